@@ -0,0 +1,201 @@
+#!/usr/bin/env python3
+"""
+Admission control for the MCP server
+Bounded per-route concurrency and queues; saturated routes answer 429/503 with Retry-After at once
+"""
+
+import asyncio
+import math
+import time
+from collections import deque
+from typing import Any, Dict, Iterable, Optional
+
+from starlette.responses import JSONResponse
+
+# Bodies up to this size are read and dropped before a rejection so the connection
+# stays usable; larger ones are left unread and the connection is closed.
+MAX_DRAIN_BYTES = 64 * 1024
+
+
+class Overloaded(Exception):
+    """Raised by ``AdmissionGate.acquire`` when a request is not admitted"""
+
+    def __init__(self, status: int, reason: str, retry_after: int):
+        super().__init__(reason)
+        self.status = status
+        self.reason = reason
+        self.retry_after = retry_after
+
+
+class AdmissionGate:
+    """Concurrency limit with a bounded FIFO queue for one route.
+
+    Up to ``concurrency`` requests run at once and up to ``queue_depth`` more
+    wait, each for at most ``queue_timeout`` seconds. A request that finds the
+    queue full is refused with 429; one that waits too long gets 503. A
+    finishing request hands its slot straight to the oldest waiter. All calls
+    happen on the event loop, so no locking is needed.
+    """
+
+    def __init__(self, concurrency: int, queue_depth: int, queue_timeout: float):
+        self.concurrency = concurrency
+        self.queue_depth = queue_depth
+        self.queue_timeout = queue_timeout
+        self.in_flight = 0
+        self.admitted = 0
+        self.rejected = 0
+        self.timed_out = 0
+        self._waiters: deque = deque()
+        # Moving average of how long admitted requests hold a slot, for Retry-After
+        self._service_time = 0.01
+
+    @property
+    def queued(self) -> int:
+        return len(self._waiters)
+
+    def retry_after(self) -> int:
+        """Whole seconds until the current backlog should have drained"""
+        backlog = (self.in_flight + len(self._waiters)) / self.concurrency
+        return max(1, math.ceil(backlog * self._service_time))
+
+    async def acquire(self):
+        if self.in_flight < self.concurrency and not self._waiters:
+            self.in_flight += 1
+            self.admitted += 1
+            return
+        if len(self._waiters) >= self.queue_depth:
+            self.rejected += 1
+            raise Overloaded(429, "Too many requests queued for this route", self.retry_after())
+
+        waiter = asyncio.get_running_loop().create_future()
+        self._waiters.append(waiter)
+        try:
+            await asyncio.wait((waiter,), timeout=self.queue_timeout)
+        except BaseException:
+            self._abandon(waiter)
+            raise
+        if not waiter.done():
+            self._abandon(waiter)
+            self.timed_out += 1
+            raise Overloaded(503, "Server is saturated; request waited too long to start",
+                             self.retry_after())
+        self.admitted += 1
+
+    def _abandon(self, waiter: asyncio.Future):
+        if waiter.done() and not waiter.cancelled():
+            # The slot was handed over just as we gave up; pass it on
+            self.release()
+            return
+        waiter.cancel()
+        try:
+            self._waiters.remove(waiter)
+        except ValueError:
+            pass
+
+    def release(self, held: Optional[float] = None):
+        if held is not None:
+            self._service_time += (held - self._service_time) * 0.1
+        while self._waiters:
+            waiter = self._waiters.popleft()
+            if not waiter.done():
+                waiter.set_result(None)
+                return
+        self.in_flight -= 1
+
+    def stats(self) -> Dict[str, float]:
+        return {"in_flight": self.in_flight, "queued": len(self._waiters),
+                "admitted": self.admitted, "rejected": self.rejected,
+                "timed_out": self.timed_out}
+
+
+class AdmissionController:
+    """One ``AdmissionGate`` per route, created by ``bind_routes``.
+
+    ``limits`` overrides the concurrency of individual paths. ``exempt``
+    paths (health probes, metrics scrapes) are never queued or refused, so
+    they keep answering while the server is saturated. Paths that were never
+    bound (typos, 404s) are not gated either.
+    """
+
+    def __init__(self, concurrency: int, queue_depth: int, queue_timeout: float,
+                 limits: Optional[Dict[str, int]] = None,
+                 exempt: Iterable[str] = ("/health", "/metrics")):
+        self.concurrency = concurrency
+        self.queue_depth = queue_depth
+        self.queue_timeout = queue_timeout
+        self.limits = dict(limits or {})
+        self.exempt = set(exempt)
+        self.gates: Dict[str, AdmissionGate] = {}
+        self.routes: Dict[str, Any] = {}
+
+    def bind_routes(self, routes: Iterable[Any]):
+        """Gate every route (anything with a ``path``) that is not exempt"""
+        for route in routes:
+            path = route.path
+            if path not in self.exempt and path not in self.gates:
+                concurrency = self.limits.get(path, self.concurrency)
+                self.gates[path] = AdmissionGate(concurrency, self.queue_depth, self.queue_timeout)
+                self.routes[path] = route
+
+    def gate(self, path: str) -> Optional[AdmissionGate]:
+        return self.gates.get(path)
+
+    def in_flight(self) -> int:
+        return sum(gate.in_flight for gate in self.gates.values())
+
+    def queued(self) -> int:
+        return sum(gate.queued for gate in self.gates.values())
+
+    def stats(self) -> Dict[str, Dict[str, float]]:
+        """Per-route counters for routes that have seen traffic"""
+        return {path: gate.stats() for path, gate in self.gates.items() if gate.admitted
+                or gate.rejected or gate.timed_out}
+
+
+class AdmissionMiddleware:
+    """ASGI middleware that admits each request through its route's gate.
+
+    It sits outside body parsing, so a refused request costs one small JSON
+    response and no handler, threadpool or storage work.
+    """
+
+    def __init__(self, app, controller: AdmissionController):
+        self.app = app
+        self.controller = controller
+
+    async def __call__(self, scope, receive, send):
+        gate = self.controller.gate(scope["path"]) if scope["type"] == "http" else None
+        if gate is None:
+            await self.app(scope, receive, send)
+            return
+
+        try:
+            await gate.acquire()
+        except Overloaded as exc:
+            # Routing never happens, so label the rejection for the timing middleware here
+            scope["route"] = self.controller.routes[scope["path"]]
+            await self._reject(exc, scope, receive, send)
+            return
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            gate.release(time.perf_counter() - start)
+
+    @staticmethod
+    async def _reject(exc: Overloaded, scope, receive, send):
+        headers = {"retry-after": str(exc.retry_after)}
+        drained = 0
+        while True:
+            message = await receive()
+            if message["type"] != "http.request":
+                break
+            drained += len(message.get("body", b""))
+            if not message.get("more_body", False):
+                break
+            if drained > MAX_DRAIN_BYTES:
+                headers["connection"] = "close"
+                break
+        response = JSONResponse({"detail": exc.reason, "retry_after": exc.retry_after},
+                                status_code=exc.status, headers=headers)
+        await response(scope, receive, send)
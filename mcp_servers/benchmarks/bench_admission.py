@@ -0,0 +1,149 @@
+#!/usr/bin/env python3
+"""
+Admission control spike benchmark
+Accepted-request latency, goodput and /health latency under a load spike, unbounded vs gated
+"""
+
+import argparse
+import json
+import os
+import shutil
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, List
+
+import requests
+
+SERVER_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(SERVER_DIR))
+
+from load_driver import run_load  # noqa: E402
+from memory_store import MemoryStore  # noqa: E402
+
+UNBOUNDED = 1_000_000
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def seed(storage: Path, entities: int):
+    """Entities that all match the load driver's search query, so each search ranks real work"""
+    store = MemoryStore(storage)
+    for offset in range(0, entities, 1000):
+        store.create_entities([{"name": f"entity {i}", "entityType": "bench",
+                                "observations": [f"test observation {i}", f"shared text {i % 97}"]}
+                               for i in range(offset, min(offset + 1000, entities))])
+    store.write_snapshot()
+    store.close()
+
+
+def probe_health(url: str, stop: threading.Event, latencies: List[float]):
+    session = requests.Session()
+    while not stop.is_set():
+        start = time.perf_counter()
+        try:
+            session.get(f"{url}/health", timeout=30)
+            latencies.append((time.perf_counter() - start) * 1000)
+        except requests.RequestException:
+            pass
+        time.sleep(0.05)
+
+
+def spike(storage: Path, env: Dict[str, str], processes: int, concurrency: int,
+          duration: float) -> Dict[str, Any]:
+    port = free_port()
+    url = f"http://127.0.0.1:{port}"
+    server_env = {**os.environ, **env, "MCP_STORAGE_DIR": str(storage), "MCP_HOST": "127.0.0.1",
+                  "MCP_PORT": str(port)}
+    server = subprocess.Popen([sys.executable, str(SERVER_DIR / "integrated_mcp_server.py")],
+                              env=server_env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    try:
+        for _ in range(300):
+            try:
+                requests.get(f"{url}/health", timeout=1)
+                break
+            except requests.RequestException:
+                time.sleep(0.1)
+
+        stop = threading.Event()
+        health: List[float] = []
+        prober = threading.Thread(target=probe_health, args=(url, stop, health), daemon=True)
+        prober.start()
+        report = run_load(url, "search", processes=processes, concurrency=concurrency,
+                          duration=duration, timeout=30, scrape=False)
+        stop.set()
+        prober.join()
+    finally:
+        server.terminate()
+        server.wait(timeout=30)
+
+    health.sort()
+    return {
+        "requests_per_second": report["requests_per_second"],
+        "goodput_per_second": report["goodput_per_second"],
+        "rejected": report["rejected_requests"],
+        "errors": report["errors"],
+        "accepted_latency_ms": report["accepted_latency"],
+        "health_ms": {"median": statistics.median(health) if health else None,
+                      "max": health[-1] if health else None},
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Admission control spike benchmark")
+    parser.add_argument("--entities", type=int, default=5000,
+                        help="Entities matching the search query (default: 5000)")
+    parser.add_argument("--processes", type=int, default=4,
+                        help="Load driver processes (default: 4)")
+    parser.add_argument("--concurrency", type=int, default=64,
+                        help="Requests in flight per load process (default: 64)")
+    parser.add_argument("--duration", type=float, default=10.0,
+                        help="Seconds of spike per configuration (default: 10)")
+    parser.add_argument("--route-concurrency", type=int, default=8,
+                        help="MCP_ROUTE_CONCURRENCY for the gated server (default: 8)")
+    parser.add_argument("--queue-depth", type=int, default=16,
+                        help="MCP_ROUTE_QUEUE_DEPTH for the gated server (default: 16)")
+    parser.add_argument("--output", default="bench_admission.json",
+                        help="Output file for results (default: bench_admission.json)")
+    args = parser.parse_args()
+
+    workdir = Path(tempfile.mkdtemp(prefix="bench_admission_"))
+    configs = {
+        "unbounded": {"MCP_ROUTE_CONCURRENCY": str(UNBOUNDED),
+                      "MCP_ROUTE_QUEUE_DEPTH": str(UNBOUNDED)},
+        "admission": {"MCP_ROUTE_CONCURRENCY": str(args.route_concurrency),
+                      "MCP_ROUTE_QUEUE_DEPTH": str(args.queue_depth)},
+    }
+    results = {"timestamp": time.time(), "entities": args.entities,
+               "in_flight": args.processes * args.concurrency, "runs": {}}
+    try:
+        print(f"🌱 Seeding {args.entities} entities...")
+        seed(workdir, args.entities)
+        for name, env in configs.items():
+            print(f"\n🌊 Spike of {args.processes * args.concurrency} in flight, {name}...")
+            run = spike(workdir, env, args.processes, args.concurrency, args.duration)
+            latency = run["accepted_latency_ms"]
+            print(f"   {run['goodput_per_second']:8.0f} accepted/s  {run['rejected']:7d} rejected  "
+                  f"accepted p50 {latency.get('p50_ms', 0):7.1f} ms  "
+                  f"p99 {latency.get('p99_ms', 0):7.1f} ms  "
+                  f"/health median {run['health_ms']['median'] or 0:6.1f} ms")
+            results["runs"][name] = run
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    with open(args.output, "w") as f:
+        json.dump(results, f, indent=2)
+    print(f"\n📁 Results saved to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
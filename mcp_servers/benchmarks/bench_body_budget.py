@@ -0,0 +1,120 @@
+#!/usr/bin/env python3
+"""
+Request body budget benchmark
+Peak memory and time to reject oversized payloads with and without the streaming budget
+"""
+
+import argparse
+import asyncio
+import json
+import sys
+import time
+import tracemalloc
+from pathlib import Path
+from typing import Any, Dict, Iterator, Optional
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from body_budget import BodyBudgetMiddleware  # noqa: E402
+
+CHUNK_BYTES = 64 * 1024
+
+
+def oversized_body(observation_bytes: int) -> Iterator[bytes]:
+    """Stream one entity with a huge observation without ever holding it whole"""
+    yield b'[{"name": "huge", "entityType": "test", "observations": ["'
+    filler = b"lorem ipsum dolor sit amet " * (CHUNK_BYTES // 27)
+    sent = 0
+    while sent < observation_bytes:
+        piece = filler[:observation_bytes - sent]
+        sent += len(piece)
+        yield piece
+    yield b'"]}]'
+
+
+async def parse_first_app(scope, receive, send):
+    """What the framework does without a budget: buffer the body, then parse it"""
+    chunks = []
+    while True:
+        message = await receive()
+        chunks.append(message.get("body", b""))
+        if not message.get("more_body", False):
+            break
+    entities = json.loads(b"".join(chunks))
+    observation = entities[0]["observations"][0]
+    status = 413 if len(observation) > 64 * 1024 else 200
+    await send({"type": "http.response.start", "status": status, "headers": []})
+    await send({"type": "http.response.body", "body": b"{}"})
+
+
+def run_request(app, observation_bytes: int, content_length: Optional[int]) -> Dict[str, Any]:
+    body = oversized_body(observation_bytes)
+    state = {"read": 0, "status": None}
+    headers = [(b"content-type", b"application/json")]
+    if content_length is not None:
+        headers.append((b"content-length", str(content_length).encode()))
+    scope = {"type": "http", "method": "POST", "path": "/mcp/memory/create_entities",
+             "headers": headers}
+
+    async def receive():
+        chunk = next(body, None)
+        if chunk is None:
+            return {"type": "http.request", "body": b"", "more_body": False}
+        state["read"] += len(chunk)
+        return {"type": "http.request", "body": chunk, "more_body": True}
+
+    async def send(message):
+        if message["type"] == "http.response.start":
+            state["status"] = message["status"]
+
+    tracemalloc.start()
+    t0 = time.perf_counter()
+    asyncio.run(app(scope, receive, send))
+    elapsed = time.perf_counter() - t0
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return {
+        "status": state["status"],
+        "bytes_read": state["read"],
+        "peak_kib": peak / 1024,
+        "ms": elapsed * 1000,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Request body budget benchmark")
+    parser.add_argument("--sizes", default="1000000,10000000,100000000",
+                        help="Comma-separated observation sizes in bytes (default: 1MB,10MB,100MB)")
+    parser.add_argument("--max-bytes", type=int, default=16 * 1024 * 1024)
+    parser.add_argument("--max-string-bytes", type=int, default=64 * 1024)
+    parser.add_argument("--output", default="bench_body_budget.json",
+                        help="Output file for results (default: bench_body_budget.json)")
+    args = parser.parse_args()
+
+    budgeted = BodyBudgetMiddleware(parse_first_app, max_bytes=args.max_bytes,
+                                    max_tokens=2_000_000, max_string_bytes=args.max_string_bytes)
+    results = {"timestamp": time.time(), "max_bytes": args.max_bytes,
+               "max_string_bytes": args.max_string_bytes, "runs": []}
+    # Warm up imports and the event loop so they do not count towards the first run
+    run_request(budgeted, CHUNK_BYTES, None)
+    for size in [int(s) for s in args.sizes.split(",")]:
+        print(f"\n📦 Observation of {size / 1e6:.0f} MB...")
+        run = {
+            "observation_bytes": size,
+            "parse_first": run_request(parse_first_app, size, None),
+            "budget_streamed": run_request(budgeted, size, None),
+            "budget_content_length": run_request(budgeted, size, size + 64),
+        }
+        for name in ("parse_first", "budget_streamed", "budget_content_length"):
+            r = run[name]
+            print(f"   {name:22s} status {r['status']}  read {r['bytes_read'] / 1024:9.0f} KiB  "
+                  f"peak {r['peak_kib']:9.0f} KiB  {r['ms']:8.1f} ms")
+        results["runs"].append(run)
+
+    with open(args.output, "w") as f:
+        json.dump(results, f, indent=2)
+    print(f"\n📁 Results saved to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
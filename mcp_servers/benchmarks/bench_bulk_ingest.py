@@ -0,0 +1,187 @@
+#!/usr/bin/env python3
+"""
+Bulk create_entities ingestion benchmark
+Compares the batched segment-log write path with the legacy file-per-entity layout
+"""
+
+import argparse
+import json
+import os
+import random
+import shutil
+import string
+import sys
+import tempfile
+import time
+import uuid
+from pathlib import Path
+from typing import Any, Dict, Iterator, List
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from memory_store import MemoryStore  # noqa: E402
+
+# Observation size classes (min chars, max chars, weight)
+OBSERVATION_SIZES = [(16, 80, 70), (200, 1000, 25), (2000, 8000, 5)]
+
+
+def generate_entities(count: int, seed: int) -> Iterator[Dict[str, Any]]:
+    """Yield entities with varied observation counts and sizes"""
+    rng = random.Random(seed)
+    words = ["".join(rng.choices(string.ascii_lowercase, k=rng.randint(3, 10)))
+             for _ in range(2000)]
+    sizes = [(lo, hi) for lo, hi, _ in OBSERVATION_SIZES]
+    weights = [w for _, _, w in OBSERVATION_SIZES]
+
+    for i in range(count):
+        observations = []
+        for _ in range(min(int(rng.expovariate(1 / 4)), 50)):
+            lo, hi = rng.choices(sizes, weights)[0]
+            target = rng.randint(lo, hi)
+            text = []
+            length = 0
+            while length < target:
+                word = rng.choice(words)
+                text.append(word)
+                length += len(word) + 1
+            observations.append(" ".join(text))
+        yield {
+            "name": f"bench-entity-{i}",
+            "entityType": rng.choice(["agent-output", "research", "decision", "test"]),
+            "observations": observations,
+        }
+
+
+def batched(items: Iterator[Dict[str, Any]], size: int) -> Iterator[List[Dict[str, Any]]]:
+    batch = []
+    for item in items:
+        batch.append(item)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def bench_batched_store(count: int, batch_size: int, seed: int, workdir: Path) -> Dict[str, Any]:
+    """Ingest through MemoryStore.create_entities (one log append and fsync per batch)"""
+    store = MemoryStore(workdir)
+    batches = list(batched(generate_entities(count, seed), batch_size))
+
+    start = time.perf_counter()
+    for batch in batches:
+        store.create_entities(batch)
+    elapsed = time.perf_counter() - start
+    store.close()
+
+    return {
+        "entities": count,
+        "batch_size": batch_size,
+        "fsyncs": len(batches),
+        "seconds": elapsed,
+        "entities_per_second": count / elapsed if elapsed > 0 else 0,
+        "bytes_written": sum(p.stat().st_size for p in (workdir / "entity_log").iterdir()),
+    }
+
+
+def bench_file_per_entity(count: int, seed: int, workdir: Path) -> Dict[str, Any]:
+    """Ingest with the legacy layout: one pretty-printed, fsync'd JSON file per entity"""
+    entities_dir = workdir / "entities"
+    entities_dir.mkdir(parents=True, exist_ok=True)
+    entities = list(generate_entities(count, seed))
+
+    start = time.perf_counter()
+    for entity in entities:
+        path = entities_dir / f"{uuid.uuid4().hex[:12]}.json"
+        with open(path, "w") as f:
+            json.dump(entity, f, indent=2)
+            f.flush()
+            os.fsync(f.fileno())
+    elapsed = time.perf_counter() - start
+
+    return {
+        "entities": count,
+        "fsyncs": count,
+        "seconds": elapsed,
+        "entities_per_second": count / elapsed if elapsed > 0 else 0,
+    }
+
+
+def bench_http(url: str, count: int, batch_size: int, seed: int) -> Dict[str, Any]:
+    """Ingest through a running server's /mcp/memory/create_entities"""
+    import requests
+
+    session = requests.Session()
+    batches = list(batched(generate_entities(count, seed), batch_size))
+    created_ids = []
+
+    start = time.perf_counter()
+    for batch in batches:
+        response = session.post(f"{url}/mcp/memory/create_entities", json=batch, timeout=300)
+        response.raise_for_status()
+        created_ids.extend(e["entity_id"] for e in response.json()["entities"])
+    elapsed = time.perf_counter() - start
+
+    for entity_id in created_ids:
+        session.post(f"{url}/mcp/memory/delete_entity", json={"entity_id": entity_id}, timeout=10)
+
+    return {
+        "entities": count,
+        "batch_size": batch_size,
+        "requests": len(batches),
+        "seconds": elapsed,
+        "entities_per_second": count / elapsed if elapsed > 0 else 0,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Bulk create_entities ingestion benchmark")
+    parser.add_argument("--counts", default="10000,100000",
+                        help="Comma-separated entity counts (default: 10000,100000)")
+    parser.add_argument("--batch-size", type=int, default=1000,
+                        help="Entities per create_entities call (default: 1000)")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--url", help="Benchmark a running server instead of the store in-process")
+    parser.add_argument("--baseline", action="store_true",
+                        help="Also run the legacy file-per-entity write path")
+    parser.add_argument("--output", default="bench_bulk_ingest.json",
+                        help="Output file for results (default: bench_bulk_ingest.json)")
+    args = parser.parse_args()
+
+    counts = [int(c) for c in args.counts.split(",")]
+    results = {"timestamp": time.time(), "seed": args.seed, "runs": []}
+
+    for count in counts:
+        print(f"\n📦 Ingesting {count} entities (batch size {args.batch_size})...")
+        run = {"count": count}
+
+        if args.url:
+            run["http"] = bench_http(args.url, count, args.batch_size, args.seed)
+            print(f"   HTTP batched: {run['http']['entities_per_second']:.0f} entities/s")
+        else:
+            workdir = Path(tempfile.mkdtemp(prefix="mcp-bench-"))
+            try:
+                run["batched"] = bench_batched_store(count, args.batch_size, args.seed, workdir)
+                print(f"   Batched log: {run['batched']['entities_per_second']:.0f} entities/s "
+                      f"({run['batched']['fsyncs']} fsyncs)")
+            finally:
+                shutil.rmtree(workdir, ignore_errors=True)
+
+            if args.baseline:
+                workdir = Path(tempfile.mkdtemp(prefix="mcp-bench-"))
+                try:
+                    run["file_per_entity"] = bench_file_per_entity(count, args.seed, workdir)
+                    print(f"   File per entity: {run['file_per_entity']['entities_per_second']:.0f} "
+                          f"entities/s ({count} fsyncs)")
+                finally:
+                    shutil.rmtree(workdir, ignore_errors=True)
+
+        results["runs"].append(run)
+
+    with open(args.output, "w") as f:
+        json.dump(results, f, indent=2)
+    print(f"\n📁 Results saved to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
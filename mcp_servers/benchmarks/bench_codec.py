@@ -0,0 +1,139 @@
+#!/usr/bin/env python3
+"""
+Response codec benchmark
+Encode/decode cost of large search_nodes responses: FastAPI's default path vs orjson vs MessagePack
+"""
+
+import argparse
+import json
+import statistics
+import sys
+import time
+import uuid
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Callable, Dict, List
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from fastapi.encoders import jsonable_encoder  # noqa: E402
+
+from bench_bulk_ingest import generate_entities  # noqa: E402
+from codec import DECODERS, ENCODERS, JSON, MSGPACK  # noqa: E402
+from mcp_client import CODECS, MCPClient  # noqa: E402
+
+
+def search_response(count: int, seed: int) -> Dict[str, Any]:
+    """A search_nodes body shaped like the server's, with stored-entity fields"""
+    now = datetime.now().isoformat()
+    nodes = [{"entity_id": uuid.uuid4().hex[:12], **entity, "metadata": {},
+              "created_at": now, "updated_at": now}
+             for entity in generate_entities(count, seed)]
+    return {"query": "", "count": len(nodes), "nodes": nodes}
+
+
+def time_calls(fn: Callable[[], Any], repeat: int) -> Dict[str, float]:
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - start) * 1000)
+    return {"mean_ms": statistics.mean(samples), "min_ms": min(samples)}
+
+
+def bench_in_process(count: int, repeat: int, seed: int) -> Dict[str, Any]:
+    body = search_response(count, seed)
+
+    def fastapi_default() -> bytes:
+        return json.dumps(jsonable_encoder(body)).encode("utf-8")
+
+    default_bytes = fastapi_default()
+    results = {
+        "fastapi_default": {
+            "bytes": len(default_bytes),
+            "encode": time_calls(fastapi_default, repeat),
+            "decode": time_calls(lambda: json.loads(default_bytes), repeat),
+        },
+    }
+    for name, media_type in (("orjson", JSON), ("msgpack", MSGPACK)):
+        if media_type not in ENCODERS:
+            continue
+        encoded = ENCODERS[media_type](body)
+        results[name] = {
+            "bytes": len(encoded),
+            "encode": time_calls(lambda: ENCODERS[media_type](body), repeat),
+            "decode": time_calls(lambda: DECODERS[media_type](encoded), repeat),
+        }
+    return results
+
+
+def bench_http(url: str, count: int, repeat: int, seed: int) -> Dict[str, Any]:
+    """search_nodes round trips against a running server, once per codec"""
+    entity_type = f"codec-bench-{uuid.uuid4().hex[:8]}"
+    seeding = MCPClient(url, timeout=300)
+    created: List[str] = []
+    entities = list(generate_entities(count, seed))
+    for entity in entities:
+        entity["entityType"] = entity_type
+    for start in range(0, count, 500):
+        response = seeding.post("/mcp/memory/create_entities", entities[start:start + 500])
+        response.raise_for_status()
+        created.extend(e["entity_id"] for e in response.data["entities"])
+
+    results = {}
+    try:
+        for codec in ("json", "msgpack"):
+            if CODECS[codec] not in ENCODERS:
+                continue
+            client = MCPClient(url, codec=codec, timeout=60)
+            query = {"query": "", "entityType": entity_type, "limit": count}
+            response = client.post("/mcp/memory/search_nodes", query)
+            response.raise_for_status()
+            results[codec] = {
+                "bytes": len(response.content),
+                "nodes": response.data["count"],
+                "round_trip": time_calls(lambda: client.post("/mcp/memory/search_nodes", query),
+                                         repeat),
+            }
+            client.close()
+    finally:
+        for entity_id in created:
+            seeding.post("/mcp/memory/delete_entity", {"entity_id": entity_id})
+        seeding.close()
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Response codec benchmark")
+    parser.add_argument("--nodes", default="1000,10000",
+                        help="Comma-separated search result sizes (default: 1000,10000)")
+    parser.add_argument("--repeat", type=int, default=10,
+                        help="Calls per measurement (default: 10)")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--url", help="Also measure search_nodes round trips against this server")
+    parser.add_argument("--output", default="bench_codec.json",
+                        help="Output file for results (default: bench_codec.json)")
+    args = parser.parse_args()
+
+    results = {"timestamp": time.time(), "seed": args.seed, "runs": []}
+    for count in [int(n) for n in args.nodes.split(",")]:
+        print(f"\n🧬 Search response with {count} nodes...")
+        run = {"nodes": count, "in_process": bench_in_process(count, args.repeat, args.seed)}
+        for name, r in run["in_process"].items():
+            print(f"   {name:16s} {r['bytes'] / 1024:9.0f} KiB  "
+                  f"encode {r['encode']['mean_ms']:8.2f} ms  "
+                  f"decode {r['decode']['mean_ms']:8.2f} ms")
+        if args.url:
+            run["http"] = bench_http(args.url, count, args.repeat, args.seed)
+            for name, r in run["http"].items():
+                print(f"   HTTP {name:11s} {r['bytes'] / 1024:9.0f} KiB  "
+                      f"round trip {r['round_trip']['mean_ms']:8.2f} ms")
+        results["runs"].append(run)
+
+    with open(args.output, "w") as f:
+        json.dump(results, f, indent=2)
+    print(f"\n📁 Results saved to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
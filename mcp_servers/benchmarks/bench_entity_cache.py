@@ -0,0 +1,123 @@
+#!/usr/bin/env python3
+"""
+Entity cache benchmark
+Read-heavy open_nodes and search_nodes latency and hit ratio, with and without caches
+"""
+
+import argparse
+import json
+import random
+import shutil
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Tuple
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from dataset_generator import SCALES, Dataset, populate_storage, scaled  # noqa: E402
+from memory_store import DEFAULT_ENTITY_CACHE, DEFAULT_SEARCH_CACHE, MemoryStore  # noqa: E402
+
+
+def summarize(samples: List[float]) -> Dict[str, float]:
+    samples = sorted(samples)
+    return {
+        "count": len(samples),
+        "mean_us": sum(samples) / len(samples),
+        "p50_us": samples[len(samples) // 2],
+        "p99_us": samples[min(int(len(samples) * 0.99), len(samples) - 1)],
+    }
+
+
+def run_reads(store: MemoryStore, reads: List[Callable[[], Any]],
+              kinds: List[str]) -> Dict[str, Dict[str, float]]:
+    samples: Dict[str, List[float]] = {}
+    for read, kind in zip(reads, kinds):
+        start = time.perf_counter()
+        read()
+        samples.setdefault(kind, []).append((time.perf_counter() - start) * 1e6)
+    return {kind: summarize(values) for kind, values in sorted(samples.items())}
+
+
+def workload(store: MemoryStore, queries: List[str],
+             args) -> Tuple[List[Callable[[], Any]], List[str]]:
+    """A phase of agent reads: most open a few hot entities or rerun a few hot searches"""
+    rng = random.Random(args.seed)
+    entity_ids = [store._entity_id(seq) for seq in store._all_seqs()]
+    hot_ids = rng.sample(entity_ids, min(args.hot, len(entity_ids)))
+    hot_queries = queries[:args.hot_queries]
+    reads, kinds = [], []
+    for _ in range(args.reads):
+        roll = rng.random()
+        if roll < args.search_share:
+            query = rng.choice(hot_queries)
+            reads.append(lambda q=query: store.search(q, limit=10))
+            kinds.append("search_hot")
+        elif roll < args.search_share + (1 - args.search_share) * args.hot_share:
+            entity_id = rng.choice(hot_ids)
+            reads.append(lambda e=entity_id: store.get_entities([e]))
+            kinds.append("open_hot")
+        else:
+            entity_id = rng.choice(entity_ids)
+            reads.append(lambda e=entity_id: store.get_entities([e]))
+            kinds.append("open_cold")
+    return reads, kinds
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Entity cache benchmark")
+    parser.add_argument("--sizes", default="100k",
+                        help=f"Comma-separated store sizes, counts or {', '.join(SCALES)} "
+                             "(default: 100k)")
+    parser.add_argument("--reads", type=int, default=50000, help="Reads per configuration")
+    parser.add_argument("--hot", type=int, default=200, help="Hot entities (default: 200)")
+    parser.add_argument("--hot-queries", type=int, default=20,
+                        help="Hot search queries (default: 20)")
+    parser.add_argument("--hot-share", type=float, default=0.9,
+                        help="Share of opens that go to hot entities (default: 0.9)")
+    parser.add_argument("--search-share", type=float, default=0.3,
+                        help="Share of reads that are searches (default: 0.3)")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--output", default="bench_entity_cache.json",
+                        help="Output file for results (default: bench_entity_cache.json)")
+    args = parser.parse_args()
+
+    sizes = [SCALES.get(size.lower()) or int(size) for size in args.sizes.split(",")]
+    configs = {"uncached": (0, 0), "cached": (DEFAULT_ENTITY_CACHE, DEFAULT_SEARCH_CACHE)}
+    results = {"timestamp": time.time(), "seed": args.seed, "runs": []}
+
+    for size in sizes:
+        spec = scaled(size, args.seed)
+        workdir = Path(tempfile.mkdtemp(prefix="mcp-bench-"))
+        try:
+            print(f"\n🗂️ Generating {size} entities (seed {args.seed})...")
+            populate_storage(workdir, spec, fsync=False)
+            queries = [q["query"] for q in Dataset(spec).queries(args.hot_queries)]
+            run = {"size": size, "configs": {}}
+            for name, (entity_cache, search_cache) in configs.items():
+                store = MemoryStore(workdir, fsync=False, entity_cache_size=entity_cache,
+                                    search_cache_size=search_cache)
+                try:
+                    reads, kinds = workload(store, queries, args)
+                    timing = run_reads(store, reads, kinds)
+                    run["configs"][name] = {"latency": timing, "cache": store.cache_stats()}
+                finally:
+                    store.close()
+                print(f"   {name:9s}: " + ", ".join(
+                    f"{kind} p50 {t['p50_us']:.1f} us / p99 {t['p99_us']:.1f} us"
+                    for kind, t in timing.items()))
+                cache = run["configs"][name]["cache"]
+                print(f"              entity hit ratio {cache['entities']['hit_ratio']:.2f}, "
+                      f"search hit ratio {cache['searches']['hit_ratio']:.2f}")
+            results["runs"].append(run)
+        finally:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+    with open(args.output, "w") as f:
+        json.dump(results, f, indent=2)
+    print(f"\n📁 Results saved to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,138 @@
+#!/usr/bin/env python3
+"""
+Knowledge graph traversal benchmark
+neighbors and find_path latency against edges visited, and restart time, on random graphs with millions of relations
+"""
+
+import argparse
+import json
+import random
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Any, Callable, Dict, List
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from relation_store import RelationStore  # noqa: E402
+
+
+def build(store: RelationStore, edges: int, degree: int, seed: int, batch: int = 20000):
+    rng = random.Random(seed)
+    nodes = max(edges // degree, 2)
+    types = [f"rel-{i}" for i in range(8)]
+    for start in range(0, edges, batch):
+        store.add((f"n{rng.randrange(nodes)}", f"n{rng.randrange(nodes)}", rng.choice(types))
+                  for _ in range(min(batch, edges - start)))
+    return nodes
+
+
+def time_queries(queries: List[Callable[[], Dict[str, Any]]]) -> Dict[str, float]:
+    samples = []
+    visited = []
+    for query in queries:
+        start = time.perf_counter()
+        result = query()
+        samples.append((time.perf_counter() - start) * 1000)
+        visited.append(result["edges_visited"])
+    mean_visited = statistics.mean(visited)
+    return {
+        "mean_ms": statistics.mean(samples),
+        "p95_ms": sorted(samples)[int(len(samples) * 0.95)],
+        "mean_edges_visited": mean_visited,
+        "us_per_edge": statistics.mean(samples) * 1000 / max(mean_visited, 1),
+    }
+
+
+def bench(edges: int, degree: int, queries: int, seed: int) -> Dict[str, Any]:
+    workdir = Path(tempfile.mkdtemp(prefix="bench_graph_"))
+    try:
+        store = RelationStore(workdir, fsync=False)
+        start = time.perf_counter()
+        nodes = build(store, edges, degree, seed)
+        build_s = time.perf_counter() - start
+        rng = random.Random(seed + 1)
+        pairs = [(f"n{rng.randrange(nodes)}", f"n{rng.randrange(nodes)}") for _ in range(queries)]
+
+        result = {"edges": store.edge_count, "nodes": store.node_count, "build_s": build_s}
+        for depth in (1, 2, 3):
+            result[f"neighbors_depth_{depth}"] = time_queries(
+                [lambda s=s, d=depth: store.neighbors(s, d, limit=10000) for s, _ in pairs])
+        paths = [store.find_path(s, t, max_depth=8) for s, t in pairs]
+        result["find_path"] = time_queries(
+            [lambda s=s, t=t: store.find_path(s, t, max_depth=8) for s, t in pairs])
+        result["find_path"]["found"] = sum(p["found"] for p in paths)
+        # What a one-sided search would have walked to reach the same depth
+        result["one_sided_edges_visited"] = statistics.mean(
+            store.neighbors(s, len(p["path"]), limit=edges)["edges_visited"]
+            for (s, _), p in zip(pairs, paths) if p["found"])
+        start = time.perf_counter()
+        store.write_snapshot()
+        result["snapshot_s"] = time.perf_counter() - start
+        store.close()
+
+        start = time.perf_counter()
+        reopened = RelationStore(workdir, fsync=False)
+        result["restart_s"] = time.perf_counter() - start
+        assert reopened.loaded_from_snapshot and reopened.edge_count == result["edges"]
+        reopened.close()
+
+        # Without the snapshot the whole log is replayed
+        (workdir / "graph.snap").unlink()
+        start = time.perf_counter()
+        reopened = RelationStore(workdir, fsync=False)
+        result["replay_s"] = time.perf_counter() - start
+        reopened.close()
+        return result
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Knowledge graph traversal benchmark")
+    parser.add_argument("--edges", default="100000,1000000",
+                        help="Comma-separated relation counts (default: 100000,1000000)")
+    parser.add_argument("--degree", type=int, default=4,
+                        help="Average out-degree of the random graph (default: 4)")
+    parser.add_argument("--queries", type=int, default=200,
+                        help="Queries per measurement (default: 200)")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--max-restart-s", type=float, default=None,
+                        help="Exit non-zero if reopening from the snapshot takes longer")
+    parser.add_argument("--output", default="bench_graph.json",
+                        help="Output file for results (default: bench_graph.json)")
+    args = parser.parse_args()
+
+    results = {"timestamp": time.time(), "degree": args.degree, "runs": []}
+    slow = []
+    for edges in [int(n) for n in args.edges.split(",")]:
+        print(f"\n🕸️  Building a graph with {edges} relations...")
+        run = bench(edges, args.degree, args.queries, args.seed)
+        print(f"   {run['nodes']} nodes, built in {run['build_s']:.1f}s, "
+              f"replayed in {run['replay_s']:.1f}s")
+        print(f"   snapshot written in {run['snapshot_s']:.1f}s, "
+              f"restart from it in {run['restart_s']:.1f}s")
+        if args.max_restart_s is not None and run["restart_s"] > args.max_restart_s:
+            slow.append(edges)
+        for name in ("neighbors_depth_1", "neighbors_depth_2", "neighbors_depth_3", "find_path"):
+            r = run[name]
+            print(f"   {name:18s} {r['mean_ms']:8.3f} ms  p95 {r['p95_ms']:8.3f} ms  "
+                  f"{r['mean_edges_visited']:9.0f} edges  {r['us_per_edge']:6.2f} µs/edge")
+        print(f"   find_path found {run['find_path']['found']}/{args.queries}; a one-sided "
+              f"search would visit {run['one_sided_edges_visited']:.0f} edges")
+        results["runs"].append(run)
+
+    with open(args.output, "w") as f:
+        json.dump(results, f, indent=2)
+    print(f"\n📁 Results saved to {args.output}")
+    if slow:
+        print(f"❌ Restart took longer than {args.max_restart_s}s with "
+              f"{', '.join(map(str, slow))} relations")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
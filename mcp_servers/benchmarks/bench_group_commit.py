@@ -0,0 +1,102 @@
+#!/usr/bin/env python3
+"""
+Group commit benchmark
+Write throughput of concurrent create/delete callers, one fsync per call vs one per group commit
+"""
+
+import argparse
+import json
+import shutil
+import statistics
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Any, Dict, List
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from memory_store import MemoryStore  # noqa: E402
+
+
+def run_writers(store: MemoryStore, writers: int, writes: int) -> Dict[str, Any]:
+    """Each writer creates entities one at a time and deletes every other one"""
+    barrier = threading.Barrier(writers + 1)
+
+    def writer(worker: int) -> List[float]:
+        latencies = []
+        barrier.wait()
+        for i in range(writes):
+            start = time.perf_counter()
+            created = store.create_entities([{"name": f"w{worker}-{i}", "entityType": "bench",
+                                              "observations": [f"observation {i}"]}])
+            if i % 2:
+                store.delete_entity(created[0]["entity_id"])
+            latencies.append((time.perf_counter() - start) * 1000)
+        return latencies
+
+    with ThreadPoolExecutor(writers) as pool:
+        futures = [pool.submit(writer, worker) for worker in range(writers)]
+        barrier.wait()
+        start = time.perf_counter()
+        latencies = sorted(ms for future in futures for ms in future.result())
+        elapsed = time.perf_counter() - start
+
+    mutations = writers * writes + writers * (writes // 2)
+    return {
+        "mutations": mutations,
+        "elapsed_s": elapsed,
+        "mutations_per_s": mutations / elapsed,
+        "mean_ms": statistics.mean(latencies),
+        "p99_ms": latencies[int(len(latencies) * 0.99)],
+    }
+
+
+def bench(writers: int, writes: int, max_batch: int) -> Dict[str, Any]:
+    workdir = Path(tempfile.mkdtemp(prefix="bench_group_commit_"))
+    try:
+        store = MemoryStore(workdir, max_commit_batch=max_batch)
+        result = run_writers(store, writers, writes)
+        result["fsync_batches"] = store._writer.batches
+        store.close()
+        reopened = MemoryStore(workdir)
+        result["durable_entities"] = reopened.count
+        reopened.close()
+        return result
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Group commit benchmark")
+    parser.add_argument("--writers", default="1,8,32",
+                        help="Comma-separated concurrent writer counts (default: 1,8,32)")
+    parser.add_argument("--writes", type=int, default=100,
+                        help="create_entities calls per writer (default: 100)")
+    parser.add_argument("--output", default="bench_group_commit.json",
+                        help="Output file for results (default: bench_group_commit.json)")
+    args = parser.parse_args()
+
+    results = {"timestamp": time.time(), "writes_per_writer": args.writes, "runs": []}
+    for writers in [int(n) for n in args.writers.split(",")]:
+        print(f"\n✍️  {writers} concurrent writers...")
+        # max_batch=1 is one append and fsync per call, as before group commit
+        run = {"writers": writers,
+               "per_call": bench(writers, args.writes, max_batch=1),
+               "group_commit": bench(writers, args.writes, max_batch=1024)}
+        for name in ("per_call", "group_commit"):
+            r = run[name]
+            print(f"   {name:12s} {r['mutations_per_s']:9.0f} writes/s  "
+                  f"mean {r['mean_ms']:7.2f} ms  p99 {r['p99_ms']:7.2f} ms  "
+                  f"{r['fsync_batches']:5d} fsyncs  {r['durable_entities']} durable")
+        results["runs"].append(run)
+
+    with open(args.output, "w") as f:
+        json.dump(results, f, indent=2)
+    print(f"\n📁 Results saved to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,152 @@
+#!/usr/bin/env python3
+"""
+Agent notification benchmark
+Handoff latency and request cost of change feed push (SSE) vs smembers polling, per subscriber count
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import shutil
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Any, Dict, List
+
+import aiohttp
+import requests
+
+SERVER_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(SERVER_DIR))
+
+from load_driver import LatencyHistogram, run_fanout  # noqa: E402
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+async def _poll(url: str, subscribers: int, events: int, interval: float,
+                poll_interval: float) -> Dict[str, Any]:
+    key = f"poll:{int(time.time() * 1000)}:handoffs"
+    published: Dict[str, float] = {}
+    latency = LatencyHistogram()
+    polls = 0
+    done = asyncio.Event()
+
+    async def poller(session):
+        nonlocal polls
+        seen = set()
+        while not done.is_set():
+            async with session.post("/mcp/redis/smembers", json={"key": key}) as response:
+                members = (await response.json())["members"]
+            polls += 1
+            now = time.time()
+            for member in members:
+                if member not in seen and member in published:
+                    seen.add(member)
+                    latency.record(now - published[member])
+            if len(seen) == events:
+                return
+            await asyncio.sleep(poll_interval)
+
+    connector = aiohttp.TCPConnector(limit=0)
+    async with aiohttp.ClientSession(url, connector=connector) as session:
+        pollers = [asyncio.create_task(poller(session)) for _ in range(subscribers)]
+        started = time.perf_counter()
+        for n in range(events):
+            published[str(n)] = time.time()
+            async with session.post("/mcp/redis/sadd", json={"key": key, "members": [str(n)]}):
+                pass
+            await asyncio.sleep(interval)
+        _, pending = await asyncio.wait(pollers, timeout=poll_interval * 4 + 30)
+        done.set()
+        await asyncio.gather(*pending, return_exceptions=True)
+        wall = time.perf_counter() - started
+        async with session.post("/mcp/redis/delete", json={"key": key}):
+            pass
+    return {"requests": polls + events, "requests_per_second": (polls + events) / wall,
+            "deliveries": latency.count, "delivery_latency": latency.summary()}
+
+
+def compare(url: str, subscribers: int, events: int, interval: float,
+            poll_interval: float) -> Dict[str, Any]:
+    push = run_fanout(url, subscribers, events, interval)
+    # One subscribe request per subscriber, one sadd per event
+    push_requests = subscribers + events
+    poll = asyncio.run(_poll(url, subscribers, events, interval, poll_interval))
+    return {
+        "push": {"requests": push_requests, "deliveries": push["deliveries"],
+                 "missing": push["missing_deliveries"],
+                 "delivery_latency": push["delivery_latency"],
+                 "fanout_latency": push["fanout_latency"]},
+        "poll": poll,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Agent notification benchmark")
+    parser.add_argument("--subscribers", default="100,300",
+                        help="Comma-separated subscriber counts (default: 100,300)")
+    parser.add_argument("--events", type=int, default=50,
+                        help="Handoffs published per run (default: 50)")
+    parser.add_argument("--interval", type=float, default=0.05,
+                        help="Seconds between handoffs (default: 0.05)")
+    parser.add_argument("--poll-interval", type=float, default=0.5,
+                        help="Seconds between smembers polls per agent (default: 0.5)")
+    parser.add_argument("--url", help="Benchmark a running server instead of starting one")
+    parser.add_argument("--output", default="bench_notifications.json",
+                        help="Output file for results (default: bench_notifications.json)")
+    args = parser.parse_args()
+
+    counts: List[int] = [int(c) for c in args.subscribers.split(",")]
+    results = {"timestamp": time.time(), "events": args.events, "interval_s": args.interval,
+               "poll_interval_s": args.poll_interval, "runs": {}}
+
+    server = workdir = None
+    url = args.url
+    if url is None:
+        workdir = Path(tempfile.mkdtemp(prefix="bench_notifications_"))
+        port = free_port()
+        url = f"http://127.0.0.1:{port}"
+        env = {**os.environ, "MCP_STORAGE_DIR": str(workdir), "MCP_HOST": "127.0.0.1",
+               "MCP_PORT": str(port)}
+        server = subprocess.Popen([sys.executable, str(SERVER_DIR / "integrated_mcp_server.py")],
+                                  env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    try:
+        for _ in range(300):
+            try:
+                requests.get(f"{url}/health", timeout=1)
+                break
+            except requests.RequestException:
+                time.sleep(0.1)
+
+        for subscribers in counts:
+            print(f"\n📣 {subscribers} subscribers, {args.events} handoffs...")
+            run = compare(url, subscribers, args.events, args.interval, args.poll_interval)
+            for mode in ("push", "poll"):
+                latency = run[mode]["delivery_latency"]
+                print(f"   {mode:5s} {run[mode]['requests']:8d} requests  "
+                      f"p50 {latency.get('p50_ms', 0):8.1f} ms  "
+                      f"p99 {latency.get('p99_ms', 0):8.1f} ms")
+            results["runs"][str(subscribers)] = run
+    finally:
+        if server is not None:
+            server.terminate()
+            server.wait(timeout=30)
+        if workdir is not None:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+    with open(args.output, "w") as f:
+        json.dump(results, f, indent=2)
+    print(f"\n📁 Results saved to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
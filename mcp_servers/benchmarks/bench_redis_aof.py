@@ -0,0 +1,142 @@
+#!/usr/bin/env python3
+"""
+Redis append-only file benchmark
+Write throughput per appendfsync policy against no persistence, and replay and rewrite speed
+"""
+
+import argparse
+import asyncio
+import json
+import random
+import shutil
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from redis_aof import ALWAYS, FSYNC_POLICIES, AppendOnlyLog  # noqa: E402
+from redis_store import RedisStore  # noqa: E402
+
+
+def make_writes(count: int, keys: int, seed: int) -> List[Callable[[RedisStore], Any]]:
+    """Agent coordination traffic: state hashes, task sets and score boards"""
+    rng = random.Random(seed)
+    writes: List[Callable[[RedisStore], Any]] = []
+    for i in range(count):
+        key = rng.randrange(keys)
+        roll = rng.random()
+        if roll < 0.6:
+            writes.append(lambda s, k=f"agent:{key}", v=str(i): s.hset(k, "state", v))
+        elif roll < 0.8:
+            writes.append(lambda s, k=f"tasks:{key % 100}", m=f"task-{i}": s.sadd(k, [m]))
+        elif roll < 0.95:
+            writes.append(lambda s, k=f"scores:{key % 100}", m=f"agent-{key}", v=float(i):
+                          s.zadd(k, {m: v}))
+        else:
+            writes.append(lambda s, k=f"lease:{key}", v=str(i): s.hset(k, "owner", v, ttl=600))
+    return writes
+
+
+def run_writes(directory: Path, policy: Optional[str], writes: List[Callable],
+               concurrency: int) -> Dict[str, Any]:
+    """Apply ``writes`` like the server would; ``always`` waits for each group's fsync.
+
+    A group of ``concurrency`` writes stands in for that many requests in
+    flight, which share an fsync the way concurrent requests do.
+    """
+    store = RedisStore()
+    aof = None
+    if policy is not None:
+        aof = AppendOnlyLog(directory, policy)
+        aof.replay(store)
+        aof.start()
+        store.on_change = aof.record
+    start = time.perf_counter()
+    for offset in range(0, len(writes), concurrency):
+        group = [write(store) for write in writes[offset:offset + concurrency]]
+        if aof is not None and policy == ALWAYS:
+            barriers = [aof.barrier() for _ in group]
+            for barrier in barriers:
+                barrier.result()
+    elapsed = time.perf_counter() - start
+    result: Dict[str, Any] = {"ops_per_second": len(writes) / elapsed,
+                              "us_per_op": elapsed / len(writes) * 1e6}
+    if aof is not None:
+        # Drain what is still queued so the next configuration starts quiet
+        aof.close()
+        result["fsyncs"] = aof.fsyncs
+        result["log_bytes"] = aof.incr_bytes()
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Redis append-only file benchmark")
+    parser.add_argument("--writes", type=int, default=200000,
+                        help="Write commands per configuration (default: 200000)")
+    parser.add_argument("--keys", type=int, default=10000, help="Distinct agents (default: 10000)")
+    parser.add_argument("--concurrency", type=int, default=32,
+                        help="Writes sharing one fsync under appendfsync always (default: 32)")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--output", default="bench_redis_aof.json",
+                        help="Output file for results (default: bench_redis_aof.json)")
+    args = parser.parse_args()
+
+    writes = make_writes(args.writes, args.keys, args.seed)
+    results: Dict[str, Any] = {"timestamp": time.time(), "writes": args.writes,
+                               "concurrency": args.concurrency, "policies": {}}
+    workdir = Path(tempfile.mkdtemp(prefix="mcp-bench-"))
+    try:
+        print(f"\n✍️ {args.writes} writes per configuration...")
+        baseline = run_writes(workdir / "off", None, writes, args.concurrency)
+        results["policies"]["off"] = baseline
+        print(f"   off     : {baseline['ops_per_second']:10.0f} ops/s "
+              f"({baseline['us_per_op']:.2f} us/op)")
+        for policy in FSYNC_POLICIES:
+            run = run_writes(workdir / policy, policy, writes, args.concurrency)
+            run["overhead_us_per_op"] = run["us_per_op"] - baseline["us_per_op"]
+            results["policies"][policy] = run
+            print(f"   {policy:8s}: {run['ops_per_second']:10.0f} ops/s "
+                  f"({run['us_per_op']:.2f} us/op, +{run['overhead_us_per_op']:.2f}, "
+                  f"{run['fsyncs']} fsyncs)")
+
+        # The everysec log holds every write; replay it, rewrite it, replay the base
+        directory = workdir / "everysec"
+        print("\n🔁 Replay and rewrite...")
+        store = RedisStore()
+        aof = AppendOnlyLog(directory)
+        commands = aof.replay(store)
+        replay = {"commands": commands, "seconds": aof.replay_seconds,
+                  "commands_per_second": commands / aof.replay_seconds, "keys": len(store)}
+        print(f"   replay  : {commands} commands in {aof.replay_seconds:.2f}s "
+              f"({replay['commands_per_second']:.0f}/s, {len(store)} keys)")
+        aof.start()
+        log_bytes = aof.incr_bytes()
+        asyncio.run(aof.rewrite(store))
+        aof.close()
+        rewrite = {"seconds": aof.last_rewrite_seconds, "log_bytes": log_bytes,
+                   "base_bytes": aof.base_bytes()}
+        print(f"   rewrite : {aof.last_rewrite_seconds:.2f}s, "
+              f"{log_bytes / 1e6:.1f} MB log -> {rewrite['base_bytes'] / 1e6:.1f} MB base")
+
+        store = RedisStore()
+        aof = AppendOnlyLog(directory)
+        records = aof.replay(store)
+        rewrite["replay_seconds"] = aof.replay_seconds
+        rewrite["replay_records"] = records
+        print(f"   reload  : {records} base records in {aof.replay_seconds:.2f}s "
+              f"({len(store)} keys)")
+        results["replay"] = replay
+        results["rewrite"] = rewrite
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    with open(args.output, "w") as f:
+        json.dump(results, f, indent=2)
+    print(f"\n📁 Results saved to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
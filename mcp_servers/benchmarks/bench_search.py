@@ -0,0 +1,109 @@
+#!/usr/bin/env python3
+"""
+search_nodes latency benchmark
+Indexed search latency on seeded synthetic datasets, by query frequency band, against a full scan
+"""
+
+import argparse
+import json
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Any, Callable, Dict, List
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from dataset_generator import SCALES, Dataset, populate_storage, scaled  # noqa: E402
+from memory_store import MemoryStore  # noqa: E402
+
+
+def full_scan(store: MemoryStore, query: str, limit: int) -> List[Dict[str, Any]]:
+    """Reference implementation: lowercase substring test against every entity"""
+    needle = query.lower()
+    results = []
+    for seq in list(store._all_seqs()):
+        entity = store.get_entity(store._entity_id(seq))
+        haystack = [entity["name"]] + entity["observations"]
+        if any(needle in text.lower() for text in haystack):
+            results.append(entity)
+            if len(results) >= limit:
+                break
+    return results
+
+
+def time_query(fn: Callable[[], Any], repeat: int) -> Dict[str, float]:
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - start) * 1000)
+    samples.sort()
+    return {
+        "median_ms": statistics.median(samples),
+        "p95_ms": samples[int(len(samples) * 0.95) - 1] if len(samples) > 1 else samples[0],
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="search_nodes latency benchmark")
+    parser.add_argument("--sizes", default="10k,100k",
+                        help=f"Comma-separated store sizes, counts or {', '.join(SCALES)} "
+                             "(default: 10k,100k)")
+    parser.add_argument("--queries", type=int, default=40,
+                        help="Generated queries per size, spread over frequency bands")
+    parser.add_argument("--repeat", type=int, default=5, help="Timed runs per query")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--skip-scan", action="store_true", help="Skip the full-scan baseline")
+    parser.add_argument("--output", default="bench_search.json",
+                        help="Output file for results (default: bench_search.json)")
+    args = parser.parse_args()
+
+    sizes = [SCALES.get(size.lower()) or int(size) for size in args.sizes.split(",")]
+    results = {"timestamp": time.time(), "seed": args.seed, "runs": []}
+
+    for size in sizes:
+        spec = scaled(size, args.seed)
+        dataset = Dataset(spec)
+        workdir = Path(tempfile.mkdtemp(prefix="mcp-bench-"))
+        try:
+            print(f"\n🔎 Generating {size} entities (seed {args.seed})...")
+            populate_storage(workdir, spec, fsync=False)
+            store = MemoryStore(workdir, fsync=False)
+
+            run = {"size": size, "bands": {}}
+            queries = dataset.queries(args.queries)
+            for band in ("head", "torso", "tail", "phrase"):
+                texts = [q["query"] for q in queries if q["band"] == band]
+                timing = {
+                    "index": time_query(lambda: [store.search(q, limit=10) for q in texts],
+                                        args.repeat),
+                    "matches": statistics.mean(len(store.search(q, limit=1000)) for q in texts),
+                }
+                if not args.skip_scan:
+                    timing["scan"] = time_query(
+                        lambda: [full_scan(store, q, 10) for q in texts], 1)
+                # Per-query figures
+                for key in ("index", "scan"):
+                    if key in timing:
+                        timing[key] = {k: v / len(texts) for k, v in timing[key].items()}
+                run["bands"][band] = timing
+                line = (f"   {band:6s}: index {timing['index']['median_ms']:.3f} ms "
+                        f"({timing['matches']:.0f} matches, capped at 1000)")
+                if "scan" in timing:
+                    line += f", scan {timing['scan']['median_ms']:.2f} ms"
+                print(line)
+            store.close()
+            results["runs"].append(run)
+        finally:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+    with open(args.output, "w") as f:
+        json.dump(results, f, indent=2)
+    print(f"\n📁 Results saved to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,117 @@
+#!/usr/bin/env python3
+"""
+Streamed search benchmark
+Time to first result and peak server memory for large search_nodes results, JSON body vs NDJSON stream
+"""
+
+import argparse
+import asyncio
+import json
+import shutil
+import sys
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+from typing import Any, Dict
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from bench_bulk_ingest import batched, generate_entities  # noqa: E402
+from integrated_mcp_server import NDJSON, create_app  # noqa: E402
+
+
+def call(app, body: bytes, accept: str) -> Dict[str, Any]:
+    """POST search_nodes straight into the ASGI app and time the response body"""
+    state = {"first": None, "bytes": 0, "status": None}
+    scope = {
+        "type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1",
+        "method": "POST", "scheme": "http", "path": "/mcp/memory/search_nodes",
+        "raw_path": b"/mcp/memory/search_nodes", "root_path": "", "query_string": b"",
+        "headers": [(b"content-type", b"application/json"), (b"accept", accept.encode()),
+                    (b"content-length", str(len(body)).encode())],
+        "client": ("127.0.0.1", 0), "server": ("127.0.0.1", 8000),
+    }
+    sent_body = False
+
+    async def receive():
+        nonlocal sent_body
+        if sent_body:
+            await asyncio.Event().wait()
+        sent_body = True
+        return {"type": "http.request", "body": body, "more_body": False}
+
+    async def send(message):
+        if message["type"] == "http.response.start":
+            state["status"] = message["status"]
+        elif message.get("body"):
+            if state["first"] is None:
+                state["first"] = time.perf_counter()
+            state["bytes"] += len(message["body"])
+
+    start = time.perf_counter()
+    asyncio.run(app(scope, receive, send))
+    end = time.perf_counter()
+    return {
+        "status": state["status"],
+        "bytes": state["bytes"],
+        "first_result_ms": (state["first"] - start) * 1000,
+        "total_ms": (end - start) * 1000,
+    }
+
+
+def measure(app, limit: int, accept: str) -> Dict[str, Any]:
+    body = json.dumps({"query": "", "limit": limit}).encode()
+    result = call(app, body, accept)
+    # Peak memory in a second pass so tracing does not distort the timings
+    tracemalloc.start()
+    call(app, body, accept)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    result["peak_kib"] = peak / 1024
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Streamed search benchmark")
+    parser.add_argument("--entities", type=int, default=50000,
+                        help="Entities in the store (default: 50000)")
+    parser.add_argument("--limits", default="1000,10000,50000",
+                        help="Comma-separated search limits (default: 1000,10000,50000)")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--output", default="bench_search_stream.json",
+                        help="Output file for results (default: bench_search_stream.json)")
+    args = parser.parse_args()
+
+    workdir = Path(tempfile.mkdtemp(prefix="bench_search_stream_"))
+    results = {"timestamp": time.time(), "entities": args.entities, "runs": []}
+    try:
+        app = create_app(workdir)
+        memory = app.state.memory
+        print(f"\n📥 Loading {args.entities} entities...")
+        for batch in batched(generate_entities(args.entities, args.seed), 1000):
+            memory.create_entities(batch)
+        # Warm up the middleware stack and imports
+        call(app, b'{"limit": 1}', "application/json")
+
+        for limit in [int(n) for n in args.limits.split(",")]:
+            print(f"\n🔎 search_nodes with limit {limit}...")
+            run = {"limit": limit,
+                   "json": measure(app, limit, "application/json"),
+                   "ndjson": measure(app, limit, NDJSON)}
+            for name in ("json", "ndjson"):
+                r = run[name]
+                print(f"   {name:7s} first result {r['first_result_ms']:8.1f} ms  "
+                      f"total {r['total_ms']:8.1f} ms  peak {r['peak_kib'] / 1024:7.1f} MiB")
+            results["runs"].append(run)
+        memory.close()
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    with open(args.output, "w") as f:
+        json.dump(results, f, indent=2)
+    print(f"\n📁 Results saved to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,123 @@
+#!/usr/bin/env python3
+"""
+Sharded server scaling benchmark
+Keyed-workload throughput and latency for one server and for 1..N shards behind the router
+"""
+
+import argparse
+import json
+import os
+import shutil
+import signal
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+import requests
+
+SERVER_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(SERVER_DIR))
+
+from load_driver import run_load  # noqa: E402
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def start(storage: Path, shards: Optional[int],
+          router_workers: int) -> Tuple[subprocess.Popen, str]:
+    """A single server (``shards`` None) or the sharded launcher; returns it and its URL"""
+    port = free_port()
+    env = {**os.environ, "MCP_STORAGE_DIR": str(storage), "MCP_HOST": "127.0.0.1",
+           "MCP_PORT": str(port)}
+    if shards is None:
+        command = [sys.executable, str(SERVER_DIR / "integrated_mcp_server.py")]
+    else:
+        # Shard ports follow the router's; free_port() only promises the first one
+        command = [sys.executable, str(SERVER_DIR / "shard_router.py"), "--shards", str(shards),
+                   "--router-workers", str(router_workers or max(1, shards // 2)),
+                   "--shard-base-port", str(free_port())]
+    server = subprocess.Popen(command, env=env, stdout=subprocess.DEVNULL,
+                              stderr=subprocess.DEVNULL)
+    url = f"http://127.0.0.1:{port}"
+    for _ in range(600):
+        try:
+            if requests.get(f"{url}/health", timeout=1).status_code == 200:
+                break
+        except requests.RequestException:
+            pass
+        time.sleep(0.1)
+    return server, url
+
+
+def measure(storage: Path, shards: Optional[int], args) -> Dict[str, Any]:
+    server, url = start(storage, shards, args.router_workers)
+    try:
+        report = run_load(url, "keyed", processes=args.processes, concurrency=args.concurrency,
+                          duration=args.duration, timeout=30, scrape=False)
+    finally:
+        server.send_signal(signal.SIGTERM)
+        server.wait(timeout=60)
+    return {
+        "requests_per_second": report["requests_per_second"],
+        "success_rate": report["success_rate"],
+        "latency_ms": report["latency"],
+        "errors": report["errors"],
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Sharded server scaling benchmark")
+    parser.add_argument("--shards", default="1,2,4",
+                        help="Comma-separated shard counts (default: 1,2,4)")
+    parser.add_argument("--router-workers", type=int, default=0,
+                        help="Router processes (default: half the shards, at least one)")
+    parser.add_argument("--processes", type=int, default=4,
+                        help="Load driver processes (default: 4)")
+    parser.add_argument("--concurrency", type=int, default=32,
+                        help="Requests in flight per load process (default: 32)")
+    parser.add_argument("--duration", type=float, default=15.0,
+                        help="Seconds of load per configuration (default: 15)")
+    parser.add_argument("--output", default="bench_sharding.json",
+                        help="Output file for results (default: bench_sharding.json)")
+    args = parser.parse_args()
+
+    counts: List[int] = [int(c) for c in args.shards.split(",")]
+    results = {"timestamp": time.time(), "cpus": os.cpu_count(), "scenario": "keyed",
+               "in_flight": args.processes * args.concurrency, "runs": {}}
+    workdir = Path(tempfile.mkdtemp(prefix="bench_sharding_"))
+    try:
+        print("🖥️ Single server...")
+        single = measure(workdir / "single", None, args)
+        results["runs"]["single"] = single
+        print(f"   {single['requests_per_second']:8.0f} req/s  "
+              f"p99 {single['latency_ms'].get('p99_ms', 0):7.1f} ms")
+
+        base = None
+        for shards in counts:
+            print(f"\n🧩 {shards} shards...")
+            run = measure(workdir / f"shards{shards}", shards, args)
+            base = base or run["requests_per_second"] / shards
+            # Throughput relative to perfect scaling from the smallest shard count
+            run["scaling_efficiency"] = run["requests_per_second"] / (base * shards) if base else 0
+            print(f"   {run['requests_per_second']:8.0f} req/s  "
+                  f"p99 {run['latency_ms'].get('p99_ms', 0):7.1f} ms  "
+                  f"efficiency {run['scaling_efficiency']:.2f}")
+            results["runs"][f"shards_{shards}"] = run
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    with open(args.output, "w") as f:
+        json.dump(results, f, indent=2)
+    print(f"\n📁 Results saved to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,84 @@
+#!/usr/bin/env python3
+"""
+Memory MCP startup benchmark
+Compares opening a store by full log replay with opening it from an index snapshot
+"""
+
+import argparse
+import json
+import shutil
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Any, Dict
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from bench_bulk_ingest import batched, generate_entities  # noqa: E402
+from memory_store import SNAPSHOT_FILE, MemoryStore  # noqa: E402
+
+
+def time_open(workdir: Path) -> Dict[str, Any]:
+    start = time.perf_counter()
+    store = MemoryStore(workdir, fsync=False)
+    elapsed = time.perf_counter() - start
+    result = {"seconds": elapsed, "entities": store.count,
+              "from_snapshot": store.loaded_from_snapshot}
+    store.close()
+    return result
+
+
+def bench_startup(count: int, tail: int, seed: int, workdir: Path) -> Dict[str, Any]:
+    """Open a store of ``count`` entities, ``tail`` of them written after the snapshot"""
+    store = MemoryStore(workdir, fsync=False)
+    entities = generate_entities(count, seed)
+    for batch in batched(entities, 1000):
+        store.create_entities(batch)
+        if store.count >= count - tail and not store.snapshot_path.exists():
+            snapshot_start = time.perf_counter()
+            store.write_snapshot()
+            snapshot_seconds = time.perf_counter() - snapshot_start
+    store.close()
+
+    snapshot_path = workdir / SNAPSHOT_FILE
+    run = {
+        "snapshot_seconds": snapshot_seconds,
+        "snapshot_bytes": snapshot_path.stat().st_size,
+        "snapshot": time_open(workdir),
+    }
+    snapshot_path.rename(snapshot_path.with_suffix(".off"))
+    run["full_replay"] = time_open(workdir)
+    return run
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Memory MCP startup benchmark")
+    parser.add_argument("--counts", default="10000,100000",
+                        help="Comma-separated entity counts (default: 10000,100000)")
+    parser.add_argument("--tail", type=int, default=1000,
+                        help="Entities written after the snapshot (default: 1000)")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--output", default="bench_startup.json",
+                        help="Output file for results (default: bench_startup.json)")
+    args = parser.parse_args()
+
+    results = {"timestamp": time.time(), "seed": args.seed, "tail": args.tail, "runs": []}
+    for count in [int(c) for c in args.counts.split(",")]:
+        print(f"\n⏱️ Startup with {count} entities ({args.tail} after the snapshot)...")
+        workdir = Path(tempfile.mkdtemp(prefix="mcp-bench-"))
+        try:
+            run = {"count": count, **bench_startup(count, args.tail, args.seed, workdir)}
+        finally:
+            shutil.rmtree(workdir, ignore_errors=True)
+        print(f"   Snapshot open: {run['snapshot']['seconds'] * 1000:.1f} ms")
+        print(f"   Full replay:   {run['full_replay']['seconds'] * 1000:.1f} ms")
+        results["runs"].append(run)
+
+    with open(args.output, "w") as f:
+        json.dump(results, f, indent=2)
+    print(f"\n📁 Results saved to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
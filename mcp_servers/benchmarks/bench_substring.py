@@ -0,0 +1,125 @@
+#!/usr/bin/env python3
+"""
+Substring search benchmark
+search_nodes substring-match latency with the trigram index against a full scan
+"""
+
+import argparse
+import json
+import random
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Any, Callable, Dict, List
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from dataset_generator import SCALES, populate_storage, scaled  # noqa: E402
+from memory_store import MemoryStore  # noqa: E402
+from search_index import trigrams  # noqa: E402
+
+
+def full_scan(store: MemoryStore, needle: str, limit: int) -> List[Dict[str, Any]]:
+    """Reference implementation: lowercase substring test against every entity"""
+    results = []
+    for seq in list(store._all_seqs()):
+        entity = store.get_entity(store._entity_id(seq))
+        if any(needle in text.lower() for text in [entity["name"]] + entity["observations"]):
+            results.append(entity)
+            if len(results) >= limit:
+                break
+    return results
+
+
+def make_queries(store: MemoryStore, count: int, seed: int) -> Dict[str, List[str]]:
+    """Fragments cut at arbitrary offsets out of stored observations and names"""
+    rng = random.Random(seed)
+    seqs = list(store._all_seqs())
+    queries: Dict[str, List[str]] = {"observation": [], "name": []}
+    while len(queries["observation"]) < count:
+        entity = store.get_entity(store._entity_id(rng.choice(seqs)))
+        text = rng.choice(entity["observations"] or [entity["name"]])
+        if len(text) < 12:
+            continue
+        start = rng.randrange(len(text) - 10)
+        queries["observation"].append(text[start:start + rng.randint(8, 16)])
+    for _ in range(count):
+        # "ity-4821 fo": an ID-like fragment straddling the number and the next word
+        name = store.get_entity(store._entity_id(rng.choice(seqs)))["name"]
+        queries["name"].append(name[3:rng.randint(len(name) - 2, len(name))])
+    return queries
+
+
+def time_queries(fn: Callable[[str], Any], queries: List[str]) -> Dict[str, float]:
+    samples = []
+    for query in queries:
+        start = time.perf_counter()
+        fn(query)
+        samples.append((time.perf_counter() - start) * 1000)
+    samples.sort()
+    return {
+        "median_ms": statistics.median(samples),
+        "p95_ms": samples[int(len(samples) * 0.95) - 1] if len(samples) > 1 else samples[0],
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Substring search benchmark")
+    parser.add_argument("--sizes", default="100k",
+                        help=f"Comma-separated store sizes, counts or {', '.join(SCALES)} "
+                             "(default: 100k)")
+    parser.add_argument("--queries", type=int, default=30, help="Queries per kind and size")
+    parser.add_argument("--limit", type=int, default=10, help="Results per query (default: 10)")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--skip-scan", action="store_true", help="Skip the full-scan baseline")
+    parser.add_argument("--output", default="bench_substring.json",
+                        help="Output file for results (default: bench_substring.json)")
+    args = parser.parse_args()
+
+    sizes = [SCALES.get(size.lower()) or int(size) for size in args.sizes.split(",")]
+    results = {"timestamp": time.time(), "seed": args.seed, "runs": []}
+
+    for size in sizes:
+        workdir = Path(tempfile.mkdtemp(prefix="mcp-bench-"))
+        try:
+            print(f"\n🔤 Generating {size} entities (seed {args.seed})...")
+            populate_storage(workdir, scaled(size, args.seed), fsync=False)
+            # No caches, so both sides read every entity they check from the log
+            store = MemoryStore(workdir, fsync=False, entity_cache_size=0, search_cache_size=0)
+            run = {"size": size, "kinds": {}}
+            for kind, queries in make_queries(store, args.queries, args.seed).items():
+                timing = {
+                    "trigram": time_queries(
+                        lambda q: store.search(q, limit=args.limit, match="substring"), queries),
+                    "candidates": statistics.mean(
+                        sum(1 for _ in store.index.substring_candidates(trigrams(q.lower())))
+                        for q in queries),
+                    "matches": statistics.mean(
+                        len(store.search(q, limit=1000, match="substring")) for q in queries),
+                }
+                line = (f"   {kind:11s}: trigram {timing['trigram']['median_ms']:.3f} ms "
+                        f"(p95 {timing['trigram']['p95_ms']:.3f}, "
+                        f"{timing['candidates']:.0f} candidates, {timing['matches']:.0f} matches)")
+                if not args.skip_scan:
+                    timing["scan"] = time_queries(lambda q: full_scan(store, q.lower(), args.limit),
+                                                  queries)
+                    timing["speedup"] = timing["scan"]["median_ms"] / timing["trigram"]["median_ms"]
+                    line += (f", scan {timing['scan']['median_ms']:.1f} ms "
+                             f"({timing['speedup']:.0f}x)")
+                print(line)
+                run["kinds"][kind] = timing
+            store.close()
+            results["runs"].append(run)
+        finally:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+    with open(args.output, "w") as f:
+        json.dump(results, f, indent=2)
+    print(f"\n📁 Results saved to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,167 @@
+#!/usr/bin/env python3
+"""
+Sequential thinking history benchmark
+Branch, revision, summary and history-page read latency as sessions grow, indexed vs rescanning
+"""
+
+import argparse
+import json
+import random
+import statistics
+import sys
+import time
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from thought_store import Thought, ThoughtStore  # noqa: E402
+
+
+class ScanHistory:
+    """Reference implementation: one list, rescanned for every read"""
+
+    def __init__(self):
+        self.thoughts: List[Thought] = []
+
+    def add(self, thought: Thought):
+        self.thoughts.append(dict(thought))
+
+    def history(self, after: int, limit: int) -> List[Thought]:
+        return [t for seq, t in enumerate(self.thoughts) if seq > after][:limit]
+
+    def branch(self, branch_id: str, limit: int) -> List[Thought]:
+        return [t for t in self.thoughts if t.get("branchId") == branch_id][:limit]
+
+    def revisions(self, thought_number: int) -> List[Thought]:
+        numbers = {thought_number}
+        chain = []
+        for t in self.thoughts:
+            if t.get("isRevision") and t.get("revisesThought") in numbers:
+                chain.append(t)
+                numbers.add(t["thoughtNumber"])
+        return chain
+
+    def summary(self) -> Dict[str, Any]:
+        branches: Dict[str, Dict[str, Any]] = {}
+        revised = set()
+        for t in self.thoughts:
+            if t.get("branchId") is not None:
+                branch = branches.setdefault(t["branchId"], {"thoughts": 0})
+                branch["thoughts"] += 1
+                branch["lastThoughtNumber"] = t["thoughtNumber"]
+            if t.get("isRevision"):
+                revised.add(t.get("revisesThought"))
+        return {"thoughts": len(self.thoughts), "branches": branches,
+                "revisedThoughts": len(revised)}
+
+
+def make_session(count: int, seed: int) -> List[Thought]:
+    """A long orchestration session: a main line with revisions and short-lived branches"""
+    rng = random.Random(seed)
+    thoughts: List[Thought] = []
+    number = 0
+    branch: Optional[str] = None
+    branch_left = 0
+    for i in range(count):
+        fields: Dict[str, Any] = {}
+        if branch_left:
+            branch_left -= 1
+            fields["branchId"] = branch
+        elif rng.random() < 0.02:
+            branch = f"branch-{i}"
+            branch_left = rng.randint(5, 40)
+            fields.update(branchId=branch, branchFromThought=max(number, 1))
+        elif number > 1 and rng.random() < 0.1:
+            fields.update(isRevision=True, revisesThought=rng.randint(max(number - 20, 1), number))
+        number += 1
+        thoughts.append({"thought": f"Step {number}: weigh option {rng.randrange(1000)}",
+                         "thoughtNumber": number, "totalThoughts": count,
+                         "nextThoughtNeeded": i < count - 1, **fields})
+    return thoughts
+
+
+def time_reads(read: Callable[[Any], Any], args: List[Any]) -> Dict[str, float]:
+    samples = []
+    for arg in args:
+        start = time.perf_counter()
+        read(arg)
+        samples.append((time.perf_counter() - start) * 1e6)
+    samples.sort()
+    return {"median_us": statistics.median(samples),
+            "p95_us": samples[int(len(samples) * 0.95) - 1] if len(samples) > 1 else samples[0]}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Sequential thinking history benchmark")
+    parser.add_argument("--sizes", default="1000,10000,50000",
+                        help="Comma-separated session lengths in thoughts "
+                             "(default: 1000,10000,50000)")
+    parser.add_argument("--reads", type=int, default=200, help="Reads per kind and size")
+    parser.add_argument("--page", type=int, default=100, help="History/branch page size")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--skip-scan", action="store_true", help="Skip the rescanning baseline")
+    parser.add_argument("--output", default="bench_thought_store.json",
+                        help="Output file for results (default: bench_thought_store.json)")
+    args = parser.parse_args()
+
+    results = {"timestamp": time.time(), "seed": args.seed, "page": args.page, "runs": []}
+    for size in [int(size) for size in args.sizes.split(",")]:
+        print(f"\n🧠 Session of {size} thoughts (seed {args.seed})...")
+        session = make_session(size, args.seed)
+        rng = random.Random(args.seed)
+        stores: Dict[str, Any] = {"indexed": ThoughtStore()}
+        if not args.skip_scan:
+            stores["scan"] = ScanHistory()
+        run: Dict[str, Any] = {"size": size, "stores": {}}
+        for name, store in stores.items():
+            start = time.perf_counter()
+            for t in session:
+                store.add(t)
+            run["stores"][name] = {"add_us": (time.perf_counter() - start) / size * 1e6}
+
+        branch_ids = sorted({t["branchId"] for t in session if "branchId" in t})
+        revised = sorted({t["revisesThought"] for t in session if t.get("isRevision")})
+        picks = {
+            "branch": [rng.choice(branch_ids) for _ in range(args.reads)],
+            "revisions": [rng.choice(revised) for _ in range(args.reads)],
+            "history_page": [rng.randrange(size) for _ in range(args.reads)],
+            "summary": [None] * args.reads,
+        }
+        indexed = stores["indexed"]
+        reads = {
+            "indexed": {
+                "branch": lambda b: indexed.branch(b, limit=args.page),
+                "revisions": indexed.revisions,
+                "history_page": lambda after: indexed.history(after, args.page),
+                "summary": lambda _: indexed.summary(),
+            },
+        }
+        if "scan" in stores:
+            scan = stores["scan"]
+            reads["scan"] = {
+                "branch": lambda b: scan.branch(b, args.page),
+                "revisions": scan.revisions,
+                "history_page": lambda after: scan.history(after, args.page),
+                "summary": lambda _: scan.summary(),
+            }
+        for name, kinds in reads.items():
+            for kind, read in kinds.items():
+                run["stores"][name][kind] = time_reads(read, picks[kind])
+        for kind in picks:
+            line = f"   {kind:12s}: indexed {run['stores']['indexed'][kind]['median_us']:9.1f} us"
+            if "scan" in run["stores"]:
+                scanned = run["stores"]["scan"][kind]["median_us"]
+                line += (f", scan {scanned:10.1f} us "
+                         f"({scanned / run['stores']['indexed'][kind]['median_us']:.0f}x)")
+            print(line)
+        print(f"   {'add':12s}: indexed {run['stores']['indexed']['add_us']:9.2f} us")
+        results["runs"].append(run)
+
+    with open(args.output, "w") as f:
+        json.dump(results, f, indent=2)
+    print(f"\n📁 Results saved to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,90 @@
+#!/usr/bin/env python3
+"""
+Sorted set zrange benchmark
+Compares the skip-list sorted set with sorting a member/score dict on every call
+"""
+
+import argparse
+import json
+import random
+import statistics
+import sys
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Tuple
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from redis_store import SortedSet  # noqa: E402
+
+
+def sort_per_call(scores: Dict[str, float], start: int, stop: int) -> List[Tuple[str, float]]:
+    """The previous zrange: sort everything, then slice"""
+    ordered = sorted(scores.items(), key=lambda item: (item[1], item[0]))
+    return ordered[start:stop + 1]
+
+
+def time_calls(fn, windows: List[Tuple[int, int]]) -> Dict[str, float]:
+    samples = []
+    for start, stop in windows:
+        t0 = time.perf_counter()
+        fn(start, stop)
+        samples.append((time.perf_counter() - t0) * 1000)
+    return {
+        "mean_ms": statistics.mean(samples),
+        "p95_ms": sorted(samples)[int(len(samples) * 0.95) - 1],
+    }
+
+
+def bench_size(size: int, window: int, calls: int, seed: int) -> Dict[str, Any]:
+    rng = random.Random(seed)
+    zset = SortedSet()
+    scores: Dict[str, float] = {}
+
+    t0 = time.perf_counter()
+    for i in range(size):
+        score = rng.random() * size
+        zset.add(f"event-{i}", score)
+        scores[f"event-{i}"] = score
+    build_seconds = time.perf_counter() - t0
+
+    windows = []
+    for _ in range(calls):
+        start = rng.randint(0, max(size - window, 0))
+        windows.append((start, start + window - 1))
+
+    return {
+        "size": size,
+        "window": window,
+        "build_seconds": build_seconds,
+        "skiplist": time_calls(zset.range, windows),
+        "sort_per_call": time_calls(lambda a, b: sort_per_call(scores, a, b), windows),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Sorted set zrange benchmark")
+    parser.add_argument("--sizes", default="1000,100000,1000000",
+                        help="Comma-separated sorted set sizes (default: 1000,100000,1000000)")
+    parser.add_argument("--window", type=int, default=50, help="Members per zrange (default: 50)")
+    parser.add_argument("--calls", type=int, default=100, help="zrange calls per size (default: 100)")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--output", default="bench_zrange.json",
+                        help="Output file for results (default: bench_zrange.json)")
+    args = parser.parse_args()
+
+    results = {"timestamp": time.time(), "seed": args.seed, "runs": []}
+    for size in [int(s) for s in args.sizes.split(",")]:
+        print(f"\n📈 zrange over {size} members (window {args.window})...")
+        run = bench_size(size, args.window, args.calls, args.seed)
+        print(f"   Skip list:     {run['skiplist']['mean_ms']:.3f} ms")
+        print(f"   Sort per call: {run['sort_per_call']['mean_ms']:.3f} ms")
+        results["runs"].append(run)
+
+    with open(args.output, "w") as f:
+        json.dump(results, f, indent=2)
+    print(f"\n📁 Results saved to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,175 @@
+#!/usr/bin/env python3
+"""
+Request body budget enforcement
+Counts bytes, tokens and string sizes on the raw request stream and rejects over-budget bodies
+with 413 before they are parsed
+"""
+
+import re
+from typing import List, Optional
+
+from starlette.responses import JSONResponse
+
+# Tokens are word-like runs in the encoded body, an upper bound on what the search tokenizer
+# produces. Mapping every byte to word/other lets bytes.count find run starts without
+# materialising the words.
+_WORD_BYTES = set(b"ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz0123456789_")
+_WORD_BYTES |= set(range(0x80, 0x100))
+_WORD_MAP = bytes(ord("w") if b in _WORD_BYTES else ord(" ") for b in range(256))
+_STRING_EVENT = re.compile(rb'["\\]')
+_QUOTE = 0x22
+
+
+class BudgetExceeded(Exception):
+    """Raised by ``BodyBudget.feed`` once a limit is crossed"""
+
+    def __init__(self, limit: str, maximum: int):
+        super().__init__(f"Request body exceeds {limit} limit of {maximum}")
+        self.limit = limit
+        self.maximum = maximum
+
+
+class BodyBudget:
+    """Incremental byte, token and string-length counter for a JSON body.
+
+    Chunks are scanned as they arrive and never joined, so memory use does not
+    depend on the payload. Token and string counts work on the encoded bytes:
+    a string's size includes its escape sequences, and a word split across two
+    chunks is counted once.
+    """
+
+    def __init__(self, max_bytes: Optional[int] = None, max_tokens: Optional[int] = None,
+                 max_string_bytes: Optional[int] = None):
+        self.max_bytes = max_bytes
+        self.max_tokens = max_tokens
+        self.max_string_bytes = max_string_bytes
+        self.bytes = 0
+        self.tokens = 0
+        self.longest_string = 0
+        self._in_word = False
+        self._in_string = False
+        self._escape = False
+        self._string_bytes = 0
+
+    def feed(self, chunk: bytes):
+        if not chunk:
+            return
+        self.bytes += len(chunk)
+        if self.max_bytes is not None and self.bytes > self.max_bytes:
+            raise BudgetExceeded("bytes", self.max_bytes)
+        if self.max_tokens is not None:
+            self._count_tokens(chunk)
+        if self.max_string_bytes is not None:
+            self._scan_strings(chunk)
+
+    def _count_tokens(self, chunk: bytes):
+        mapped = chunk.translate(_WORD_MAP)
+        self.tokens += mapped.count(b" w")
+        if mapped[0] == 0x77 and not self._in_word:
+            # A run starting the chunk, unless it continues the previous chunk's last run
+            self.tokens += 1
+        self._in_word = mapped[-1] == 0x77
+        if self.tokens > self.max_tokens:
+            raise BudgetExceeded("tokens", self.max_tokens)
+
+    def _scan_strings(self, chunk: bytes):
+        pos = 0
+        size = len(chunk)
+        while pos < size:
+            if not self._in_string:
+                quote = chunk.find(b'"', pos)
+                if quote < 0:
+                    return
+                self._in_string = True
+                self._string_bytes = 0
+                pos = quote + 1
+                continue
+            if self._escape:
+                self._escape = False
+                self._string_bytes += 1
+                pos += 1
+                continue
+            match = _STRING_EVENT.search(chunk, pos)
+            end = match.start() if match else size
+            self._string_bytes += end - pos
+            if self._string_bytes > self.max_string_bytes:
+                raise BudgetExceeded("string_bytes", self.max_string_bytes)
+            if match is None:
+                return
+            if chunk[end] == _QUOTE:
+                self.longest_string = max(self.longest_string, self._string_bytes)
+                self._in_string = False
+            else:
+                self._escape = True
+                self._string_bytes += 1
+            pos = end + 1
+
+
+class BodyBudgetMiddleware:
+    """ASGI middleware that reads the request body through a ``BodyBudget``.
+
+    A declared ``Content-Length`` over the byte limit is refused without
+    reading anything. Otherwise chunks are counted as they arrive and the
+    first one over any limit ends the request with 413; the rest of the body
+    is never read. Bodies within budget are replayed to the app unchanged.
+    Token and string limits read JSON syntax, so binary bodies such as
+    MessagePack are held to the byte limit only.
+    """
+
+    def __init__(self, app, max_bytes: Optional[int] = None, max_tokens: Optional[int] = None,
+                 max_string_bytes: Optional[int] = None):
+        self.app = app
+        self.max_bytes = max_bytes
+        self.max_tokens = max_tokens
+        self.max_string_bytes = max_string_bytes
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        textual = True
+        for name, value in scope["headers"]:
+            if name == b"content-length" and self.max_bytes is not None \
+                    and value.isdigit() and int(value) > self.max_bytes:
+                exc = BudgetExceeded("bytes", self.max_bytes)
+                await self._reject(exc, scope, receive, send)
+                return
+            if name == b"content-type" and b"msgpack" in value.lower():
+                textual = False
+
+        if textual:
+            budget = BodyBudget(self.max_bytes, self.max_tokens, self.max_string_bytes)
+        else:
+            budget = BodyBudget(self.max_bytes)
+        messages: List[dict] = []
+        while True:
+            message = await receive()
+            messages.append(message)
+            if message["type"] != "http.request":
+                break
+            try:
+                budget.feed(message.get("body", b""))
+            except BudgetExceeded as exc:
+                await self._reject(exc, scope, receive, send)
+                return
+            if not message.get("more_body", False):
+                break
+
+        pending = iter(messages)
+
+        async def replay():
+            message = next(pending, None)
+            return message if message is not None else await receive()
+
+        await self.app(scope, replay, send)
+
+    @staticmethod
+    async def _reject(exc: BudgetExceeded, scope, receive, send):
+        response = JSONResponse(
+            {"detail": str(exc), "limit": exc.limit, "maximum": exc.maximum},
+            status_code=413,
+            # The unread remainder of the body makes the connection unusable
+            headers={"connection": "close"},
+        )
+        await response(scope, receive, send)
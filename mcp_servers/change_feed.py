@@ -0,0 +1,179 @@
+#!/usr/bin/env python3
+"""
+Redis MCP change feed
+Fans keyspace change events out to subscribers by key glob pattern, for push notifications over SSE
+"""
+
+import asyncio
+import fnmatch
+import re
+import time
+from typing import Any, AsyncIterator, Dict, Iterable, List, Optional, Pattern, Set
+
+from codec import encode_json
+from redis_store import ChangeEvent
+
+_GLOB_CHARS = re.compile(r"[*?\[]")
+
+
+class SubscriberLimit(Exception):
+    """Raised by ``ChangeHub.subscribe`` when the hub is at its subscriber limit"""
+
+
+class Subscription:
+    """One subscriber's patterns and pending events.
+
+    Events wait in a bounded queue. A subscriber that falls ``max_pending``
+    events behind is marked ``overflowed`` and gets no more events; it should
+    reconnect and re-read the keys it cares about, as with a Redis client
+    that hits its output buffer limit.
+    """
+
+    def __init__(self, patterns: List[str], max_pending: int):
+        self.patterns = patterns
+        self.overflowed = False
+        self.closed = False
+        self._pending: asyncio.Queue = asyncio.Queue(max_pending)
+
+    def offer(self, event: ChangeEvent):
+        if self.overflowed or self.closed:
+            return
+        try:
+            self._pending.put_nowait(event)
+        except asyncio.QueueFull:
+            self.overflowed = True
+            self._wake()
+
+    def close(self):
+        self.closed = True
+        self._wake()
+
+    def _wake(self):
+        # A None sentinel makes the reader return promptly; drop an event to make room
+        if self._pending.full():
+            self._pending.get_nowait()
+        self._pending.put_nowait(None)
+
+    async def next_batch(self, timeout: float) -> Optional[List[ChangeEvent]]:
+        """Wait up to ``timeout`` for events; returns everything pending, [] on timeout,
+        or None once the subscription has overflowed or been closed"""
+        try:
+            first = await asyncio.wait_for(self._pending.get(), timeout)
+        except asyncio.TimeoutError:
+            return []
+        batch = [first]
+        while not self._pending.empty():
+            batch.append(self._pending.get_nowait())
+        if self.overflowed or self.closed:
+            return None
+        return batch
+
+
+class ChangeHub:
+    """Routes change events to subscriptions whose patterns match the key.
+
+    Patterns use Redis glob syntax (``*``, ``?``, ``[abc]``). Exact keys are
+    found with one dict lookup; glob patterns are compiled once and shared by
+    every subscriber using the same pattern, so an event costs one regex
+    match per distinct pattern plus one queue put per matching subscriber.
+    Publishing happens on the event loop thread, like every redis mutation.
+    """
+
+    def __init__(self, max_subscribers: int = 1024, max_pending: int = 1024):
+        self.max_subscribers = max_subscribers
+        self.max_pending = max_pending
+        self.published = 0
+        self.delivered = 0
+        self._subscriptions: Set[Subscription] = set()
+        self._exact: Dict[str, Set[Subscription]] = {}
+        self._globs: Dict[str, Set[Subscription]] = {}
+        self._compiled: Dict[str, Pattern] = {}
+
+    @property
+    def subscribers(self) -> int:
+        return len(self._subscriptions)
+
+    def subscribe(self, patterns: Iterable[str]) -> Subscription:
+        if len(self._subscriptions) >= self.max_subscribers:
+            raise SubscriberLimit(f"Subscriber limit of {self.max_subscribers} reached")
+        subscription = Subscription(sorted(set(patterns)), self.max_pending)
+        for pattern in subscription.patterns:
+            if _GLOB_CHARS.search(pattern):
+                if pattern not in self._globs:
+                    self._globs[pattern] = set()
+                    self._compiled[pattern] = re.compile(fnmatch.translate(pattern))
+                self._globs[pattern].add(subscription)
+            else:
+                self._exact.setdefault(pattern, set()).add(subscription)
+        self._subscriptions.add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription):
+        if subscription not in self._subscriptions:
+            return
+        self._subscriptions.discard(subscription)
+        for pattern in subscription.patterns:
+            table = self._globs if pattern in self._globs else self._exact
+            members = table.get(pattern)
+            if members is None:
+                continue
+            members.discard(subscription)
+            if not members:
+                del table[pattern]
+                self._compiled.pop(pattern, None)
+
+    def publish(self, event: ChangeEvent):
+        """Stamp ``event`` with a sequence number and time and offer it to matching subscribers"""
+        if not self._subscriptions:
+            return
+        key = event["key"]
+        targets = self._exact.get(key, set())
+        for pattern, members in self._globs.items():
+            if self._compiled[pattern].match(key):
+                targets = targets | members
+        self.published += 1
+        if not targets:
+            return
+        event["seq"] = self.published
+        event["time"] = time.time()
+        for subscription in targets:
+            subscription.offer(event)
+        self.delivered += len(targets)
+
+    def close(self):
+        """End every subscription, so open streams finish and the server can shut down"""
+        for subscription in list(self._subscriptions):
+            subscription.close()
+
+    def stats(self) -> Dict[str, Any]:
+        return {"subscribers": len(self._subscriptions),
+                "patterns": len(self._exact) + len(self._globs),
+                "published": self.published, "delivered": self.delivered}
+
+
+async def sse_stream(hub: ChangeHub, subscription: Subscription,
+                     keepalive: float) -> AsyncIterator[bytes]:
+    """Server-Sent Events for one subscription; unsubscribes when the client goes away.
+
+    Each change is a ``data:`` line holding the event as JSON, with its
+    sequence number as the event ``id``. Pending events are written in one
+    chunk, a comment line is sent every ``keepalive`` seconds of silence, and
+    an ``overflow`` event ends the stream if the client fell too far behind.
+    Closing the hub ends the stream without an event.
+    """
+    try:
+        patterns = encode_json({"patterns": subscription.patterns})
+        yield b"event: subscribed\ndata: " + patterns + b"\n\n"
+        while True:
+            batch = await subscription.next_batch(keepalive)
+            if batch is None:
+                if subscription.overflowed:
+                    yield b"event: overflow\ndata: {}\n\n"
+                return
+            if not batch:
+                yield b": keepalive\n\n"
+                continue
+            yield b"".join(b"id: %d\ndata: %s\n\n" % (event["seq"], encode_json(event))
+                           for event in batch)
+    finally:
+        hub.unsubscribe(subscription)
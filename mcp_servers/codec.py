@@ -0,0 +1,153 @@
+#!/usr/bin/env python3
+"""
+Wire codecs for the integrated MCP server
+orjson-backed JSON with optional MessagePack, chosen per request from Content-Type and Accept
+"""
+
+import json
+from contextvars import ContextVar
+from functools import lru_cache
+from typing import Any, Callable, Dict
+
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+from starlette.requests import Request
+from starlette.responses import Response
+
+from server_metrics import TimedRoute
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - stdlib fallback
+    orjson = None
+
+try:
+    import msgpack
+except ImportError:  # pragma: no cover - MessagePack is optional
+    msgpack = None
+
+JSON = "application/json"
+MSGPACK = "application/msgpack"
+MSGPACK_ALIASES = frozenset({MSGPACK, "application/x-msgpack", "application/vnd.msgpack"})
+
+
+def _fallback(value: Any) -> Any:
+    """Types neither codec knows natively (pydantic models, sets, paths) go through FastAPI"""
+    return jsonable_encoder(value)
+
+
+def encode_json(value: Any) -> bytes:
+    if orjson is not None:
+        return orjson.dumps(value, default=_fallback, option=orjson.OPT_NON_STR_KEYS)
+    return json.dumps(value, default=_fallback, separators=(",", ":")).encode("utf-8")
+
+
+def decode_json(data: bytes) -> Any:
+    # orjson.JSONDecodeError subclasses json.JSONDecodeError, so callers catch either the same way
+    return orjson.loads(data) if orjson is not None else json.loads(data)
+
+
+def encode_msgpack(value: Any) -> bytes:
+    return msgpack.packb(value, default=_fallback, use_bin_type=True)
+
+
+def decode_msgpack(data: bytes) -> Any:
+    return msgpack.unpackb(data, raw=False)
+
+
+ENCODERS: Dict[str, Callable[[Any], bytes]] = {JSON: encode_json}
+DECODERS: Dict[str, Callable[[bytes], Any]] = {JSON: decode_json}
+if msgpack is not None:
+    ENCODERS[MSGPACK] = encode_msgpack
+    DECODERS[MSGPACK] = decode_msgpack
+
+
+def media_type_of(content_type: str) -> str:
+    """Canonical media type for a Content-Type value; MessagePack aliases map to MSGPACK"""
+    media_type = content_type.split(";", 1)[0].strip().lower()
+    return MSGPACK if media_type in MSGPACK_ALIASES else media_type
+
+
+@lru_cache(maxsize=256)
+def negotiate(accept: str) -> str:
+    """Pick the response media type for an Accept header; JSON wins ties and wildcards"""
+    weights = {JSON: 0.0, MSGPACK: 0.0}
+    for part in accept.split(","):
+        media_type, *params = part.split(";")
+        media_type = media_type.strip().lower()
+        quality = 1.0
+        for param in params:
+            name, _, value = param.partition("=")
+            if name.strip() == "q":
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0.0
+        if media_type in ("*/*", "application/*"):
+            weights[JSON] = max(weights[JSON], quality)
+        elif media_type == JSON or media_type in MSGPACK_ALIASES:
+            canonical = media_type_of(media_type)
+            weights[canonical] = max(weights[canonical], quality)
+    if MSGPACK in ENCODERS and weights[MSGPACK] > weights[JSON]:
+        return MSGPACK
+    return JSON
+
+
+# Response media type for the request being served, set by CodecRoute
+response_media_type: ContextVar[str] = ContextVar("response_media_type", default=JSON)
+
+
+def render(result: Any) -> Any:
+    """Encode an endpoint's return value with the negotiated codec.
+
+    Skips FastAPI's ``jsonable_encoder`` walk; endpoints already return plain
+    dicts and lists, and anything else goes through the fallback.
+    """
+    if isinstance(result, Response):
+        return result
+    media_type = response_media_type.get()
+    return Response(ENCODERS[media_type](result), media_type=media_type)
+
+
+class CodecRequest(Request):
+    """Request whose JSON body is decoded with orjson, or MessagePack when ``body_codec`` says so"""
+
+    body_codec = JSON
+
+    async def json(self) -> Any:
+        if not hasattr(self, "_json"):
+            self._json = DECODERS[self.body_codec](await self.body())
+        return self._json
+
+
+class CodecRoute(TimedRoute):
+    """TimedRoute that decodes request bodies and encodes results with the negotiated codecs.
+
+    MessagePack bodies are presented to FastAPI as JSON so they take its
+    usual body validation path; only the decoder differs.
+    """
+
+    render_result = staticmethod(render)
+
+    def get_route_handler(self) -> Callable:
+        handler = super().get_route_handler()
+
+        async def codec_handler(request: Request) -> Response:
+            body_codec = media_type_of(request.headers.get("content-type", ""))
+            scope = request.scope
+            if body_codec == MSGPACK:
+                if MSGPACK not in DECODERS:
+                    return JSONResponse(status_code=415,
+                                        content={"detail": "MessagePack support is not installed"})
+                headers = [(name, value) for name, value in scope["headers"]
+                           if name != b"content-type"]
+                scope = {**scope, "headers": headers + [(b"content-type", JSON.encode())]}
+            codec_request = CodecRequest(scope, request.receive)
+            codec_request.body_codec = MSGPACK if body_codec == MSGPACK else JSON
+            token = response_media_type.set(negotiate(request.headers.get("accept", "")))
+            try:
+                return await handler(codec_request)
+            finally:
+                response_media_type.reset(token)
+
+        return codec_handler
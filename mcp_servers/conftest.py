@@ -0,0 +1,29 @@
+#!/usr/bin/env python3
+"""
+Shared pytest fixtures for the MCP test suites
+Functional suites run against an in-process server unless MCP_SERVER_URL names a running one
+"""
+
+import os
+
+import pytest
+
+
+@pytest.fixture(scope="session")
+def server_url(tmp_path_factory):
+    """Base URL of the server under test.
+
+    By default each session (each xdist worker) boots its own app on an
+    ephemeral port with empty temporary storage, so there is no server to
+    start beforehand and no startup sleep. Set ``MCP_SERVER_URL`` to test a
+    deployed server instead.
+    """
+    external = os.environ.get("MCP_SERVER_URL")
+    if external:
+        yield external.rstrip("/")
+        return
+
+    from integrated_mcp_server import background_server
+
+    with background_server(tmp_path_factory.mktemp("mcp_storage")) as url:
+        yield url
@@ -0,0 +1,352 @@
+#!/usr/bin/env python3
+"""
+Deterministic synthetic dataset generator
+Seeded entities, relations and redis key spaces at benchmark scale, loaded over HTTP or to disk
+"""
+
+import argparse
+import asyncio
+import bisect
+import itertools
+import json
+import math
+import random
+import string
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, NamedTuple, Optional, Sequence, Tuple
+
+# Redis pipeline command: op plus that command's request fields
+Command = Dict[str, Any]
+
+
+class DatasetSpec(NamedTuple):
+    """Everything that shapes a dataset; the same spec always yields the same data"""
+    entities: int = 10000
+    seed: int = 42
+    # Entity types and vocabulary words are drawn with Zipf(zipf_exponent) popularity
+    entity_types: int = 40
+    vocabulary: int = 20000
+    zipf_exponent: float = 1.1
+    # Observations per entity are geometric with this mean; words per observation are
+    # lognormal with this median, so most are a sentence and a few are pages long
+    observations_mean: float = 4.0
+    words_median: float = 12.0
+    words_sigma: float = 1.0
+    relations_per_entity: float = 1.5
+    relation_types: int = 12
+    # Redis key spaces: key counts and the exact cardinality of every key; members are
+    # drawn from a shared universe of member_universe strings with Zipf popularity
+    hash_keys: int = 1000
+    hash_fields: int = 8
+    set_keys: int = 1000
+    set_members: int = 16
+    zset_keys: int = 200
+    zset_members: int = 256
+    member_universe: int = 50000
+
+
+def scaled(entities: int, seed: int = 42) -> DatasetSpec:
+    """Spec with redis key counts proportional to the entity count"""
+    return DatasetSpec(entities=entities, seed=seed, hash_keys=max(entities // 10, 1),
+                       set_keys=max(entities // 10, 1), zset_keys=max(entities // 50, 1),
+                       member_universe=max(entities * 5, 1000))
+
+
+SCALES = {"10k": 10_000, "100k": 100_000, "1m": 1_000_000}
+
+
+class Zipf:
+    """Ranks 0..n-1 with probability proportional to 1 / (rank + 1) ** exponent"""
+
+    def __init__(self, n: int, exponent: float):
+        self.cumulative = list(itertools.accumulate(1 / (rank + 1) ** exponent
+                                                    for rank in range(n)))
+        self.total = self.cumulative[-1]
+
+    def sample(self, rng: random.Random) -> int:
+        return bisect.bisect(self.cumulative, rng.random() * self.total)
+
+    def samples(self, rng: random.Random, k: int) -> List[int]:
+        cumulative, total = self.cumulative, self.total
+        return [bisect.bisect(cumulative, rng.random() * total) for _ in range(k)]
+
+    def probability(self, rank: int) -> float:
+        previous = self.cumulative[rank - 1] if rank else 0.0
+        return (self.cumulative[rank] - previous) / self.total
+
+
+def make_words(rng: random.Random, count: int) -> List[str]:
+    """Distinct pronounceable-ish words, shortest first so common words are short"""
+    words = set()
+    while len(words) < count:
+        words.add("".join(rng.choices(string.ascii_lowercase, k=rng.randint(3, 11))))
+    return sorted(words, key=lambda word: (len(word), word))
+
+
+class Dataset:
+    """Generates one spec's data. Each stream has its own seeded RNG, so entities,
+    relations, redis commands and queries can be generated independently and in any order.
+    """
+
+    def __init__(self, spec: DatasetSpec):
+        self.spec = spec
+        rng = random.Random(f"{spec.seed}:vocabulary")
+        self.words = make_words(rng, spec.vocabulary)
+        self.types = [f"type-{rank:03d}" for rank in range(spec.entity_types)]
+        self.relation_types = [f"rel-{rank:02d}" for rank in range(spec.relation_types)]
+        self.word_zipf = Zipf(spec.vocabulary, spec.zipf_exponent)
+        self.type_zipf = Zipf(spec.entity_types, spec.zipf_exponent)
+        self.member_zipf = Zipf(spec.member_universe, spec.zipf_exponent)
+
+    def _rng(self, stream: str) -> random.Random:
+        return random.Random(f"{self.spec.seed}:{stream}")
+
+    # Memory MCP
+
+    def entity_id(self, index: int) -> str:
+        """Stable 12-hex-digit ID for the index-th entity, used when loading from disk"""
+        return format((index * 0x9E3779B97F4A7C15 + self.spec.seed) % (1 << 48), "012x")
+
+    def _sentence(self, rng: random.Random) -> str:
+        count = max(1, int(rng.lognormvariate(math.log(self.spec.words_median),
+                                              self.spec.words_sigma)))
+        words = self.words
+        return " ".join(words[rank] for rank in self.word_zipf.samples(rng, count))
+
+    def entities(self) -> Iterator[Dict[str, Any]]:
+        rng = self._rng("entities")
+        # Geometric observation counts: P(stop) after each observation
+        stop = 1 / (self.spec.observations_mean + 1)
+        for i in range(self.spec.entities):
+            observations = []
+            while rng.random() >= stop:
+                observations.append(self._sentence(rng))
+            yield {
+                "name": f"entity-{i} {self.words[self.word_zipf.sample(rng)]}",
+                "entityType": self.types[self.type_zipf.sample(rng)],
+                "observations": observations,
+                "metadata": {"index": i},
+            }
+
+    def relations(self) -> Iterator[Tuple[int, int, str]]:
+        """(source index, target index, relation type); targets favour popular entities"""
+        rng = self._rng("relations")
+        count = int(self.spec.entities * self.spec.relations_per_entity)
+        targets = Zipf(self.spec.entities, self.spec.zipf_exponent) if count else None
+        relation_zipf = Zipf(self.spec.relation_types, self.spec.zipf_exponent)
+        for _ in range(count):
+            # Popular targets are a shuffled set of entities, not just the first ones
+            target = (targets.sample(rng) * 7919) % self.spec.entities
+            yield (rng.randrange(self.spec.entities), target,
+                   self.relation_types[relation_zipf.sample(rng)])
+
+    def queries(self, count: int) -> List[Dict[str, str]]:
+        """search_nodes queries across head, torso and tail words plus two-word phrases"""
+        rng = self._rng("queries")
+        vocabulary = self.spec.vocabulary
+        bands = {
+            "head": (0, max(vocabulary // 1000, 1)),
+            "torso": (vocabulary // 100, vocabulary // 10),
+            "tail": (vocabulary // 2, vocabulary),
+        }
+        result = []
+        for i in range(count):
+            band = ("head", "torso", "tail", "phrase")[i % 4]
+            if band == "phrase":
+                sentence = self._sentence(rng).split()
+                if len(sentence) < 2:
+                    sentence.append(self.words[0])
+                start = rng.randrange(len(sentence) - 1)
+                query = " ".join(sentence[start:start + 2])
+            else:
+                lo, hi = bands[band]
+                query = self.words[rng.randrange(lo, max(hi, lo + 1))]
+            result.append({"band": band, "query": query})
+        return result
+
+    # Redis MCP
+
+    def _members(self, rng: random.Random, cardinality: int) -> List[str]:
+        cardinality = min(cardinality, self.spec.member_universe)
+        members: Dict[int, None] = {}
+        while len(members) < cardinality:
+            members[self.member_zipf.sample(rng)] = None
+        return [f"m{rank}" for rank in members]
+
+    def redis_commands(self) -> Iterator[Command]:
+        rng = self._rng("redis")
+        spec = self.spec
+        for k in range(spec.hash_keys):
+            for field in self._members(rng, spec.hash_fields):
+                yield {"op": "hset", "key": f"hash:{k}", "field": field,
+                       "value": self.words[self.word_zipf.sample(rng)]}
+        for k in range(spec.set_keys):
+            yield {"op": "sadd", "key": f"set:{k}", "members": self._members(rng, spec.set_members)}
+        for k in range(spec.zset_keys):
+            members = self._members(rng, spec.zset_members)
+            yield {"op": "zadd", "key": f"zset:{k}",
+                   "members": {m: round(rng.lognormvariate(0, 2), 6) for m in members}}
+
+    def expected_counts(self) -> Dict[str, int]:
+        spec = self.spec
+        return {
+            "entities": spec.entities,
+            "hash_keys": spec.hash_keys,
+            "set_keys": spec.set_keys,
+            "sorted_set_keys": spec.zset_keys,
+        }
+
+
+def chunks(items: Iterator[Any], size: int) -> Iterator[List[Any]]:
+    while True:
+        chunk = list(itertools.islice(items, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def populate_storage(storage_dir: Path, spec: DatasetSpec, batch_size: int = 10000,
+                     fsync: bool = True) -> Dict[str, Any]:
+    """Write entities, relations and redis keys straight into a (stopped) server's storage.
+
+    Entities get stable IDs from ``Dataset.entity_id``. Redis keys are written
+    as an append-only file base, which the server only reads when started
+    with ``MCP_REDIS_APPENDONLY=1``.
+    """
+    from memory_store import MemoryStore
+    from redis_aof import ALWAYS, NO, AppendOnlyLog
+    from redis_store import RedisStore
+    from relation_store import RelationStore
+
+    dataset = Dataset(spec)
+    start = time.perf_counter()
+    memory = MemoryStore(storage_dir, fsync=fsync)
+    now = datetime.now().isoformat()
+    index = 0
+    for batch in chunks(dataset.entities(), batch_size):
+        items = []
+        for entity in batch:
+            items.append((dataset.entity_id(index),
+                          {**entity, "created_at": now, "updated_at": now}))
+            index += 1
+        memory.ingest(items)
+    memory.write_snapshot()
+    memory.close()
+
+    relations = RelationStore(Path(storage_dir) / "knowledge_graph", fsync=fsync)
+    edges = ((dataset.entity_id(s), dataset.entity_id(t), r) for s, t, r in dataset.relations())
+    for batch in chunks(edges, batch_size * 5):
+        relations.add(batch)
+    relation_count = relations.edge_count
+    relations.close()
+
+    redis = RedisStore()
+    aof = AppendOnlyLog(Path(storage_dir) / "redis_aof", ALWAYS if fsync else NO)
+    aof.replay(redis)
+    aof.start()
+    commands = 0
+    for command in dataset.redis_commands():
+        if command["op"] == "hset":
+            redis.hset(command["key"], command["field"], command["value"])
+        elif command["op"] == "sadd":
+            redis.sadd(command["key"], command["members"])
+        else:
+            redis.zadd(command["key"], command["members"])
+        commands += 1
+    # One base file holding each key's final value, rather than a record per command
+    asyncio.run(aof.rewrite(redis))
+    aof.close()
+    return {"entities": index, "relations": relation_count, "redis_commands": commands,
+            "redis_keys": len(redis), "elapsed_s": time.perf_counter() - start}
+
+
+def populate_server(url: str, spec: DatasetSpec, batch_size: int = 1000,
+                    pipeline_size: int = 5000, codec: str = "json") -> Dict[str, Any]:
+    """Load a dataset into a running server through its public endpoints"""
+    from mcp_client import MCPClient
+
+    dataset = Dataset(spec)
+    client = MCPClient(url, codec=codec, timeout=300)
+    start = time.perf_counter()
+    ids: List[str] = []
+    for batch in chunks(dataset.entities(), batch_size):
+        response = client.post("/mcp/memory/create_entities", batch)
+        response.raise_for_status()
+        ids.extend(entity["entity_id"] for entity in response.data["entities"])
+
+    relation_count = 0
+    edges = ({"from": ids[s], "to": ids[t], "relationType": r}
+             for s, t, r in dataset.relations())
+    for batch in chunks(edges, batch_size * 5):
+        response = client.post("/mcp/memory/create_relations", {"relations": batch})
+        response.raise_for_status()
+        relation_count += response.data["created"]
+
+    commands = 0
+    for batch in chunks(dataset.redis_commands(), pipeline_size):
+        response = client.post("/mcp/redis/pipeline", {"commands": batch})
+        response.raise_for_status()
+        commands += len(batch)
+    client.close()
+    return {"entities": len(ids), "relations": relation_count, "redis_commands": commands,
+            "elapsed_s": time.perf_counter() - start, "entity_ids": ids}
+
+
+def parse_spec(args: argparse.Namespace) -> DatasetSpec:
+    entities = SCALES.get(args.scale.lower()) if args.scale else None
+    if entities is None:
+        entities = int(args.scale) if args.scale else 10000
+    spec = scaled(entities, args.seed)
+    overrides = {name: getattr(args, name) for name in DatasetSpec._fields
+                 if getattr(args, name, None) is not None and name not in ("entities", "seed")}
+    return spec._replace(**overrides)
+
+
+def main(argv: Optional[Sequence[str]] = None):
+    parser = argparse.ArgumentParser(description="Deterministic synthetic dataset generator")
+    parser.add_argument("--scale", default="10k",
+                        help=f"Entity count or one of {', '.join(SCALES)} (default: 10k)")
+    parser.add_argument("--seed", type=int, default=42)
+    target = parser.add_mutually_exclusive_group(required=True)
+    target.add_argument("--url", help="Load into a running server over HTTP")
+    target.add_argument("--storage-dir", type=Path,
+                        help="Write entities, relations and redis keys into a stopped "
+                             "server's storage")
+    parser.add_argument("--codec", default="json", choices=["json", "msgpack"])
+    parser.add_argument("--queries", type=int, default=100,
+                        help="Search queries to include in the manifest (default: 100)")
+    for name, default in DatasetSpec._field_defaults.items():
+        if name not in ("entities", "seed"):
+            parser.add_argument(f"--{name.replace('_', '-')}", type=type(default), default=None,
+                                dest=name)
+    parser.add_argument("--output", default="dataset_manifest.json",
+                        help="Manifest output file (default: dataset_manifest.json)")
+    args = parser.parse_args(argv)
+
+    spec = parse_spec(args)
+    dataset = Dataset(spec)
+    print(f"\n🌱 Generating {spec.entities} entities (seed {spec.seed})...")
+    if args.url:
+        loaded = populate_server(args.url, spec, codec=args.codec)
+        loaded.pop("entity_ids")
+    else:
+        loaded = populate_storage(args.storage_dir, spec)
+    print(f"✅ Loaded {loaded['entities']} entities and {loaded['relations']} relations "
+          f"in {loaded['elapsed_s']:.1f}s")
+
+    manifest = {
+        "timestamp": time.time(),
+        "spec": spec._asdict(),
+        "loaded": loaded,
+        "expected": dataset.expected_counts(),
+        "queries": dataset.queries(args.queries),
+    }
+    with open(args.output, "w") as f:
+        json.dump(manifest, f, indent=2)
+    print(f"📁 Manifest saved to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,394 @@
+#!/usr/bin/env python3
+"""
+Append-only segment log
+Durable record storage with an offset-addressed read path and online compaction
+"""
+
+import json
+import os
+import zlib
+from pathlib import Path
+from typing import Any, Dict, Iterable, Iterator, List, NamedTuple, Optional, Tuple
+
+SEGMENT_PREFIX = "segment-"
+SEGMENT_SUFFIX = ".log"
+COMPACT_SUFFIX = ".compact"
+DEFAULT_SEGMENT_BYTES = 64 * 1024 * 1024
+
+
+class Location(NamedTuple):
+    """Position of one record inside the log"""
+    segment: int
+    offset: int
+    length: int
+
+
+class LogCorruption(Exception):
+    """Raised when a record read through the offset index fails verification"""
+    pass
+
+
+def encode_record(record: Dict[str, Any]) -> bytes:
+    """Frame a record as ``<crc32 hex> <json>\\n``"""
+    body = json.dumps(record, separators=(",", ":")).encode("utf-8")
+    return b"%08x %s\n" % (zlib.crc32(body), body)
+
+
+def decode_record(line: bytes) -> Optional[Dict[str, Any]]:
+    """Decode a framed record, returning None if it is torn or corrupt"""
+    if len(line) < 10 or not line.endswith(b"\n") or line[8:9] != b" ":
+        return None
+    body = line[9:-1]
+    try:
+        if int(line[:8], 16) != zlib.crc32(body):
+            return None
+        return json.loads(body)
+    except ValueError:
+        return None
+
+
+def _fsync_dir(directory: Path):
+    fd = os.open(directory, os.O_RDONLY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+
+class SegmentLog:
+    """Sequence of append-only segment files.
+
+    Records are appended to the highest-numbered (active) segment, which is
+    sealed and replaced by a new one once it grows past ``max_segment_bytes``.
+    Sealed segments are immutable until compaction rewrites their live records
+    into a single segment that takes the number of the newest sealed segment
+    and starts with a ``compact`` header; any lower-numbered segments left
+    behind by a crash are removed on the next open.
+    """
+
+    def __init__(self, directory: Path, max_segment_bytes: int = DEFAULT_SEGMENT_BYTES,
+                 fsync: bool = True):
+        self.directory = Path(directory)
+        self.max_segment_bytes = max_segment_bytes
+        self.fsync = fsync
+        self.directory.mkdir(parents=True, exist_ok=True)
+
+        self._readers: Dict[int, int] = {}
+        self._live_bytes: Dict[int, int] = {}
+        self._sizes: Dict[int, int] = {}
+        # Running totals over sealed segments, so garbage() never scans
+        self._sealed_bytes = 0
+        self._sealed_live = 0
+        self._recover()
+
+        segments = self.segments()
+        self.active = segments[-1] if segments else 1
+        self._open_active()
+
+    # Segment files
+
+    def _path(self, segment: int, suffix: str = SEGMENT_SUFFIX) -> Path:
+        return self.directory / f"{SEGMENT_PREFIX}{segment:06d}{suffix}"
+
+    def segments(self) -> List[int]:
+        numbers = []
+        for path in self.directory.glob(f"{SEGMENT_PREFIX}*{SEGMENT_SUFFIX}"):
+            try:
+                numbers.append(int(path.name[len(SEGMENT_PREFIX):-len(SEGMENT_SUFFIX)]))
+            except ValueError:
+                continue
+        return sorted(numbers)
+
+    def _recover(self):
+        """Finish or discard compactions interrupted by a crash"""
+        for leftover in self.directory.glob(f"*{COMPACT_SUFFIX}"):
+            leftover.unlink()
+
+        for segment in reversed(self.segments()):
+            with open(self._path(segment), "rb") as f:
+                header = decode_record(f.readline())
+            if header and header.get("op") == "compact":
+                for older in self.segments():
+                    if older < segment:
+                        self._path(older).unlink()
+                break
+
+    def _open_active(self):
+        path = self._path(self.active)
+        self._writer = os.open(path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+        self._sizes[self.active] = os.fstat(self._writer).st_size
+        self._live_bytes.setdefault(self.active, 0)
+
+    def _reader(self, segment: int) -> int:
+        fd = self._readers.get(segment)
+        if fd is None:
+            fd = os.open(self._path(segment), os.O_RDONLY)
+            self._readers[segment] = fd
+        return fd
+
+    # Replay
+
+    def replay(self, start: Optional[Tuple[int, int]] = None
+               ) -> Iterator[Tuple[Dict[str, Any], Location]]:
+        """Yield every intact record in log order, truncating a torn active tail.
+
+        ``start`` is a (segment, offset) position from ``position()``; records
+        before it are skipped without being read.
+        """
+        for segment in self.segments():
+            offset = 0
+            if start is not None:
+                if segment < start[0]:
+                    self._sizes[segment] = self._path(segment).stat().st_size
+                    continue
+                if segment == start[0]:
+                    offset = start[1]
+            with open(self._path(segment), "rb") as f:
+                f.seek(offset)
+                for line in f:
+                    record = decode_record(line)
+                    if record is None:
+                        break
+                    location = Location(segment, offset, len(line))
+                    offset += len(line)
+                    if record.get("op") != "compact":
+                        yield record, location
+
+            size = self._path(segment).stat().st_size
+            if offset != size:
+                if segment == self.active:
+                    os.ftruncate(self._writer, offset)
+                    if self.fsync:
+                        os.fsync(self._writer)
+                else:
+                    print(f"⚠️ {self._path(segment).name}: ignoring {size - offset} "
+                          f"unreadable bytes at offset {offset}")
+            self._sizes[segment] = offset
+        self._recount()
+
+    # Positions and fingerprints
+
+    def position(self) -> Tuple[int, int]:
+        """Current end of the log as (active segment, size)"""
+        return self.active, self._sizes[self.active]
+
+    def fingerprint(self) -> Dict[str, List]:
+        """Size and leading bytes of each segment, used to validate snapshots"""
+        result = {}
+        for segment, size in sorted(self._sizes.items()):
+            head = os.pread(self._reader(segment), 8, 0) if size else b""
+            result[str(segment)] = [size, head.hex()]
+        return result
+
+    def matches(self, fingerprint: Dict[str, List], position: Tuple[int, int]) -> bool:
+        """Check that a fingerprint taken at ``position`` still describes this log.
+
+        Segments before the recorded active segment must be unchanged; the
+        recorded active segment may only have grown since.
+        """
+        recorded = {int(segment): value for segment, value in fingerprint.items()}
+        for segment in self.segments():
+            if segment <= position[0] and segment not in recorded:
+                return False
+        for segment, (size, head) in recorded.items():
+            path = self._path(segment)
+            if not path.exists():
+                return False
+            current = path.stat().st_size
+            if current < size or (segment != position[0] and current != size):
+                return False
+            if size:
+                with open(path, "rb") as f:
+                    if f.read(8).hex() != head:
+                        return False
+        return True
+
+    def restore_live_bytes(self, live_bytes: Dict[str, int]):
+        for segment, count in live_bytes.items():
+            self._live_bytes[int(segment)] = count
+        self._recount()
+
+    def live_bytes(self) -> Dict[str, int]:
+        return {str(segment): count for segment, count in self._live_bytes.items()}
+
+    # Writes and reads
+
+    def append(self, records: List[Dict[str, Any]]) -> List[Location]:
+        """Append records with one write and one fsync; returns their locations"""
+        locations = self.write(records)
+        self.advance(locations)
+        return locations
+
+    def write(self, records: List[Dict[str, Any]]) -> List[Location]:
+        """Write and fsync records past the end of the log, without moving the end.
+
+        Only touches the active segment file, so it can run without the
+        caller's lock, but a single thread must do all of the writing and
+        pass the locations to ``advance`` before writing again. Until then
+        ``position()`` excludes the records, and a snapshot taken meanwhile
+        replays them from the log. A failed or short write is truncated away
+        so the next write starts where the locations say it does.
+        """
+        frames = [encode_record(record) for record in records]
+        offset = self._sizes[self.active]
+        locations = []
+        for frame in frames:
+            locations.append(Location(self.active, offset, len(frame)))
+            offset += len(frame)
+
+        data = b"".join(frames)
+        try:
+            if os.write(self._writer, data) != len(data):
+                raise OSError(f"Short write to segment {self.active}")
+            if self.fsync:
+                os.fsync(self._writer)
+        except BaseException:
+            os.ftruncate(self._writer, self._sizes[self.active])
+            raise
+        return locations
+
+    def advance(self, locations: List[Location]):
+        """Move the end of the log past records from ``write``; call under the caller's lock"""
+        if not locations:
+            return
+        last = locations[-1]
+        self._sizes[self.active] = last.offset + last.length
+        if self._sizes[self.active] >= self.max_segment_bytes:
+            self._rotate()
+
+    def _rotate(self):
+        self._sealed_bytes += self._sizes[self.active]
+        self._sealed_live += self._live_bytes.get(self.active, 0)
+        os.close(self._writer)
+        self.active += 1
+        self._open_active()
+        if self.fsync:
+            _fsync_dir(self.directory)
+
+    def read(self, location: Location) -> Dict[str, Any]:
+        data = os.pread(self._reader(location.segment), location.length, location.offset)
+        record = decode_record(data)
+        if record is None:
+            raise LogCorruption(f"Bad record at {location}")
+        return record
+
+    # Space accounting
+
+    def mark_live(self, location: Location):
+        self._live_bytes[location.segment] = \
+            self._live_bytes.get(location.segment, 0) + location.length
+        if location.segment != self.active:
+            self._sealed_live += location.length
+
+    def mark_dead(self, location: Location):
+        self._live_bytes[location.segment] = \
+            self._live_bytes.get(location.segment, 0) - location.length
+        if location.segment != self.active:
+            self._sealed_live -= location.length
+
+    def _recount(self):
+        sealed = [s for s in self._sizes if s != self.active]
+        self._sealed_bytes = sum(self._sizes[s] for s in sealed)
+        self._sealed_live = sum(self._live_bytes.get(s, 0) for s in sealed)
+
+    def garbage(self) -> Tuple[int, int]:
+        """Return (dead bytes, total bytes) across sealed segments"""
+        return self._sealed_bytes - self._sealed_live, self._sealed_bytes
+
+    @property
+    def segment_count(self) -> int:
+        return len(self._sizes)
+
+    # Compaction
+
+    def sealed_segments(self) -> List[int]:
+        return sorted(s for s in self._sizes if s != self.active)
+
+    def compact_copy(self, sealed: List[int], live: Dict[int, List[Tuple[str, Location]]]
+                     ) -> Optional[Tuple[List[int], Dict[str, Tuple[Location, Location]]]]:
+        """Copy the live records of the given sealed segments into a temp segment.
+
+        ``sealed`` must come from ``sealed_segments()`` and ``live`` must map
+        those segments to the (key, location) pairs the caller considers live,
+        both taken under the caller's lock. Sealed segments are immutable, so
+        the copy itself runs without that lock while appends continue. Returns
+        the plan to hand to ``compact_install``.
+        """
+        if not sealed:
+            return None
+        target = sealed[-1]
+
+        moves: Dict[str, Tuple[Location, Location]] = {}
+        header = encode_record({"op": "compact", "through": target})
+        offset = len(header)
+        with open(self._path(target, COMPACT_SUFFIX), "wb") as out:
+            out.write(header)
+            for segment in sealed:
+                with open(self._path(segment), "rb") as src:
+                    for key, location in sorted(live.get(segment, []),
+                                                key=lambda item: item[1].offset):
+                        frame = os.pread(src.fileno(), location.length, location.offset)
+                        out.write(frame)
+                        moves[key] = (location, Location(target, offset, location.length))
+                        offset += location.length
+            out.flush()
+            if self.fsync:
+                os.fsync(out.fileno())
+        return sealed, moves
+
+    def compact_rewrite(self, sealed: List[int], records: Iterable[Dict[str, Any]]
+                        ) -> Optional[Tuple[List[int], Dict[str, Tuple[Location, Location]]]]:
+        """Write ``records`` into a temp segment that will replace the given sealed segments.
+
+        For logs whose records are not addressed by key: the caller supplies
+        records that rebuild the state the sealed segments held, and the
+        segments after them replay on top. Like ``compact_copy`` it runs
+        without the caller's lock and returns the plan (with no moves) to
+        hand to ``compact_install``.
+        """
+        if not sealed:
+            return None
+        target = sealed[-1]
+        with open(self._path(target, COMPACT_SUFFIX), "wb") as out:
+            out.write(encode_record({"op": "compact", "through": target}))
+            for record in records:
+                out.write(encode_record(record))
+            out.flush()
+            if self.fsync:
+                os.fsync(out.fileno())
+        return sealed, {}
+
+    def compact_install(self, plan: Tuple[List[int], Dict[str, Tuple[Location, Location]]]
+                        ) -> Dict[str, Tuple[Location, Location]]:
+        """Swap the compacted segment in and delete the segments it replaces.
+
+        Must run under the caller's lock. The caller then repoints every key
+        whose location is still the ``old`` half of its move and marks the new
+        location live; keys changed since the copy keep their newer location.
+        """
+        sealed, moves = plan
+        target = sealed[-1]
+        for segment in sealed:
+            fd = self._readers.pop(segment, None)
+            if fd is not None:
+                os.close(fd)
+
+        os.replace(self._path(target, COMPACT_SUFFIX), self._path(target))
+        if self.fsync:
+            _fsync_dir(self.directory)
+
+        for segment in sealed:
+            if segment != target:
+                self._path(segment).unlink()
+            self._sizes.pop(segment, None)
+            self._live_bytes.pop(segment, None)
+        self._sizes[target] = self._path(target).stat().st_size
+        self._live_bytes[target] = 0
+        self._recount()
+        return moves
+
+    def close(self):
+        os.close(self._writer)
+        for fd in self._readers.values():
+            os.close(fd)
+        self._readers.clear()
@@ -0,0 +1,128 @@
+#!/usr/bin/env python3
+"""
+Group commit for segment logs
+A single writer thread that batches mutations from concurrent callers into one append and one fsync
+"""
+
+import queue
+import threading
+from concurrent.futures import Future
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from entity_log import Location, SegmentLog
+
+DEFAULT_MAX_BATCH = 1024
+
+# Called under the store lock: returns the records to append and a function that applies
+# them once they are durable, given their locations, and produces the caller's result
+# (also called under the lock, which is released in between for the write and fsync)
+Finish = Callable[[List[Location]], Any]
+Stage = Callable[[], Tuple[List[Dict[str, Any]], Finish]]
+
+
+class GroupCommitter:
+    """Owns every append to one log.
+
+    Callers ``submit`` a stage function and get a future. The writer thread
+    takes whatever is queued (up to ``max_batch`` submissions), stages each
+    one under ``lock``, releases it to append all of their records with a
+    single write and fsync, then takes it again to apply them in submission
+    order and resolve the futures. While one batch is being fsynced the next
+    one queues up, so concurrent writers share fsyncs instead of each paying
+    for their own, and readers holding ``lock`` never wait on the disk.
+
+    A submission only sees the effects of earlier batches when staged, so its
+    finish function must re-check anything an earlier submission in the same
+    batch, or a caller holding ``lock`` during the write, could have changed.
+    """
+
+    def __init__(self, log: SegmentLog, lock: threading.Lock,
+                 max_batch: int = DEFAULT_MAX_BATCH, name: str = "group-commit"):
+        self._log = log
+        self._lock = lock
+        self.max_batch = max_batch
+        self._queue: "queue.SimpleQueue[Optional[Tuple[Stage, Future]]]" = queue.SimpleQueue()
+        self.batches = 0
+        self.submissions = 0
+        self._closed = False
+        self._thread = threading.Thread(target=self._run, name=name, daemon=True)
+        self._thread.start()
+
+    def submit(self, stage: Stage) -> Future:
+        future: Future = Future()
+        if self._closed:
+            future.set_exception(RuntimeError("Log is closed"))
+            return future
+        self._queue.put((stage, future))
+        return future
+
+    def _run(self):
+        while True:
+            item = self._queue.get()
+            if item is None:
+                return
+            batch = [item]
+            stop = False
+            while len(batch) < self.max_batch:
+                try:
+                    item = self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                if item is None:
+                    stop = True
+                    break
+                batch.append(item)
+            self._commit(batch)
+            if stop:
+                return
+
+    def _commit(self, batch: List[Tuple[Stage, Future]]):
+        staged: List[Tuple[Future, List[Dict[str, Any]], Finish]] = []
+        with self._lock:
+            for stage, future in batch:
+                if not future.set_running_or_notify_cancel():
+                    continue
+                try:
+                    records, finish = stage()
+                except BaseException as e:
+                    future.set_exception(e)
+                    continue
+                staged.append((future, records, finish))
+
+        # Readers keep the lock while the batch is written and fsynced
+        records = [record for _, batch_records, _ in staged for record in batch_records]
+        try:
+            locations = self._log.write(records) if records else []
+        except BaseException as e:
+            for future, _, _ in staged:
+                future.set_exception(e)
+            return
+
+        with self._lock:
+            self._log.advance(locations)
+            start = 0
+            for future, batch_records, finish in staged:
+                end = start + len(batch_records)
+                try:
+                    future.set_result(finish(locations[start:end]))
+                except BaseException as e:
+                    future.set_exception(e)
+                start = end
+            self.batches += 1
+            self.submissions += len(batch)
+
+    def close(self):
+        """Commit everything already submitted, then stop the writer thread"""
+        if self._closed:
+            return
+        self._closed = True
+        self._queue.put(None)
+        self._thread.join()
+        # Submissions that raced with close
+        while True:
+            try:
+                item = self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if item is not None:
+                item[1].set_exception(RuntimeError("Log is closed"))
@@ -0,0 +1,930 @@
+#!/usr/bin/env python3
+"""
+Integrated MCP Server
+Serves the Memory MCP and Redis MCP APIs from a single FastAPI process
+"""
+
+import asyncio
+import os
+import socket
+import threading
+import time
+from concurrent.futures import Future
+from contextlib import asynccontextmanager, contextmanager
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterator, List, Literal, Optional, Tuple, Type
+
+import uvicorn
+from fastapi import FastAPI, HTTPException, Query, Request
+from fastapi.responses import JSONResponse, PlainTextResponse, StreamingResponse
+from pydantic import BaseModel, ConfigDict, Field, ValidationError
+
+from admission import AdmissionController, AdmissionMiddleware
+from body_budget import BodyBudgetMiddleware
+from change_feed import ChangeHub, SubscriberLimit, sse_stream
+from codec import CodecRoute, encode_json
+from memory_store import MemoryStore
+from redis_aof import ALWAYS, DEFAULT_REWRITE_MIN_BYTES, AppendOnlyLog
+from redis_store import RedisStore, WrongTypeError
+from relation_store import OUT, MissingNodeError, RelationStore
+from request_timing import storage_io
+from search_index import PHRASE
+from server_metrics import ServerMetrics, TimingMiddleware
+from thought_store import ThoughtStore
+
+# Configuration
+STORAGE_DIR = Path(os.environ.get("MCP_STORAGE_DIR", Path(__file__).parent / "storage"))
+HOST = os.environ.get("MCP_HOST", "0.0.0.0")
+PORT = int(os.environ.get("MCP_PORT", "8000"))
+COMPACT_INTERVAL = float(os.environ.get("MCP_COMPACT_INTERVAL", "60"))
+SNAPSHOT_INTERVAL = float(os.environ.get("MCP_SNAPSHOT_INTERVAL", "300"))
+READY_FIFO = os.environ.get("MCP_READY_FIFO")
+# Set by shard_router.py on the worker processes of a sharded server
+SHARD_MODE = os.environ.get("MCP_SHARD_MODE") == "1"
+EXPIRE_INTERVAL = float(os.environ.get("MCP_REDIS_EXPIRE_INTERVAL", "1"))
+# Like Redis's active expiry, each tick sweeps due keys in slices until none are left or the
+# budget (seconds, default a quarter of the interval) is spent, yielding between slices
+EXPIRE_BUDGET = float(os.environ.get("MCP_REDIS_EXPIRE_BUDGET", str(EXPIRE_INTERVAL / 4)))
+EXPIRE_SLICE = 1000
+MAX_PIPELINE_COMMANDS = int(os.environ.get("MCP_MAX_PIPELINE_COMMANDS", "10000"))
+PIPELINE_YIELD_EVERY = 256
+# Redis MCP persistence: an append-only file replayed on start (see redis_aof.py)
+REDIS_APPENDONLY = os.environ.get("MCP_REDIS_APPENDONLY") == "1"
+REDIS_APPENDFSYNC = os.environ.get("MCP_REDIS_APPENDFSYNC", "everysec")
+REDIS_AOF_REWRITE_MIN_BYTES = int(os.environ.get("MCP_REDIS_AOF_REWRITE_MIN_BYTES",
+                                                 str(DEFAULT_REWRITE_MIN_BYTES)))
+NDJSON = "application/x-ndjson"
+# Nodes read per store lock acquisition when streaming search results
+SEARCH_STREAM_PAGE = 128
+# Request body budget, enforced on the raw stream before JSON parsing
+MAX_BODY_BYTES = int(os.environ.get("MCP_MAX_BODY_BYTES", str(16 * 1024 * 1024)))
+MAX_BODY_TOKENS = int(os.environ.get("MCP_MAX_BODY_TOKENS", "2000000"))
+MAX_STRING_BYTES = int(os.environ.get("MCP_MAX_STRING_BYTES", str(64 * 1024)))
+# Admission control: requests running and waiting per route before 429/503
+ROUTE_CONCURRENCY = int(os.environ.get("MCP_ROUTE_CONCURRENCY", "32"))
+ROUTE_QUEUE_DEPTH = int(os.environ.get("MCP_ROUTE_QUEUE_DEPTH", "128"))
+ROUTE_QUEUE_TIMEOUT = float(os.environ.get("MCP_ROUTE_QUEUE_TIMEOUT", "1"))
+# Redis change feed subscriptions (Server-Sent Events)
+MAX_SUBSCRIBERS = int(os.environ.get("MCP_MAX_SUBSCRIBERS", "1024"))
+SUBSCRIBER_BUFFER = int(os.environ.get("MCP_SUBSCRIBER_BUFFER", "1024"))
+SSE_KEEPALIVE = float(os.environ.get("MCP_SSE_KEEPALIVE", "15"))
+MAX_SUBSCRIBE_PATTERNS = 64
+SSE = "text/event-stream"
+# Entities and search results kept parsed in memory; 0 disables either cache
+ENTITY_CACHE_SIZE = int(os.environ.get("MCP_ENTITY_CACHE_SIZE", "10000"))
+SEARCH_CACHE_SIZE = int(os.environ.get("MCP_SEARCH_CACHE_SIZE", "256"))
+
+# Bounds on knowledge graph traversals
+MAX_GRAPH_DEPTH = int(os.environ.get("MCP_MAX_GRAPH_DEPTH", "6"))
+MAX_GRAPH_NODES = int(os.environ.get("MCP_MAX_GRAPH_NODES", "10000"))
+# Thoughts per sequential thinking history or branch page
+MAX_THOUGHT_PAGE = 1000
+
+
+class Entity(BaseModel):
+    name: str = Field(..., min_length=1)
+    entityType: str = Field(..., min_length=1)
+    observations: List[str] = []
+    metadata: Dict[str, Any] = {}
+
+
+# phrase: the query's words in order; substring: the query verbatim, ignoring case
+Match = Literal["phrase", "substring"]
+
+
+class SearchRequest(BaseModel):
+    query: str = ""
+    limit: int = Field(10, ge=0)
+    entityType: Optional[str] = None
+    match: Match = PHRASE
+    # next_cursor from a previous page; results continue after it
+    cursor: Optional[str] = None
+
+
+class DeleteEntityRequest(BaseModel):
+    entity_id: str = Field(..., min_length=1)
+
+
+class OpenNodesRequest(BaseModel):
+    entity_ids: List[str] = Field(..., min_length=1)
+
+
+class Relation(BaseModel):
+    """A typed, directed edge between two entity IDs"""
+    model_config = ConfigDict(populate_by_name=True)
+
+    source: str = Field(..., alias="from", min_length=1)
+    to: str = Field(..., min_length=1)
+    relationType: str = Field(..., min_length=1)
+
+
+class RelationsRequest(BaseModel):
+    relations: List[Relation] = Field(..., min_length=1)
+
+
+Direction = Literal["out", "in", "both"]
+
+
+class NeighborsRequest(BaseModel):
+    entity_id: str = Field(..., min_length=1)
+    depth: int = Field(1, ge=1, le=MAX_GRAPH_DEPTH)
+    direction: Direction = OUT
+    relationType: Optional[str] = None
+    limit: int = Field(100, ge=1, le=MAX_GRAPH_NODES)
+
+
+class PathRequest(BaseModel):
+    source: str = Field(..., min_length=1)
+    target: str = Field(..., min_length=1)
+    maxDepth: int = Field(MAX_GRAPH_DEPTH, ge=1, le=MAX_GRAPH_DEPTH)
+    direction: Direction = OUT
+    relationType: Optional[str] = None
+
+
+class DeleteEntitiesRequest(BaseModel):
+    entity_ids: List[str] = []
+    # Also delete every entity whose name starts with this
+    namePrefix: Optional[str] = Field(None, min_length=1)
+
+
+class RedisKeyRequest(BaseModel):
+    key: str = Field(..., min_length=1)
+
+
+class DeletePrefixRequest(BaseModel):
+    prefix: str = Field(..., min_length=1)
+
+
+class RedisWriteRequest(RedisKeyRequest):
+    ttl: Optional[float] = Field(None, gt=0)
+
+
+class HSetRequest(RedisWriteRequest):
+    field: str
+    value: str
+
+
+class HGetRequest(RedisKeyRequest):
+    field: str
+
+
+class SAddRequest(RedisWriteRequest):
+    members: List[str]
+
+
+class ZAddRequest(RedisWriteRequest):
+    members: Dict[str, float]
+
+
+class ZRangeRequest(RedisKeyRequest):
+    start: int = 0
+    stop: int = -1
+    withscores: bool = False
+
+
+class ExpireRequest(RedisKeyRequest):
+    seconds: float = Field(..., gt=0)
+
+
+class PipelineCommand(BaseModel):
+    """One pipeline entry: ``op`` plus the fields of that command's request body"""
+    model_config = ConfigDict(extra="allow")
+
+    op: str
+
+
+class PipelineRequest(BaseModel):
+    commands: List[PipelineCommand] = Field(..., min_length=1, max_length=MAX_PIPELINE_COMMANDS)
+    atomic: bool = False
+
+
+# Request body model of each command /mcp/redis/pipeline accepts
+REDIS_COMMAND_MODELS: Dict[str, Type[BaseModel]] = {
+    "hset": HSetRequest,
+    "hget": HGetRequest,
+    "sadd": SAddRequest,
+    "smembers": RedisKeyRequest,
+    "zadd": ZAddRequest,
+    "zrange": ZRangeRequest,
+    "expire": ExpireRequest,
+    "ttl": RedisKeyRequest,
+    "delete": RedisKeyRequest,
+    "delete_prefix": DeletePrefixRequest,
+}
+
+
+# Sequential thinking: the sequential_thinking tool and its thoughts:// resources
+
+class ThoughtRequest(BaseModel):
+    thought: str = Field(..., min_length=1)
+    thoughtNumber: int = Field(..., ge=1)
+    totalThoughts: int = Field(..., ge=1)
+    nextThoughtNeeded: bool
+    isRevision: Optional[bool] = None
+    revisesThought: Optional[int] = Field(None, ge=1)
+    branchFromThought: Optional[int] = Field(None, ge=1)
+    branchId: Optional[str] = Field(None, min_length=1)
+    needsMoreThoughts: Optional[bool] = None
+
+
+class ThoughtPageRequest(BaseModel):
+    limit: int = Field(100, ge=1, le=MAX_THOUGHT_PAGE)
+    # next_cursor from a previous page; thoughts continue after it
+    cursor: Optional[str] = None
+
+
+class BranchRequest(ThoughtPageRequest):
+    branchId: str = Field(..., min_length=1)
+
+
+class RevisionsRequest(BaseModel):
+    thoughtNumber: int = Field(..., ge=1)
+
+
+# Internal shard API, only served with shard=True (see shard_router.py)
+
+class ShardEntity(Entity):
+    entity_id: str = Field(..., min_length=1)
+    created_at: str = Field(..., min_length=1)
+
+
+class ShardSearchRequest(BaseModel):
+    query: str = ""
+    limit: int = Field(10, ge=0)
+    entityType: Optional[str] = None
+    match: Match = PHRASE
+    after: int = -1
+
+
+class EntityIdsRequest(BaseModel):
+    entity_ids: List[str]
+
+
+def parse_pipeline(request: PipelineRequest) -> List[Any]:
+    """Validate each command against its model.
+
+    Invalid commands become failed result entries, or with ``atomic`` set
+    the first one rejects the whole pipeline with 400 (like EXECABORT).
+    """
+    parsed: List[Any] = []
+    for index, command in enumerate(request.commands):
+        try:
+            model = REDIS_COMMAND_MODELS[command.op]
+            parsed.append(model.model_validate(command.model_extra or {}))
+        except (KeyError, ValidationError) as e:
+            error = f"Unknown command '{command.op}'" if isinstance(e, KeyError) else \
+                e.errors(include_url=False, include_context=False)
+            if request.atomic:
+                raise HTTPException(status_code=400,
+                                    detail={"index": index, "op": command.op, "error": error})
+            parsed.append({"ok": False, "status": 422, "error": error})
+    return parsed
+
+
+def encode_cursor(seq: Optional[int]) -> Optional[str]:
+    return format(seq, "x") if seq is not None else None
+
+
+def decode_cursor(cursor: Optional[str]) -> int:
+    """Sequence number to resume after; cursors are opaque to clients"""
+    if cursor is None:
+        return -1
+    try:
+        seq = int(cursor, 16)
+    except ValueError:
+        seq = -1
+    if seq < 0 or cursor != format(seq, "x"):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    return seq
+
+
+async def committed(future: Future) -> Any:
+    """Wait for a group commit without holding a threadpool thread"""
+    with storage_io():
+        return await asyncio.wrap_future(future)
+
+
+def create_app(storage_dir: Path = STORAGE_DIR, shard: bool = False,
+               appendonly: bool = REDIS_APPENDONLY,
+               appendfsync: str = REDIS_APPENDFSYNC) -> FastAPI:
+    """Build the FastAPI application around a storage directory.
+
+    With ``shard`` set the app is one worker of a sharded server and also
+    serves the ``/internal`` routes its router uses (see shard_router.py).
+    With ``appendonly`` set the redis keyspace is logged to
+    ``storage_dir/redis_aof`` and rebuilt from it here, before the server
+    takes requests, so agents find their coordination state after a restart.
+    """
+    memory = MemoryStore(storage_dir, entity_cache_size=ENTITY_CACHE_SIZE,
+                         search_cache_size=SEARCH_CACHE_SIZE)
+    changes = ChangeHub(MAX_SUBSCRIBERS, SUBSCRIBER_BUFFER)
+    redis = RedisStore()
+    aof = None
+    if appendonly:
+        aof = AppendOnlyLog(Path(storage_dir) / "redis_aof", appendfsync)
+        aof.replay(redis)
+        aof.start()
+
+        def log_and_publish(event):
+            # Logged first: publish() stamps the event for subscribers
+            aof.record(event)
+            changes.publish(event)
+
+        redis.on_change = log_and_publish
+    else:
+        # Redis MCP state lives in process memory only; every change is offered to subscribers
+        redis.on_change = changes.publish
+    relations = RelationStore(Path(storage_dir) / "knowledge_graph")
+    # A crash between deleting entities and their edges leaves edges to deleted entities;
+    # after a clean shutdown there are none to look for. A shard cannot tell, as the
+    # entities live across shards; its router prunes instead.
+    pruned_relations = 0
+    if not shard and not relations.closed_cleanly:
+        pruned_relations = relations.prune(memory.missing)
+    # Like the reference sequential thinking server, thought history is kept in memory
+    thoughts = ThoughtStore()
+
+    async def compaction_loop():
+        while True:
+            await asyncio.sleep(COMPACT_INTERVAL)
+            # Compaction invalidates the previous snapshot's offsets
+            for store in (memory, relations):
+                if await asyncio.to_thread(store.maybe_compact):
+                    await asyncio.to_thread(store.write_snapshot)
+
+    async def snapshot_loop():
+        while True:
+            await asyncio.sleep(SNAPSHOT_INTERVAL)
+            await asyncio.to_thread(memory.write_snapshot)
+            await asyncio.to_thread(relations.write_snapshot)
+
+    async def expiry_loop():
+        while True:
+            await asyncio.sleep(EXPIRE_INTERVAL)
+            stop = time.monotonic() + EXPIRE_BUDGET
+            while redis.expire_due(EXPIRE_SLICE) == EXPIRE_SLICE and time.monotonic() < stop:
+                await asyncio.sleep(0)
+
+    async def aof_rewrite_loop():
+        while True:
+            await asyncio.sleep(COMPACT_INTERVAL)
+            if aof.needs_rewrite(REDIS_AOF_REWRITE_MIN_BYTES):
+                await aof.rewrite(redis)
+
+    @asynccontextmanager
+    async def lifespan(app: FastAPI):
+        tasks = [asyncio.create_task(compaction_loop()),
+                 asyncio.create_task(snapshot_loop()),
+                 asyncio.create_task(expiry_loop())]
+        if aof is not None:
+            tasks.append(asyncio.create_task(aof_rewrite_loop()))
+        yield
+        for task in tasks:
+            task.cancel()
+        if aof is not None:
+            aof.close()
+        memory.write_snapshot()
+        memory.close()
+        relations.write_snapshot()
+        relations.close()
+
+    app = FastAPI(title="Integrated MCP Server",
+                  description="Memory MCP and Redis MCP in a single service",
+                  lifespan=lifespan)
+
+    # Every route records handler start/end so Server-Timing can split queueing from work,
+    # and speaks orjson JSON or MessagePack depending on Content-Type and Accept
+    app.router.route_class = CodecRoute
+    metrics = ServerMetrics()
+    metrics.gauge("mcp_memory_entities", "Entities in the memory store", lambda: memory.count)
+    metrics.gauge("mcp_entity_log_garbage_bytes", "Reclaimable bytes in sealed log segments",
+                  lambda: memory.stats()["garbage_bytes"])
+    metrics.gauge("mcp_graph_relations", "Relations in the knowledge graph",
+                  lambda: relations.edge_count)
+    metrics.gauge("mcp_redis_keys", "Keys in the redis keyspace", lambda: len(redis))
+    metrics.gauge("mcp_redis_used_bytes", "Estimated redis keyspace memory",
+                  lambda: redis.used_bytes)
+    metrics.gauge("mcp_redis_subscribers", "Open redis change feed subscriptions",
+                  lambda: changes.subscribers)
+    # Subscriptions are long-lived streams, so they are capped by MAX_SUBSCRIBERS instead
+    admission = AdmissionController(ROUTE_CONCURRENCY, ROUTE_QUEUE_DEPTH, ROUTE_QUEUE_TIMEOUT,
+                                    exempt=("/health", "/metrics", "/mcp/redis/subscribe"))
+    metrics.gauge("mcp_admission_in_flight", "Admitted requests running on gated routes",
+                  admission.in_flight)
+    metrics.gauge("mcp_admission_queued", "Requests waiting for a slot on gated routes",
+                  admission.queued)
+    app.add_middleware(BodyBudgetMiddleware, max_bytes=MAX_BODY_BYTES,
+                       max_tokens=MAX_BODY_TOKENS, max_string_bytes=MAX_STRING_BYTES)
+    # Outside the body budget so refused requests are not parsed, inside timing so they are counted
+    app.add_middleware(AdmissionMiddleware, controller=admission)
+    # Added last so it is outermost and also times requests rejected by the budget
+    app.add_middleware(TimingMiddleware, metrics=metrics)
+
+    app.state.memory = memory
+    app.state.redis = redis
+    app.state.changes = changes
+    app.state.aof = aof
+    app.state.relations = relations
+    app.state.pruned_relations = pruned_relations
+    app.state.thoughts = thoughts
+    app.state.metrics = metrics
+    app.state.admission = admission
+
+    @app.exception_handler(WrongTypeError)
+    async def wrong_type_handler(request: Request, exc: WrongTypeError):
+        return JSONResponse(status_code=400, content={"detail": str(exc)})
+
+    @app.get("/health")
+    async def health():
+        return {
+            "status": "healthy",
+            "memory_entities": memory.count,
+            "redis_keys": len(redis),
+        }
+
+    @app.get("/metrics")
+    async def prometheus_metrics():
+        return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4")
+
+    @app.get("/status")
+    async def status():
+        key_counts = redis.key_counts()
+        return {
+            "status": "running",
+            "memory_mcp": {
+                "entities": memory.count,
+                "storage_dir": str(storage_dir),
+                "log": memory.stats(),
+                "cache": memory.cache_stats(),
+                "graph": relations.stats(),
+            },
+            "redis_mcp": {
+                "hash_keys": key_counts["hash"],
+                "set_keys": key_counts["set"],
+                "sorted_set_keys": key_counts["zset"],
+                "memory": redis.memory(),
+                "subscriptions": changes.stats(),
+                "persistence": {"appendonly": True, **aof.stats()} if aof is not None
+                else {"appendonly": False},
+            },
+            "sequential_thinking": thoughts.stats(),
+            "admission": admission.stats(),
+        }
+
+    # Memory MCP
+
+    @app.post("/mcp/memory/create_entities")
+    async def create_entities(entities: List[Entity]):
+        if not entities:
+            raise HTTPException(status_code=400, detail="No entities supplied")
+        created = await committed(memory.submit_create([entity.model_dump()
+                                                        for entity in entities]))
+        return {
+            "entities": [
+                {"entity_id": e["entity_id"], "name": e["name"], "entityType": e["entityType"]}
+                for e in created
+            ],
+            "count": len(created),
+        }
+
+    @app.post("/mcp/memory/search_nodes")
+    def search_nodes(request: SearchRequest, http_request: Request):
+        after = decode_cursor(request.cursor)
+        if NDJSON in http_request.headers.get("accept", ""):
+            return StreamingResponse(stream_search(request, after), media_type=NDJSON)
+        nodes, last_seq = memory.search_page(request.query, request.entityType,
+                                             request.limit, after, request.match)
+        # A full page may have more after it; the next page comes back empty if not
+        next_cursor = encode_cursor(last_seq) if len(nodes) == request.limit else None
+        return {"query": request.query, "count": len(nodes), "nodes": nodes,
+                "next_cursor": next_cursor}
+
+    def stream_search(request: SearchRequest, after: int):
+        """One JSON node per line as pages are read, then a summary line"""
+        count = 0
+        last_seq = None
+        for nodes, last_seq in memory.search_pages(request.query, request.entityType,
+                                                   request.limit, after, SEARCH_STREAM_PAGE,
+                                                   request.match):
+            count += len(nodes)
+            yield b"".join(encode_json(node) + b"\n" for node in nodes)
+        next_cursor = encode_cursor(last_seq) if count and count == request.limit else None
+        yield encode_json({"query": request.query, "count": count,
+                           "next_cursor": next_cursor}) + b"\n"
+
+    @app.post("/mcp/memory/open_nodes")
+    def open_nodes(request: OpenNodesRequest):
+        """Entities by ID, in the order asked for; unknown IDs are listed as missing"""
+        nodes = memory.get_entities(request.entity_ids)
+        found = {node["entity_id"] for node in nodes}
+        missing = [entity_id for entity_id in dict.fromkeys(request.entity_ids)
+                   if entity_id not in found]
+        return {"nodes": nodes, "count": len(nodes), "missing": missing}
+
+    @app.post("/mcp/memory/delete_entity")
+    async def delete_entity(request: DeleteEntityRequest):
+        if not await committed(memory.submit_delete_many([request.entity_id])):
+            raise HTTPException(status_code=404, detail="Entity not found")
+        # A separate commit to the relation log; edges left behind by a crash before it
+        # are pruned when the server starts
+        await committed(relations.submit_remove_nodes([request.entity_id]))
+        return {"deleted": request.entity_id}
+
+    @app.post("/mcp/memory/delete_entities")
+    async def delete_entities(request: DeleteEntitiesRequest):
+        """Bulk delete by ID and/or name prefix, as one group commit"""
+        entity_ids = list(request.entity_ids)
+        if request.namePrefix is not None:
+            entity_ids += await asyncio.to_thread(memory.find_by_name_prefix, request.namePrefix)
+        deleted = await committed(memory.submit_delete_many(entity_ids))
+        await committed(relations.submit_remove_nodes(deleted))
+        return {"deleted": len(deleted)}
+
+    # Knowledge graph: relations between entity IDs
+
+    def edges_of(request: RelationsRequest) -> List[Tuple[str, str, str]]:
+        return [(r.source, r.to, r.relationType) for r in request.relations]
+
+    @app.post("/mcp/memory/create_relations")
+    async def create_relations(request: RelationsRequest):
+        edges = edges_of(request)
+        try:
+            # Checked as the edges are staged, so a concurrent delete either fails
+            # this request or removes the edges after they are added
+            created = await committed(relations.submit_add(edges, memory.missing))
+        except MissingNodeError as e:
+            raise HTTPException(status_code=404, detail=str(e))
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        return {"created": created, "count": len(edges)}
+
+    @app.post("/mcp/memory/delete_relations")
+    async def delete_relations(request: RelationsRequest):
+        return {"deleted": await committed(relations.submit_remove(edges_of(request)))}
+
+    @app.post("/mcp/memory/neighbors")
+    def neighbors(request: NeighborsRequest):
+        return relations.neighbors(request.entity_id, request.depth, request.direction,
+                                   request.relationType, request.limit)
+
+    @app.post("/mcp/memory/find_path")
+    def find_path(request: PathRequest):
+        return relations.find_path(request.source, request.target, request.maxDepth,
+                                   request.direction, request.relationType)
+
+    # Redis MCP
+    # Each command is a plain function so /mcp/redis/pipeline can run it too
+
+    async def durable(response: Dict[str, Any]) -> Dict[str, Any]:
+        """With appendfsync always, answer a write only once its changes are fsynced"""
+        if aof is not None and aof.fsync == ALWAYS:
+            await committed(aof.barrier())
+        return response
+
+    def run_hset(request: HSetRequest) -> Dict[str, Any]:
+        created = redis.hset(request.key, request.field, request.value, request.ttl)
+        return {"key": request.key, "field": request.field, "created": created}
+
+    def run_hget(request: HGetRequest) -> Dict[str, Any]:
+        value = redis.hget(request.key, request.field)
+        return {"key": request.key, "field": request.field, "value": value}
+
+    def run_sadd(request: SAddRequest) -> Dict[str, Any]:
+        return {"key": request.key, "added": redis.sadd(request.key, request.members, request.ttl)}
+
+    def run_smembers(request: RedisKeyRequest) -> Dict[str, Any]:
+        return {"key": request.key, "members": redis.smembers(request.key)}
+
+    def run_zadd(request: ZAddRequest) -> Dict[str, Any]:
+        try:
+            added = redis.zadd(request.key, request.members, request.ttl)
+        except ValueError as e:
+            # Pydantic accepts "nan" and "inf" as floats
+            raise HTTPException(status_code=400, detail=str(e))
+        return {"key": request.key, "added": added}
+
+    def run_zrange(request: ZRangeRequest) -> Dict[str, Any]:
+        window = redis.zrange(request.key, request.start, request.stop)
+        if request.withscores:
+            return {"key": request.key, "members": [[m, s] for m, s in window]}
+        return {"key": request.key, "members": [m for m, _ in window]}
+
+    def run_expire(request: ExpireRequest) -> Dict[str, Any]:
+        if not redis.expire(request.key, request.seconds):
+            raise HTTPException(status_code=404, detail="Key not found")
+        return {"key": request.key, "ttl": request.seconds}
+
+    def run_ttl(request: RedisKeyRequest) -> Dict[str, Any]:
+        return {"key": request.key, "ttl": redis.ttl(request.key)}
+
+    def run_delete(request: RedisKeyRequest) -> Dict[str, Any]:
+        if not redis.delete(request.key):
+            raise HTTPException(status_code=404, detail="Key not found")
+        return {"key": request.key, "deleted": 1}
+
+    def run_delete_prefix(request: DeletePrefixRequest) -> Dict[str, Any]:
+        return {"prefix": request.prefix, "deleted": redis.delete_prefix(request.prefix)}
+
+    redis_commands: Dict[str, Callable[[Any], Dict[str, Any]]] = {
+        "hset": run_hset,
+        "hget": run_hget,
+        "sadd": run_sadd,
+        "smembers": run_smembers,
+        "zadd": run_zadd,
+        "zrange": run_zrange,
+        "expire": run_expire,
+        "ttl": run_ttl,
+        "delete": run_delete,
+        "delete_prefix": run_delete_prefix,
+    }
+
+    @app.post("/mcp/redis/hset")
+    async def hset(request: HSetRequest):
+        return await durable(run_hset(request))
+
+    @app.post("/mcp/redis/hget")
+    async def hget(request: HGetRequest):
+        return run_hget(request)
+
+    @app.post("/mcp/redis/sadd")
+    async def sadd(request: SAddRequest):
+        return await durable(run_sadd(request))
+
+    @app.post("/mcp/redis/smembers")
+    async def smembers(request: RedisKeyRequest):
+        return run_smembers(request)
+
+    @app.post("/mcp/redis/zadd")
+    async def zadd(request: ZAddRequest):
+        return await durable(run_zadd(request))
+
+    @app.post("/mcp/redis/zrange")
+    async def zrange(request: ZRangeRequest):
+        return run_zrange(request)
+
+    @app.post("/mcp/redis/expire")
+    async def expire(request: ExpireRequest):
+        return await durable(run_expire(request))
+
+    @app.post("/mcp/redis/ttl")
+    async def ttl(request: RedisKeyRequest):
+        return run_ttl(request)
+
+    @app.post("/mcp/redis/delete")
+    async def delete(request: RedisKeyRequest):
+        return await durable(run_delete(request))
+
+    @app.post("/mcp/redis/delete_prefix")
+    async def delete_prefix(request: DeletePrefixRequest):
+        return await durable(run_delete_prefix(request))
+
+    @app.get("/mcp/redis/subscribe")
+    async def subscribe(pattern: List[str] = Query(..., min_length=1,
+                                                   max_length=MAX_SUBSCRIBE_PATTERNS)):
+        """Stream changes to keys matching any ``pattern`` (Redis globs) as Server-Sent Events.
+
+        Agents can wait here for handoffs instead of polling ``smembers``.
+        Each ``data:`` line is one change event as JSON: ``event`` (hset,
+        hdel, sadd, srem, zadd, zrem, del, expired, expire, persist), ``key``,
+        ``type``, what changed (``field``/``value``, ``members`` or ``ttl``),
+        plus ``seq`` and ``time``. An ``overflow`` event means the client fell
+        behind and should reconnect and re-read its keys.
+        """
+        try:
+            subscription = changes.subscribe(pattern)
+        except SubscriberLimit as e:
+            raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": "5"})
+        return StreamingResponse(sse_stream(changes, subscription, SSE_KEEPALIVE),
+                                 media_type=SSE, headers={"Cache-Control": "no-cache"})
+
+    @app.post("/mcp/redis/pipeline")
+    async def pipeline(request: PipelineRequest):
+        """Run an ordered list of commands in one request.
+
+        Commands run in order and each gets its own result entry; a failing
+        command does not stop the ones after it. With ``atomic`` set, every
+        command is validated before any runs (a bad one rejects the whole
+        pipeline with 400, like EXECABORT) and the batch runs without
+        yielding to other requests, like MULTI/EXEC. As in Redis, commands
+        that fail at run time are not rolled back.
+        """
+        parsed = parse_pipeline(request)
+        results = []
+        for index, (command, args) in enumerate(zip(request.commands, parsed)):
+            if isinstance(args, dict):
+                results.append(args)
+                continue
+            try:
+                results.append({"ok": True, "result": redis_commands[command.op](args)})
+            except HTTPException as e:
+                results.append({"ok": False, "status": e.status_code, "error": e.detail})
+            except WrongTypeError as e:
+                results.append({"ok": False, "status": 400, "error": str(e)})
+            if not request.atomic and index % PIPELINE_YIELD_EVERY == PIPELINE_YIELD_EVERY - 1:
+                # Let other requests in between chunks of a long non-atomic pipeline
+                await asyncio.sleep(0)
+
+        return await durable({
+            "count": len(results),
+            "failed": sum(1 for r in results if not r["ok"]),
+            "atomic": request.atomic,
+            "results": results,
+        })
+
+    # Sequential thinking
+
+    @app.post("/mcp/thinking/thought")
+    async def add_thought(request: ThoughtRequest):
+        """The sequential_thinking tool: record one thought"""
+        return thoughts.add(request.model_dump(exclude_none=True))
+
+    @app.post("/mcp/thinking/history")
+    async def thought_history(request: ThoughtPageRequest):
+        """thoughts://history, a page at a time in arrival order"""
+        page, last_seq = thoughts.history(decode_cursor(request.cursor), request.limit)
+        next_cursor = encode_cursor(last_seq) if len(page) == request.limit else None
+        return {"thoughts": page, "count": len(page), "next_cursor": next_cursor}
+
+    @app.post("/mcp/thinking/branch")
+    async def thought_branch(request: BranchRequest):
+        """thoughts://branches/{branch_id}, paged like the history"""
+        result = thoughts.branch(request.branchId, decode_cursor(request.cursor), request.limit)
+        if result is None:
+            raise HTTPException(status_code=404, detail="Branch not found")
+        page, last_seq = result
+        next_cursor = encode_cursor(last_seq) if len(page) == request.limit else None
+        return {"branchId": request.branchId, "thoughts": page, "count": len(page),
+                "next_cursor": next_cursor}
+
+    @app.post("/mcp/thinking/revisions")
+    async def thought_revisions(request: RevisionsRequest):
+        """Thoughts revising a thought number, directly or by revising a revision"""
+        chain = thoughts.revisions(request.thoughtNumber)
+        return {"thoughtNumber": request.thoughtNumber, "revisions": chain, "count": len(chain)}
+
+    @app.get("/mcp/thinking/summary")
+    async def thought_summary():
+        """thoughts://summary"""
+        return thoughts.summary()
+
+    @app.post("/mcp/thinking/clear")
+    async def clear_thoughts():
+        return {"cleared": thoughts.clear()}
+
+    if shard:
+        @app.post("/internal/memory/create_entities")
+        async def shard_create_entities(entities: List[ShardEntity]):
+            """Create entities under IDs the router picked"""
+            created = await committed(memory.submit_create(
+                [entity.model_dump(exclude={"entity_id", "created_at"}) for entity in entities],
+                [entity.entity_id for entity in entities],
+                entities[0].created_at if entities else None))
+            return {"entities": [{"entity_id": e["entity_id"], "name": e["name"],
+                                  "entityType": e["entityType"]} for e in created]}
+
+        @app.post("/internal/memory/search_matches")
+        def shard_search_matches(request: ShardSearchRequest):
+            """A search page with each node's sequence number, for the router's merge"""
+            matches = memory.search_matches(request.query, request.entityType,
+                                            request.limit, request.after, request.match)
+            return {"seqs": [seq for seq, _ in matches], "nodes": [node for _, node in matches]}
+
+        @app.post("/internal/memory/missing")
+        async def shard_missing(request: EntityIdsRequest):
+            return {"missing": await asyncio.to_thread(memory.missing, request.entity_ids)}
+
+        @app.post("/internal/memory/delete_entities")
+        async def shard_delete_entities(request: DeleteEntitiesRequest):
+            """delete_entities returning the deleted IDs, so the graph shard can drop their edges"""
+            entity_ids = list(request.entity_ids)
+            if request.namePrefix is not None:
+                entity_ids += await asyncio.to_thread(memory.find_by_name_prefix,
+                                                      request.namePrefix)
+            deleted = await committed(memory.submit_delete_many(entity_ids))
+            await committed(relations.submit_remove_nodes(deleted))
+            return {"deleted": deleted}
+
+        @app.post("/internal/graph/create_relations")
+        async def shard_create_relations(request: RelationsRequest):
+            """create_relations for endpoints the router already found on their shards"""
+            try:
+                created = await committed(relations.submit_add(edges_of(request)))
+            except ValueError as e:
+                raise HTTPException(status_code=400, detail=str(e))
+            return {"created": created, "count": len(request.relations)}
+
+        @app.post("/internal/graph/remove_nodes")
+        async def shard_remove_nodes(request: EntityIdsRequest):
+            return {"removed": await committed(relations.submit_remove_nodes(request.entity_ids))}
+
+        @app.get("/internal/graph/nodes")
+        def shard_graph_nodes():
+            """Entity IDs with relations, for the router to prune those of deleted entities"""
+            return {"entity_ids": relations.nodes()}
+
+    # Every route is registered now; give each its own admission gate
+    admission.bind_routes(app.routes)
+    return app
+
+
+def signal_ready(fifo: Optional[str] = READY_FIFO):
+    """Tell the launching script the server is accepting connections"""
+    if not fifo:
+        return
+    try:
+        fd = os.open(fifo, os.O_WRONLY | os.O_NONBLOCK)
+        try:
+            os.write(fd, b"ready\n")
+        finally:
+            os.close(fd)
+    except OSError as e:
+        print(f"⚠️ Could not signal readiness on {fifo}: {e}")
+
+
+class MCPServer(uvicorn.Server):
+    """uvicorn server that ends change feed streams before waiting for connections to close"""
+
+    async def shutdown(self, sockets=None):
+        # Open subscriptions would otherwise hold graceful shutdown forever
+        changes = getattr(self.config.app.state, "changes", None)
+        if changes is not None:
+            changes.close()
+        await super().shutdown(sockets=sockets)
+
+
+class ReadyServer(MCPServer):
+    """uvicorn server that signals readiness once its sockets are listening"""
+
+    async def startup(self, sockets=None):
+        await super().startup(sockets=sockets)
+        if not self.should_exit:
+            signal_ready()
+
+
+class ThreadedServer(MCPServer):
+    """uvicorn server run from a background thread; ``ready`` is set once startup finishes"""
+
+    def __init__(self, config: uvicorn.Config):
+        super().__init__(config)
+        self.ready = threading.Event()
+
+    async def startup(self, sockets=None):
+        try:
+            await super().startup(sockets=sockets)
+        finally:
+            self.ready.set()
+
+
+@contextmanager
+def background_server(storage_dir: Path, host: str = "127.0.0.1", timeout: float = 30,
+                      shard: bool = False, **options: Any) -> Iterator[str]:
+    """Serve a fresh app on an ephemeral port from a daemon thread; yields the base URL"""
+    with serve_in_background(create_app(storage_dir, shard=shard, **options), host,
+                             timeout) as url:
+        yield url
+
+
+@contextmanager
+def serve_in_background(app: FastAPI, host: str = "127.0.0.1",
+                        timeout: float = 30) -> Iterator[str]:
+    """Serve ``app`` on an ephemeral port from a daemon thread; yields the base URL.
+
+    The listening socket is bound before the thread starts, so the URL is known
+    up front and the caller only waits for the app's lifespan startup.
+    """
+    sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.bind((host, 0))
+    port = sock.getsockname()[1]
+    config = uvicorn.Config(app, log_config=None, log_level="warning")
+    server = ThreadedServer(config)
+    thread = threading.Thread(target=server.run, kwargs={"sockets": [sock]},
+                              name="mcp-background-server", daemon=True)
+    thread.start()
+    try:
+        if not server.ready.wait(timeout) or not server.started:
+            raise RuntimeError(f"In-process MCP server failed to start on {host}:{port}")
+        yield f"http://{host}:{port}"
+    finally:
+        server.should_exit = True
+        thread.join(timeout)
+        sock.close()
+
+
+def main():
+    print(f"🚀 Integrated MCP Server starting on {HOST}:{PORT}")
+    print(f"📂 Storage: {STORAGE_DIR}")
+    app = create_app(STORAGE_DIR, shard=SHARD_MODE)
+    if app.state.memory.loaded_from_snapshot:
+        print(f"⚡ Loaded entity index from snapshot ({app.state.memory.count} entities)")
+    if app.state.pruned_relations:
+        print(f"🧹 Removed {app.state.pruned_relations} relations to deleted entities")
+    if app.state.aof is not None:
+        aof = app.state.aof
+        print(f"💾 Replayed {aof.replayed} redis commands in {aof.replay_seconds:.2f}s "
+              f"({len(app.state.redis)} keys, appendfsync {aof.fsync})")
+    ReadyServer(uvicorn.Config(app, host=HOST, port=PORT, log_level="info")).run()
+
+
+if __name__ == "__main__":
+    main()
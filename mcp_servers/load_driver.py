@@ -0,0 +1,662 @@
+#!/usr/bin/env python3
+"""
+Multi-process load driver for the MCP server
+Runs N worker processes, each with its own event loop and HTTP session, released together
+by a start barrier; per-worker latency histograms are merged into one report
+"""
+
+import argparse
+import asyncio
+import json
+import math
+import multiprocessing
+import os
+import queue
+import re
+import sys
+import time
+import urllib.request
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+# Request = (method, path, json body or None)
+Request = Tuple[str, str, Optional[Dict[str, Any]]]
+
+BARRIER_TIMEOUT = 60
+
+METRIC_LINE = re.compile(r'^([a-zA-Z_:][\w:]*)(?:\{(.*)\})?\s+(\S+)$')
+LABEL_PAIR = re.compile(r'(\w+)="((?:[^"\\]|\\.)*)"')
+PHASES = ("queue", "handler", "storage", "serialization")
+# Fast refusals from the server's admission control, reported apart from errors
+REJECTED_STATUSES = ("429", "503")
+
+# (metric name, sorted label pairs) -> value
+MetricSamples = Dict[Tuple[str, Tuple[Tuple[str, str], ...]], float]
+
+
+class LatencyHistogram:
+    """Log-bucketed latency histogram that merges exactly across processes.
+
+    Bucket ``b`` covers (MIN * GROWTH**(b-1), MIN * GROWTH**b], so any
+    percentile is reported within 5% of the true value, and two histograms
+    merge by adding counts.
+    """
+
+    MIN_SECONDS = 1e-5
+    GROWTH = 1.05
+
+    def __init__(self):
+        self.counts: Dict[int, int] = {}
+        self.count = 0
+        self.total = 0.0
+        self.min = math.inf
+        self.max = 0.0
+
+    def _bucket(self, seconds: float) -> int:
+        if seconds <= self.MIN_SECONDS:
+            return 0
+        return int(math.ceil(math.log(seconds / self.MIN_SECONDS, self.GROWTH)))
+
+    def record(self, seconds: float):
+        bucket = self._bucket(seconds)
+        self.counts[bucket] = self.counts.get(bucket, 0) + 1
+        self.count += 1
+        self.total += seconds
+        self.min = min(self.min, seconds)
+        self.max = max(self.max, seconds)
+
+    def merge(self, other: "LatencyHistogram"):
+        for bucket, n in other.counts.items():
+            self.counts[bucket] = self.counts.get(bucket, 0) + n
+        self.count += other.count
+        self.total += other.total
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+
+    def percentile(self, q: float) -> float:
+        """Upper bound of the bucket holding the q-th percentile, in seconds"""
+        if not self.count:
+            return 0.0
+        target = max(1, math.ceil(self.count * q / 100))
+        seen = 0
+        for bucket in sorted(self.counts):
+            seen += self.counts[bucket]
+            if seen >= target:
+                return min(self.MIN_SECONDS * self.GROWTH ** bucket, self.max)
+        return self.max
+
+    def summary(self) -> Dict[str, float]:
+        """Latency summary in milliseconds"""
+        if not self.count:
+            return {"count": 0}
+        return {
+            "count": self.count,
+            "mean_ms": self.total / self.count * 1000,
+            "min_ms": self.min * 1000,
+            "p50_ms": self.percentile(50) * 1000,
+            "p90_ms": self.percentile(90) * 1000,
+            "p99_ms": self.percentile(99) * 1000,
+            "p999_ms": self.percentile(99.9) * 1000,
+            "max_ms": self.max * 1000,
+        }
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {"counts": self.counts, "count": self.count, "total": self.total,
+                "min": self.min, "max": self.max}
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "LatencyHistogram":
+        histogram = cls()
+        histogram.counts = {int(b): n for b, n in data["counts"].items()}
+        histogram.count = data["count"]
+        histogram.total = data["total"]
+        histogram.min = data["min"]
+        histogram.max = data["max"]
+        return histogram
+
+
+# Scenarios map (worker id, request number) to a request. They are looked up
+# by name in the worker process, so they must stay module-level functions.
+
+def scenario_health(worker_id: int, n: int) -> Request:
+    return "GET", "/health", None
+
+
+def scenario_search(worker_id: int, n: int) -> Request:
+    return "POST", "/mcp/memory/search_nodes", {"query": "test", "limit": 10}
+
+
+def scenario_redis_read(worker_id: int, n: int) -> Request:
+    return "POST", "/mcp/redis/hget", {"key": f"load:{worker_id}:{n % 64}", "field": "f"}
+
+
+def scenario_mixed(worker_id: int, n: int) -> Request:
+    choice = n % 10
+    if choice < 6:
+        return scenario_health(worker_id, n)
+    if choice < 8:
+        return scenario_redis_read(worker_id, n)
+    return scenario_search(worker_id, n)
+
+
+def scenario_keyed(worker_id: int, n: int) -> Request:
+    """Single-key reads and writes spread over many keys and entities, so a sharded
+    server can serve them in parallel; each request touches exactly one shard"""
+    key = f"keyed:{worker_id}:{(n * 7919) % 4096}"
+    choice = n % 10
+    if choice < 4:
+        return "POST", "/mcp/redis/hset", {"key": key, "field": "f", "value": str(n)}
+    if choice < 8:
+        return "POST", "/mcp/redis/hget", {"key": key, "field": "f"}
+    return "POST", "/mcp/memory/create_entities", [{
+        "name": f"keyed {worker_id} {n}", "entityType": "keyed",
+        "observations": [f"keyed observation {n}"]}]
+
+
+def scenario_hot_reads(worker_id: int, n: int) -> Request:
+    """Read-heavy phase: the same few searches over and over, with a write every 50
+    requests that invalidates cached results, as agents re-read their working set"""
+    if n % 50 == 49:
+        return "POST", "/mcp/memory/create_entities", [{
+            "name": f"hot {worker_id} {n}", "entityType": "hot",
+            "observations": [f"hot topic {n % 8}"]}]
+    return "POST", "/mcp/memory/search_nodes", {"query": f"hot topic {n % 8}", "limit": 10}
+
+
+SOAK_BLOCK = 1000
+
+
+def soak_entity_prefix(worker_id: int, block: int) -> str:
+    return f"soak{worker_id}b{block}:"
+
+
+def scenario_soak(worker_id: int, n: int) -> Request:
+    """Reads and writes whose data stays bounded, so any growth over hours is a leak.
+
+    Entities are created in blocks of SOAK_BLOCK requests and each block is
+    bulk-deleted one block later; redis writes reuse 256 keys with a TTL.
+    """
+    block, offset = divmod(n, SOAK_BLOCK)
+    if offset == SOAK_BLOCK - 1 and block:
+        return "POST", "/mcp/memory/delete_entities", {
+            "namePrefix": soak_entity_prefix(worker_id, block - 1)}
+    choice = n % 10
+    if choice == 0:
+        return "POST", "/mcp/memory/create_entities", [{
+            "name": f"{soak_entity_prefix(worker_id, block)}{n}", "entityType": "soak",
+            "observations": [f"soak observation {n}"]}]
+    if choice < 3:
+        return "POST", "/mcp/redis/hset", {"key": f"soak:{worker_id}:{n % 256}", "field": "f",
+                                           "value": str(n), "ttl": 60}
+    if choice < 5:
+        return scenario_redis_read(worker_id, n)
+    if choice < 7:
+        return scenario_search(worker_id, n)
+    return scenario_health(worker_id, n)
+
+
+SCENARIOS: Dict[str, Callable[[int, int], Request]] = {
+    "health": scenario_health,
+    "search": scenario_search,
+    "redis_read": scenario_redis_read,
+    "mixed": scenario_mixed,
+    "keyed": scenario_keyed,
+    "hot_reads": scenario_hot_reads,
+    "soak": scenario_soak,
+}
+
+
+async def _run_worker(worker_id: int, config: Dict[str, Any], barrier) -> Dict[str, Any]:
+    import aiohttp
+
+    scenario = SCENARIOS[config["scenario"]]
+    histogram = LatencyHistogram()
+    accepted = LatencyHistogram()
+    window = config.get("window")
+    windows: List[LatencyHistogram] = []
+    statuses: Dict[str, int] = {}
+    errors: Dict[str, int] = {}
+    issued = 0
+    limit = config["requests"]
+    concurrency = config["concurrency"]
+    timeout = aiohttp.ClientTimeout(total=config["timeout"])
+    connector = aiohttp.TCPConnector(limit=concurrency)
+
+    async with aiohttp.ClientSession(config["url"], connector=connector, timeout=timeout) as session:
+        async def warm_up():
+            async with session.get("/health") as response:
+                await response.read()
+
+        # Open connections before the barrier so connection setup is not measured
+        await asyncio.gather(*(warm_up() for _ in range(concurrency)), return_exceptions=True)
+        loop = asyncio.get_running_loop()
+        await loop.run_in_executor(None, barrier.wait, BARRIER_TIMEOUT)
+
+        started = time.time()
+        released = time.perf_counter()
+        deadline = released + config["duration"] if config["duration"] else None
+
+        async def client():
+            nonlocal issued
+            while True:
+                if limit is not None and issued >= limit:
+                    return
+                if deadline is not None and time.perf_counter() >= deadline:
+                    return
+                n = issued
+                issued += 1
+                method, path, body = scenario(worker_id, n)
+                start = time.perf_counter()
+                try:
+                    async with session.request(method, path, json=body) as response:
+                        await response.read()
+                        status = str(response.status)
+                        retry_after = response.headers.get("Retry-After", "")
+                except Exception as e:
+                    name = type(e).__name__
+                    errors[name] = errors.get(name, 0) + 1
+                    continue
+                end = time.perf_counter()
+                histogram.record(end - start)
+                if status.startswith("2"):
+                    accepted.record(end - start)
+                statuses[status] = statuses.get(status, 0) + 1
+                if window:
+                    index = int((end - released) / window)
+                    while len(windows) <= index:
+                        windows.append(LatencyHistogram())
+                    windows[index].record(end - start)
+                if status in REJECTED_STATUSES and config["retry_after"] and retry_after.isdigit():
+                    # Back off like a well-behaved client instead of hammering a saturated route
+                    pause = float(retry_after)
+                    if deadline is not None:
+                        pause = min(pause, max(deadline - time.perf_counter(), 0.0))
+                    await asyncio.sleep(pause)
+
+        await asyncio.gather(*(client() for _ in range(concurrency)))
+        finished = time.time()
+
+    return {
+        "worker_id": worker_id,
+        "pid": os.getpid(),
+        "started": started,
+        "finished": finished,
+        "statuses": statuses,
+        "errors": errors,
+        "histogram": histogram.to_dict(),
+        "accepted_histogram": accepted.to_dict(),
+        "windows": [w.to_dict() for w in windows],
+    }
+
+
+def _worker_main(worker_id: int, config: Dict[str, Any], barrier, results):
+    try:
+        result = asyncio.run(_run_worker(worker_id, config, barrier))
+    except Exception as e:
+        barrier.abort()
+        result = {"worker_id": worker_id, "failed": f"{type(e).__name__}: {e}"}
+    results.put(result)
+
+
+def _split(total: Optional[int], parts: int) -> List[Optional[int]]:
+    if total is None:
+        return [None] * parts
+    return [total // parts + (1 if i < total % parts else 0) for i in range(parts)]
+
+
+def run_load(url: str, scenario: str = "health", processes: int = 0, concurrency: int = 16,
+             requests: Optional[int] = None, duration: Optional[float] = None,
+             timeout: float = 10.0, scrape: bool = True,
+             window: Optional[float] = None, retry_after: bool = True) -> Dict[str, Any]:
+    """Drive load from ``processes`` worker processes and return a merged report.
+
+    Each worker keeps ``concurrency`` requests in flight on one event loop.
+    Load stops after ``requests`` in total (split across workers) or after
+    ``duration`` seconds, whichever comes first; one of them is required.
+    With ``scrape`` set, the server's /metrics is read before and after so
+    the report carries the server-side phase breakdown next to client
+    percentiles. With ``window`` set, the report also has ``windows``:
+    latency summaries for each consecutive ``window`` seconds of the run.
+    With ``retry_after`` set, a client that is refused with 429/503 waits for
+    the server's ``Retry-After`` before its next request.
+    """
+    if requests is None and not duration:
+        raise ValueError("run_load needs a request count or a duration")
+    if scenario not in SCENARIOS:
+        raise ValueError(f"Unknown scenario '{scenario}' (choose from {', '.join(SCENARIOS)})")
+    processes = processes or min(os.cpu_count() or 1, 8)
+
+    before = None
+    if scrape:
+        try:
+            before = scrape_metrics(url)
+        except OSError as e:
+            print(f"⚠️ Could not scrape {url}/metrics: {e}")
+
+    ctx = multiprocessing.get_context("spawn")
+    barrier = ctx.Barrier(processes)
+    results = ctx.Queue()
+    workers = []
+    for worker_id, share in enumerate(_split(requests, processes)):
+        config = {"url": url, "scenario": scenario, "concurrency": concurrency,
+                  "requests": share, "duration": duration, "timeout": timeout,
+                  "window": window, "retry_after": retry_after}
+        worker = ctx.Process(target=_worker_main, args=(worker_id, config, barrier, results),
+                             daemon=True)
+        worker.start()
+        workers.append(worker)
+
+    reports = []
+    wait = BARRIER_TIMEOUT + (duration or 0) + timeout * 10
+    for _ in workers:
+        try:
+            reports.append(results.get(timeout=wait))
+        except queue.Empty:
+            break
+    for worker in workers:
+        worker.join(timeout=5)
+        if worker.is_alive():
+            worker.terminate()
+
+    meta = {"url": url, "scenario": scenario, "processes": processes,
+            "concurrency_per_process": concurrency}
+    if window:
+        meta["window_s"] = window
+    report = merge_reports(reports, meta)
+    if before is not None:
+        try:
+            report["server"] = server_breakdown(before, scrape_metrics(url))
+        except OSError as e:
+            print(f"⚠️ Could not scrape {url}/metrics: {e}")
+    return report
+
+
+async def _run_fanout(url: str, subscribers: int, events: int, interval: float,
+                      timeout: float) -> Dict[str, Any]:
+    import aiohttp
+
+    key = f"fanout:{os.getpid()}:{int(time.time() * 1000)}:handoffs"
+    # Clocks: the server stamps each event with time.time(), compared with this host's clock
+    delivery = LatencyHistogram()
+    slowest: Dict[int, float] = {}
+    received = [0] * subscribers
+    ready = asyncio.Semaphore(0)
+    overflowed = 0
+    errors: Dict[str, int] = {}
+
+    async def subscriber(index: int, session):
+        nonlocal overflowed
+        try:
+            async with session.get("/mcp/redis/subscribe", params={"pattern": key}) as response:
+                response.raise_for_status()
+                subscribed = False
+                async for line in response.content:
+                    if not subscribed:
+                        subscribed = line.startswith(b"event: subscribed")
+                        if subscribed:
+                            ready.release()
+                    elif line.startswith(b"event: overflow"):
+                        overflowed += 1
+                        return
+                    elif line.startswith(b"data: "):
+                        event = json.loads(line[6:])
+                        if "event" not in event:
+                            continue  # the subscription confirmation
+                        latency = max(time.time() - event["time"], 0.0)
+                        delivery.record(latency)
+                        n = int(event["members"][0])
+                        slowest[n] = max(slowest.get(n, 0.0), latency)
+                        received[index] += 1
+                        if received[index] == events:
+                            return
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            name = type(e).__name__
+            errors[name] = errors.get(name, 0) + 1
+            ready.release()
+
+    connector = aiohttp.TCPConnector(limit=0)
+    client_timeout = aiohttp.ClientTimeout(total=None, sock_connect=timeout)
+    async with aiohttp.ClientSession(url, connector=connector, timeout=client_timeout) as session:
+        tasks = [asyncio.create_task(subscriber(i, session)) for i in range(subscribers)]
+        for _ in range(subscribers):
+            await asyncio.wait_for(ready.acquire(), timeout)
+
+        publish = LatencyHistogram()
+        started = time.perf_counter()
+        for n in range(events):
+            start = time.perf_counter()
+            async with session.post("/mcp/redis/sadd", json={"key": key, "members": [str(n)]},
+                                    timeout=aiohttp.ClientTimeout(total=timeout)) as response:
+                await response.read()
+            publish.record(time.perf_counter() - start)
+            await asyncio.sleep(interval)
+        _, pending = await asyncio.wait(tasks, timeout=timeout)
+        for task in pending:
+            task.cancel()
+        wall = time.perf_counter() - started
+        async with session.post("/mcp/redis/delete", json={"key": key}) as response:
+            await response.read()
+
+    per_event = LatencyHistogram()
+    for latency in slowest.values():
+        per_event.record(latency)
+    expected = subscribers * events
+    return {
+        "url": url,
+        "subscribers": subscribers,
+        "events": events,
+        "interval_s": interval,
+        "duration": wall,
+        "expected_deliveries": expected,
+        "deliveries": delivery.count,
+        "missing_deliveries": expected - delivery.count,
+        "overflowed_subscribers": overflowed,
+        "unfinished_subscribers": len(pending),
+        "errors": errors,
+        "publish_latency": publish.summary(),
+        "delivery_latency": delivery.summary(),
+        "fanout_latency": per_event.summary(),
+    }
+
+
+def run_fanout(url: str, subscribers: int = 200, events: int = 100, interval: float = 0.02,
+               timeout: float = 30.0) -> Dict[str, Any]:
+    """Measure change feed fan-out: ``subscribers`` SSE clients all watch one set
+    while ``events`` members are added to it, ``interval`` seconds apart.
+
+    ``delivery_latency`` covers every (event, subscriber) pair, from the
+    server stamping the event to a client parsing it; ``fanout_latency`` is
+    the slowest subscriber per event, i.e. how long until everyone has seen
+    a handoff. All subscribers share this process's event loop, so on a
+    busy host part of the latency is spent on the client side.
+    """
+    return asyncio.run(_run_fanout(url, subscribers, events, interval, timeout))
+
+
+def print_fanout_report(report: Dict[str, Any]):
+    print(f"📣 Fan-out results ({report['subscribers']} subscribers x {report['events']} events):")
+    print(f"   Deliveries: {report['deliveries']}/{report['expected_deliveries']} "
+          f"({report['overflowed_subscribers']} overflowed, "
+          f"{report['unfinished_subscribers']} unfinished)")
+    for label, name in (("Delivery", "delivery_latency"), ("Fan-out", "fanout_latency"),
+                        ("Publish", "publish_latency")):
+        summary = report[name]
+        if summary.get("count"):
+            print(f"   {label} p50/p90/p99/max: {summary['p50_ms']:.2f} / {summary['p90_ms']:.2f} / "
+                  f"{summary['p99_ms']:.2f} / {summary['max_ms']:.2f} ms")
+    if report["errors"]:
+        print(f"   Errors: {report['errors']}")
+
+
+def scrape_metrics(url: str, timeout: float = 5.0) -> MetricSamples:
+    """Fetch and parse the server's Prometheus text-format /metrics"""
+    with urllib.request.urlopen(f"{url}/metrics", timeout=timeout) as response:
+        text = response.read().decode("utf-8")
+    samples: MetricSamples = {}
+    for line in text.splitlines():
+        match = METRIC_LINE.match(line)
+        if not match:
+            continue
+        name, labels, value = match.groups()
+        key = tuple(sorted(LABEL_PAIR.findall(labels or "")))
+        samples[(name, key)] = float(value)
+    return samples
+
+
+def server_breakdown(before: MetricSamples, after: MetricSamples) -> Dict[str, Dict[str, Any]]:
+    """Per-route server-side timings for the requests served between two scrapes"""
+    def delta(name: str, **labels: str) -> float:
+        key = (name, tuple(sorted(labels.items())))
+        return after.get(key, 0.0) - before.get(key, 0.0)
+
+    routes = {dict(labels)["route"] for name, labels in after
+              if name == "mcp_request_duration_seconds_count"}
+    breakdown = {}
+    for route in sorted(routes - {"/metrics"}):
+        count = delta("mcp_request_duration_seconds_count", route=route)
+        if count <= 0:
+            continue
+        buckets = sorted((float(dict(labels)["le"]), delta(name, **dict(labels)))
+                         for name, labels in after
+                         if name == "mcp_request_duration_seconds_bucket"
+                         and dict(labels)["route"] == route)
+        p99 = next((le for le, n in buckets if n >= count * 0.99), math.inf)
+        phases = {}
+        for phase in PHASES:
+            phase_count = delta("mcp_request_phase_seconds_count", route=route, phase=phase)
+            if phase_count > 0:
+                phases[phase] = delta("mcp_request_phase_seconds_sum", route=route,
+                                      phase=phase) / phase_count * 1000
+        breakdown[route] = {
+            "requests": int(count),
+            "mean_ms": delta("mcp_request_duration_seconds_sum", route=route) / count * 1000,
+            "p99_upper_bound_ms": p99 * 1000,
+            "phase_mean_ms": phases,
+        }
+    return breakdown
+
+
+def merge_reports(reports: List[Dict[str, Any]], meta: Dict[str, Any]) -> Dict[str, Any]:
+    histogram = LatencyHistogram()
+    accepted = LatencyHistogram()
+    statuses: Dict[str, int] = {}
+    errors: Dict[str, int] = {}
+    windows: List[LatencyHistogram] = []
+    failed_workers = []
+    per_worker = []
+    for report in reports:
+        if "failed" in report:
+            failed_workers.append(report)
+            continue
+        worker_histogram = LatencyHistogram.from_dict(report["histogram"])
+        histogram.merge(worker_histogram)
+        if "accepted_histogram" in report:
+            accepted.merge(LatencyHistogram.from_dict(report["accepted_histogram"]))
+        for status, n in report["statuses"].items():
+            statuses[status] = statuses.get(status, 0) + n
+        for name, n in report["errors"].items():
+            errors[name] = errors.get(name, 0) + n
+        for index, data in enumerate(report.get("windows", [])):
+            if index == len(windows):
+                windows.append(LatencyHistogram())
+            windows[index].merge(LatencyHistogram.from_dict(data))
+        per_worker.append({"worker_id": report["worker_id"], "pid": report["pid"],
+                           "requests": worker_histogram.count,
+                           "p99_ms": worker_histogram.percentile(99) * 1000})
+
+    ok = [r for r in reports if "failed" not in r]
+    wall = max(r["finished"] for r in ok) - min(r["started"] for r in ok) if ok else 0.0
+    total = histogram.count + sum(errors.values())
+    successful = sum(n for status, n in statuses.items() if status.startswith("2"))
+    rejected = sum(statuses.get(status, 0) for status in REJECTED_STATUSES)
+    merged = {
+        **meta,
+        "workers_reported": len(ok),
+        "failed_workers": failed_workers,
+        "total_requests": total,
+        "successful_requests": successful,
+        "failed_requests": total - successful,
+        "rejected_requests": rejected,
+        "success_rate": successful / total * 100 if total else 0.0,
+        "duration": wall,
+        "requests_per_second": total / wall if wall > 0 else 0.0,
+        "goodput_per_second": successful / wall if wall > 0 else 0.0,
+        "statuses": statuses,
+        "errors": errors,
+        "latency": histogram.summary(),
+        "accepted_latency": accepted.summary(),
+        "per_worker": per_worker,
+    }
+    if windows:
+        merged["windows"] = [w.summary() for w in windows]
+    return merged
+
+
+def print_report(report: Dict[str, Any]):
+    latency = report["latency"]
+    print(f"📊 Load results ({report['processes']} processes x "
+          f"{report['concurrency_per_process']} in flight, scenario '{report['scenario']}'):")
+    print(f"   Total requests: {report['total_requests']}")
+    print(f"   Success rate: {report['success_rate']:.1f}%")
+    print(f"   Requests per second: {report['requests_per_second']:.1f} "
+          f"(goodput {report['goodput_per_second']:.1f}/s)")
+    if report["rejected_requests"]:
+        print(f"   Rejected by admission control: {report['rejected_requests']} (429/503)")
+    for label, summary in (("Latency", latency), ("Accepted", report["accepted_latency"])):
+        if summary.get("count"):
+            print(f"   {label} p50/p90/p99/max: {summary['p50_ms']:.2f} / {summary['p90_ms']:.2f} / "
+                  f"{summary['p99_ms']:.2f} / {summary['max_ms']:.2f} ms")
+    if report["errors"]:
+        print(f"   Errors: {report['errors']}")
+    if report["failed_workers"]:
+        print(f"   ⚠️ {len(report['failed_workers'])} workers failed: "
+              f"{report['failed_workers'][0]['failed']}")
+    for route, server in report.get("server", {}).items():
+        phases = " / ".join(f"{name} {server['phase_mean_ms'].get(name, 0):.2f}" for name in PHASES)
+        print(f"   Server {route}: {server['requests']} requests, mean {server['mean_ms']:.2f} ms "
+              f"(p99 <= {server['p99_upper_bound_ms']:.1f} ms; {phases} ms)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Multi-process load driver for the MCP server")
+    parser.add_argument("--url", default="http://localhost:8000",
+                        help="Server URL (default: http://localhost:8000)")
+    parser.add_argument("--scenario", default="health", choices=sorted(SCENARIOS) + ["fanout"],
+                        help="Request mix, or 'fanout' for change feed notification latency")
+    parser.add_argument("--processes", type=int, default=0,
+                        help="Worker processes (default: one per core, up to 8)")
+    parser.add_argument("--concurrency", type=int, default=16,
+                        help="Requests in flight per worker process (default: 16)")
+    parser.add_argument("--requests", type=int, help="Total requests across all workers")
+    parser.add_argument("--duration", type=float, default=10.0,
+                        help="Seconds to run when --requests is not given (default: 10)")
+    parser.add_argument("--subscribers", type=int, default=200,
+                        help="Change feed subscribers for --scenario fanout (default: 200)")
+    parser.add_argument("--events", type=int, default=100,
+                        help="Events published for --scenario fanout (default: 100)")
+    parser.add_argument("--output", default="load_results.json",
+                        help="Output file for results (default: load_results.json)")
+    args = parser.parse_args()
+
+    if args.scenario == "fanout":
+        report = run_fanout(args.url, args.subscribers, args.events)
+        print_fanout_report(report)
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"📁 Results saved to {args.output}")
+        return 0 if not report["missing_deliveries"] else 1
+
+    duration = None if args.requests else args.duration
+    report = run_load(args.url, args.scenario, args.processes, args.concurrency,
+                      requests=args.requests, duration=duration)
+    print_report(report)
+
+    with open(args.output, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"📁 Results saved to {args.output}")
+    return 0 if report["workers_reported"] and not report["failed_workers"] else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
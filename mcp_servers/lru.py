@@ -0,0 +1,71 @@
+#!/usr/bin/env python3
+"""
+Bounded LRU cache with hit counters
+Keeps recently read values in memory and reports its size and hit ratio
+"""
+
+from collections import OrderedDict
+from typing import Any, Dict, Generic, Hashable, Optional, TypeVar
+
+V = TypeVar("V")
+
+
+def hit_ratio(hits: int, misses: int) -> float:
+    lookups = hits + misses
+    return hits / lookups if lookups else 0.0
+
+
+class LRUCache(Generic[V]):
+    """Least-recently-used cache of at most ``capacity`` entries.
+
+    Not thread-safe: callers serialize access (``MemoryStore`` holds its
+    store lock). A capacity of 0 disables caching but still counts misses.
+    Cached values are shared with every caller and must not be mutated.
+    """
+
+    def __init__(self, capacity: int):
+        self.capacity = max(capacity, 0)
+        self._entries: "OrderedDict[Hashable, V]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __contains__(self, key: Hashable) -> bool:
+        return key in self._entries
+
+    def get(self, key: Hashable) -> Optional[V]:
+        value = self._entries.get(key)
+        if value is None:
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return value
+
+    def put(self, key: Hashable, value: V):
+        if not self.capacity:
+            return
+        self._entries[key] = value
+        self._entries.move_to_end(key)
+        if len(self._entries) > self.capacity:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def pop(self, key: Hashable):
+        self._entries.pop(key, None)
+
+    def clear(self):
+        self._entries.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "entries": len(self._entries),
+            "capacity": self.capacity,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_ratio": hit_ratio(self.hits, self.misses),
+        }
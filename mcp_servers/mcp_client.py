@@ -0,0 +1,106 @@
+#!/usr/bin/env python3
+"""
+Shared MCP test client
+requests session that talks JSON or MessagePack to the integrated server, for tests and benchmarks
+"""
+
+import os
+import time
+import uuid
+from typing import Any, Dict, Optional
+
+import requests
+
+from codec import DECODERS, ENCODERS, JSON, MSGPACK, media_type_of
+
+CODECS = {"json": JSON, "msgpack": MSGPACK}
+# Statuses the server's admission control answers with Retry-After when saturated
+RETRYABLE = (429, 503)
+
+
+def worker_namespace() -> str:
+    """Namespace unique to this test process: the xdist worker ID plus a random suffix.
+
+    It is letters and digits only, so it is one search token and entities
+    named ``f"{namespace}:..."`` are found through the index on cleanup.
+    """
+    worker = os.environ.get("PYTEST_XDIST_WORKER", "main")
+    return f"t{worker}{uuid.uuid4().hex[:8]}"
+
+
+class MCPClient:
+    """POSTs request bodies and decodes responses with one codec.
+
+    ``codec`` is ``"json"`` or ``"msgpack"``; both the request body and the
+    ``Accept`` header use it. Responses are decoded by their own
+    ``Content-Type``, so error bodies (always JSON) decode too.
+
+    A 429 or 503 carrying ``Retry-After`` is retried after that delay (capped
+    at ``max_retry_delay``) up to ``retries`` times; the last response is
+    returned either way.
+    """
+
+    def __init__(self, base_url: str = "http://localhost:8000", codec: str = "json",
+                 timeout: float = 10, session: Optional[requests.Session] = None,
+                 retries: int = 3, max_retry_delay: float = 5.0):
+        if CODECS.get(codec) not in ENCODERS:
+            raise ValueError(f"Codec '{codec}' is not available")
+        self.base_url = base_url.rstrip("/")
+        self.codec = codec
+        self.media_type = CODECS[codec]
+        self.timeout = timeout
+        self.retries = retries
+        self.max_retry_delay = max_retry_delay
+        self.session = session or requests.Session()
+        self.session.headers["Accept"] = self.media_type
+
+    def request(self, method: str, path: str, payload: Any = None) -> requests.Response:
+        """Send a request; the decoded body is available as ``response.data``"""
+        headers = {}
+        data = None
+        if payload is not None:
+            data = ENCODERS[self.media_type](payload)
+            headers["Content-Type"] = self.media_type
+        for attempt in range(self.retries + 1):
+            response = self.session.request(method, f"{self.base_url}{path}", data=data,
+                                            headers=headers, timeout=self.timeout)
+            delay = self.retry_delay(response)
+            if delay is None or attempt == self.retries:
+                break
+            time.sleep(delay)
+        response.data = self.decode(response)
+        return response
+
+    def retry_delay(self, response: requests.Response) -> Optional[float]:
+        """Seconds to wait before retrying, or None if the response is final"""
+        if response.status_code not in RETRYABLE:
+            return None
+        retry_after = response.headers.get("retry-after", "")
+        if not retry_after.isdigit():
+            return None
+        return min(float(retry_after), self.max_retry_delay)
+
+    def post(self, path: str, payload: Any = None) -> requests.Response:
+        return self.request("POST", path, payload)
+
+    def get(self, path: str) -> requests.Response:
+        return self.request("GET", path)
+
+    @staticmethod
+    def decode(response: requests.Response) -> Any:
+        decoder = DECODERS.get(media_type_of(response.headers.get("content-type", "")))
+        if decoder is None or not response.content:
+            return None
+        return decoder(response.content)
+
+    def delete_namespace(self, namespace: str) -> Dict[str, int]:
+        """Delete every entity named and every redis key starting with ``namespace:``"""
+        prefix = f"{namespace}:"
+        entities = self.post("/mcp/memory/delete_entities", {"namePrefix": prefix})
+        keys = self.post("/mcp/redis/delete_prefix", {"prefix": prefix})
+        entities.raise_for_status()
+        keys.raise_for_status()
+        return {"entities": entities.data["deleted"], "redis_keys": keys.data["deleted"]}
+
+    def close(self):
+        self.session.close()
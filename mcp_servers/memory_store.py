@@ -0,0 +1,599 @@
+#!/usr/bin/env python3
+"""
+Memory MCP entity storage
+Persists entities in an append-only segment log addressed by an in-memory offset index
+"""
+
+import json
+import threading
+import time
+import uuid
+from concurrent.futures import Future
+from datetime import datetime
+from itertools import chain, dropwhile
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from entity_log import DEFAULT_SEGMENT_BYTES, Location, SegmentLog
+from group_commit import DEFAULT_MAX_BATCH, GroupCommitter
+from lru import LRUCache
+from request_timing import storage_io
+from search_index import (PHRASE, SUBSTRING, TOKEN_PATTERN, InvertedIndex, contains_phrase,
+                          contains_substring, tail, tokenize, trigrams)
+from snapshot import Snapshot, SnapshotMismatch, write_snapshot
+
+LOG_DIR = "entity_log"
+LEGACY_JOURNAL_FILE = "entity_journal.jsonl"
+SNAPSHOT_FILE = "entity_index.snap"
+SNAPSHOT_VERSION = 2
+
+# Compact once sealed segments hold this much garbage and it is at least this share of them
+COMPACT_MIN_BYTES = 16 * 1024 * 1024
+COMPACT_MIN_RATIO = 0.5
+
+# Parsed entities and search results kept in memory for repeated reads
+DEFAULT_ENTITY_CACHE = 10000
+DEFAULT_SEARCH_CACHE = 256
+# Larger result lists are not cached, so a few big searches cannot pin much memory
+SEARCH_CACHE_MAX_RESULTS = 256
+
+
+def new_entity_id() -> str:
+    return uuid.uuid4().hex[:12]
+
+
+class MemoryStore:
+    """Entity store backing the /mcp/memory endpoints.
+
+    Entities live in ``entity_log/`` as append-only segment files; memory
+    only holds the offset of each entity's latest record plus the search
+    index. Writes go through a ``GroupCommitter``: the ``submit_*`` methods
+    return futures, and concurrent calls share one append and one fsync.
+    Deleted and overwritten records are reclaimed by ``maybe_compact``.
+
+    ``write_snapshot`` persists the offset and search indexes to
+    ``entity_index.snap``. On open, a snapshot that still matches the log is
+    mmap'd as a read-only base layer and only records appended after it are
+    replayed; otherwise the whole log is replayed. Entities created since the
+    snapshot live in the in-memory overlay (``_locations`` and friends).
+
+    Recently read entities are kept parsed in an LRU cache, and recent
+    ``search_matches`` results in another; an entity leaves the cache when
+    it is replaced or deleted, and any write empties the search cache.
+    Scans (prefix lookups, non-matching search candidates) read around the
+    entity cache so they do not evict the hot set.
+
+    Older layouts (one JSON file per entity under ``entities/`` and the
+    ``entity_journal.jsonl`` journal) are migrated into the log on open.
+    """
+
+    def __init__(self, storage_dir: Path, fsync: bool = True,
+                 max_segment_bytes: int = DEFAULT_SEGMENT_BYTES,
+                 max_commit_batch: int = DEFAULT_MAX_BATCH,
+                 entity_cache_size: int = DEFAULT_ENTITY_CACHE,
+                 search_cache_size: int = DEFAULT_SEARCH_CACHE):
+        self.storage_dir = Path(storage_dir)
+        self.storage_dir.mkdir(parents=True, exist_ok=True)
+
+        self._log = SegmentLog(self.storage_dir / LOG_DIR, max_segment_bytes, fsync)
+        self._locations: Dict[str, Location] = {}
+        self._seq_of: Dict[str, int] = {}
+        self._id_of_seq: Dict[int, str] = {}
+        self._next_seq = 0
+        self._base: Optional[Snapshot] = None
+        self._base_moved: Dict[str, Location] = {}
+        self.index = InvertedIndex()
+        self._entity_cache: LRUCache[Dict[str, Any]] = LRUCache(entity_cache_size)
+        self._search_cache: LRUCache[List[Tuple[int, Dict[str, Any]]]] = \
+            LRUCache(search_cache_size)
+        self._lock = threading.Lock()
+        self._compact_lock = threading.Lock()
+        self._snapshot_lock = threading.Lock()
+        self._mutations = 0
+        self.snapshot_path = self.storage_dir / SNAPSHOT_FILE
+        self.loaded_from_snapshot = False
+
+        self._load()
+        self._writer = GroupCommitter(self._log, self._lock, max_commit_batch,
+                                      name="entity-log-writer")
+        migrate_legacy_layout(self)
+
+    def _load(self):
+        """Rebuild the offset and search indexes from the snapshot and the log"""
+        start = self._open_snapshot()
+        for record, location in self._log.replay(start):
+            entity_id = record["id"]
+            if self._lookup(entity_id) is not None:
+                self._remove(entity_id)
+            if record["op"] == "put":
+                self._put(entity_id, record["seq"], record["entity"], location)
+            self._mutations += 1
+
+    def _open_snapshot(self) -> Optional[Tuple[int, int]]:
+        """Attach a valid snapshot as the base layer, returning its log position"""
+        if not self.snapshot_path.exists():
+            return None
+        try:
+            snapshot = Snapshot(self.snapshot_path)
+        except (OSError, ValueError, SnapshotMismatch) as e:
+            print(f"⚠️ Ignoring unreadable snapshot {self.snapshot_path.name}: {e}")
+            return None
+
+        header = snapshot.header
+        position = tuple(header.get("position", ()))
+        if (header.get("version") != SNAPSHOT_VERSION or len(position) != 2
+                or not self._log.matches(header["segments"], position)):
+            print(f"⚠️ Snapshot {self.snapshot_path.name} does not match {LOG_DIR}/, "
+                  f"replaying the full log")
+            snapshot.close()
+            return None
+
+        self._base = snapshot
+        self.index.base = snapshot
+        self._next_seq = header["next_seq"]
+        self._log.restore_live_bytes(header["live_bytes"])
+        self.loaded_from_snapshot = True
+        return position
+
+    @staticmethod
+    def _fields(entity: Dict[str, Any]) -> List[str]:
+        return [entity.get("name", "")] + list(entity.get("observations", []))
+
+    def _lookup(self, entity_id: str) -> Optional[Tuple[int, Location]]:
+        """Sequence number and current location of an entity in either layer"""
+        location = self._locations.get(entity_id)
+        if location is not None:
+            return self._seq_of[entity_id], location
+        if self._base is None:
+            return None
+        found = self._base.lookup(entity_id)
+        if found is None or found[0] in self.index.base_deleted:
+            return None
+        return found[0], self._base_moved.get(entity_id, found[1])
+
+    def _entity_id(self, seq: int) -> str:
+        entity_id = self._id_of_seq.get(seq)
+        return entity_id if entity_id is not None else self._base.entity_id(seq)
+
+    def _all_seqs(self, after: int = -1) -> Iterator[int]:
+        """Live sequence numbers greater than ``after``, ascending"""
+        # The overlay is filled in log order, which is sequence order
+        overlay = dropwhile(lambda seq: seq <= after, self._id_of_seq)
+        if self._base is None:
+            return overlay
+        deleted = self.index.base_deleted
+        return chain((seq for seq in tail(self._base.seqs, after) if seq not in deleted), overlay)
+
+    def _read(self, entity_id: str, fill: bool = True) -> Dict[str, Any]:
+        """An entity's fields, from the cache or the log; ``fill=False`` for scans"""
+        entity = self._entity_cache.get(entity_id)
+        if entity is None:
+            location = self._lookup(entity_id)[1]
+            with storage_io():
+                entity = self._log.read(location)["entity"]
+            if fill:
+                self._entity_cache.put(entity_id, entity)
+        return entity
+
+    def _put(self, entity_id: str, seq: int, entity: Dict[str, Any], location: Location):
+        self._locations[entity_id] = location
+        self._seq_of[entity_id] = seq
+        self._id_of_seq[seq] = entity_id
+        self._next_seq = max(self._next_seq, seq + 1)
+        self._log.mark_live(location)
+        self.index.add(seq, self._fields(entity), entity.get("entityType", ""))
+        self._search_cache.clear()
+
+    def _remove(self, entity_id: str):
+        entity = self._read(entity_id, fill=False)
+        self._entity_cache.pop(entity_id)
+        self._search_cache.clear()
+        fields, entity_type = self._fields(entity), entity.get("entityType", "")
+        if entity_id in self._locations:
+            location = self._locations.pop(entity_id)
+            seq = self._seq_of.pop(entity_id)
+            del self._id_of_seq[seq]
+            self.index.remove(seq, fields, entity_type)
+        else:
+            seq, location = self._lookup(entity_id)
+            self._base_moved.pop(entity_id, None)
+            self.index.remove_base(seq, fields, entity_type)
+        self._log.mark_dead(location)
+
+    @staticmethod
+    def _wait(future: Future) -> Any:
+        with storage_io():
+            return future.result()
+
+    def submit_ingest(self, items: List[Tuple[str, Dict[str, Any]]]) -> Future:
+        """Queue (entity_id, entity) pairs as one batch, replacing existing IDs.
+
+        The future resolves to the entities with their IDs once they are durable.
+        """
+        def stage():
+            records = []
+            for entity_id, entity in items:
+                records.append({"op": "put", "id": entity_id, "seq": self._next_seq,
+                                "entity": entity})
+                self._next_seq += 1
+
+            def finish(locations: List[Location]):
+                for record, location in zip(records, locations):
+                    if self._lookup(record["id"]) is not None:
+                        self._remove(record["id"])
+                    self._put(record["id"], record["seq"], record["entity"], location)
+                self._mutations += len(records)
+                return [{"entity_id": entity_id, **entity} for entity_id, entity in items]
+            return records, finish
+        return self._writer.submit(stage)
+
+    def ingest(self, items: List[Tuple[str, Dict[str, Any]]]):
+        self._wait(self.submit_ingest(items))
+
+    def submit_create(self, entities: List[Dict[str, Any]],
+                      entity_ids: Optional[List[str]] = None,
+                      created_at: Optional[str] = None) -> Future:
+        """Queue a batch of entities; the future resolves to them with their new IDs.
+
+        ``entity_ids`` and ``created_at`` are supplied by a sharding router,
+        which picks IDs so it knows which shard owns each entity and stamps
+        one creation time on a batch split across shards.
+        """
+        now = created_at or datetime.now().isoformat()
+        created = []
+        for index, entity in enumerate(entities):
+            record = {
+                "name": entity["name"],
+                "entityType": entity["entityType"],
+                "observations": list(entity.get("observations") or []),
+                "metadata": dict(entity.get("metadata") or {}),
+                "created_at": now,
+                "updated_at": now,
+            }
+            entity_id = entity_ids[index] if entity_ids is not None else new_entity_id()
+            created.append((entity_id, record))
+        return self.submit_ingest(created)
+
+    def create_entities(self, entities: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Persist a batch of entities and return them with their new IDs"""
+        return self._wait(self.submit_create(entities))
+
+    def submit_delete_many(self, entity_ids: Iterable[str]) -> Future:
+        """Queue deletes as one batch; the future resolves to the IDs that existed"""
+        entity_ids = list(dict.fromkeys(entity_ids))
+
+        def stage():
+            present = [entity_id for entity_id in entity_ids
+                       if self._lookup(entity_id) is not None]
+
+            def finish(locations: List[Location]) -> List[str]:
+                deleted = []
+                for entity_id in present:
+                    # An earlier delete in the same batch may have got there first
+                    if self._lookup(entity_id) is not None:
+                        self._remove(entity_id)
+                        deleted.append(entity_id)
+                self._mutations += len(deleted)
+                return deleted
+            return [{"op": "del", "id": entity_id} for entity_id in present], finish
+        return self._writer.submit(stage)
+
+    def delete_entity(self, entity_id: str) -> bool:
+        """Delete an entity, returning False if it does not exist"""
+        return bool(self._wait(self.submit_delete_many([entity_id])))
+
+    def delete_entities(self, entity_ids: Iterable[str]) -> List[str]:
+        """Delete entities with one append and fsync, returning the IDs that existed"""
+        return self._wait(self.submit_delete_many(entity_ids))
+
+    def find_by_name_prefix(self, prefix: str) -> List[str]:
+        """IDs of entities whose name starts with ``prefix``.
+
+        The prefix's complete tokens narrow the candidates through the search
+        index, so a prefix like ``"run42:"`` only reads that run's entities.
+        A prefix with no complete token is narrowed by its trigrams instead,
+        and one shorter than three characters reads every entity.
+        """
+        tokens = tokenize(prefix)
+        # The last token may be cut short, so it cannot be looked up exactly
+        if tokens and TOKEN_PATTERN.match(prefix[-1]):
+            tokens.pop()
+        grams = trigrams(prefix)
+        with self._lock:
+            if tokens:
+                seqs = self.index.candidates(tokens)
+            elif grams:
+                seqs = self.index.substring_candidates(grams)
+            else:
+                seqs = self._all_seqs()
+            found = []
+            for seq in seqs:
+                entity_id = self._entity_id(seq)
+                if self._read(entity_id, fill=False)["name"].startswith(prefix):
+                    found.append(entity_id)
+            return found
+
+    def missing(self, entity_ids: Iterable[str]) -> List[str]:
+        """The given entity IDs that do not exist"""
+        with self._lock:
+            return [entity_id for entity_id in entity_ids if self._lookup(entity_id) is None]
+
+    def get_entity(self, entity_id: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            if self._lookup(entity_id) is None:
+                return None
+            return {"entity_id": entity_id, **self._read(entity_id)}
+
+    def get_entities(self, entity_ids: Iterable[str]) -> List[Dict[str, Any]]:
+        """The given entities that exist, in the order asked for"""
+        with self._lock:
+            return [{"entity_id": entity_id, **self._read(entity_id)}
+                    for entity_id in dict.fromkeys(entity_ids)
+                    if self._lookup(entity_id) is not None]
+
+    def search(self, query: str, entity_type: Optional[str] = None,
+               limit: int = 10, match: str = PHRASE) -> List[Dict[str, Any]]:
+        """Phrase or substring search over entity names and observations.
+
+        With ``match="phrase"`` a node matches when the query's tokens appear
+        contiguously, in order, within its name or one of its observations.
+        With ``match="substring"`` the query must appear verbatim (ignoring
+        case) in one of them, even cutting across tokens or punctuation.
+        Candidates come from the inverted or trigram index in creation order
+        and are verified one at a time, so the scan stops as soon as ``limit``
+        matches are found.
+        """
+        return self.search_page(query, entity_type, limit, match=match)[0]
+
+    def search_page(self, query: str, entity_type: Optional[str] = None, limit: int = 10,
+                    after: int = -1, match: str = PHRASE
+                    ) -> Tuple[List[Dict[str, Any]], Optional[int]]:
+        """One page of ``search`` results created after sequence number ``after``.
+
+        Returns the matches and the sequence number of the last one; passing
+        that back as ``after`` continues the scan where this page stopped.
+        """
+        matches = self.search_matches(query, entity_type, limit, after, match)
+        return [node for _, node in matches], (matches[-1][0] if matches else None)
+
+    def _candidates(self, query: str, entity_type: Optional[str], after: int,
+                    match: str) -> Tuple[Iterable[int], Optional[Callable[[List[str]], bool]]]:
+        """Candidate sequence numbers and the check each must pass (None: all match)"""
+        if match == SUBSTRING:
+            needle = query.lower()
+            grams = trigrams(needle)
+            if grams:
+                seqs = self.index.substring_candidates(grams, entity_type, after)
+                return seqs, lambda fields: contains_substring(fields, needle)
+            # Too short for a trigram: every entity (of the type) is a candidate
+            check = (lambda fields: contains_substring(fields, needle)) if needle else None
+        else:
+            phrase = tokenize(query)
+            if phrase:
+                seqs = self.index.candidates(phrase, entity_type, after)
+                if len(phrase) > 1:
+                    return seqs, lambda fields: contains_phrase(fields, phrase)
+                return seqs, None
+            if query.strip():
+                # Punctuation-only queries cannot match any token
+                return (), None
+            check = None
+        if entity_type is not None:
+            return self.index.type_members(entity_type, after), check
+        return self._all_seqs(after), check
+
+    def search_matches(self, query: str, entity_type: Optional[str] = None, limit: int = 10,
+                       after: int = -1, match: str = PHRASE
+                       ) -> List[Tuple[int, Dict[str, Any]]]:
+        """``search_page`` as (sequence number, node) pairs, so a caller merging
+        several stores can resume after any node rather than only the last"""
+        if match not in (PHRASE, SUBSTRING):
+            raise ValueError(f"Unknown match mode '{match}'")
+        results: List[Tuple[int, Dict[str, Any]]] = []
+        if limit <= 0:
+            return results
+
+        key = (query, entity_type, limit, after, match)
+        with self._lock:
+            cached = self._search_cache.get(key)
+            if cached is not None:
+                return list(cached)
+            seqs, check = self._candidates(query, entity_type, after, match)
+            for seq in seqs:
+                entity_id = self._entity_id(seq)
+                entity = self._read(entity_id, fill=False)
+                if check is not None and not check(self._fields(entity)):
+                    continue
+                self._entity_cache.put(entity_id, entity)
+                results.append((seq, {"entity_id": entity_id, **entity}))
+                if len(results) >= limit:
+                    break
+            if len(results) <= SEARCH_CACHE_MAX_RESULTS:
+                self._search_cache.put(key, results)
+        return list(results)
+
+    def search_pages(self, query: str, entity_type: Optional[str] = None,
+                     limit: Optional[int] = None, after: int = -1, page_size: int = 256,
+                     match: str = PHRASE) -> Iterator[Tuple[List[Dict[str, Any]], int]]:
+        """Yield ``search_page`` results until ``limit`` matches or the end.
+
+        The store lock is held only while a page is read, so a slow consumer
+        never blocks writers, and at most ``page_size`` nodes are in memory.
+        """
+        remaining = limit
+        while remaining is None or remaining > 0:
+            size = page_size if remaining is None else min(page_size, remaining)
+            nodes, last_seq = self.search_page(query, entity_type, size, after, match)
+            if not nodes:
+                return
+            yield nodes, last_seq
+            if len(nodes) < size:
+                return
+            after = last_seq
+            if remaining is not None:
+                remaining -= len(nodes)
+
+    # Compaction
+
+    def maybe_compact(self, min_bytes: int = COMPACT_MIN_BYTES,
+                      min_ratio: float = COMPACT_MIN_RATIO) -> bool:
+        """Compact sealed segments once enough of them is garbage"""
+        dead, total = self._log.garbage()
+        if dead < min_bytes or dead < total * min_ratio:
+            return False
+        return self.compact()
+
+    def compact(self) -> bool:
+        """Rewrite live records of sealed segments, reclaiming deleted and replaced ones"""
+        with self._compact_lock:
+            with self._lock:
+                sealed = self._log.sealed_segments()
+                live: Dict[int, List[Tuple[str, Location]]] = {s: [] for s in sealed}
+                for entity_id, location in self._live_locations():
+                    if location.segment in live:
+                        live[location.segment].append((entity_id, location))
+
+            plan = self._log.compact_copy(sealed, live)
+            if plan is None:
+                return False
+
+            with self._lock:
+                moves = self._log.compact_install(plan)
+                for entity_id, (old, new) in moves.items():
+                    if self._locations.get(entity_id) == old:
+                        self._locations[entity_id] = new
+                        self._log.mark_live(new)
+                    elif entity_id not in self._locations:
+                        current = self._lookup(entity_id)
+                        if current is not None and current[1] == old:
+                            self._base_moved[entity_id] = new
+                            self._log.mark_live(new)
+                self._mutations += 1
+            return True
+
+    def _live_locations(self) -> Iterator[Tuple[str, Location]]:
+        """(entity_id, location) for every live entity; call under the lock"""
+        if self._base is not None:
+            deleted = self.index.base_deleted
+            for entity_id, seq, location in self._base.iter_entities():
+                if seq not in deleted:
+                    yield entity_id, self._base_moved.get(entity_id, location)
+        yield from self._locations.items()
+
+    # Snapshots
+
+    def write_snapshot(self, force: bool = False) -> bool:
+        """Persist the offset and search indexes so the next open skips the replay.
+
+        The overlay is copied under the store lock; merging it with the base
+        layer and writing the file happen outside it. Returns False when
+        nothing changed since the last snapshot.
+        """
+        with self._snapshot_lock:
+            with self._lock:
+                if not force and self._mutations == 0 and self.snapshot_path.exists():
+                    return False
+                position = self._log.position()
+                header = {
+                    "version": SNAPSHOT_VERSION,
+                    "position": list(position),
+                    "segments": self._log.fingerprint(),
+                    "live_bytes": self._log.live_bytes(),
+                    "next_seq": self._next_seq,
+                }
+                overlay = [(entity_id, self._seq_of[entity_id], location)
+                           for entity_id, location in self._locations.items()]
+                base_moved = dict(self._base_moved)
+                captured = self.index.capture()
+                mutations, self._mutations = self._mutations, 0
+
+            try:
+                entities = overlay
+                if self._base is not None:
+                    deleted = captured["deleted"]
+                    entities += [(entity_id, seq, base_moved.get(entity_id, location))
+                                 for entity_id, seq, location in self._base.iter_entities()
+                                 if seq not in deleted]
+                write_snapshot(self.snapshot_path, header, entities,
+                               self.index.merged_postings(captured))
+            except Exception:
+                with self._lock:
+                    self._mutations += mutations
+                raise
+        return True
+
+    def cache_stats(self) -> Dict[str, Dict[str, Any]]:
+        with self._lock:
+            return {"entities": self._entity_cache.stats(),
+                    "searches": self._search_cache.stats()}
+
+    def stats(self) -> Dict[str, Any]:
+        dead, total = self._log.garbage()
+        return {
+            "segments": self._log.segment_count,
+            "sealed_bytes": total,
+            "garbage_bytes": dead,
+        }
+
+    @property
+    def count(self) -> int:
+        if self._base is None:
+            return len(self._locations)
+        # Replacing a base entity deletes it from the base layer first
+        return self._base.count - len(self.index.base_deleted) + len(self._locations)
+
+    def close(self):
+        self._writer.close()
+        with self._snapshot_lock, self._compact_lock, self._lock:
+            self._log.close()
+            if self._base is not None:
+                self._base.close()
+
+
+def migrate_legacy_layout(store: MemoryStore) -> int:
+    """Move entities from the file-per-entity and journal layouts into the log.
+
+    Legacy files are renamed with a ``.migrated`` suffix only after their
+    contents have been appended and fsync'd, so an interrupted migration is
+    simply repeated on the next open. Returns the number of entities moved.
+    """
+    entities_dir = store.storage_dir / "entities"
+    journal_path = store.storage_dir / LEGACY_JOURNAL_FILE
+
+    legacy_files = sorted(entities_dir.glob("*.json")) if entities_dir.exists() else []
+    if not legacy_files and not journal_path.exists():
+        return 0
+
+    entities: Dict[str, Dict[str, Any]] = {}
+    for path in legacy_files:
+        try:
+            with open(path, "r") as f:
+                entities[path.stem] = json.load(f)
+        except (OSError, json.JSONDecodeError):
+            print(f"⚠️ Skipping unreadable legacy entity file {path.name}")
+
+    if journal_path.exists():
+        with open(journal_path, "rb") as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except json.JSONDecodeError:
+                    break
+                if record["op"] == "put":
+                    entities[record["id"]] = record["entity"]
+                else:
+                    entities.pop(record["id"], None)
+
+    items = list(entities.items())
+    for start in range(0, len(items), 10000):
+        store.ingest(items[start:start + 10000])
+
+    suffix = f".migrated-{int(time.time())}"
+    if legacy_files:
+        entities_dir.rename(entities_dir.with_name(entities_dir.name + suffix))
+        entities_dir.mkdir()
+    if journal_path.exists():
+        journal_path.rename(journal_path.with_name(journal_path.name + suffix))
+
+    print(f"📦 Migrated {len(items)} legacy entities into {LOG_DIR}/")
+    return len(items)
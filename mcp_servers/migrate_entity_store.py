@@ -0,0 +1,38 @@
+#!/usr/bin/env python3
+"""
+One-shot Memory MCP storage migrator
+Moves storage/entities/*.json (and the entity journal) into the segment log
+"""
+
+import argparse
+import sys
+from pathlib import Path
+
+from memory_store import LEGACY_JOURNAL_FILE, LOG_DIR, MemoryStore
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Migrate legacy entity storage into the segment log")
+    parser.add_argument("--storage-dir", default=str(Path(__file__).parent / "storage"),
+                        help="Storage directory (default: mcp_servers/storage)")
+    parser.add_argument("--compact", action="store_true",
+                        help="Compact the log after migrating")
+    args = parser.parse_args()
+
+    storage_dir = Path(args.storage_dir)
+    legacy = list((storage_dir / "entities").glob("*.json"))
+    journal = storage_dir / LEGACY_JOURNAL_FILE
+    print(f"🔍 Found {len(legacy)} legacy entity files"
+          f"{' and a journal' if journal.exists() else ''} in {storage_dir}")
+
+    # Opening the store performs the migration
+    store = MemoryStore(storage_dir)
+    if args.compact:
+        store.compact()
+    print(f"✅ {store.count} entities now stored in {storage_dir / LOG_DIR}")
+    store.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
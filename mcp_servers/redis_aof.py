@@ -0,0 +1,529 @@
+#!/usr/bin/env python3
+"""
+Redis MCP append-only file
+Logs redis keyspace changes to disk and replays them on start, with fsync policies and rewrites
+"""
+
+import asyncio
+import math
+import os
+import queue
+import threading
+import time
+import zlib
+from concurrent.futures import Future
+from pathlib import Path
+from typing import Any, Callable, Dict, List, NamedTuple, Optional
+
+from codec import decode_json, encode_json
+from redis_store import HASH, SET, ZSET, ChangeEvent, RedisStore
+
+# appendfsync policies, as in Redis
+ALWAYS = "always"
+EVERYSEC = "everysec"
+NO = "no"
+FSYNC_POLICIES = (ALWAYS, EVERYSEC, NO)
+
+MANIFEST = "manifest.json"
+BASE_PREFIX = "base-"
+INCR_PREFIX = "incr-"
+AOF_SUFFIX = ".aof"
+# Records written per frame, one write() each
+DEFAULT_MAX_BATCH = 4096
+# How long the writer waits for more records before writing, except under always
+WRITE_LINGER = 0.002
+# Rewrite once the incremental files reach this size and the size of the base
+DEFAULT_REWRITE_MIN_BYTES = 64 * 1024 * 1024
+# Keys copied per event loop slice during a rewrite
+REWRITE_CHUNK = 1000
+
+# A logged command: [op, key, *args]
+Record = List[Any]
+
+
+def to_record(event: ChangeEvent) -> Record:
+    """The command that redoes a change event; relative TTLs become wall-clock deadlines"""
+    op = event["event"]
+    key = event["key"]
+    if op == "hset":
+        return ["hset", key, event["field"], event["value"]]
+    if op == "hdel":
+        return ["hdel", key, event["field"]]
+    if op in ("sadd", "srem", "zadd", "zrem"):
+        return [op, key, event["members"]]
+    if op == "expire":
+        return ["expireat", key, time.time() + event["ttl"]]
+    if op == "persist":
+        return ["persist", key]
+    return ["del", key]
+
+
+def encode_frame(records: List[Record]) -> bytes:
+    """Frame a batch of records as ``<crc32 hex> <json list>\\n``"""
+    body = encode_json(records)
+    return b"%08x %s\n" % (zlib.crc32(body), body)
+
+
+def decode_frame(line: bytes) -> Optional[List[Record]]:
+    """Decode a framed batch, returning None if it is torn or corrupt"""
+    if len(line) < 10 or not line.endswith(b"\n") or line[8:9] != b" ":
+        return None
+    body = line[9:-1]
+    try:
+        if int(line[:8], 16) != zlib.crc32(body):
+            return None
+        return decode_json(body)
+    except ValueError:
+        return None
+
+
+class _Keyspace:
+    """Plain dicts and sets that replayed commands are applied to before loading the store.
+
+    Commands here are a few dict operations each, against a store command's
+    type checks, memory accounting and skip-list updates; only the final
+    value of each key is then loaded into the ``RedisStore``. A key that
+    becomes empty is dropped, as in the store, and a command against a key
+    of another type replaces it rather than failing the replay.
+    """
+
+    def __init__(self):
+        self.types: Dict[str, str] = {}
+        self.values: Dict[str, Any] = {}
+        self.deadlines: Dict[str, float] = {}
+        self.ops: Dict[str, Callable[[Record], None]] = {
+            "hset": self.hset, "hdel": self.hdel, "sadd": self.sadd, "srem": self.srem,
+            "zadd": self.zadd, "zrem": self.zrem, "del": self.delete,
+            "expireat": self.expireat, "persist": self.persist,
+            HASH: self.restore, SET: self.restore, ZSET: self.restore,
+        }
+
+    def _create(self, key: str, kind: str, value: Any) -> Any:
+        self.deadlines.pop(key, None)
+        self.types[key] = kind
+        self.values[key] = value
+        return value
+
+    def _drop_if_empty(self, key: str, value: Any):
+        if not value:
+            self.delete([None, key])
+
+    def hset(self, record: Record):
+        key = record[1]
+        fields = self.values[key] if self.types.get(key) == HASH else \
+            self._create(key, HASH, {})
+        fields[record[2]] = record[3]
+
+    def hdel(self, record: Record):
+        key = record[1]
+        if self.types.get(key) == HASH:
+            fields = self.values[key]
+            fields.pop(record[2], None)
+            self._drop_if_empty(key, fields)
+
+    def sadd(self, record: Record):
+        key = record[1]
+        members = self.values[key] if self.types.get(key) == SET else \
+            self._create(key, SET, set())
+        members.update(record[2])
+
+    def srem(self, record: Record):
+        key = record[1]
+        if self.types.get(key) == SET:
+            members = self.values[key]
+            members.difference_update(record[2])
+            self._drop_if_empty(key, members)
+
+    def zadd(self, record: Record):
+        key = record[1]
+        scores = self.values[key] if self.types.get(key) == ZSET else \
+            self._create(key, ZSET, {})
+        # Logs written before scores were checked can hold NaN or infinity, encoded as null
+        scores.update((member, score) for member, score in record[2].items()
+                      if score is not None and math.isfinite(score))
+
+    def zrem(self, record: Record):
+        key = record[1]
+        if self.types.get(key) == ZSET:
+            scores = self.values[key]
+            for member in record[2]:
+                scores.pop(member, None)
+            self._drop_if_empty(key, scores)
+
+    def delete(self, record: Record):
+        key = record[1]
+        if self.types.pop(key, None) is not None:
+            del self.values[key]
+            self.deadlines.pop(key, None)
+
+    def expireat(self, record: Record):
+        if record[1] in self.types:
+            self.deadlines[record[1]] = record[2]
+
+    def persist(self, record: Record):
+        self.deadlines.pop(record[1], None)
+
+    def restore(self, record: Record):
+        """A base file record: [type, key, value, deadline or None]"""
+        kind, key, value, deadline = record
+        self._create(key, kind, set(value) if kind == SET else value)
+        if deadline is not None:
+            self.deadlines[key] = deadline
+
+    def load(self, store: RedisStore, now: float):
+        """Restore every key into ``store``, skipping those whose deadline has passed"""
+        deadlines = self.deadlines
+        for key, kind in self.types.items():
+            deadline = deadlines.get(key)
+            if deadline is None:
+                store.restore(key, kind, self.values[key])
+            elif deadline > now:
+                store.restore(key, kind, self.values[key], deadline - now)
+
+
+def _fsync_dir(directory: Path):
+    fd = os.open(directory, os.O_RDONLY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+
+class _Switch(NamedTuple):
+    """Writer queue marker: continue in a new incremental file"""
+    name: str
+    done: Future
+
+
+class AppendOnlyLog:
+    """Multi-part append-only file for one ``RedisStore``, like Redis 7's.
+
+    ``manifest.json`` names a base file (the keyspace as of the last rewrite)
+    and the incremental files logged since, oldest first. ``record`` queues
+    the command for a change event; a writer thread appends whatever is
+    queued as one checksummed frame and fsyncs according to the policy:
+    ``always`` after every frame, ``everysec`` at most once a second, ``no``
+    never (the OS flushes when it likes). ``barrier`` returns a future that
+    resolves once everything queued before it is written and, unless the
+    policy is ``no``, fsynced.
+
+    ``rewrite`` starts a new incremental file, copies the keyspace into a new
+    base in slices, then swaps the manifest and deletes the old files. The
+    copy may include changes also logged in the new incremental file, which
+    is harmless because replaying a change event twice has the same effect
+    as once.
+    """
+
+    def __init__(self, directory: Path, fsync: str = EVERYSEC,
+                 max_batch: int = DEFAULT_MAX_BATCH):
+        if fsync not in FSYNC_POLICIES:
+            raise ValueError(f"Unknown fsync policy '{fsync}', expected one of "
+                             f"{', '.join(FSYNC_POLICIES)}")
+        self.directory = Path(directory)
+        self.fsync = fsync
+        self.max_batch = max_batch
+        self.directory.mkdir(parents=True, exist_ok=True)
+
+        self._lock = threading.Lock()
+        self._queue: "queue.SimpleQueue[Any]" = queue.SimpleQueue()
+        self._writer: Optional[int] = None
+        self._thread: Optional[threading.Thread] = None
+        self._rewriting = False
+        self.replayed = 0
+        self.replay_seconds = 0.0
+        self.rewrites = 0
+        self.last_rewrite_seconds = 0.0
+        self.fsyncs = 0
+        self.last_error: Optional[str] = None
+
+        manifest_path = self.directory / MANIFEST
+        if manifest_path.exists():
+            self._manifest = decode_json(manifest_path.read_bytes())
+        else:
+            self._manifest = {"base": None, "incr": [], "next": 1}
+            self._manifest["incr"].append(self._allocate(INCR_PREFIX))
+            self._write_manifest()
+        self._remove_strays()
+
+    # Files and manifest
+
+    def _allocate(self, prefix: str) -> str:
+        number = self._manifest["next"]
+        self._manifest["next"] = number + 1
+        return f"{prefix}{number:06d}{AOF_SUFFIX}"
+
+    def _write_manifest(self):
+        path = self.directory / MANIFEST
+        tmp = path.with_suffix(".tmp")
+        with open(tmp, "wb") as f:
+            f.write(encode_json(self._manifest))
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, path)
+        _fsync_dir(self.directory)
+
+    def _files(self) -> List[str]:
+        base = self._manifest["base"]
+        return ([base] if base else []) + list(self._manifest["incr"])
+
+    def _remove_strays(self):
+        """Delete files a crash left outside the manifest, like a half-written base"""
+        keep = set(self._files())
+        for path in self.directory.iterdir():
+            if path.suffix in (AOF_SUFFIX, ".tmp") and path.name not in keep:
+                path.unlink()
+
+    def _size(self, name: Optional[str]) -> int:
+        try:
+            return (self.directory / name).stat().st_size if name else 0
+        except FileNotFoundError:
+            return 0
+
+    def base_bytes(self) -> int:
+        return self._size(self._manifest["base"])
+
+    def incr_bytes(self) -> int:
+        return sum(self._size(name) for name in list(self._manifest["incr"]))
+
+    # Replay
+
+    def replay(self, store: RedisStore) -> int:
+        """Load every logged command into ``store`` without change events; returns the count.
+
+        A torn frame at the end of the newest file (a crash mid-write) is
+        truncated; anything unreadable in older files is skipped with a
+        warning. Keys whose deadline passed while the server was down are
+        not restored.
+        """
+        start = time.perf_counter()
+        keyspace = _Keyspace()
+        ops = keyspace.ops
+        count = 0
+        files = self._files()
+        for index, name in enumerate(files):
+            path = self.directory / name
+            if not path.exists():
+                continue
+            offset = 0
+            with open(path, "rb") as f:
+                for line in f:
+                    records = decode_frame(line)
+                    if records is None:
+                        break
+                    offset += len(line)
+                    for record in records:
+                        ops[record[0]](record)
+                    count += len(records)
+            size = path.stat().st_size
+            if offset != size:
+                if index == len(files) - 1:
+                    os.truncate(path, offset)
+                else:
+                    print(f"⚠️ {name}: ignoring {size - offset} unreadable bytes "
+                          f"at offset {offset}")
+        keyspace.load(store, time.time())
+        self.replayed = count
+        self.replay_seconds = time.perf_counter() - start
+        return count
+
+    # Writing
+
+    def start(self):
+        """Open the newest incremental file and start the writer thread (after ``replay``)"""
+        self._open(self._manifest["incr"][-1])
+        self._thread = threading.Thread(target=self._run, name="redis-aof", daemon=True)
+        self._thread.start()
+
+    def _open(self, name: str):
+        self._writer = os.open(self.directory / name, os.O_WRONLY | os.O_APPEND | os.O_CREAT,
+                               0o644)
+
+    def record(self, event: ChangeEvent):
+        """Queue the command for a change event; pass this (or a fan-out) as ``on_change``"""
+        self._queue.put(to_record(event))
+
+    def barrier(self) -> Future:
+        future: Future = Future()
+        if self._thread is None or not self._thread.is_alive():
+            future.set_exception(RuntimeError("Append-only file is closed"))
+        else:
+            self._queue.put(future)
+        return future
+
+    def _fsync_wait(self, dirty: bool, last_fsync: float) -> Optional[float]:
+        """How long the writer may sleep before an everysec fsync falls due"""
+        if not dirty or self.fsync != EVERYSEC:
+            return None
+        return max(last_fsync + 1.0 - time.monotonic(), 0.0)
+
+    def _run(self):
+        dirty = False
+        last_fsync = time.monotonic()
+        stop = False
+        while not stop:
+            try:
+                items = [self._queue.get(timeout=self._fsync_wait(dirty, last_fsync))]
+            except queue.Empty:
+                items = []
+            if items and self.fsync != ALWAYS and type(items[0]) is list:
+                # Let a burst of writes queue up instead of waking for each one
+                time.sleep(WRITE_LINGER)
+            while len(items) < self.max_batch:
+                try:
+                    items.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+
+            records: List[Record] = []
+            waiters: List[Future] = []
+            error: Optional[OSError] = None
+            for item in items:
+                if type(item) is list:
+                    records.append(item)
+                elif isinstance(item, Future):
+                    waiters.append(item)
+                elif isinstance(item, _Switch):
+                    error = self._write(records) or error
+                    records = []
+                    self._switch(item)
+                    dirty = False
+                    last_fsync = time.monotonic()
+                else:
+                    stop = True
+                    break
+            if records:
+                error = self._write(records) or error
+                dirty = True
+
+            due = (self.fsync == ALWAYS or stop or (waiters and self.fsync != NO) or
+                   (self.fsync == EVERYSEC and time.monotonic() - last_fsync >= 1.0))
+            if dirty and due:
+                try:
+                    os.fsync(self._writer)
+                    self.fsyncs += 1
+                except OSError as e:
+                    error = e
+                dirty = False
+                last_fsync = time.monotonic()
+            if error is not None:
+                self.last_error = str(error)
+                print(f"⚠️ Redis append-only file: {error}")
+            for future in waiters:
+                if error is None:
+                    future.set_result(None)
+                else:
+                    future.set_exception(error)
+        os.close(self._writer)
+
+    def _write(self, records: List[Record]) -> Optional[OSError]:
+        if not records:
+            return None
+        try:
+            os.write(self._writer, encode_frame(records))
+        except OSError as e:
+            return e
+        return None
+
+    def _switch(self, switch: _Switch):
+        """Seal the current incremental file and continue in a new one"""
+        try:
+            if self.fsync != NO:
+                os.fsync(self._writer)
+            os.close(self._writer)
+            self._open(switch.name)
+            with self._lock:
+                self._manifest["incr"].append(switch.name)
+                self._write_manifest()
+        except OSError as e:
+            switch.done.set_exception(e)
+            return
+        switch.done.set_result(None)
+
+    # Rewrite
+
+    def needs_rewrite(self, min_bytes: int = DEFAULT_REWRITE_MIN_BYTES) -> bool:
+        """True once the incremental files outgrow both ``min_bytes`` and the base"""
+        incr = self.incr_bytes()
+        return not self._rewriting and incr >= min_bytes and incr >= self.base_bytes()
+
+    async def rewrite(self, store: RedisStore, chunk: int = REWRITE_CHUNK) -> bool:
+        """Compact the log into a new base file without blocking the event loop for long.
+
+        Must run on the event loop that mutates ``store``. Returns False if a
+        rewrite is already in progress.
+        """
+        if self._rewriting:
+            return False
+        self._rewriting = True
+        start = time.perf_counter()
+        try:
+            with self._lock:
+                incr = self._allocate(INCR_PREFIX)
+                base = self._allocate(BASE_PREFIX)
+            switched: Future = Future()
+            self._queue.put(_Switch(incr, switched))
+            await asyncio.wrap_future(switched)
+
+            # Changes from here on land in ``incr``, which replays on top of the new base
+            keys = store.keys()
+            path = self.directory / base
+            out = await asyncio.to_thread(open, path, "wb")
+            try:
+                for offset in range(0, len(keys), chunk):
+                    now = time.time()
+                    records = []
+                    for key in keys[offset:offset + chunk]:
+                        dumped = store.dump(key)
+                        if dumped is not None:
+                            kind, value, ttl = dumped
+                            records.append([kind, key, value,
+                                            now + ttl if ttl is not None else None])
+                    if records:
+                        await asyncio.to_thread(out.write, encode_frame(records))
+                await asyncio.to_thread(self._install_base, out, base, incr)
+            except BaseException:
+                out.close()
+                path.unlink(missing_ok=True)
+                raise
+        finally:
+            self._rewriting = False
+        self.rewrites += 1
+        self.last_rewrite_seconds = time.perf_counter() - start
+        return True
+
+    def _install_base(self, out, base: str, incr: str):
+        out.flush()
+        os.fsync(out.fileno())
+        out.close()
+        with self._lock:
+            old = self._files()
+            current = self._manifest["incr"]
+            self._manifest["base"] = base
+            self._manifest["incr"] = current[current.index(incr):]
+            self._write_manifest()
+        for name in old:
+            if name not in self._manifest["incr"]:
+                (self.directory / name).unlink(missing_ok=True)
+
+    # Lifecycle
+
+    def close(self):
+        """Write and fsync everything queued, then stop the writer thread"""
+        if self._thread is not None and self._thread.is_alive():
+            self._queue.put(None)
+            self._thread.join()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "fsync": self.fsync,
+            "files": len(self._files()),
+            "base_bytes": self.base_bytes(),
+            "incr_bytes": self.incr_bytes(),
+            "replayed": self.replayed,
+            "replay_seconds": self.replay_seconds,
+            "rewrites": self.rewrites,
+            "rewriting": self._rewriting,
+            "last_rewrite_seconds": self.last_rewrite_seconds,
+            "fsyncs": self.fsyncs,
+            "last_error": self.last_error,
+        }
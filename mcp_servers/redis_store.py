@@ -0,0 +1,509 @@
+#!/usr/bin/env python3
+"""
+Redis MCP in-process store
+Redis-style keyspace of hashes, sets and skip-list sorted sets with expiry and memory accounting
+"""
+
+import heapq
+import math
+import random
+import time
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+HASH = "hash"
+SET = "set"
+ZSET = "zset"
+
+# Approximate per-object overheads in bytes, used for memory accounting only
+KEY_OVERHEAD = 96
+HASH_FIELD_OVERHEAD = 64
+SET_MEMBER_OVERHEAD = 48
+ZSET_MEMBER_OVERHEAD = 120
+
+# Redis's reply to a NaN or infinite sorted set score
+INVALID_SCORE = "ERR value is not a valid float"
+
+# A keyspace change: {"event", "key", "type", ...event-specific fields}
+ChangeEvent = Dict[str, Any]
+
+
+class WrongTypeError(Exception):
+    """Raised when a command targets a key holding a different data type"""
+
+    def __init__(self, key: str, expected: str, actual: str):
+        super().__init__(f"WRONGTYPE key '{key}' holds a {actual}, not a {expected}")
+
+
+class _Node:
+    __slots__ = ("member", "score", "forward", "span")
+
+    def __init__(self, member: Optional[str], score: float, level: int):
+        self.member = member
+        self.score = score
+        self.forward: List[Optional["_Node"]] = [None] * level
+        self.span = [0] * level
+
+
+class SkipList:
+    """Indexable skip list ordered by (score, member).
+
+    Every forward pointer records how many nodes it skips, so the node at a
+    given rank is found in O(log n) and a rank window of k nodes is read in
+    O(log n + k), the same structure Redis uses for large sorted sets.
+    """
+
+    MAX_LEVEL = 32
+    P = 0.25
+
+    def __init__(self):
+        self._head = _Node(None, float("-inf"), self.MAX_LEVEL)
+        self._level = 1
+        self._length = 0
+
+    def __len__(self) -> int:
+        return self._length
+
+    def _random_level(self) -> int:
+        level = 1
+        while level < self.MAX_LEVEL and random.random() < self.P:
+            level += 1
+        return level
+
+    def insert(self, score: float, member: str):
+        update: List[_Node] = [self._head] * self.MAX_LEVEL
+        rank = [0] * self.MAX_LEVEL
+        node = self._head
+        for i in reversed(range(self._level)):
+            rank[i] = rank[i + 1] if i < self._level - 1 else 0
+            nxt = node.forward[i]
+            while nxt is not None and (nxt.score, nxt.member) < (score, member):
+                rank[i] += node.span[i]
+                node = nxt
+                nxt = node.forward[i]
+            update[i] = node
+
+        level = self._random_level()
+        if level > self._level:
+            for i in range(self._level, level):
+                rank[i] = 0
+                update[i] = self._head
+                self._head.span[i] = self._length
+            self._level = level
+
+        new = _Node(member, score, level)
+        for i in range(level):
+            new.forward[i] = update[i].forward[i]
+            update[i].forward[i] = new
+            new.span[i] = update[i].span[i] - (rank[0] - rank[i])
+            update[i].span[i] = rank[0] - rank[i] + 1
+        for i in range(level, self._level):
+            update[i].span[i] += 1
+        self._length += 1
+
+    def delete(self, score: float, member: str) -> bool:
+        update: List[_Node] = [self._head] * self.MAX_LEVEL
+        node = self._head
+        for i in reversed(range(self._level)):
+            nxt = node.forward[i]
+            while nxt is not None and (nxt.score, nxt.member) < (score, member):
+                node = nxt
+                nxt = node.forward[i]
+            update[i] = node
+
+        target = node.forward[0]
+        if target is None or target.score != score or target.member != member:
+            return False
+        for i in range(self._level):
+            if update[i].forward[i] is target:
+                update[i].span[i] += target.span[i] - 1
+                update[i].forward[i] = target.forward[i]
+            else:
+                update[i].span[i] -= 1
+        while self._level > 1 and self._head.forward[self._level - 1] is None:
+            self._level -= 1
+        self._length -= 1
+        return True
+
+    def _node_at(self, rank: int) -> Optional[_Node]:
+        """Node at a 0-based rank"""
+        traversed = 0
+        target = rank + 1
+        node = self._head
+        for i in reversed(range(self._level)):
+            while node.forward[i] is not None and traversed + node.span[i] <= target:
+                traversed += node.span[i]
+                node = node.forward[i]
+            if traversed == target:
+                return node
+        return None
+
+    def range(self, start: int, stop: int) -> Iterator[Tuple[str, float]]:
+        """Yield (member, score) for ranks start..stop inclusive (already clamped)"""
+        node = self._node_at(start)
+        for _ in range(stop - start + 1):
+            if node is None:
+                return
+            yield node.member, node.score
+            node = node.forward[0]
+
+
+class SortedSet:
+    """Member-to-score dict paired with a skip list in score order"""
+
+    __slots__ = ("scores", "order")
+
+    def __init__(self):
+        self.scores: Dict[str, float] = {}
+        self.order = SkipList()
+
+    def __len__(self) -> int:
+        return len(self.scores)
+
+    def add(self, member: str, score: float) -> bool:
+        """Insert or rescore a member; returns True if it is new.
+
+        Scores must be finite: a NaN score never compares equal, so its
+        skip-list node could not be found again to rescore or remove it.
+        """
+        if not math.isfinite(score):
+            raise ValueError(INVALID_SCORE)
+        old = self.scores.get(member)
+        if old is not None:
+            if old == score:
+                return False
+            self.order.delete(old, member)
+        self.scores[member] = score
+        self.order.insert(score, member)
+        return old is None
+
+    def remove(self, member: str) -> bool:
+        score = self.scores.pop(member, None)
+        if score is None:
+            return False
+        self.order.delete(score, member)
+        return True
+
+    def range(self, start: int, stop: int) -> List[Tuple[str, float]]:
+        """Redis ZRANGE index semantics: inclusive, negative indexes count from the end"""
+        size = len(self.scores)
+        if start < 0:
+            start = max(size + start, 0)
+        if stop < 0:
+            stop = size + stop
+        stop = min(stop, size - 1)
+        if start > stop:
+            return []
+        return list(self.order.range(start, stop))
+
+
+class RedisStore:
+    """Single keyspace with per-key types, like a Redis database.
+
+    Each key holds exactly one of a hash (dict), a set or a sorted set, and
+    commands against a key of another type raise ``WrongTypeError``. Keys
+    may carry a deadline; expired keys are dropped lazily on access and
+    actively by ``expire_due``, which only looks at the head of a deadline
+    heap. Memory use is an estimate maintained on every mutation.
+
+    ``on_change``, when set, is called with a ``ChangeEvent`` after every
+    mutation that changed data, like Redis keyspace notifications: ``hset``,
+    ``hdel``, ``sadd``, ``srem``, ``zadd``, ``zrem``, ``del``, ``expired``,
+    plus ``expire`` (with the new ``ttl``) and ``persist``. Writes that
+    change nothing (re-adding a member) send no event. A write with a TTL
+    sends its data event before its ``expire`` event, so replaying the
+    events in order rebuilds the keyspace (see redis_aof.py).
+    """
+
+    def __init__(self, clock: Callable[[], float] = time.monotonic,
+                 on_change: Optional[Callable[[ChangeEvent], None]] = None):
+        self._clock = clock
+        self.on_change = on_change
+        self._data: Dict[str, Any] = {}
+        self._types: Dict[str, str] = {}
+        self._deadlines: Dict[str, float] = {}
+        self._expiry_heap: List[Tuple[float, str]] = []
+        self._key_bytes: Dict[str, int] = {}
+        self._counts = {HASH: 0, SET: 0, ZSET: 0}
+        self.used_bytes = 0
+
+    # Keyspace
+
+    def _get(self, key: str, kind: str) -> Optional[Any]:
+        deadline = self._deadlines.get(key)
+        if deadline is not None and deadline <= self._clock():
+            self._drop(key, "expired")
+            return None
+        actual = self._types.get(key)
+        if actual is None:
+            return None
+        if actual != kind:
+            raise WrongTypeError(key, kind, actual)
+        return self._data[key]
+
+    def _get_or_create(self, key: str, kind: str, factory: Callable[[], Any]) -> Any:
+        value = self._get(key, kind)
+        if value is None:
+            value = factory()
+            self._data[key] = value
+            self._types[key] = kind
+            self._counts[kind] += 1
+            self._key_bytes[key] = 0
+            self._account(key, KEY_OVERHEAD + len(key))
+        return value
+
+    def _account(self, key: str, delta: int):
+        self._key_bytes[key] += delta
+        self.used_bytes += delta
+
+    def _drop(self, key: str, event: Optional[str] = None) -> bool:
+        if key not in self._types:
+            return False
+        del self._data[key]
+        kind = self._types.pop(key)
+        self._counts[kind] -= 1
+        self._deadlines.pop(key, None)
+        self.used_bytes -= self._key_bytes.pop(key)
+        if event is not None:
+            self._notify(event, key, kind)
+        return True
+
+    def _notify(self, event: str, key: str, kind: str, **fields: Any):
+        if self.on_change is not None:
+            self.on_change({"event": event, "key": key, "type": kind, **fields})
+
+    def _drop_if_empty(self, key: str):
+        if not self._data[key]:
+            self._drop(key)
+
+    def _apply_ttl(self, key: str, ttl: Optional[float]):
+        if ttl is not None and key in self._types:
+            self.expire(key, ttl)
+
+    def exists(self, key: str) -> bool:
+        deadline = self._deadlines.get(key)
+        if deadline is not None and deadline <= self._clock():
+            self._drop(key, "expired")
+        return key in self._types
+
+    def type_of(self, key: str) -> Optional[str]:
+        return self._types.get(key) if self.exists(key) else None
+
+    def delete(self, key: str) -> bool:
+        if not self.exists(key):
+            return False
+        return self._drop(key, "del")
+
+    def delete_prefix(self, prefix: str) -> int:
+        """Delete every key starting with ``prefix``; scans the key names once"""
+        keys = [key for key in self._types if key.startswith(prefix)]
+        for key in keys:
+            self._drop(key, "del")
+        return len(keys)
+
+    # Expiry
+
+    def expire(self, key: str, seconds: float) -> bool:
+        """Set a key's time to live; returns False if the key does not exist"""
+        if not self.exists(key):
+            return False
+        self._set_deadline(key, self._clock() + seconds)
+        self._notify("expire", key, self._types[key], ttl=seconds)
+        return True
+
+    def _set_deadline(self, key: str, deadline: float):
+        self._deadlines[key] = deadline
+        heapq.heappush(self._expiry_heap, (deadline, key))
+
+    def persist(self, key: str) -> bool:
+        if not self.exists(key) or self._deadlines.pop(key, None) is None:
+            return False
+        self._notify("persist", key, self._types[key])
+        return True
+
+    def ttl(self, key: str) -> float:
+        """Seconds left to live, -1 for keys without a deadline, -2 for missing keys"""
+        if not self.exists(key):
+            return -2
+        deadline = self._deadlines.get(key)
+        if deadline is None:
+            return -1
+        return max(deadline - self._clock(), 0.0)
+
+    def expire_due(self, max_keys: int = 100) -> int:
+        """Drop up to ``max_keys`` keys whose deadline has passed"""
+        now = self._clock()
+        dropped = 0
+        heap = self._expiry_heap
+        while heap and heap[0][0] <= now and dropped < max_keys:
+            deadline, key = heapq.heappop(heap)
+            # Skip heap entries superseded by a later expire() or persist()
+            if self._deadlines.get(key) == deadline:
+                self._drop(key, "expired")
+                dropped += 1
+        return dropped
+
+    # Hashes
+
+    def hset(self, key: str, field: str, value: str, ttl: Optional[float] = None) -> bool:
+        fields = self._get_or_create(key, HASH, dict)
+        old = fields.get(field)
+        if old is None:
+            self._account(key, HASH_FIELD_OVERHEAD + len(field) + len(value))
+        else:
+            self._account(key, len(value) - len(old))
+        fields[field] = value
+        if old != value:
+            self._notify("hset", key, HASH, field=field, value=value)
+        self._apply_ttl(key, ttl)
+        return old is None
+
+    def hget(self, key: str, field: str) -> Optional[str]:
+        fields = self._get(key, HASH)
+        return fields.get(field) if fields is not None else None
+
+    def hdel(self, key: str, field: str) -> bool:
+        fields = self._get(key, HASH)
+        if fields is None or field not in fields:
+            return False
+        value = fields.pop(field)
+        self._account(key, -(HASH_FIELD_OVERHEAD + len(field) + len(value)))
+        self._drop_if_empty(key)
+        self._notify("hdel", key, HASH, field=field)
+        return True
+
+    # Sets
+
+    def sadd(self, key: str, members: List[str], ttl: Optional[float] = None) -> int:
+        current = self._get_or_create(key, SET, set)
+        added = []
+        for member in members:
+            if member not in current:
+                current.add(member)
+                self._account(key, SET_MEMBER_OVERHEAD + len(member))
+                added.append(member)
+        self._drop_if_empty(key)
+        if added:
+            self._notify("sadd", key, SET, members=added)
+        self._apply_ttl(key, ttl)
+        return len(added)
+
+    def smembers(self, key: str) -> List[str]:
+        members = self._get(key, SET)
+        return sorted(members) if members is not None else []
+
+    def srem(self, key: str, members: List[str]) -> int:
+        current = self._get(key, SET)
+        if current is None:
+            return 0
+        removed = []
+        for member in members:
+            if member in current:
+                current.remove(member)
+                self._account(key, -(SET_MEMBER_OVERHEAD + len(member)))
+                removed.append(member)
+        self._drop_if_empty(key)
+        if removed:
+            self._notify("srem", key, SET, members=removed)
+        return len(removed)
+
+    # Sorted sets
+
+    def zadd(self, key: str, members: Dict[str, float], ttl: Optional[float] = None) -> int:
+        """Add or rescore members; raises ValueError, changing nothing, on a non-finite score"""
+        if not all(map(math.isfinite, members.values())):
+            raise ValueError(INVALID_SCORE)
+        zset = self._get_or_create(key, ZSET, SortedSet)
+        added = 0
+        changed = {}
+        for member, score in members.items():
+            if zset.scores.get(member) != score:
+                changed[member] = score
+            if zset.add(member, score):
+                self._account(key, ZSET_MEMBER_OVERHEAD + len(member))
+                added += 1
+        self._drop_if_empty(key)
+        if changed:
+            self._notify("zadd", key, ZSET, members=changed)
+        self._apply_ttl(key, ttl)
+        return added
+
+    def zrange(self, key: str, start: int = 0, stop: int = -1) -> List[Tuple[str, float]]:
+        zset = self._get(key, ZSET)
+        return zset.range(start, stop) if zset is not None else []
+
+    def zrem(self, key: str, members: List[str]) -> int:
+        zset = self._get(key, ZSET)
+        if zset is None:
+            return 0
+        removed = []
+        for member in members:
+            if zset.remove(member):
+                self._account(key, -(ZSET_MEMBER_OVERHEAD + len(member)))
+                removed.append(member)
+        self._drop_if_empty(key)
+        if removed:
+            self._notify("zrem", key, ZSET, members=removed)
+        return len(removed)
+
+    def zcard(self, key: str) -> int:
+        zset = self._get(key, ZSET)
+        return len(zset) if zset is not None else 0
+
+    # Dump and restore, for persistence
+
+    def keys(self) -> List[str]:
+        return list(self._types)
+
+    def dump(self, key: str) -> Optional[Tuple[str, Any, Optional[float]]]:
+        """(type, copy of the value, seconds left to live or None), or None if missing"""
+        if not self.exists(key):
+            return None
+        kind = self._types[key]
+        value = self._data[key]
+        if kind == HASH:
+            value = dict(value)
+        elif kind == SET:
+            value = list(value)
+        else:
+            value = dict(value.scores)
+        deadline = self._deadlines.get(key)
+        return kind, value, deadline - self._clock() if deadline is not None else None
+
+    def restore(self, key: str, kind: str, value: Any, ttl: Optional[float] = None):
+        """Replace ``key`` with a ``dump`` value in one step, without sending change events"""
+        self._drop(key)
+        if not value:
+            return
+        if kind == HASH:
+            data: Any = dict(value)
+            size = sum(HASH_FIELD_OVERHEAD + len(f) + len(v) for f, v in data.items())
+        elif kind == SET:
+            data = set(value)
+            size = sum(SET_MEMBER_OVERHEAD + len(member) for member in data)
+        else:
+            data = SortedSet()
+            for member, score in value.items():
+                data.add(member, score)
+            size = sum(ZSET_MEMBER_OVERHEAD + len(member) for member in data.scores)
+        self._data[key] = data
+        self._types[key] = kind
+        self._counts[kind] += 1
+        self._key_bytes[key] = 0
+        self._account(key, KEY_OVERHEAD + len(key) + size)
+        if ttl is not None:
+            self._set_deadline(key, self._clock() + ttl)
+
+    # Introspection
+
+    def __len__(self) -> int:
+        return len(self._types)
+
+    def key_counts(self) -> Dict[str, int]:
+        return dict(self._counts)
+
+    def memory(self) -> Dict[str, int]:
+        return {
+            "used_bytes": self.used_bytes,
+            "keys": len(self._types),
+            "expiring_keys": len(self._deadlines),
+        }
@@ -0,0 +1,608 @@
+#!/usr/bin/env python3
+"""
+Memory MCP knowledge graph relations
+Typed edges between entities with forward and reverse adjacency indexes and bounded traversals
+"""
+
+import json
+import os
+import struct
+import threading
+from array import array
+from concurrent.futures import Future
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Set, Tuple
+
+from entity_log import DEFAULT_SEGMENT_BYTES, SegmentLog, _fsync_dir
+from group_commit import Finish, GroupCommitter
+from request_timing import storage_io
+
+OUT = "out"
+IN = "in"
+BOTH = "both"
+DIRECTIONS = (OUT, IN, BOTH)
+REVERSE = {OUT: IN, IN: OUT, BOTH: BOTH}
+
+# An adjacency entry packs the neighbour's node number and the relation type number into one int
+TYPE_BITS = 20
+TYPE_MASK = (1 << TYPE_BITS) - 1
+
+SNAPSHOT_FILE = "graph.snap"
+# Written by close() and removed on open, so its absence on open means the last run crashed
+CLEAN_SHUTDOWN_FILE = "clean_shutdown"
+SNAPSHOT_VERSION = 1
+SNAPSHOT_MAGIC = b"MCPGRAF1"
+SNAPSHOT_TRAILER = struct.Struct("<QQ")   # header offset, header length
+# Adjacency sections: per-node start offsets (CSR) and the packed entries they index
+ADJACENCY_SECTIONS = ("out_starts", "out_packed", "in_starts", "in_packed")
+
+# Same thresholds as entity log compaction
+COMPACT_MIN_BYTES = 16 * 1024 * 1024
+COMPACT_MIN_RATIO = 0.5
+# Edges per relate record when compaction rewrites the graph
+COMPACT_BATCH = 10000
+# JSON framing of one edge in a relate record: quotes, commas and brackets
+EDGE_OVERHEAD = 11
+
+Edge = Tuple[str, str, str]
+# (neighbour, relation type, edge stored as outgoing from the neighbour)
+Step = Tuple[int, int, bool]
+# Given node names, returns those whose entity does not exist (MemoryStore.missing)
+Missing = Callable[[Iterable[str]], List[str]]
+
+
+class MissingNodeError(LookupError):
+    """Raised when an edge would connect an entity that does not exist"""
+
+    def __init__(self, names: List[str]):
+        super().__init__(f"Entity not found: {', '.join(sorted(names))}")
+        self.names = names
+
+
+class RelationStore:
+    """Directed, typed relations persisted in their own segment log.
+
+    Node IDs and relation types are interned to integers; each node keeps a
+    set of packed (neighbour, type) ints for its outgoing edges and another
+    for its incoming ones, so adding, removing and following an edge are all
+    O(1) and traversals cost time proportional to the edges they visit.
+
+    Every mutation batch is one log record; concurrent batches are
+    group-committed like entity writes. ``write_snapshot`` saves the
+    adjacency to ``graph.snap`` so an open only replays the log written since,
+    and compaction rewrites the sealed segments as the edges they leave
+    behind. A node's ID is freed with its last edge, so churn through many
+    distinct entities does not grow the interning tables.
+    """
+
+    def __init__(self, directory: Path, fsync: bool = True,
+                 max_segment_bytes: int = DEFAULT_SEGMENT_BYTES):
+        self._log = SegmentLog(directory, max_segment_bytes, fsync)
+        self._lock = threading.Lock()
+        self._snapshot_lock = threading.Lock()
+        self._compact_lock = threading.Lock()
+        self._mutations = 0
+        self.snapshot_path = Path(directory) / SNAPSHOT_FILE
+        self.loaded_from_snapshot = False
+        self._marker_path = Path(directory) / CLEAN_SHUTDOWN_FILE
+        self.closed_cleanly = self._marker_path.exists()
+        if self.closed_cleanly:
+            self._marker_path.unlink()
+            if self._log.fsync:
+                _fsync_dir(self._marker_path.parent)
+        # Every interned node has at least one edge; a freed ID leaves a None hole
+        self._node_ids: Dict[str, int] = {}
+        self._node_names: List[Optional[str]] = []
+        self._free_nodes: List[int] = []
+        self._type_ids: Dict[str, int] = {}
+        self._type_names: List[str] = []
+        self._out: Dict[int, Set[int]] = {}
+        self._in: Dict[int, Set[int]] = {}
+        self.edge_count = 0
+        # Nodes with at least one edge, kept current so stats() never scans
+        self.node_count = 0
+        # Estimated size of the edges as relate records, to tell how much of the log is garbage
+        self._edge_bytes = 0
+
+        for record, _ in self._log.replay(self._open_snapshot()):
+            self._apply(record)
+        self._writer = GroupCommitter(self._log, self._lock, name="relation-log-writer")
+
+    # Interning
+
+    def _node(self, name: str) -> int:
+        node = self._node_ids.get(name)
+        if node is None:
+            if self._free_nodes:
+                node = self._free_nodes.pop()
+                self._node_names[node] = name
+            else:
+                node = len(self._node_names)
+                self._node_names.append(name)
+            self._node_ids[name] = node
+            self.node_count += 1
+        return node
+
+    def _type(self, name: str) -> int:
+        rel = self._type_ids.get(name)
+        if rel is None:
+            rel = self._type_ids[name] = len(self._type_names)
+            self._type_names.append(name)
+        return rel
+
+    # Mutation
+
+    def _isolated(self, node: int) -> bool:
+        return node not in self._out and node not in self._in
+
+    def _linked(self) -> List[str]:
+        return list(self._node_ids)
+
+    def _release(self, node: int):
+        """Free the ID of a node whose last edge is gone"""
+        if self._isolated(node):
+            del self._node_ids[self._node_names[node]]
+            self._node_names[node] = None
+            self._free_nodes.append(node)
+            self.node_count -= 1
+
+    def _size(self, source: int, target: int, rel: int) -> int:
+        return (len(self._node_names[source]) + len(self._node_names[target])
+                + len(self._type_names[rel]) + EDGE_OVERHEAD)
+
+    def _link(self, source: int, target: int, rel: int) -> bool:
+        packed = (target << TYPE_BITS) | rel
+        out = self._out.get(source)
+        if out is not None and packed in out:
+            return False
+        if out is None:
+            out = self._out[source] = set()
+        out.add(packed)
+        self._in.setdefault(target, set()).add((source << TYPE_BITS) | rel)
+        self.edge_count += 1
+        self._edge_bytes += self._size(source, target, rel)
+        return True
+
+    def _unlink(self, source: int, target: int, rel: int) -> bool:
+        out = self._out.get(source)
+        packed = (target << TYPE_BITS) | rel
+        if out is None or packed not in out:
+            return False
+        out.discard(packed)
+        if not out:
+            del self._out[source]
+        incoming = self._in[target]
+        incoming.discard((source << TYPE_BITS) | rel)
+        if not incoming:
+            del self._in[target]
+        self.edge_count -= 1
+        self._edge_bytes -= self._size(source, target, rel)
+        self._release(source)
+        if target != source:
+            self._release(target)
+        return True
+
+    def _drop_node(self, node: int) -> int:
+        removed = 0
+        for packed in list(self._out.get(node, ())):
+            removed += self._unlink(node, packed >> TYPE_BITS, packed & TYPE_MASK)
+        for packed in list(self._in.get(node, ())):
+            removed += self._unlink(packed >> TYPE_BITS, node, packed & TYPE_MASK)
+        return removed
+
+    def _apply(self, record: Dict[str, Any]) -> int:
+        op = record.get("op")
+        self._mutations += 1
+        if op == "relate":
+            return sum(self._link(self._node(s), self._node(t), self._type(r))
+                       for s, t, r in record["edges"])
+        if op == "unrelate":
+            changed = 0
+            for s, t, r in record["edges"]:
+                if s in self._node_ids and t in self._node_ids and r in self._type_ids:
+                    changed += self._unlink(self._node_ids[s], self._node_ids[t], self._type_ids[r])
+            return changed
+        if op == "drop":
+            node = self._node_ids.get(record["node"])
+            return self._drop_node(node) if node is not None else 0
+        return 0
+
+    def _staged(self, record: Dict[str, Any]) -> Tuple[List[Dict[str, Any]], Finish]:
+        """A mutation record and the finish step that applies it once durable"""
+        return [record], lambda locations: self._apply(record)
+
+    @staticmethod
+    def _wait(future: Future) -> int:
+        with storage_io():
+            return future.result()
+
+    def submit_add(self, edges: Iterable[Edge], missing: Optional[Missing] = None) -> Future:
+        """Queue (source, target, relation type) edges; resolves to how many were new.
+
+        With ``missing``, the endpoints are checked when the batch is staged,
+        under the store lock and in commit order with ``submit_remove_nodes``,
+        and the future fails with ``MissingNodeError`` if any is gone. A
+        delete committed after that check queues its edge removal behind
+        these edges, so no edge outlives its entity.
+        """
+        edges = [list(edge) for edge in edges]
+
+        def stage():
+            if not edges:
+                return [], lambda locations: 0
+            if missing is not None:
+                gone = missing({node for s, t, _ in edges for node in (s, t)})
+                if gone:
+                    raise MissingNodeError(gone)
+            new_types = {rel for _, _, rel in edges} - self._type_ids.keys()
+            if len(self._type_names) + len(new_types) > TYPE_MASK + 1:
+                raise ValueError("Too many distinct relation types")
+            return self._staged({"op": "relate", "edges": edges})
+        return self._writer.submit(stage)
+
+    def submit_remove(self, edges: Iterable[Edge]) -> Future:
+        """Queue edge removals; resolves to how many existed"""
+        edges = [list(edge) for edge in edges]
+
+        def stage():
+            if not edges:
+                return [], lambda locations: 0
+            return self._staged({"op": "unrelate", "edges": edges})
+        return self._writer.submit(stage)
+
+    def submit_remove_nodes(self, names: Iterable[str]) -> Future:
+        """Queue removal of every edge into or out of the nodes; resolves to how many there were"""
+        names = list(names)
+
+        def stage():
+            records = [{"op": "drop", "node": name} for name in names if name in self._node_ids]
+            return records, lambda locations: sum(self._apply(record) for record in records)
+        return self._writer.submit(stage)
+
+    def submit_prune(self, missing: Missing) -> Future:
+        """Queue removal of the edges of every node ``missing`` reports gone; resolves to the count.
+
+        Entity deletes and their edge removals are separate commits to
+        separate logs, so a crash between them leaves edges to a deleted
+        entity; this drops them, typically on an open where
+        ``closed_cleanly`` is False.
+        """
+        def stage():
+            records = [{"op": "drop", "node": name} for name in missing(self._linked())]
+            return records, lambda locations: sum(self._apply(record) for record in records)
+        return self._writer.submit(stage)
+
+    def add(self, edges: Iterable[Edge], missing: Optional[Missing] = None) -> int:
+        return self._wait(self.submit_add(edges, missing))
+
+    def remove(self, edges: Iterable[Edge]) -> int:
+        return self._wait(self.submit_remove(edges))
+
+    def remove_node(self, name: str) -> int:
+        return self._wait(self.submit_remove_nodes([name]))
+
+    def prune(self, missing: Missing) -> int:
+        return self._wait(self.submit_prune(missing))
+
+    def nodes(self) -> List[str]:
+        """Names of the nodes with at least one edge"""
+        with self._lock:
+            return self._linked()
+
+    # Traversal
+
+    def _steps(self, node: int, direction: str, rel: Optional[int]
+               ) -> Iterator[Tuple[int, int, bool]]:
+        """Yield (neighbour, relation type, stored as outgoing from node) for a node's edges"""
+        if direction != IN:
+            for packed in self._out.get(node, ()):
+                if rel is None or packed & TYPE_MASK == rel:
+                    yield packed >> TYPE_BITS, packed & TYPE_MASK, True
+        if direction != OUT:
+            for packed in self._in.get(node, ()):
+                if rel is None or packed & TYPE_MASK == rel:
+                    yield packed >> TYPE_BITS, packed & TYPE_MASK, False
+
+    def _edge(self, node: int, neighbour: int, rel: int, outgoing: bool) -> Dict[str, str]:
+        source, target = (node, neighbour) if outgoing else (neighbour, node)
+        return {"from": self._node_names[source], "to": self._node_names[target],
+                "relationType": self._type_names[rel]}
+
+    def _filter(self, relation_type: Optional[str]) -> Tuple[bool, Optional[int]]:
+        """(possible, type number) for an optional relation type filter"""
+        if relation_type is None:
+            return True, None
+        rel = self._type_ids.get(relation_type)
+        return rel is not None, rel
+
+    def neighbors(self, name: str, depth: int = 1, direction: str = OUT,
+                  relation_type: Optional[str] = None, limit: int = 1000) -> Dict[str, Any]:
+        """Breadth-first neighbourhood up to ``depth`` hops, at most ``limit`` nodes.
+
+        Each node is returned with its distance and the edge it was reached
+        by. The walk stops as soon as ``limit`` nodes have been found, so it
+        never touches more than the edges of the nodes it expands.
+        """
+        with self._lock:
+            result = {"node": name, "nodes": [], "edges_visited": 0, "truncated": False}
+            start = self._node_ids.get(name)
+            possible, rel = self._filter(relation_type)
+            if start is None or not possible:
+                return result
+
+            seen = {start}
+            frontier = [start]
+            for level in range(1, depth + 1):
+                next_frontier = []
+                for node in frontier:
+                    for neighbour, edge_rel, outgoing in self._steps(node, direction, rel):
+                        result["edges_visited"] += 1
+                        if neighbour in seen:
+                            continue
+                        seen.add(neighbour)
+                        next_frontier.append(neighbour)
+                        result["nodes"].append({
+                            "id": self._node_names[neighbour],
+                            "depth": level,
+                            "via": self._edge(node, neighbour, edge_rel, outgoing),
+                        })
+                        if len(result["nodes"]) >= limit:
+                            result["truncated"] = True
+                            return result
+                if not next_frontier:
+                    break
+                frontier = next_frontier
+            return result
+
+    def find_path(self, source: str, target: str, max_depth: int = 6, direction: str = OUT,
+                  relation_type: Optional[str] = None) -> Dict[str, Any]:
+        """Shortest path of at most ``max_depth`` edges, by bidirectional breadth-first search.
+
+        The smaller frontier is expanded one level at a time, from the source
+        along ``direction`` and from the target against it, so the search
+        visits roughly the square root of the edges a one-sided search would.
+        """
+        with self._lock:
+            result = {"source": source, "target": target, "found": False, "path": [],
+                      "edges_visited": 0}
+            start = self._node_ids.get(source)
+            goal = self._node_ids.get(target)
+            possible, rel = self._filter(relation_type)
+            if start is None or goal is None or not possible:
+                return result
+            if start == goal:
+                result["found"] = True
+                return result
+
+            # node -> (neighbour it was reached from, relation type, stored as outgoing from it)
+            parents: List[Dict[int, Optional[Step]]] = [{start: None}, {goal: None}]
+            depths: List[Dict[int, int]] = [{start: 0}, {goal: 0}]
+            frontiers = [[start], [goal]]
+            directions = [direction, REVERSE[direction]]
+            levels = [0, 0]
+
+            while frontiers[0] and frontiers[1] and levels[0] + levels[1] < max_depth:
+                side = 0 if len(frontiers[0]) <= len(frontiers[1]) else 1
+                other = 1 - side
+                levels[side] += 1
+                best: Optional[Tuple[int, int]] = None
+                next_frontier = []
+                for node in frontiers[side]:
+                    for neighbour, edge_rel, outgoing in self._steps(node, directions[side], rel):
+                        result["edges_visited"] += 1
+                        if neighbour in parents[side]:
+                            continue
+                        parents[side][neighbour] = (node, edge_rel, outgoing)
+                        depths[side][neighbour] = levels[side]
+                        next_frontier.append(neighbour)
+                        if neighbour in parents[other]:
+                            length = levels[side] + depths[other][neighbour]
+                            if best is None or length < best[0]:
+                                best = (length, neighbour)
+                if best is not None and best[0] <= max_depth:
+                    result["found"] = True
+                    result["path"] = self._join(parents, best[1])
+                    return result
+                frontiers[side] = next_frontier
+            return result
+
+    def _join(self, parents: List[Dict[int, Optional[Step]]], meet: int) -> List[Dict[str, str]]:
+        """Edges from the source to ``meet`` followed by edges from ``meet`` to the target"""
+        path = []
+        for side in (0, 1):
+            half = []
+            node = meet
+            while parents[side][node] is not None:
+                previous, rel, outgoing = parents[side][node]
+                half.append(self._edge(previous, node, rel, outgoing))
+                node = previous
+            path += reversed(half) if side == 0 else half
+        return path
+
+    # Introspection
+
+    def degree(self, name: str) -> Dict[str, int]:
+        with self._lock:
+            node = self._node_ids.get(name)
+            if node is None:
+                return {"out": 0, "in": 0}
+            return {"out": len(self._out.get(node, ())), "in": len(self._in.get(node, ()))}
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "relations": self.edge_count,
+            "nodes": self.node_count,
+            "relation_types": len(self._type_names),
+            "garbage_bytes": self._garbage(),
+        }
+
+    # Compaction
+
+    def _garbage(self) -> int:
+        """Sealed log bytes beyond what the live edges need; an estimate"""
+        _, total = self._log.garbage()
+        return total - min(self._edge_bytes, total)
+
+    def maybe_compact(self, min_bytes: int = COMPACT_MIN_BYTES,
+                      min_ratio: float = COMPACT_MIN_RATIO) -> bool:
+        """Compact sealed segments once enough of them is garbage"""
+        _, total = self._log.garbage()
+        dead = self._garbage()
+        if dead < min_bytes or dead < total * min_ratio:
+            return False
+        return self.compact()
+
+    def compact(self) -> bool:
+        """Rewrite the sealed segments as relate records for the edges that exist now.
+
+        Relation records are not keyed, so there are no live records to copy:
+        the current graph is captured under the lock and written out in its
+        place. Every record sets or clears edges regardless of their previous
+        state, so replaying the captured graph and then the segments written
+        since it was captured ends in the same graph.
+        """
+        with self._compact_lock:
+            with self._lock:
+                sealed = self._log.sealed_segments()
+                if not sealed:
+                    return False
+                names = list(self._node_names)
+                types = list(self._type_names)
+                starts, packed = self._csr(self._out)
+
+            def records() -> Iterator[Dict[str, Any]]:
+                edges = []
+                for node, name in enumerate(names):
+                    for entry in packed[starts[node]:starts[node + 1]]:
+                        edges.append([name, names[entry >> TYPE_BITS], types[entry & TYPE_MASK]])
+                        if len(edges) == COMPACT_BATCH:
+                            yield {"op": "relate", "edges": edges}
+                            edges = []
+                if edges:
+                    yield {"op": "relate", "edges": edges}
+
+            plan = self._log.compact_rewrite(sealed, records())
+            with self._lock:
+                self._log.compact_install(plan)
+                self._mutations += 1
+            return True
+
+    # Snapshots
+
+    def _csr(self, adjacency: Dict[int, Set[int]]) -> Tuple[array, array]:
+        """Per-node start offsets into one array of packed entries; call under the lock"""
+        starts = array("q", [0])
+        packed = array("q")
+        for node in range(len(self._node_names)):
+            entries = adjacency.get(node)
+            if entries:
+                packed.extend(entries)
+            starts.append(len(packed))
+        return starts, packed
+
+    def _open_snapshot(self) -> Optional[Tuple[int, int]]:
+        """Load the graph from a valid snapshot, returning its log position"""
+        if not self.snapshot_path.exists():
+            return None
+        try:
+            with open(self.snapshot_path, "rb") as f:
+                data = f.read()
+            if data[:len(SNAPSHOT_MAGIC)] != SNAPSHOT_MAGIC:
+                raise ValueError("not a graph snapshot")
+            start, length = SNAPSHOT_TRAILER.unpack_from(data, len(SNAPSHOT_MAGIC))
+            header = json.loads(data[start:start + length])
+            position = tuple(header["position"])
+            if (header["version"] != SNAPSHOT_VERSION or len(position) != 2
+                    or not self._log.matches(header["segments"], position)):
+                print(f"⚠️ Snapshot {self.snapshot_path.name} does not match the relation log, "
+                      f"replaying the full log")
+                return None
+            sections = {name: data[offset:offset + size]
+                        for name, (offset, size) in header["sections"].items()}
+            names = json.loads(sections["names"])
+            types = json.loads(sections["types"])
+            adjacency = []
+            for name in ADJACENCY_SECTIONS:
+                values = array("q")
+                values.frombytes(sections[name])
+                adjacency.append(values)
+        except (OSError, ValueError, KeyError, TypeError, struct.error) as e:
+            print(f"⚠️ Ignoring unreadable snapshot {self.snapshot_path.name}: {e}")
+            return None
+
+        out_starts, out_packed, in_starts, in_packed = adjacency
+        for node, name in enumerate(names):
+            if name is None:
+                self._free_nodes.append(node)
+                continue
+            self._node_ids[name] = node
+            if out_starts[node] != out_starts[node + 1]:
+                self._out[node] = set(out_packed[out_starts[node]:out_starts[node + 1]])
+            if in_starts[node] != in_starts[node + 1]:
+                self._in[node] = set(in_packed[in_starts[node]:in_starts[node + 1]])
+        self._node_names = names
+        self._type_names = types
+        self._type_ids = {name: rel for rel, name in enumerate(types)}
+        self.edge_count = len(out_packed)
+        self.node_count = len(self._node_ids)
+        self._edge_bytes = header["edge_bytes"]
+        self.loaded_from_snapshot = True
+        return position
+
+    def write_snapshot(self, force: bool = False) -> bool:
+        """Persist the adjacency so the next open only replays the log written after it.
+
+        The graph is copied into flat arrays under the store lock and written
+        outside it. Returns False when nothing changed since the last snapshot.
+        """
+        with self._snapshot_lock:
+            with self._lock:
+                if not force and self._mutations == 0 and self.snapshot_path.exists():
+                    return False
+                header = {
+                    "version": SNAPSHOT_VERSION,
+                    "position": list(self._log.position()),
+                    "segments": self._log.fingerprint(),
+                    "edge_bytes": self._edge_bytes,
+                }
+                names = json.dumps(self._node_names).encode("utf-8")
+                types = json.dumps(self._type_names).encode("utf-8")
+                adjacency = self._csr(self._out) + self._csr(self._in)
+                mutations, self._mutations = self._mutations, 0
+
+            try:
+                self._write_snapshot(header, [("names", names), ("types", types)]
+                                     + [(name, values.tobytes()) for name, values
+                                        in zip(ADJACENCY_SECTIONS, adjacency)])
+            except Exception:
+                with self._lock:
+                    self._mutations += mutations
+                raise
+        return True
+
+    def _write_snapshot(self, header: Dict[str, Any], sections: List[Tuple[str, bytes]]):
+        temp_path = self.snapshot_path.with_name(self.snapshot_path.name + ".tmp")
+        with open(temp_path, "wb") as f:
+            f.write(SNAPSHOT_MAGIC)
+            f.write(SNAPSHOT_TRAILER.pack(0, 0))
+            offset = len(SNAPSHOT_MAGIC) + SNAPSHOT_TRAILER.size
+            header["sections"] = {}
+            for name, data in sections:
+                f.write(data)
+                header["sections"][name] = [offset, len(data)]
+                offset += len(data)
+            header_bytes = json.dumps(header).encode("utf-8")
+            f.write(header_bytes)
+            f.seek(len(SNAPSHOT_MAGIC))
+            f.write(SNAPSHOT_TRAILER.pack(offset, len(header_bytes)))
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(temp_path, self.snapshot_path)
+
+    def close(self):
+        self._writer.close()
+        with self._snapshot_lock, self._compact_lock, self._lock:
+            self._log.close()
+            self._marker_path.touch()
+            if self._log.fsync:
+                _fsync_dir(self._marker_path.parent)
@@ -0,0 +1,71 @@
+#!/usr/bin/env python3
+"""
+Per-request timing breakdown
+Phase timestamps for the request being served, carried in a context variable so storage code can
+report I/O time without knowing about HTTP
+"""
+
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Dict, Iterator, Optional
+
+# queue: body parsing and threadpool wait before the handler ran
+# handler: handler time excluding storage I/O
+# storage: entity log reads and writes
+# serialization: response validation and JSON encoding (plus any threadpool hop) up to
+#   the first response byte
+PHASES = ("queue", "handler", "storage", "serialization")
+
+
+class RequestTimer:
+    """Timestamps (perf_counter seconds) for one request.
+
+    Set by the timing middleware and route wrapper; ``storage`` accumulates
+    time spent in ``storage_io`` blocks, which may run on a worker thread.
+    """
+
+    __slots__ = ("arrival", "handler_start", "handler_end", "response_start", "storage")
+
+    def __init__(self):
+        self.arrival = time.perf_counter()
+        self.handler_start: Optional[float] = None
+        self.handler_end: Optional[float] = None
+        self.response_start: Optional[float] = None
+        self.storage = 0.0
+
+    def phases(self) -> Dict[str, float]:
+        """Phase durations in seconds; phases that did not happen are omitted"""
+        end = self.response_start or time.perf_counter()
+        result = {"total": end - self.arrival}
+        if self.handler_start is None:
+            return result
+        handler_end = self.handler_end or end
+        result["queue"] = self.handler_start - self.arrival
+        result["storage"] = self.storage
+        result["handler"] = max(handler_end - self.handler_start - self.storage, 0.0)
+        result["serialization"] = max(end - handler_end, 0.0)
+        return result
+
+    def server_timing_header(self) -> str:
+        """Render a ``Server-Timing`` header value (durations in milliseconds)"""
+        phases = self.phases()
+        return ", ".join(f"{name};dur={phases[name] * 1000:.3f}"
+                         for name in (*PHASES, "total") if name in phases)
+
+
+current_timer: ContextVar[Optional[RequestTimer]] = ContextVar("current_timer", default=None)
+
+
+@contextmanager
+def storage_io() -> Iterator[None]:
+    """Attribute the enclosed block to the current request's storage phase"""
+    timer = current_timer.get()
+    if timer is None:
+        yield
+        return
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        timer.storage += time.perf_counter() - start
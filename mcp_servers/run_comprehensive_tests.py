@@ -4,6 +4,7 @@ Comprehensive Test Runner for MCP Server
 Supports multiple test modes and CI/CD integration
 """
 
+import os
 import sys
 import argparse
 import subprocess
@@ -13,8 +14,9 @@ from pathlib import Path
 from typing import Dict, List, Any
 
 class TestRunner:
-    def __init__(self, server_url: str = "http://localhost:8000"):
+    def __init__(self, server_url: str = "http://localhost:8000", load_processes: int = 0):
         self.server_url = server_url
+        self.load_processes = load_processes
         self.results = {
             "timestamp": time.time(),
             "server_url": server_url,
@@ -135,105 +137,283 @@ class TestRunner:
             }
             return False
     
-    def run_load_tests(self, concurrent_users: int = 10, requests_per_user: int = 5) -> bool:
-        """Run load tests"""
+    def run_load_tests(self, concurrent_users: int = 10, requests_per_user: int = 5,
+                       processes: int = 0) -> bool:
+        """Run load tests from multiple worker processes (see load_driver.py)"""
         print(f"\n🏋️ Running load tests ({concurrent_users} users, {requests_per_user} requests each)...")
         
         try:
-            import requests
-            import threading
-            from queue import Queue
-            
-            results_queue = Queue()
-            
-            def user_simulation(user_id: int):
-                user_results = []
-                for i in range(requests_per_user):
-                    try:
-                        start = time.time()
-                        response = requests.get(f"{self.server_url}/health", timeout=10)
-                        end = time.time()
-                        
-                        user_results.append({
-                            "status_code": response.status_code,
-                            "response_time": end - start,
-                            "success": response.status_code == 200
-                        })
-                    except Exception as e:
-                        user_results.append({
-                            "status_code": None,
-                            "response_time": None,
-                            "success": False,
-                            "error": str(e)
-                        })
-                
-                results_queue.put(user_results)
-            
-            # Start concurrent users
-            threads = []
-            start_time = time.time()
+            from load_driver import print_report, run_load
+            
+            processes = processes or self.load_processes or min(os.cpu_count() or 1, concurrent_users, 8)
+            per_process = max(1, -(-concurrent_users // processes))
+            report = run_load(self.server_url, "health", processes=processes,
+                              concurrency=per_process,
+                              requests=concurrent_users * requests_per_user)
+            print_report(report)
+            
+            latency = report["latency"]
+            avg_response_time = report["accepted_latency"].get("mean_ms", 0) / 1000
+            total = report["total_requests"]
+            answered = report["successful_requests"] + report["rejected_requests"]
+            answered_rate = answered / total * 100 if total else 0.0
+            
+            # Load test passes if > 95% of requests were served or refused fast with 429/503
+            # (only errors and timeouts count against it) and accepted requests average < 1s
+            load_test_ok = (answered_rate > 95.0 and avg_response_time < 1.0
+                            and not report["failed_workers"])
             
-            for user_id in range(concurrent_users):
-                thread = threading.Thread(target=user_simulation, args=(user_id,))
-                threads.append(thread)
-                thread.start()
+            self.results["tests"]["load"] = {
+                "success": load_test_ok,
+                "total_requests": report["total_requests"],
+                "successful_requests": report["successful_requests"],
+                "failed_requests": report["failed_requests"],
+                "rejected_requests": report["rejected_requests"],
+                "success_rate": report["success_rate"],
+                "avg_response_time": avg_response_time,
+                "requests_per_second": report["requests_per_second"],
+                "goodput_per_second": report["goodput_per_second"],
+                "duration": report["duration"],
+                "processes": report["processes"],
+                "latency_ms": latency,
+                "accepted_latency_ms": report["accepted_latency"],
+                "per_worker": report["per_worker"],
+                "server_timing": report.get("server", {})
+            }
             
-            # Wait for all users to complete
-            for thread in threads:
-                thread.join()
+            if load_test_ok:
+                print("✅ Load tests passed")
+            else:
+                print("⚠️ Load tests show performance issues")
             
-            end_time = time.time()
+            return load_test_ok
             
-            # Collect and analyze results
-            all_results = []
-            while not results_queue.empty():
-                all_results.extend(results_queue.get())
+        except Exception as e:
+            print(f"❌ Load tests failed: {e}")
+            self.results["tests"]["load"] = {
+                "success": False,
+                "error": str(e)
+            }
+            return False
+    
+    def run_pipeline_load_tests(self, operations: int = 1000, batch_size: int = 50) -> bool:
+        """Compare individual redis calls with the same writes sent through /mcp/redis/pipeline"""
+        print(f"\n🚚 Running redis pipeline load test ({operations} operations, batches of {batch_size})...")
+        
+        try:
+            import requests
             
-            total_requests = len(all_results)
-            successful_requests = sum(1 for r in all_results if r["success"])
-            failed_requests = total_requests - successful_requests
+            session = requests.Session()
+            run_id = f"{int(time.time() * 1000)}"
+            
+            def workload(mode: str) -> List[Dict[str, Any]]:
+                commands = []
+                for i in range(operations):
+                    kind = i % 3
+                    if kind == 0:
+                        commands.append({"op": "hset", "key": f"load:{run_id}:{mode}:hash:{i % 20}",
+                                         "field": f"f{i}", "value": f"v{i}"})
+                    elif kind == 1:
+                        commands.append({"op": "sadd", "key": f"load:{run_id}:{mode}:set:{i % 20}",
+                                         "members": [f"m{i}"]})
+                    else:
+                        commands.append({"op": "zadd", "key": f"load:{run_id}:{mode}:zset:{i % 20}",
+                                         "members": {f"e{i}": float(i)}})
+                return commands
+            
+            # Individual calls, one HTTP round trip per operation
+            individual_failures = 0
+            start = time.time()
+            for command in workload("single"):
+                body = {k: v for k, v in command.items() if k != "op"}
+                response = session.post(f"{self.server_url}/mcp/redis/{command['op']}", json=body, timeout=10)
+                if response.status_code != 200:
+                    individual_failures += 1
+            individual_duration = time.time() - start
+            
+            # Same operations batched through the pipeline endpoint
+            pipeline_failures = 0
+            commands = workload("pipe")
+            start = time.time()
+            for offset in range(0, len(commands), batch_size):
+                response = session.post(f"{self.server_url}/mcp/redis/pipeline",
+                                        json={"commands": commands[offset:offset + batch_size]}, timeout=30)
+                if response.status_code != 200:
+                    pipeline_failures += len(commands[offset:offset + batch_size])
+                else:
+                    pipeline_failures += response.json()["failed"]
+            pipeline_duration = time.time() - start
+            
+            # Cleanup
+            keys = {c["key"] for mode in ("single", "pipe") for c in workload(mode)}
+            cleanup = [{"op": "delete", "key": key} for key in keys]
+            for offset in range(0, len(cleanup), 1000):
+                session.post(f"{self.server_url}/mcp/redis/pipeline",
+                             json={"commands": cleanup[offset:offset + 1000]}, timeout=30)
+            
+            individual_ops = operations / individual_duration if individual_duration > 0 else 0
+            pipeline_ops = operations / pipeline_duration if pipeline_duration > 0 else 0
+            speedup = pipeline_ops / individual_ops if individual_ops > 0 else 0
+            
+            print(f"📊 Pipeline load results:")
+            print(f"   Individual calls: {individual_ops:.0f} ops/s ({individual_failures} failed)")
+            print(f"   Pipelined:        {pipeline_ops:.0f} ops/s ({pipeline_failures} failed)")
+            print(f"   Speedup: {speedup:.1f}x")
+            
+            pipeline_ok = individual_failures == 0 and pipeline_failures == 0 and speedup > 1.0
+            
+            self.results["tests"]["pipeline_load"] = {
+                "success": pipeline_ok,
+                "operations": operations,
+                "batch_size": batch_size,
+                "individual_ops_per_second": individual_ops,
+                "pipeline_ops_per_second": pipeline_ops,
+                "individual_failures": individual_failures,
+                "pipeline_failures": pipeline_failures,
+                "speedup": speedup
+            }
             
-            if successful_requests > 0:
-                avg_response_time = sum(r["response_time"] for r in all_results if r["response_time"]) / successful_requests
+            if pipeline_ok:
+                print("✅ Pipeline load test passed")
             else:
-                avg_response_time = 0
+                print("⚠️ Pipeline load test found failures or no speedup")
             
-            success_rate = (successful_requests / total_requests) * 100 if total_requests > 0 else 0
-            total_duration = end_time - start_time
-            requests_per_second = total_requests / total_duration if total_duration > 0 else 0
+            return pipeline_ok
             
-            print(f"📊 Load test results:")
-            print(f"   Total requests: {total_requests}")
-            print(f"   Successful: {successful_requests}")
-            print(f"   Failed: {failed_requests}")
-            print(f"   Success rate: {success_rate:.1f}%")
-            print(f"   Avg response time: {avg_response_time:.3f}s")
-            print(f"   Requests per second: {requests_per_second:.1f}")
+        except Exception as e:
+            print(f"❌ Pipeline load test failed: {e}")
+            self.results["tests"]["pipeline_load"] = {
+                "success": False,
+                "error": str(e)
+            }
+            return False
+    
+    def run_notification_tests(self, subscribers: int = 200, events: int = 50) -> bool:
+        """Measure change feed fan-out latency with many SSE subscribers (see load_driver.py)"""
+        print(f"\n📣 Running notification fan-out test ({subscribers} subscribers, {events} events)...")
+        
+        try:
+            from load_driver import print_fanout_report, run_fanout
             
-            # Load test passes if success rate > 95% and avg response time < 1s
-            load_test_ok = success_rate > 95.0 and avg_response_time < 1.0
+            report = run_fanout(self.server_url, subscribers, events)
+            print_fanout_report(report)
             
-            self.results["tests"]["load"] = {
-                "success": load_test_ok,
-                "total_requests": total_requests,
-                "successful_requests": successful_requests,
-                "failed_requests": failed_requests,
-                "success_rate": success_rate,
-                "avg_response_time": avg_response_time,
-                "requests_per_second": requests_per_second,
-                "duration": total_duration
+            # Every subscriber must see every event, and the slowest one within a second
+            fanout_p99 = report["fanout_latency"].get("p99_ms", float("inf"))
+            notifications_ok = (report["missing_deliveries"] == 0 and not report["errors"]
+                                and fanout_p99 < 1000)
+            
+            self.results["tests"]["notifications"] = {"success": notifications_ok, **report}
+            
+            if notifications_ok:
+                print("✅ Notification fan-out test passed")
+            else:
+                print("⚠️ Notification fan-out lost events or was slow")
+            
+            return notifications_ok
+            
+        except Exception as e:
+            print(f"❌ Notification fan-out test failed: {e}")
+            self.results["tests"]["notifications"] = {
+                "success": False,
+                "error": str(e)
+            }
+            return False
+    
+    def run_soak_tests(self, duration: float, interval: float = 30.0,
+                       pid_file: str = "mcp_server.pid", concurrency: int = 8,
+                       processes: int = 2) -> bool:
+        """Drive a steady mixed workload for a long time, sampling the server process for leaks"""
+        print(f"\n🫧 Running soak test ({duration:.0f}s, sampling every {interval:.0f}s)...")
+        
+        try:
+            import threading
+            import requests
+            from load_driver import run_load
+            from soak_monitor import analyze_soak, read_pid, sample_process
+            
+            path = Path(pid_file)
+            if not path.exists():
+                path = Path(__file__).parent / pid_file
+            pid = read_pid(path)
+            print(f"🔎 Sampling server process {pid} from {path}")
+            
+            load = {}
+            
+            def drive():
+                load["report"] = run_load(self.server_url, "soak", processes=processes,
+                                          concurrency=concurrency, duration=duration,
+                                          window=interval)
+            
+            driver = threading.Thread(target=drive, name="soak-load", daemon=True)
+            samples = []
+            start = time.time()
+            driver.start()
+            while True:
+                sample = sample_process(pid)
+                sample["elapsed_s"] = sample["time"] - start
+                try:
+                    health = requests.get(f"{self.server_url}/health", timeout=5).json()
+                    sample["memory_entities"] = health["memory_entities"]
+                    sample["redis_keys"] = health["redis_keys"]
+                except (requests.RequestException, ValueError, KeyError):
+                    pass
+                samples.append(sample)
+                print(f"   {sample['elapsed_s']:7.0f}s  rss {sample['rss_bytes'] / 2**20:7.1f} MiB  "
+                      f"fds {sample['open_fds']:4d}  threads {sample['threads']:3d}")
+                driver.join(interval)
+                if not driver.is_alive():
+                    break
+            # Resources once load stops; kept out of the trends, which describe steady load
+            after_load = dict(sample_process(pid), elapsed_s=time.time() - start)
+            
+            # Remove the entity blocks the workload had not yet deleted itself
+            session = requests.Session()
+            for worker_id in range(processes):
+                session.post(f"{self.server_url}/mcp/memory/delete_entities",
+                             json={"namePrefix": f"soak{worker_id}b"}, timeout=60)
+            
+            report = load.get("report", {})
+            windows = report.get("windows", [])
+            trends = analyze_soak(samples, windows)
+            flagged = [metric for metric, trend in trends.items() if trend["growing"]]
+            soak_ok = (not flagged and bool(report.get("workers_reported"))
+                       and not report.get("failed_workers"))
+            
+            print("📊 Soak trends (after warm-up):")
+            for metric, trend in trends.items():
+                if "first" not in trend:
+                    print(f"   {metric}: not enough samples ({trend['samples']})")
+                    continue
+                marker = "⚠️" if trend["growing"] else "✅"
+                scale, unit = (2**20, " MiB") if metric.endswith("_bytes") else (1, "")
+                print(f"   {marker} {metric}: {trend['first'] / scale:.1f} -> "
+                      f"{trend['last'] / scale:.1f}{unit} "
+                      f"({trend['relative_growth'] * 100:+.1f}%, tau {trend['tau']:.2f})")
+            
+            self.results["tests"]["soak"] = {
+                "success": soak_ok,
+                "pid": pid,
+                "duration": duration,
+                "interval": interval,
+                "flagged": flagged,
+                "trends": trends,
+                "samples": samples,
+                "after_load": after_load,
+                "latency_windows": windows,
+                "load": {k: v for k, v in report.items() if k not in ("windows", "per_worker")},
             }
             
-            if load_test_ok:
-                print("✅ Load tests passed")
+            if soak_ok:
+                print("✅ Soak test found no resource growth or latency drift")
             else:
-                print("⚠️ Load tests show performance issues")
+                print(f"⚠️ Soak test flagged: {flagged or 'load driver failures'}")
             
-            return load_test_ok
+            return soak_ok
             
         except Exception as e:
-            print(f"❌ Load tests failed: {e}")
-            self.results["tests"]["load"] = {
+            print(f"❌ Soak test failed: {e}")
+            self.results["tests"]["soak"] = {
                 "success": False,
                 "error": str(e)
             }
@@ -321,7 +501,9 @@ class TestRunner:
         except Exception as e:
             print(f"⚠️ Failed to save results: {e}")
     
-    def run_all_tests(self, include_load: bool = False, include_security: bool = False) -> bool:
+    def run_all_tests(self, include_load: bool = False, include_security: bool = False,
+                      soak_duration: float = 0, soak_interval: float = 30.0,
+                      pid_file: str = "mcp_server.pid") -> bool:
         """Run all test suites"""
         print("🚀 Starting comprehensive test suite...")
         
@@ -335,10 +517,17 @@ class TestRunner:
         
         if include_load:
             tests_to_run.append(("load", self.run_load_tests))
+            tests_to_run.append(("pipeline_load", self.run_pipeline_load_tests))
+            tests_to_run.append(("notifications", self.run_notification_tests))
         
         if include_security:
             tests_to_run.append(("security", self.run_security_tests))
         
+        if soak_duration:
+            tests_to_run.append(("soak", lambda: self.run_soak_tests(
+                soak_duration, soak_interval, pid_file,
+                processes=self.load_processes or 2)))
+        
         all_passed = True
         
         for test_name, test_func in tests_to_run:
@@ -366,14 +555,25 @@ def main():
                        help="Output file for results (default: test_results.json)")
     parser.add_argument("--ci", action="store_true",
                        help="CI mode - exit with error code on failure")
+    parser.add_argument("--load-processes", type=int, default=0,
+                       help="Worker processes for load tests (default: one per core, up to 8)")
+    parser.add_argument("--soak", type=float, default=0, metavar="SECONDS",
+                       help="Also run a soak test of this many seconds (e.g. 14400 for 4 hours)")
+    parser.add_argument("--soak-interval", type=float, default=30.0,
+                       help="Seconds between server resource samples in the soak test (default: 30)")
+    parser.add_argument("--pid-file", default="mcp_server.pid",
+                       help="PID file of the server to sample during the soak test (default: mcp_server.pid)")
     
     args = parser.parse_args()
     
-    runner = TestRunner(args.url)
+    runner = TestRunner(args.url, load_processes=args.load_processes)
     
     success = runner.run_all_tests(
         include_load=args.include_load,
-        include_security=args.include_security
+        include_security=args.include_security,
+        soak_duration=args.soak,
+        soak_interval=args.soak_interval,
+        pid_file=args.pid_file
     )
     
     runner.save_results(args.output)
@@ -0,0 +1,271 @@
+#!/usr/bin/env python3
+"""
+Inverted index for Memory MCP search
+Maps tokens and character trigrams to sorted posting lists of entity sequence numbers
+"""
+
+import re
+from bisect import bisect_left, bisect_right, insort
+from array import array
+from functools import partial
+from typing import (Callable, Dict, Iterable, Iterator, List, MutableSequence, Optional, Sequence,
+                    Set, Tuple)
+
+TOKEN_PATTERN = re.compile(r"\w+")
+
+PHRASE = "phrase"
+SUBSTRING = "substring"
+
+# Substring queries intersect at most this many of their rarest trigrams; the
+# candidates are verified anyway, and more lists rarely narrow them further
+MAX_QUERY_GRAMS = 8
+
+# Trigram postings are far more numerous than token postings, so they are
+# packed int64 arrays rather than lists of Python ints
+_gram_posting = partial(array, "q")
+
+
+def tokenize(text: str) -> List[str]:
+    """Split text into lowercase word tokens"""
+    return TOKEN_PATTERN.findall(text.lower())
+
+
+def contains_phrase(fields: Iterable[str], phrase: List[str]) -> bool:
+    """Check whether any field contains the token sequence contiguously"""
+    width = len(phrase)
+    for field in fields:
+        tokens = tokenize(field)
+        first = phrase[0]
+        for i in range(len(tokens) - width + 1):
+            if tokens[i] == first and tokens[i:i + width] == phrase:
+                return True
+    return False
+
+
+def trigrams(text: str) -> Set[str]:
+    """Overlapping three-character substrings of the lowercased text"""
+    text = text.lower()
+    return {text[i:i + 3] for i in range(len(text) - 2)}
+
+
+def contains_substring(fields: Iterable[str], needle: str) -> bool:
+    """Check whether any field contains the lowercased ``needle``"""
+    return any(needle in field.lower() for field in fields)
+
+
+def _add_posting(postings: Dict[str, MutableSequence[int]], key: str, seq: int,
+                 new: Callable[[Iterable[int]], MutableSequence[int]] = list):
+    posting = postings.get(key)
+    if posting is None:
+        postings[key] = new((seq,))
+    elif posting[-1] < seq:
+        posting.append(seq)
+    else:
+        insort(posting, seq)
+
+
+def _remove_posting(postings: Dict[str, MutableSequence[int]], key: str, seq: int):
+    posting = postings.get(key)
+    if posting is None:
+        return
+    i = bisect_left(posting, seq)
+    if i < len(posting) and posting[i] == seq:
+        del posting[i]
+        if not posting:
+            del postings[key]
+
+
+def tail(posting: Sequence[int], after: int) -> Iterator[int]:
+    """Yield the values of an ascending posting list greater than ``after``"""
+    for i in range(bisect_right(posting, after), len(posting)):
+        yield posting[i]
+
+
+def _intersect(postings: List[Optional[Sequence[int]]], after: int = -1) -> Iterator[int]:
+    """Yield values greater than ``after`` present in every ascending posting list"""
+    if not postings or any(p is None for p in postings):
+        return
+
+    postings.sort(key=len)
+    driver, others = postings[0], postings[1:]
+    cursors = [0] * len(others)
+    for seq in tail(driver, after):
+        for i, other in enumerate(others):
+            cursors[i] = bisect_left(other, seq, cursors[i])
+            if cursors[i] == len(other):
+                return
+            if other[cursors[i]] != seq:
+                break
+        else:
+            yield seq
+
+
+def _rarest(postings: List[Optional[Sequence[int]]],
+            count: int = MAX_QUERY_GRAMS) -> List[Optional[Sequence[int]]]:
+    """The ``count`` shortest posting lists; a missing one means nothing can match"""
+    if any(p is None for p in postings):
+        return [None]
+    return sorted(postings, key=len)[:count]
+
+
+def merge_postings(base: Iterable[Tuple[str, Sequence[int]]], overlay: Dict[str, List[int]],
+                   deleted: Set[int], dirty: Set[str]) -> List[Tuple[str, array]]:
+    """Combine snapshot posting lists with newer in-memory ones.
+
+    Only keys in ``dirty`` can reference deleted sequence numbers, so every
+    other base posting list is copied as raw bytes without being scanned.
+    """
+    merged = []
+    seen = set()
+    for key, posting in base:
+        seen.add(key)
+        combined = array("q")
+        if key in dirty:
+            combined.extend(seq for seq in posting if seq not in deleted)
+        else:
+            combined.frombytes(posting.tobytes())
+        combined.extend(overlay.get(key, ()))
+        if combined:
+            merged.append((key, combined))
+    for key, posting in overlay.items():
+        if key not in seen:
+            merged.append((key, array("q", posting)))
+    return merged
+
+
+class InvertedIndex:
+    """Token, trigram and entity type posting lists kept in ascending sequence order.
+
+    Sequence numbers are assigned by the store in creation order, so every
+    posting list is append-only during ingest and intersections yield
+    matches oldest-first, which lets callers stop as soon as they have
+    enough results.
+
+    An index restored at startup keeps the snapshot's posting lists as a
+    read-only base layer (see ``snapshot.Snapshot``). Entities added since
+    live in the in-memory layer, whose sequence numbers are all newer, and
+    base entities that were removed are filtered out by sequence number.
+
+    Trigrams are taken from each lowercased field separately, so a substring
+    query's trigrams narrow the candidates to entities that have all of them
+    in some field; callers verify the substring on those candidates.
+    """
+
+    def __init__(self, base=None):
+        self.base = base
+        self.base_deleted: Set[int] = set()
+        self._tokens: Dict[str, List[int]] = {}
+        self._types: Dict[str, List[int]] = {}
+        self._grams: Dict[str, array] = {}
+        self._dirty_tokens: Set[str] = set()
+        self._dirty_types: Set[str] = set()
+        self._dirty_grams: Set[str] = set()
+
+    @staticmethod
+    def _keys(fields: Iterable[str]) -> Tuple[Set[str], Set[str]]:
+        fields = list(fields)
+        return ({t for field in fields for t in tokenize(field)},
+                {g for field in fields for g in trigrams(field)})
+
+    def add(self, seq: int, fields: Iterable[str], entity_type: str):
+        tokens, grams = self._keys(fields)
+        for token in tokens:
+            _add_posting(self._tokens, token, seq)
+        # _add_posting inlined: this loop runs for every trigram of every entity
+        postings = self._grams
+        for gram in grams:
+            posting = postings.get(gram)
+            if posting is None:
+                postings[gram] = _gram_posting((seq,))
+            elif posting[-1] < seq:
+                posting.append(seq)
+            else:
+                insort(posting, seq)
+        _add_posting(self._types, entity_type, seq)
+
+    def remove(self, seq: int, fields: Iterable[str], entity_type: str):
+        tokens, grams = self._keys(fields)
+        for token in tokens:
+            _remove_posting(self._tokens, token, seq)
+        for gram in grams:
+            _remove_posting(self._grams, gram, seq)
+        _remove_posting(self._types, entity_type, seq)
+
+    def remove_base(self, seq: int, fields: Iterable[str], entity_type: str):
+        """Hide an entity that lives in the snapshot layer"""
+        tokens, grams = self._keys(fields)
+        self.base_deleted.add(seq)
+        self._dirty_tokens.update(tokens)
+        self._dirty_grams.update(grams)
+        self._dirty_types.add(entity_type)
+
+    def candidates(self, tokens: List[str], entity_type: Optional[str] = None,
+                   after: int = -1) -> Iterator[int]:
+        """Yield sequence numbers greater than ``after`` present in every posting list, ascending"""
+        keys = set(tokens)
+        if self.base is not None:
+            postings = [self.base.posting(token) for token in keys]
+            if entity_type is not None:
+                postings.append(self.base.type_posting(entity_type))
+            for seq in _intersect(postings, after):
+                if seq not in self.base_deleted:
+                    yield seq
+
+        postings = [self._tokens.get(token) for token in keys]
+        if entity_type is not None:
+            postings.append(self._types.get(entity_type))
+        yield from _intersect(postings, after)
+
+    def substring_candidates(self, grams: Set[str], entity_type: Optional[str] = None,
+                             after: int = -1) -> Iterator[int]:
+        """Yield sequence numbers greater than ``after`` having every trigram, ascending.
+
+        Only the rarest ``MAX_QUERY_GRAMS`` trigrams are intersected, so the
+        result can include entities without the substring; callers verify.
+        """
+        if self.base is not None:
+            postings = _rarest([self.base.gram_posting(gram) for gram in grams])
+            if entity_type is not None:
+                postings.append(self.base.type_posting(entity_type))
+            for seq in _intersect(postings, after):
+                if seq not in self.base_deleted:
+                    yield seq
+
+        postings = _rarest([self._grams.get(gram) for gram in grams])
+        if entity_type is not None:
+            postings.append(self._types.get(entity_type))
+        yield from _intersect(postings, after)
+
+    def type_members(self, entity_type: str, after: int = -1) -> Iterator[int]:
+        if self.base is not None:
+            for seq in tail(self.base.type_posting(entity_type) or (), after):
+                if seq not in self.base_deleted:
+                    yield seq
+        yield from tail(self._types.get(entity_type, ()), after)
+
+    def capture(self) -> Dict[str, object]:
+        """Copy the in-memory layer so a snapshot can be merged without the store lock"""
+        return {
+            "tokens": {key: posting[:] for key, posting in self._tokens.items()},
+            "types": {key: posting[:] for key, posting in self._types.items()},
+            "grams": {key: posting[:] for key, posting in self._grams.items()},
+            "deleted": set(self.base_deleted),
+            "dirty_tokens": set(self._dirty_tokens),
+            "dirty_types": set(self._dirty_types),
+            "dirty_grams": set(self._dirty_grams),
+        }
+
+    def merged_postings(self, captured: Dict[str, object]
+                        ) -> Dict[str, List[Tuple[str, array]]]:
+        """Full tokens, types and grams posting lists for a captured state, base included"""
+        deleted = captured["deleted"]
+        return {table: merge_postings(self.base.iter_postings(table) if self.base is not None
+                                      else (), captured[table], deleted,
+                                      captured[f"dirty_{table}"])
+                for table in ("tokens", "types", "grams")}
+
+    @property
+    def vocabulary_size(self) -> int:
+        if self.base is not None:
+            return len(self.base.tokens) + sum(1 for t in self._tokens if self.base.posting(t) is None)
+        return len(self._tokens)
@@ -0,0 +1,200 @@
+#!/usr/bin/env python3
+"""
+Integrated MCP server metrics
+Server-Timing headers and Prometheus text-format counters and histograms per route
+"""
+
+import functools
+import inspect
+import time
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from fastapi.routing import APIRoute
+
+from request_timing import PHASES, RequestTimer, current_timer
+
+DURATION_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+LabelKey = Tuple[Tuple[str, str], ...]
+
+
+def _labels(**labels: str) -> LabelKey:
+    return tuple(sorted(labels.items()))
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_labels(key: LabelKey, extra: Optional[Tuple[str, str]] = None) -> str:
+    items = list(key) + ([extra] if extra else [])
+    if not items:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in items) + "}"
+
+
+def _format_value(value: float) -> str:
+    return repr(float(value)) if value != int(value) else str(int(value))
+
+
+class Histogram:
+    """Cumulative-bucket histogram per label set, Prometheus style"""
+
+    def __init__(self, name: str, help_text: str, buckets=DURATION_BUCKETS):
+        self.name = name
+        self.help = help_text
+        self.buckets = buckets
+        self._series: Dict[LabelKey, List[float]] = {}
+
+    def observe(self, key: LabelKey, value: float):
+        series = self._series.get(key)
+        if series is None:
+            # One counter per bucket, then +Inf, sum and count
+            series = self._series[key] = [0.0] * (len(self.buckets) + 3)
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                series[i] += 1
+        series[-3] += 1
+        series[-2] += value
+        series[-1] += 1
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        for key, series in sorted(self._series.items()):
+            for bound, count in zip(self.buckets, series):
+                lines.append(f"{self.name}_bucket{_format_labels(key, ('le', str(bound)))} "
+                             f"{_format_value(count)}")
+            lines.append(f"{self.name}_bucket{_format_labels(key, ('le', '+Inf'))} "
+                         f"{_format_value(series[-3])}")
+            lines.append(f"{self.name}_sum{_format_labels(key)} {series[-2]!r}")
+            lines.append(f"{self.name}_count{_format_labels(key)} {_format_value(series[-1])}")
+        return lines
+
+
+class Counter:
+    def __init__(self, name: str, help_text: str):
+        self.name = name
+        self.help = help_text
+        self._values: Dict[LabelKey, float] = {}
+
+    def inc(self, key: LabelKey, amount: float = 1):
+        self._values[key] = self._values.get(key, 0) + amount
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} counter"]
+        for key, value in sorted(self._values.items()):
+            lines.append(f"{self.name}{_format_labels(key)} {_format_value(value)}")
+        return lines
+
+
+class ServerMetrics:
+    """Request metrics plus gauges sampled at scrape time.
+
+    Observations happen on the event loop thread (in the timing middleware),
+    so no locking is needed.
+    """
+
+    def __init__(self):
+        self.requests = Counter("mcp_requests_total", "Requests served by route, method and status")
+        self.duration = Histogram("mcp_request_duration_seconds",
+                                  "Arrival to first response byte by route")
+        self.phases = Histogram("mcp_request_phase_seconds",
+                                "Time per request phase (queue, handler, storage, serialization)")
+        self._gauges: List[Tuple[str, str, Callable[[], float]]] = []
+
+    def gauge(self, name: str, help_text: str, read: Callable[[], float]):
+        self._gauges.append((name, help_text, read))
+
+    def observe(self, route: str, method: str, status: int, timer: RequestTimer):
+        phases = timer.phases()
+        self.requests.inc(_labels(route=route, method=method, status=str(status)))
+        self.duration.observe(_labels(route=route), phases["total"])
+        for phase in PHASES:
+            if phase in phases:
+                self.phases.observe(_labels(route=route, phase=phase), phases[phase])
+
+    def render(self) -> str:
+        lines = self.requests.render() + self.duration.render() + self.phases.render()
+        for name, help_text, read in self._gauges:
+            lines += [f"# HELP {name} {help_text}", f"# TYPE {name} gauge",
+                      f"{name} {_format_value(read())}"]
+        return "\n".join(lines) + "\n"
+
+
+class TimingMiddleware:
+    """ASGI middleware that times each request, adds ``Server-Timing`` and records metrics"""
+
+    def __init__(self, app, metrics: ServerMetrics):
+        self.app = app
+        self.metrics = metrics
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        timer = RequestTimer()
+        token = current_timer.set(timer)
+        status = 500
+
+        async def send_with_timing(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                timer.response_start = time.perf_counter()
+                status = message["status"]
+                headers = list(message.get("headers", []))
+                headers.append((b"server-timing", timer.server_timing_header().encode("latin-1")))
+                message = {**message, "headers": headers}
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            current_timer.reset(token)
+            route = scope.get("route")
+            self.metrics.observe(getattr(route, "path", "unmatched"), scope["method"], status, timer)
+
+
+def _timed(endpoint: Callable, render: Optional[Callable[[Any], Any]] = None) -> Callable:
+    """Wrap an endpoint to mark when its body starts and ends.
+
+    ``render``, when given, turns the return value into a response after the
+    handler has been marked finished, so its cost lands in the serialization
+    phase.
+    """
+    if inspect.iscoroutinefunction(endpoint):
+        @functools.wraps(endpoint)
+        async def async_wrapper(*args, **kwargs):
+            timer = current_timer.get()
+            if timer is not None:
+                timer.handler_start = time.perf_counter()
+            try:
+                result = await endpoint(*args, **kwargs)
+            finally:
+                if timer is not None:
+                    timer.handler_end = time.perf_counter()
+            return render(result) if render is not None else result
+        return async_wrapper
+
+    @functools.wraps(endpoint)
+    def sync_wrapper(*args, **kwargs):
+        timer = current_timer.get()
+        if timer is not None:
+            timer.handler_start = time.perf_counter()
+        try:
+            result = endpoint(*args, **kwargs)
+        finally:
+            if timer is not None:
+                timer.handler_end = time.perf_counter()
+        return render(result) if render is not None else result
+    return sync_wrapper
+
+
+class TimedRoute(APIRoute):
+    """APIRoute whose endpoint records handler start and end on the request timer"""
+
+    # Subclasses may set this (as a staticmethod) to render endpoint results themselves
+    render_result: Optional[Callable[[Any], Any]] = None
+
+    def __init__(self, path: str, endpoint: Callable[..., Any], **kwargs):
+        super().__init__(path, _timed(endpoint, self.render_result), **kwargs)
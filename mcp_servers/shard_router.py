@@ -0,0 +1,655 @@
+#!/usr/bin/env python3
+"""
+Sharded MCP server: consistent-hash router and launcher
+Runs N shard processes and a stateless router that forwards each request to its owning shard
+"""
+
+import argparse
+import asyncio
+import heapq
+import os
+import signal
+import subprocess
+import sys
+import threading
+import time
+import urllib.request
+from contextlib import asynccontextmanager
+from datetime import datetime
+from itertools import islice
+from pathlib import Path
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple
+
+import aiohttp
+import uvicorn
+from fastapi import FastAPI, HTTPException, Query, Request
+from fastapi.responses import PlainTextResponse, Response, StreamingResponse
+
+from body_budget import BodyBudgetMiddleware
+from codec import JSON, MSGPACK, CodecRoute, decode_json, encode_json
+from integrated_mcp_server import (HOST, MAX_BODY_BYTES, MAX_BODY_TOKENS, MAX_STRING_BYTES,
+                                   MAX_SUBSCRIBE_PATTERNS, NDJSON, PORT, READY_FIFO,
+                                   SEARCH_STREAM_PAGE, SSE, SSE_KEEPALIVE, STORAGE_DIR,
+                                   DeleteEntitiesRequest, DeleteEntityRequest, Entity,
+                                   OpenNodesRequest, PipelineRequest, RelationsRequest,
+                                   SearchRequest, parse_pipeline, signal_ready)
+from lru import hit_ratio
+from memory_store import new_entity_id
+from server_metrics import ServerMetrics, TimingMiddleware
+from request_timing import storage_io
+from sharding import HashRing
+
+SHARD_URLS = [url for url in os.environ.get("MCP_SHARD_URLS", "").split(",") if url]
+SHARD_TIMEOUT = float(os.environ.get("MCP_SHARD_TIMEOUT", "60"))
+SHARD_CONNECTIONS = int(os.environ.get("MCP_SHARD_CONNECTIONS", "256"))
+ROUTER_SHUTDOWN_TIMEOUT = 5
+SHARD_START_TIMEOUT = float(os.environ.get("MCP_READY_TIMEOUT", "60"))
+# How often the router refreshes the shard totals behind its /metrics gauges
+HEALTH_INTERVAL = float(os.environ.get("MCP_ROUTER_HEALTH_INTERVAL", "1"))
+# The knowledge graph is not partitioned; all relations live on this shard
+GRAPH_SHARD = 0
+
+# Redis commands that touch exactly one key, forwarded to the shard owning it
+KEYED_REDIS_COMMANDS = ("hset", "hget", "sadd", "smembers", "zadd", "zrange",
+                        "expire", "ttl", "delete")
+RELAYED_HEADERS = ("content-type", "retry-after")
+
+
+def encode_cursors(seqs: List[int]) -> str:
+    """One cursor over every shard: each shard's last sequence number, offset by one"""
+    return ".".join(format(seq + 1, "x") for seq in seqs)
+
+
+def decode_cursors(cursor: Optional[str], shards: int) -> List[int]:
+    if cursor is None:
+        return [-1] * shards
+    parts = cursor.split(".")
+    try:
+        seqs = [int(part, 16) - 1 for part in parts]
+    except ValueError:
+        seqs = []
+    if len(seqs) != shards or any(seq < -1 for seq in seqs) or encode_cursors(seqs) != cursor:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    return seqs
+
+
+def sum_numbers(values: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """Add up numeric fields (recursively) across per-shard stats dicts"""
+    total: Dict[str, Any] = {}
+    for value in values:
+        for name, item in value.items():
+            if isinstance(item, bool) or not isinstance(item, (int, float, dict)):
+                continue
+            if isinstance(item, dict):
+                total[name] = sum_numbers([total.get(name, {}), item])
+            else:
+                total[name] = total.get(name, 0) + item
+    return total
+
+
+class ShardClient:
+    """HTTP connections from one router process to every shard"""
+
+    def __init__(self, urls: List[str]):
+        self.urls = urls
+        self.session: Optional[aiohttp.ClientSession] = None
+
+    async def start(self):
+        connector = aiohttp.TCPConnector(limit=0, limit_per_host=SHARD_CONNECTIONS)
+        self.session = aiohttp.ClientSession(connector=connector, timeout=aiohttp.ClientTimeout(
+            total=SHARD_TIMEOUT))
+
+    async def close(self):
+        if self.session is not None:
+            await self.session.close()
+
+    async def send(self, shard: int, method: str, path: str, body: Optional[bytes],
+                   headers: Dict[str, str]) -> Tuple[int, Dict[str, str], bytes]:
+        try:
+            async with self.session.request(method, self.urls[shard] + path, data=body,
+                                            headers=headers) as response:
+                relayed = {name: response.headers[name] for name in RELAYED_HEADERS
+                           if name in response.headers}
+                return response.status, relayed, await response.read()
+        except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+            raise HTTPException(status_code=502,
+                                detail=f"Shard {shard} unavailable: {type(e).__name__}")
+
+    async def forward(self, shard: int, request: Request, path: Optional[str] = None) -> Response:
+        """Send the request's body as-is to ``shard`` and relay its response"""
+        headers = {"content-type": MSGPACK if request.body_codec == MSGPACK else JSON,
+                   "accept": request.headers.get("accept", JSON)}
+        body = await request.body()
+        with storage_io():
+            status, relayed, content = await self.send(shard, request.method,
+                                                       path or request.url.path, body, headers)
+        return Response(content, status_code=status, headers=relayed)
+
+    async def call_all(self, calls: Dict[int, Tuple[str, Optional[Any]]]
+                       ) -> Dict[int, Any]:
+        """Run {shard: (path, JSON payload or None for GET)} concurrently; returns decoded bodies.
+
+        Any shard answering with an error status fails the whole call with that status.
+        """
+        async def one(shard: int, path: str, payload: Any):
+            method = "GET" if payload is None else "POST"
+            body = None if payload is None else encode_json(payload)
+            return await self.send(shard, method, path, body, {"content-type": JSON})
+
+        shards = list(calls)
+        with storage_io():
+            responses = await asyncio.gather(*(one(shard, *calls[shard]) for shard in shards))
+        results = {}
+        for shard, (status, relayed, content) in zip(shards, responses):
+            data = decode_json(content) if content else None
+            if status >= 400:
+                detail = data.get("detail") if isinstance(data, dict) else None
+                raise HTTPException(status_code=status, detail=detail or f"Shard {shard} failed",
+                                    headers={k: v for k, v in relayed.items()
+                                             if k == "retry-after"} or None)
+            results[shard] = data
+        return results
+
+    async def call(self, shard: int, path: str, payload: Optional[Any] = None) -> Any:
+        return (await self.call_all({shard: (path, payload)}))[shard]
+
+    async def subscribe(self, shard: int, patterns: List[str]) -> aiohttp.ClientResponse:
+        params = [("pattern", pattern) for pattern in patterns]
+        try:
+            response = await self.session.get(self.urls[shard] + "/mcp/redis/subscribe",
+                                              params=params,
+                                              timeout=aiohttp.ClientTimeout(total=None))
+        except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+            raise HTTPException(status_code=502,
+                                detail=f"Shard {shard} unavailable: {type(e).__name__}")
+        return response
+
+
+async def merged_sse(responses: List[aiohttp.ClientResponse], patterns: List[str],
+                     keepalive: float) -> AsyncIterator[bytes]:
+    """One SSE stream from every shard's change feed.
+
+    Event ids become ``<shard>.<seq>`` since sequence numbers are per shard.
+    Reading stalls while the client is slow, so a lagging client overflows
+    on the shards and gets their ``overflow`` event. The stream ends when
+    any shard's stream does.
+    """
+    frames: asyncio.Queue = asyncio.Queue(64)
+
+    async def read(shard: int, response: aiohttp.ClientResponse):
+        frame: List[bytes] = []
+        try:
+            async for line in response.content:
+                line = line.rstrip(b"\r\n")
+                if line:
+                    frame.append(line)
+                    continue
+                if frame and frame[0].startswith(b"event: overflow"):
+                    await frames.put(b"event: overflow\ndata: {}\n\n")
+                    return
+                if frame and frame[0].startswith(b"id: "):
+                    frame[0] = b"id: %d.%s" % (shard, frame[0][4:])
+                    await frames.put(b"\n".join(frame) + b"\n\n")
+                frame = []
+        except aiohttp.ClientError:
+            pass
+        finally:
+            await frames.put(None)
+
+    readers = [asyncio.create_task(read(shard, response))
+               for shard, response in enumerate(responses)]
+    try:
+        yield b"event: subscribed\ndata: " + encode_json({"patterns": patterns}) + b"\n\n"
+        while True:
+            try:
+                frame = await asyncio.wait_for(frames.get(), keepalive)
+            except asyncio.TimeoutError:
+                yield b": keepalive\n\n"
+                continue
+            if frame is None:
+                return
+            yield frame
+            if frame.startswith(b"event: overflow"):
+                return
+    finally:
+        for reader in readers:
+            reader.cancel()
+        for response in responses:
+            response.close()
+
+
+def create_router_app(shard_urls: Optional[List[str]] = None) -> FastAPI:
+    """Build the router in front of ``shard_urls`` (default: ``MCP_SHARD_URLS``).
+
+    The router holds no data, so any number of router processes can serve
+    the same shards. Entity IDs are picked here so their owning shard is
+    known from the ID alone.
+    """
+    urls = list(shard_urls or SHARD_URLS)
+    if not urls:
+        raise ValueError("No shards configured (set MCP_SHARD_URLS)")
+    ring = HashRing(len(urls))
+    shards = ShardClient(urls)
+    every_shard = range(len(urls))
+    totals = {"memory_entities": 0, "redis_keys": 0, "healthy_shards": 0}
+    # Monotonic time of the last completed health check
+    checked: Dict[str, Optional[float]] = {"at": None}
+    # Cleared when edges of deleted entities may have been left on the graph shard
+    graph = {"pruned": False}
+
+    async def check_health():
+        checks = await asyncio.gather(*(shards.send(shard, "GET", "/health", None, {})
+                                        for shard in every_shard), return_exceptions=True)
+        healthy = [decode_json(check[2]) for check in checks
+                   if not isinstance(check, BaseException) and check[0] == 200]
+        totals.update(memory_entities=sum(h["memory_entities"] for h in healthy),
+                      redis_keys=sum(h["redis_keys"] for h in healthy),
+                      healthy_shards=len(healthy))
+        checked["at"] = time.monotonic()
+
+    async def missing_entities(entity_ids: List[str]) -> List[str]:
+        found = await shards.call_all({
+            shard: ("/internal/memory/missing", {"entity_ids": group})
+            for shard, group in ring.group(entity_ids).items()})
+        return [entity_id for result in found.values() for entity_id in result["missing"]]
+
+    async def prune_graph():
+        """Remove relations of entities that no longer exist on their shards.
+
+        Deleting an entity and removing its edges are separate requests to
+        separate shards, so a failure in between leaves edges behind. The
+        health loop runs this when the router starts and after such a failure.
+        """
+        linked = (await shards.call(GRAPH_SHARD, "/internal/graph/nodes"))["entity_ids"]
+        gone = await missing_entities(linked)
+        if gone:
+            await shards.call(GRAPH_SHARD, "/internal/graph/remove_nodes", {"entity_ids": gone})
+
+    async def health_loop():
+        while True:
+            await check_health()
+            if not graph["pruned"]:
+                try:
+                    await prune_graph()
+                    graph["pruned"] = True
+                except HTTPException:
+                    pass
+            await asyncio.sleep(HEALTH_INTERVAL)
+
+    @asynccontextmanager
+    async def lifespan(app: FastAPI):
+        await shards.start()
+        task = asyncio.create_task(health_loop())
+        yield
+        task.cancel()
+        await shards.close()
+
+    app = FastAPI(title="Integrated MCP Server (sharded)",
+                  description="Consistent-hash router over Memory MCP and Redis MCP shards",
+                  lifespan=lifespan)
+    app.router.route_class = CodecRoute
+    # "storage" in the router's Server-Timing and metrics is time spent waiting on shards
+    metrics = ServerMetrics()
+    metrics.gauge("mcp_router_shards", "Shards behind this router", lambda: len(urls))
+    metrics.gauge("mcp_router_healthy_shards", "Shards that answered the last health check",
+                  lambda: totals["healthy_shards"])
+    metrics.gauge("mcp_memory_entities", "Entities across all shards",
+                  lambda: totals["memory_entities"])
+    metrics.gauge("mcp_redis_keys", "Redis keys across all shards", lambda: totals["redis_keys"])
+    app.add_middleware(BodyBudgetMiddleware, max_bytes=MAX_BODY_BYTES,
+                       max_tokens=MAX_BODY_TOKENS, max_string_bytes=MAX_STRING_BYTES)
+    app.add_middleware(TimingMiddleware, metrics=metrics)
+    app.state.ring = ring
+    app.state.shards = shards
+    app.state.metrics = metrics
+
+    @app.get("/health")
+    async def health():
+        """The last background health check, so a probe never fans out to the shards"""
+        age = time.monotonic() - checked["at"] if checked["at"] is not None else None
+        body = {
+            "status": "healthy" if totals["healthy_shards"] == len(urls) else "degraded",
+            **totals,
+            "shards": len(urls),
+            "age_seconds": age,
+        }
+        if totals["healthy_shards"] < len(urls):
+            return Response(encode_json(body), status_code=503, media_type=JSON)
+        return body
+
+    @app.get("/metrics")
+    async def prometheus_metrics():
+        return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4")
+
+    @app.get("/status")
+    async def status():
+        statuses = await shards.call_all({shard: ("/status", None) for shard in every_shard})
+        ordered = [statuses[shard] for shard in every_shard]
+        memory = sum_numbers([s["memory_mcp"] for s in ordered])
+        memory["graph"] = ordered[GRAPH_SHARD]["memory_mcp"]["graph"]
+        # Ratios do not add up across shards; recompute them from the summed counters
+        for cache in memory.get("cache", {}).values():
+            cache["hit_ratio"] = hit_ratio(cache["hits"], cache["misses"])
+        return {
+            "status": "running",
+            "memory_mcp": memory,
+            "redis_mcp": sum_numbers([s["redis_mcp"] for s in ordered]),
+            "sequential_thinking": ordered[GRAPH_SHARD]["sequential_thinking"],
+            "shards": [{"url": url, **s} for url, s in zip(urls, ordered)],
+        }
+
+    # Memory MCP
+
+    @app.post("/mcp/memory/create_entities")
+    async def create_entities(entities: List[Entity]):
+        if not entities:
+            raise HTTPException(status_code=400, detail="No entities supplied")
+        # Sorted IDs and one timestamp keep the batch in order when shards' results are merged
+        entity_ids = sorted(new_entity_id() for _ in entities)
+        created_at = datetime.now().isoformat()
+        batches: Dict[int, List[int]] = {}
+        for index, entity_id in enumerate(entity_ids):
+            batches.setdefault(ring.shard_for(entity_id), []).append(index)
+        created = await shards.call_all({
+            shard: ("/internal/memory/create_entities",
+                    [{**entities[i].model_dump(), "entity_id": entity_ids[i],
+                      "created_at": created_at} for i in indexes])
+            for shard, indexes in batches.items()})
+        results: List[Any] = [None] * len(entities)
+        for shard, indexes in batches.items():
+            for index, entity in zip(indexes, created[shard]["entities"]):
+                results[index] = entity
+        return {"entities": results, "count": len(results)}
+
+    async def search_merged(request: SearchRequest, limit: int,
+                            after: List[int]) -> Tuple[List[Dict[str, Any]], List[int]]:
+        """The first ``limit`` matches across shards in creation order, and the new cursors"""
+        if limit <= 0:
+            return [], after
+        pages = await shards.call_all({
+            shard: ("/internal/memory/search_matches",
+                    {"query": request.query, "limit": limit, "entityType": request.entityType,
+                     "match": request.match, "after": after[shard]})
+            for shard in every_shard})
+        # Each shard's page is already in its own creation order; merge keeps that order
+        streams = [[(node.get("created_at") or "", node["entity_id"], shard, seq, node)
+                    for seq, node in zip(pages[shard]["seqs"], pages[shard]["nodes"])]
+                   for shard in every_shard]
+        cursors = list(after)
+        nodes = []
+        for _, _, shard, seq, node in islice(heapq.merge(*streams), limit):
+            cursors[shard] = seq
+            nodes.append(node)
+        return nodes, cursors
+
+    @app.post("/mcp/memory/search_nodes")
+    async def search_nodes(request: SearchRequest, http_request: Request):
+        after = decode_cursors(request.cursor, len(urls))
+        if NDJSON in http_request.headers.get("accept", ""):
+            return StreamingResponse(stream_search(request, after), media_type=NDJSON)
+        nodes, cursors = await search_merged(request, request.limit, after)
+        next_cursor = encode_cursors(cursors) if len(nodes) == request.limit else None
+        return {"query": request.query, "count": len(nodes), "nodes": nodes,
+                "next_cursor": next_cursor}
+
+    async def stream_search(request: SearchRequest, after: List[int]) -> AsyncIterator[bytes]:
+        count = 0
+        while count < request.limit:
+            size = min(SEARCH_STREAM_PAGE, request.limit - count)
+            nodes, after = await search_merged(request, size, after)
+            count += len(nodes)
+            if nodes:
+                yield b"".join(encode_json(node) + b"\n" for node in nodes)
+            if len(nodes) < size:
+                break
+        next_cursor = encode_cursors(after) if count and count == request.limit else None
+        yield encode_json({"query": request.query, "count": count,
+                           "next_cursor": next_cursor}) + b"\n"
+
+    @app.post("/mcp/memory/open_nodes")
+    async def open_nodes(request: OpenNodesRequest):
+        entity_ids = list(dict.fromkeys(request.entity_ids))
+        opened = await shards.call_all({
+            shard: ("/mcp/memory/open_nodes", {"entity_ids": group})
+            for shard, group in ring.group(entity_ids).items()})
+        found = {node["entity_id"]: node for result in opened.values()
+                 for node in result["nodes"]}
+        nodes = [found[entity_id] for entity_id in entity_ids if entity_id in found]
+        missing = [entity_id for entity_id in entity_ids if entity_id not in found]
+        return {"nodes": nodes, "count": len(nodes), "missing": missing}
+
+    async def drop_edges(entity_ids: List[str], remote_only: bool = True):
+        """Remove relations of deleted entities; the graph shard drops those of its own"""
+        remote = [entity_id for entity_id in entity_ids
+                  if not remote_only or ring.shard_for(entity_id) != GRAPH_SHARD]
+        if remote:
+            try:
+                await shards.call(GRAPH_SHARD, "/internal/graph/remove_nodes",
+                                  {"entity_ids": remote})
+            except HTTPException:
+                # The health loop removes them once the graph shard answers again
+                graph["pruned"] = False
+                raise
+
+    @app.post("/mcp/memory/delete_entity")
+    async def delete_entity(request: DeleteEntityRequest, http_request: Request):
+        response = await shards.forward(ring.shard_for(request.entity_id), http_request)
+        if response.status_code == 200:
+            await drop_edges([request.entity_id])
+        return response
+
+    @app.post("/mcp/memory/delete_entities")
+    async def delete_entities(request: DeleteEntitiesRequest):
+        groups = ring.group(dict.fromkeys(request.entity_ids))
+        targets = every_shard if request.namePrefix is not None else groups
+        results = await shards.call_all({
+            shard: ("/internal/memory/delete_entities",
+                    {"entity_ids": groups.get(shard, []), "namePrefix": request.namePrefix})
+            for shard in targets})
+        deleted = [entity_id for result in results.values() for entity_id in result["deleted"]]
+        await drop_edges(deleted)
+        return {"deleted": len(deleted)}
+
+    @app.post("/mcp/memory/create_relations")
+    async def create_relations(request: RelationsRequest, http_request: Request):
+        """Check the endpoints on their shards, add the edges, then check again.
+
+        An entity deleted between the first check and the commit on the graph
+        shard has already had its edges removed, so the second check drops
+        the edges just added to it and fails the request.
+        """
+        nodes = sorted({node for r in request.relations for node in (r.source, r.to)})
+        missing = await missing_entities(nodes)
+        if not missing:
+            response = await shards.forward(GRAPH_SHARD, http_request,
+                                            "/internal/graph/create_relations")
+            if response.status_code != 200:
+                return response
+            missing = await missing_entities(nodes)
+            if not missing:
+                return response
+            await drop_edges(missing, remote_only=False)
+        raise HTTPException(status_code=404,
+                            detail=f"Entity not found: {', '.join(sorted(missing))}")
+
+    async def to_graph_shard(request: Request):
+        return await shards.forward(GRAPH_SHARD, request)
+
+    for path in ("/mcp/memory/delete_relations", "/mcp/memory/neighbors",
+                 "/mcp/memory/find_path"):
+        app.add_api_route(path, to_graph_shard, methods=["POST"])
+
+    # Sequential thinking history is one session, kept with the graph on shard 0
+    for path in ("/mcp/thinking/thought", "/mcp/thinking/history", "/mcp/thinking/branch",
+                 "/mcp/thinking/revisions", "/mcp/thinking/clear"):
+        app.add_api_route(path, to_graph_shard, methods=["POST"])
+    app.add_api_route("/mcp/thinking/summary", to_graph_shard, methods=["GET"])
+
+    # Redis MCP
+
+    async def to_key_owner(request: Request):
+        """Route by the body's ``key``; bodies without one go to shard 0 to be rejected there"""
+        try:
+            key = (await request.json()).get("key")
+        except Exception:
+            key = None
+        shard = ring.shard_for_redis_key(key) if isinstance(key, str) else 0
+        return await shards.forward(shard, request)
+
+    for command in KEYED_REDIS_COMMANDS:
+        app.add_api_route(f"/mcp/redis/{command}", to_key_owner, methods=["POST"])
+
+    @app.post("/mcp/redis/delete_prefix")
+    async def delete_prefix(http_request: Request):
+        body = await http_request.json()
+        results = await shards.call_all({shard: ("/mcp/redis/delete_prefix", body)
+                                         for shard in every_shard})
+        return {"prefix": results[0]["prefix"],
+                "deleted": sum(result["deleted"] for result in results.values())}
+
+    @app.get("/mcp/redis/subscribe")
+    async def subscribe(pattern: List[str] = Query(..., min_length=1,
+                                                   max_length=MAX_SUBSCRIBE_PATTERNS)):
+        """Change feed of every shard merged into one Server-Sent Events stream"""
+        responses = []
+        try:
+            for shard in every_shard:
+                response = await shards.subscribe(shard, pattern)
+                responses.append(response)
+                if response.status != 200:
+                    content = await response.read()
+                    return Response(content, status_code=response.status, headers={
+                        name: response.headers[name] for name in RELAYED_HEADERS
+                        if name in response.headers})
+        except BaseException:
+            for response in responses:
+                response.close()
+            raise
+        return StreamingResponse(merged_sse(responses, pattern, SSE_KEEPALIVE),
+                                 media_type=SSE, headers={"Cache-Control": "no-cache"})
+
+    @app.post("/mcp/redis/pipeline")
+    async def pipeline(request: PipelineRequest, http_request: Request):
+        """Split the pipeline by key owner and run the parts concurrently.
+
+        Commands keep their order on each shard. An atomic pipeline is
+        validated here first, so nothing runs if any command is invalid, but
+        it is only isolated from other requests shard by shard; keep its
+        keys on one shard with a ``{hash tag}``. ``delete_prefix`` runs on
+        every shard.
+        """
+        if request.atomic:
+            parse_pipeline(request)
+        commands = (await http_request.json())["commands"]
+        parts: Dict[int, List[int]] = {}
+        for index, command in enumerate(commands):
+            key = command.get("key")
+            if command.get("op") == "delete_prefix":
+                targets = list(every_shard)
+            else:
+                targets = [ring.shard_for_redis_key(key) if isinstance(key, str) else 0]
+            for shard in targets:
+                parts.setdefault(shard, []).append(index)
+        replies = await shards.call_all({
+            shard: ("/mcp/redis/pipeline",
+                    {"commands": [commands[i] for i in indexes], "atomic": request.atomic})
+            for shard, indexes in parts.items()})
+
+        answers: List[List[Dict[str, Any]]] = [[] for _ in commands]
+        for shard, indexes in parts.items():
+            for index, result in zip(indexes, replies[shard]["results"]):
+                answers[index].append(result)
+        results = []
+        for command, answer in zip(commands, answers):
+            failed = next((a for a in answer if not a["ok"]), None)
+            if failed is not None or len(answer) == 1:
+                results.append(failed or answer[0])
+            else:
+                results.append({"ok": True, "result": {
+                    "prefix": command.get("prefix"),
+                    "deleted": sum(a["result"]["deleted"] for a in answer)}})
+        return {
+            "count": len(results),
+            "failed": sum(1 for r in results if not r["ok"]),
+            "atomic": request.atomic,
+            "results": results,
+        }
+
+    return app
+
+
+def wait_healthy(url: str, timeout: float) -> bool:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            with urllib.request.urlopen(f"{url}/health", timeout=1):
+                return True
+        except OSError:
+            time.sleep(0.1)
+    return False
+
+
+def start_shards(count: int, storage_dir: Path, base_port: int) -> List[subprocess.Popen]:
+    """Start ``count`` shard processes on 127.0.0.1, each with its own storage directory"""
+    server = Path(__file__).resolve().parent / "integrated_mcp_server.py"
+    processes = []
+    for shard in range(count):
+        env = {**os.environ, "MCP_SHARD_MODE": "1", "MCP_HOST": "127.0.0.1",
+               "MCP_PORT": str(base_port + shard),
+               "MCP_STORAGE_DIR": str(storage_dir / f"shard-{shard}")}
+        env.pop("MCP_READY_FIFO", None)
+        processes.append(subprocess.Popen([sys.executable, str(server)], env=env))
+    return processes
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Sharded MCP server: shards plus router")
+    parser.add_argument("--shards", type=int, default=int(os.environ.get("MCP_SHARDS", "0")),
+                        help="Shard processes (default: MCP_SHARDS or one per core)")
+    parser.add_argument("--router-workers", type=int,
+                        default=int(os.environ.get("MCP_ROUTER_WORKERS", "0")),
+                        help="Router processes sharing the port (default: half the shards)")
+    parser.add_argument("--shard-base-port", type=int, default=PORT + 1,
+                        help=f"First shard port; shards listen on 127.0.0.1 (default: {PORT + 1})")
+    parser.add_argument("--shard-urls",
+                        help="Comma-separated URLs of running shards; only the router is started")
+    args = parser.parse_args()
+
+    processes: List[subprocess.Popen] = []
+    if args.shard_urls:
+        urls = args.shard_urls.split(",")
+    else:
+        count = args.shards or os.cpu_count() or 1
+        print(f"🧩 Starting {count} shards under {STORAGE_DIR}")
+        processes = start_shards(count, STORAGE_DIR, args.shard_base_port)
+        urls = [f"http://127.0.0.1:{args.shard_base_port + shard}" for shard in range(count)]
+    try:
+        for url in urls:
+            if not wait_healthy(url, SHARD_START_TIMEOUT):
+                print(f"❌ Shard {url} did not become healthy")
+                return 1
+        os.environ["MCP_SHARD_URLS"] = ",".join(urls)
+        workers = args.router_workers or max(1, len(urls) // 2)
+
+        def announce():
+            if wait_healthy(f"http://127.0.0.1:{PORT}", SHARD_START_TIMEOUT):
+                signal_ready(READY_FIFO)
+
+        threading.Thread(target=announce, daemon=True).start()
+        # uvicorn re-raises SIGTERM once the router has stopped; exit through the
+        # finally block below so the shards are stopped too
+        signal.signal(signal.SIGTERM, lambda signum, frame: sys.exit(0))
+        print(f"🚀 Router ({workers} processes) on {HOST}:{PORT} over {len(urls)} shards")
+        uvicorn.run("shard_router:create_router_app", factory=True, host=HOST, port=PORT,
+                    workers=workers, log_level="info",
+                    timeout_graceful_shutdown=ROUTER_SHUTDOWN_TIMEOUT)
+    finally:
+        for process in processes:
+            process.terminate()
+        for process in processes:
+            process.wait(timeout=30)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,65 @@
+#!/usr/bin/env python3
+"""
+Consistent-hash placement for the sharded MCP server
+Maps entity IDs and redis keys to shards on a hash ring with virtual nodes
+"""
+
+import bisect
+import hashlib
+from typing import Dict, Iterable, List
+
+DEFAULT_VNODES = 160
+
+
+def _hash(value: str) -> int:
+    return int.from_bytes(hashlib.blake2b(value.encode("utf-8"), digest_size=8).digest(), "big")
+
+
+def hash_tag(key: str) -> str:
+    """The part of a redis key that decides its shard.
+
+    As in Redis Cluster, a non-empty ``{...}`` section is hashed instead of
+    the whole key, so ``{job42}:inbox`` and ``{job42}:timeline`` share a
+    shard (and an atomic pipeline over both runs on one shard).
+    """
+    start = key.find("{")
+    if start != -1:
+        end = key.find("}", start + 1)
+        if end > start + 1:
+            return key[start + 1:end]
+    return key
+
+
+class HashRing:
+    """Consistent hash ring over shard indexes ``0..shards-1``.
+
+    Each shard owns ``vnodes`` points on a 64-bit ring and a key belongs to
+    the first point at or after its hash. Adding a shard moves only about
+    ``1/shards`` of the keys, and the points depend only on the shard count,
+    so every router process computes the same placement.
+    """
+
+    def __init__(self, shards: int, vnodes: int = DEFAULT_VNODES):
+        if shards < 1:
+            raise ValueError("A hash ring needs at least one shard")
+        self.shards = shards
+        points = sorted((_hash(f"shard-{shard}#{v}"), shard)
+                        for shard in range(shards) for v in range(vnodes))
+        self._points = [point for point, _ in points]
+        self._owners = [shard for _, shard in points]
+
+    def shard_for(self, key: str) -> int:
+        if self.shards == 1:
+            return 0
+        index = bisect.bisect_left(self._points, _hash(key))
+        return self._owners[index % len(self._points)]
+
+    def shard_for_redis_key(self, key: str) -> int:
+        return self.shard_for(hash_tag(key))
+
+    def group(self, keys: Iterable[str]) -> Dict[int, List[str]]:
+        """Keys by owning shard, in their original order"""
+        groups: Dict[int, List[str]] = {}
+        for key in keys:
+            groups.setdefault(self.shard_for(key), []).append(key)
+        return groups
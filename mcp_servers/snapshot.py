@@ -0,0 +1,248 @@
+#!/usr/bin/env python3
+"""
+Memory MCP index snapshots
+Compact binary snapshot of the offset and search indexes, read lazily through mmap
+"""
+
+import json
+import mmap
+import os
+import struct
+import time
+from array import array
+from bisect import bisect_left
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Sequence, Tuple
+
+from entity_log import Location
+
+MAGIC = b"MCPSNAP1"
+TRAILER = struct.Struct("<QQ")           # header offset, header length
+
+# Sorted string table entry: key offset, key length, then a fixed payload
+ENTITY_ENTRY = struct.Struct("<QIqIQI")   # seq, segment, offset, length
+POSTING_ENTRY = struct.Struct("<QIQI")    # posting offset, posting count
+
+PostingList = Sequence[int]
+
+# Posting tables and the sections holding their sorted entries
+POSTING_SECTIONS = {"tokens": "token_entries", "types": "type_entries", "grams": "gram_entries"}
+
+
+class SnapshotMismatch(Exception):
+    """Raised when a snapshot does not describe the log it is loaded against"""
+    pass
+
+
+class _SortedTable:
+    """Binary-searchable table of byte-string keys with fixed-size payloads"""
+
+    def __init__(self, buf: memoryview, entries: Tuple[int, int], entry: struct.Struct):
+        self._buf = buf
+        self._entry = entry
+        self._base = entries[0]
+        self._count = entries[1] // entry.size
+
+    def __len__(self) -> int:
+        return self._count
+
+    def key(self, i: int) -> bytes:
+        key_off, key_len = self._entry.unpack_from(self._buf, self._base + i * self._entry.size)[:2]
+        return bytes(self._buf[key_off:key_off + key_len])
+
+    def payload(self, i: int) -> Tuple:
+        return self._entry.unpack_from(self._buf, self._base + i * self._entry.size)[2:]
+
+    def find(self, key: bytes) -> Optional[int]:
+        lo, hi = 0, self._count
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if self.key(mid) < key:
+                lo = mid + 1
+            else:
+                hi = mid
+        if lo < self._count and self.key(lo) == key:
+            return lo
+        return None
+
+
+class Snapshot:
+    """Read-only view of a snapshot file.
+
+    Nothing is deserialized up front: lookups binary-search the mmap'd
+    tables and posting lists are returned as memoryviews over the file, so
+    opening a snapshot costs the same for a hundred entities as for millions.
+    """
+
+    def __init__(self, path: Path):
+        self.path = Path(path)
+        with open(self.path, "rb") as f:
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        buf = memoryview(self._mmap)
+        if bytes(buf[:len(MAGIC)]) != MAGIC:
+            buf.release()
+            self._mmap.close()
+            raise SnapshotMismatch(f"{self.path.name} is not a snapshot file")
+
+        try:
+            header_start, header_len = TRAILER.unpack_from(buf, len(MAGIC))
+            self.header: Dict[str, Any] = json.loads(bytes(buf[header_start:header_start + header_len]))
+            sections = self.header["sections"]
+        except (struct.error, ValueError, KeyError) as e:
+            buf.release()
+            self._mmap.close()
+            raise SnapshotMismatch(f"{self.path.name} has an unreadable header: {e}")
+
+        self._buf = buf
+        self.entities = _SortedTable(buf, sections["entity_entries"], ENTITY_ENTRY)
+        self.tokens = _SortedTable(buf, sections["token_entries"], POSTING_ENTRY)
+        self.types = _SortedTable(buf, sections["type_entries"], POSTING_ENTRY)
+        # Older snapshots have no trigram table; the store rejects them by version
+        self.grams = _SortedTable(buf, sections.get("gram_entries", (0, 0)), POSTING_ENTRY)
+        self.seqs = self._array(sections["seqs"], "q")
+        self._seq_rows = self._array(sections["seq_rows"], "I")
+
+    def _array(self, section: Tuple[int, int], fmt: str) -> memoryview:
+        offset, length = section
+        return self._buf[offset:offset + length].cast(fmt)
+
+    @property
+    def count(self) -> int:
+        return len(self.entities)
+
+    def lookup(self, entity_id: str) -> Optional[Tuple[int, Location]]:
+        row = self.entities.find(entity_id.encode("utf-8"))
+        if row is None:
+            return None
+        seq, segment, offset, length = self.entities.payload(row)
+        return seq, Location(segment, offset, length)
+
+    def entity_id(self, seq: int) -> str:
+        i = bisect_left(self.seqs, seq)
+        return self.entities.key(self._seq_rows[i]).decode("utf-8")
+
+    def iter_entities(self) -> Iterator[Tuple[str, int, Location]]:
+        for row in range(len(self.entities)):
+            seq, segment, offset, length = self.entities.payload(row)
+            yield self.entities.key(row).decode("utf-8"), seq, Location(segment, offset, length)
+
+    def _posting(self, table: _SortedTable, key: str) -> Optional[PostingList]:
+        row = table.find(key.encode("utf-8"))
+        if row is None:
+            return None
+        offset, count = table.payload(row)
+        return self._buf[offset:offset + count * 8].cast("q")
+
+    def posting(self, token: str) -> Optional[PostingList]:
+        return self._posting(self.tokens, token)
+
+    def type_posting(self, entity_type: str) -> Optional[PostingList]:
+        return self._posting(self.types, entity_type)
+
+    def gram_posting(self, gram: str) -> Optional[PostingList]:
+        return self._posting(self.grams, gram)
+
+    def iter_postings(self, table: str) -> Iterator[Tuple[str, PostingList]]:
+        """(key, posting) pairs of the ``tokens``, ``types`` or ``grams`` table"""
+        source = {"tokens": self.tokens, "types": self.types, "grams": self.grams}[table]
+        for row in range(len(source)):
+            offset, count = source.payload(row)
+            yield source.key(row).decode("utf-8"), self._buf[offset:offset + count * 8].cast("q")
+
+    def close(self):
+        try:
+            self.seqs.release()
+            self._seq_rows.release()
+            self._buf.release()
+            self._mmap.close()
+        except BufferError:
+            # Posting views handed out to callers are still alive; the
+            # mapping is released once they are garbage collected.
+            pass
+
+
+class _SectionWriter:
+    """Write 8-byte aligned sections and remember where each one landed"""
+
+    def __init__(self, f, offset: int):
+        self.f = f
+        self.offset = offset
+        self.sections: Dict[str, List[int]] = {}
+
+    def write(self, data: bytes, name: Optional[str] = None) -> int:
+        pad = -self.offset % 8
+        if pad:
+            self.f.write(b"\0" * pad)
+            self.offset += pad
+        start = self.offset
+        self.f.write(data)
+        self.offset += len(data)
+        if name is not None:
+            self.sections[name] = [start, len(data)]
+        return start
+
+
+def write_snapshot(path: Path, header: Dict[str, Any],
+                   entities: List[Tuple[str, int, Location]],
+                   postings: Dict[str, List[Tuple[str, PostingList]]]):
+    """Write a snapshot atomically.
+
+    ``entities`` holds (entity_id, seq, location) triples in any order;
+    ``postings`` maps ``tokens``, ``types`` and ``grams`` to (key, ascending
+    seqs) pairs in any order. The file is written next to ``path`` and
+    renamed into place after fsync.
+    """
+    path = Path(path)
+    temp_path = path.with_name(path.name + ".tmp")
+    entities = sorted(entities, key=lambda item: item[0].encode("utf-8"))
+    tables = {
+        section: sorted(((k.encode("utf-8"), p) for k, p in postings[name]), key=lambda kp: kp[0])
+        for name, section in POSTING_SECTIONS.items()
+    }
+
+    with open(temp_path, "wb") as f:
+        f.write(MAGIC)
+        f.write(TRAILER.pack(0, 0))
+        writer = _SectionWriter(f, len(MAGIC) + TRAILER.size)
+
+        # All keys go into one blob up front so entries can carry absolute offsets
+        blob = bytearray()
+        entity_keys = []
+        for entity_id, _, _ in entities:
+            key = entity_id.encode("utf-8")
+            entity_keys.append((len(blob), len(key)))
+            blob += key
+        table_keys: Dict[str, List[Tuple[int, int]]] = {}
+        for name, rows in tables.items():
+            table_keys[name] = []
+            for key, _ in rows:
+                table_keys[name].append((len(blob), len(key)))
+                blob += key
+        blob_start = writer.write(bytes(blob))
+
+        packed = bytearray()
+        for (key_off, key_len), (_, seq, location) in zip(entity_keys, entities):
+            packed += ENTITY_ENTRY.pack(blob_start + key_off, key_len, seq, *location)
+        writer.write(bytes(packed), "entity_entries")
+
+        order = sorted(range(len(entities)), key=lambda row: entities[row][1])
+        writer.write(array("q", (entities[row][1] for row in order)).tobytes(), "seqs")
+        writer.write(array("I", order).tobytes(), "seq_rows")
+
+        for name, rows in tables.items():
+            packed = bytearray()
+            for (key_off, key_len), (_, posting) in zip(table_keys[name], rows):
+                data = posting.tobytes() if hasattr(posting, "tobytes") else array("q", posting).tobytes()
+                posting_start = writer.write(data)
+                packed += POSTING_ENTRY.pack(blob_start + key_off, key_len,
+                                             posting_start, len(posting))
+            writer.write(bytes(packed), name)
+
+        header = dict(header, created_at=time.time(), sections=writer.sections)
+        header_bytes = json.dumps(header).encode("utf-8")
+        header_start = writer.write(header_bytes)
+        f.seek(len(MAGIC))
+        f.write(TRAILER.pack(header_start, len(header_bytes)))
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(temp_path, path)
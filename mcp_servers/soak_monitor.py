@@ -0,0 +1,105 @@
+#!/usr/bin/env python3
+"""
+Soak-test resource sampling and trend detection
+Samples a server process from /proc over a long run and flags steady growth in its resources
+"""
+
+import os
+import statistics
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Sequence
+
+# metric -> (minimum relative growth, minimum absolute growth) before it is flagged.
+# Growth must clear both, so small counts (fds, threads) are not flagged for +1.
+RESOURCE_THRESHOLDS = {
+    "rss_bytes": (0.05, 8 * 1024 * 1024),
+    "open_fds": (0.10, 8),
+    "threads": (0.10, 4),
+}
+LATENCY_THRESHOLDS = {
+    "p50_ms": (0.25, 0.5),
+    "p99_ms": (0.25, 2.0),
+}
+
+# A series must also rise steadily: Kendall's tau between time and value of at
+# least MIN_TAU. A one-off step (a cache filling) scores at most 0.5.
+MIN_TAU = 0.6
+# Samples from the first WARMUP fraction of the run are ignored: pools and
+# caches grow to their working size there.
+WARMUP = 0.2
+
+
+def read_pid(pid_file: Path) -> int:
+    """Read the PID the start script saved; raises if the process is not running"""
+    pid = int(Path(pid_file).read_text().strip())
+    os.kill(pid, 0)
+    return pid
+
+
+def sample_process(pid: int) -> Dict[str, Any]:
+    """RSS, open file descriptors and thread count of ``pid``, read from /proc (Linux)"""
+    proc = Path("/proc") / str(pid)
+    sample: Dict[str, Any] = {"time": time.time()}
+    for line in (proc / "status").read_text().splitlines():
+        key, _, value = line.partition(":")
+        if key == "VmRSS":
+            sample["rss_bytes"] = int(value.split()[0]) * 1024
+        elif key == "Threads":
+            sample["threads"] = int(value)
+    sample["open_fds"] = len(os.listdir(proc / "fd"))
+    return sample
+
+
+def kendall_tau(values: Sequence[float]) -> float:
+    """Rank correlation between sample order and value, from -1 (falling) to 1 (rising)"""
+    n = len(values)
+    if n < 2:
+        return 0.0
+    score = 0
+    for i in range(n - 1):
+        for j in range(i + 1, n):
+            if values[j] > values[i]:
+                score += 1
+            elif values[j] < values[i]:
+                score -= 1
+    return score / (n * (n - 1) / 2)
+
+
+def detect_growth(values: Sequence[Optional[float]], min_relative: float, min_absolute: float,
+                  min_tau: float = MIN_TAU, warmup: float = WARMUP) -> Dict[str, Any]:
+    """Compare the start and end of a series after warm-up; ``growing`` flags a steady rise.
+
+    Start and end are the medians of the first and last quarter of the
+    post-warm-up samples, so single spikes do not move them.
+    """
+    series = [v for v in values if v is not None]
+    steady = series[int(len(series) * warmup):]
+    if len(steady) < 8:
+        return {"samples": len(steady), "growing": False}
+    quarter = len(steady) // 4
+    first = statistics.median(steady[:quarter])
+    last = statistics.median(steady[-quarter:])
+    growth = last - first
+    relative = growth / first if first else (float("inf") if growth > 0 else 0.0)
+    tau = kendall_tau(steady)
+    return {
+        "samples": len(steady),
+        "first": first,
+        "last": last,
+        "growth": growth,
+        "relative_growth": relative,
+        "tau": tau,
+        "growing": tau >= min_tau and growth >= min_absolute and relative >= min_relative,
+    }
+
+
+def analyze_soak(samples: List[Dict[str, Any]],
+                 windows: List[Dict[str, Any]]) -> Dict[str, Dict[str, Any]]:
+    """Trend of every resource metric over ``samples`` and every latency percentile over ``windows``"""
+    trends = {}
+    for metric, (relative, absolute) in RESOURCE_THRESHOLDS.items():
+        trends[metric] = detect_growth([s.get(metric) for s in samples], relative, absolute)
+    for metric, (relative, absolute) in LATENCY_THRESHOLDS.items():
+        trends[metric] = detect_growth([w.get(metric) for w in windows], relative, absolute)
+    return trends
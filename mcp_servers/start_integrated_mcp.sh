@@ -23,18 +23,32 @@ source mcp_venv/bin/activate
 
 # Install required packages
 echo "📦 Installing dependencies..."
-pip install -q fastapi uvicorn pydantic
+pip install -q fastapi uvicorn pydantic orjson msgpack aiohttp
 
-# Start the integrated server
-echo "🔧 Starting server on port 8000..."
-python mcp_servers/integrated_mcp_server.py &
+# The server writes to this FIFO once it is listening
+READY_FIFO=$(mktemp -u /tmp/mcp_ready.XXXXXX)
+mkfifo "$READY_FIFO"
+exec 3<>"$READY_FIFO"
+
+# Start the integrated server, or shards behind a router when MCP_SHARDS > 1
+if [ "${MCP_SHARDS:-1}" -gt 1 ]; then
+    echo "🔧 Starting $MCP_SHARDS shards behind a router on port 8000..."
+    MCP_READY_FIFO="$READY_FIFO" python mcp_servers/shard_router.py &
+else
+    echo "🔧 Starting server on port 8000..."
+    MCP_READY_FIFO="$READY_FIFO" python mcp_servers/integrated_mcp_server.py &
+fi
 SERVER_PID=$!
 
 # Save PID
 echo $SERVER_PID > mcp_server.pid
 
-# Wait for server to start
-sleep 3
+# Wait for the readiness signal instead of a fixed sleep
+if ! read -t "${MCP_READY_TIMEOUT:-60}" -u 3 READY_LINE; then
+    echo "⚠️ Server did not report ready within ${MCP_READY_TIMEOUT:-60}s"
+fi
+exec 3<&-
+rm -f "$READY_FIFO"
 
 # Check health
 if curl -s http://localhost:8000/health > /dev/null 2>&1; then
@@ -8,8 +8,13 @@ if [ -f "mcp_server.pid" ]; then
     if ps -p $SERVER_PID > /dev/null 2>&1; then
         echo "Stopping server (PID: $SERVER_PID)..."
         kill $SERVER_PID
-        sleep 1
+        # A sharded server drains its router and shards before exiting
+        for _ in $(seq $((${MCP_STOP_TIMEOUT:-10} * 10))); do
+            ps -p $SERVER_PID > /dev/null 2>&1 || break
+            sleep 0.1
+        done
         if ps -p $SERVER_PID > /dev/null 2>&1; then
+            pkill -9 -P $SERVER_PID 2>/dev/null || true
             kill -9 $SERVER_PID 2>/dev/null || true
         fi
         echo "✅ Server stopped"
@@ -0,0 +1,185 @@
+#!/usr/bin/env python3
+"""
+Unit tests for admission control
+Run without a server: gates and middleware are driven directly on an event loop
+"""
+
+import asyncio
+import json
+from types import SimpleNamespace
+
+import pytest
+import requests
+
+from admission import AdmissionController, AdmissionGate, AdmissionMiddleware, Overloaded
+from mcp_client import MCPClient
+
+
+class BlockingApp:
+    """ASGI app whose requests run until ``release`` is set"""
+
+    def __init__(self):
+        self.release = asyncio.Event()
+        self.started = 0
+
+    async def __call__(self, scope, receive, send):
+        self.started += 1
+        await self.release.wait()
+        await send({"type": "http.response.start", "status": 200, "headers": []})
+        await send({"type": "http.response.body", "body": b"ok"})
+
+
+async def call(app, path, body=b""):
+    """Send one request through ``app``; returns (status, headers, body, scope)"""
+    sent = {"status": None, "headers": {}, "body": b""}
+    scope = {"type": "http", "method": "POST", "path": path, "headers": []}
+
+    async def receive():
+        return {"type": "http.request", "body": body, "more_body": False}
+
+    async def send(message):
+        if message["type"] == "http.response.start":
+            sent["status"] = message["status"]
+            sent["headers"] = {k.decode(): v.decode() for k, v in message["headers"]}
+        else:
+            sent["body"] += message.get("body", b"")
+
+    await app(scope, receive, send)
+    return sent["status"], sent["headers"], sent["body"], scope
+
+
+def controller(concurrency=2, queue_depth=1, queue_timeout=5.0):
+    admission = AdmissionController(concurrency, queue_depth, queue_timeout)
+    admission.bind_routes([SimpleNamespace(path=p) for p in ("/work", "/health", "/other")])
+    return admission
+
+
+class TestAdmissionGate:
+    """Test the per-route concurrency limit and queue"""
+
+    def test_queue_full_is_429_and_slots_pass_in_order(self):
+        async def scenario():
+            gate = AdmissionGate(concurrency=1, queue_depth=2, queue_timeout=5)
+            await gate.acquire()
+            order = []
+
+            async def waiter(name):
+                await gate.acquire()
+                order.append(name)
+                gate.release(0.01)
+
+            tasks = [asyncio.create_task(waiter(name)) for name in ("a", "b")]
+            await asyncio.sleep(0)
+            assert gate.queued == 2
+            with pytest.raises(Overloaded) as excinfo:
+                await gate.acquire()
+            assert excinfo.value.status == 429
+            assert excinfo.value.retry_after >= 1
+
+            gate.release(0.01)
+            await asyncio.gather(*tasks)
+            assert order == ["a", "b"]
+            assert gate.in_flight == 0
+            assert gate.stats()["rejected"] == 1
+
+        asyncio.run(scenario())
+
+    def test_queue_timeout_is_503(self):
+        async def scenario():
+            gate = AdmissionGate(concurrency=1, queue_depth=4, queue_timeout=0.02)
+            await gate.acquire()
+            with pytest.raises(Overloaded) as excinfo:
+                await gate.acquire()
+            assert excinfo.value.status == 503
+            assert gate.queued == 0
+            gate.release()
+            assert gate.in_flight == 0
+
+        asyncio.run(scenario())
+
+    def test_cancelled_waiter_gives_up_its_place(self):
+        async def scenario():
+            gate = AdmissionGate(concurrency=1, queue_depth=4, queue_timeout=5)
+            await gate.acquire()
+            task = asyncio.create_task(gate.acquire())
+            await asyncio.sleep(0)
+            task.cancel()
+            with pytest.raises(asyncio.CancelledError):
+                await task
+            assert gate.queued == 0
+            gate.release()
+            assert gate.in_flight == 0
+
+        asyncio.run(scenario())
+
+
+class TestAdmissionMiddleware:
+    """Test refusals through the ASGI middleware"""
+
+    def test_saturated_route_refused_while_health_and_others_pass(self):
+        async def scenario():
+            app = BlockingApp()
+            middleware = AdmissionMiddleware(app, controller())
+            running = [asyncio.create_task(call(middleware, "/work")) for _ in range(3)]
+            await asyncio.sleep(0.01)
+            assert app.started == 2
+
+            status, headers, body, scope = await call(middleware, "/work", b'{"x": 1}')
+            assert status == 429
+            assert int(headers["retry-after"]) >= 1
+            assert json.loads(body)["retry_after"] == int(headers["retry-after"])
+            assert scope["route"].path == "/work"
+
+            # Health probes and other routes are not held up by /work
+            probes = [asyncio.create_task(call(middleware, path))
+                      for path in ("/health", "/other", "/unknown")]
+            await asyncio.sleep(0.01)
+            assert app.started == 5
+
+            app.release.set()
+            results = await asyncio.gather(*running, *probes)
+            assert [r[0] for r in results] == [200] * 6
+            assert middleware.controller.in_flight() == 0
+
+        asyncio.run(scenario())
+
+
+class FakeSession(requests.Session):
+    def __init__(self, statuses):
+        super().__init__()
+        self.statuses = list(statuses)
+        self.calls = 0
+
+    def request(self, method, url, **kwargs):
+        self.calls += 1
+        status, retry_after = self.statuses.pop(0)
+        response = requests.Response()
+        response.status_code = status
+        response.headers["content-type"] = "application/json"
+        if retry_after is not None:
+            response.headers["retry-after"] = retry_after
+        response._content = b'{"ok": true}'
+        return response
+
+
+class TestClientRetry:
+    """Test that the shared client honours Retry-After"""
+
+    def test_retries_after_429_and_503(self, monkeypatch):
+        delays = []
+        monkeypatch.setattr("mcp_client.time.sleep", delays.append)
+        session = FakeSession([(429, "2"), (503, "30"), (200, None)])
+        client = MCPClient(session=session)
+        response = client.post("/mcp/memory/search_nodes", {"query": "x"})
+        assert response.status_code == 200
+        assert delays == [2.0, client.max_retry_delay]
+
+    def test_gives_up_after_retries_or_without_header(self, monkeypatch):
+        monkeypatch.setattr("mcp_client.time.sleep", lambda seconds: None)
+        session = FakeSession([(429, "1")] * 3)
+        response = MCPClient(session=session, retries=2).get("/status")
+        assert response.status_code == 429
+        assert session.calls == 3
+
+        session = FakeSession([(503, None)])
+        assert MCPClient(session=session).get("/status").status_code == 503
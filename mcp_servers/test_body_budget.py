@@ -0,0 +1,103 @@
+#!/usr/bin/env python3
+"""
+Unit tests for request body budget enforcement
+Run without a server: the budget and middleware are driven directly
+"""
+
+import asyncio
+import json
+
+import pytest
+
+from body_budget import BodyBudget, BodyBudgetMiddleware, BudgetExceeded
+
+
+def feed_all(budget: BodyBudget, body: bytes, chunk_size: int):
+    for i in range(0, len(body), chunk_size):
+        budget.feed(body[i:i + chunk_size])
+
+
+def call(app, chunks, headers=()):
+    """Drive an ASGI app with a streamed body; returns (status, response body, chunks read)"""
+    pending = list(chunks)
+    read = []
+    sent = {"status": None, "body": b""}
+
+    async def receive():
+        if not pending:
+            return {"type": "http.request", "body": b"", "more_body": False}
+        read.append(pending.pop(0))
+        return {"type": "http.request", "body": read[-1], "more_body": True}
+
+    async def send(message):
+        if message["type"] == "http.response.start":
+            sent["status"] = message["status"]
+        else:
+            sent["body"] += message.get("body", b"")
+
+    scope = {"type": "http", "method": "POST", "path": "/", "headers": list(headers)}
+    asyncio.run(app(scope, receive, send))
+    return sent["status"], sent["body"], len(read)
+
+
+async def echo_app(scope, receive, send):
+    body = b""
+    while True:
+        message = await receive()
+        body += message.get("body", b"")
+        if not message.get("more_body", False):
+            break
+    await send({"type": "http.response.start", "status": 200, "headers": []})
+    await send({"type": "http.response.body", "body": body})
+
+
+class TestBodyBudget:
+    """Test incremental counting"""
+
+    @pytest.mark.parametrize("chunk_size", [1, 3, 7, 1024])
+    def test_counts_independent_of_chunking(self, chunk_size):
+        observations = ['quote " and \\\\ slash', "x" * 40]
+        body = json.dumps([{"name": "alpha beta", "observations": observations}])
+        budget = BodyBudget(max_tokens=1000, max_string_bytes=1000)
+        feed_all(budget, body.encode(), chunk_size)
+        reference = BodyBudget(max_tokens=1000, max_string_bytes=1000)
+        reference.feed(body.encode())
+        assert budget.tokens == reference.tokens
+        assert budget.longest_string == reference.longest_string == 40
+
+    def test_escaped_quote_does_not_end_string(self):
+        budget = BodyBudget(max_string_bytes=10)
+        with pytest.raises(BudgetExceeded) as exc:
+            feed_all(budget, b'["abc\\"defghijkl"]', 2)
+        assert exc.value.limit == "string_bytes"
+
+    def test_token_limit(self):
+        budget = BodyBudget(max_tokens=5)
+        budget.feed(b'["one two three"')
+        with pytest.raises(BudgetExceeded) as exc:
+            budget.feed(b', "four five six"]')
+        assert exc.value.limit == "tokens"
+
+
+class TestBodyBudgetMiddleware:
+    """Test early rejection and replay"""
+
+    def test_body_within_budget_is_replayed(self):
+        app = BodyBudgetMiddleware(echo_app, max_bytes=100, max_string_bytes=10)
+        status, body, _ = call(app, [b'{"a": ', b'"short"}'])
+        assert status == 200
+        assert body == b'{"a": "short"}'
+
+    def test_rejects_without_reading_the_rest(self):
+        app = BodyBudgetMiddleware(echo_app, max_string_bytes=1000)
+        chunks = [b'["'] + [b"a" * 512] * 100 + [b'"]']
+        status, body, read = call(app, chunks)
+        assert status == 413
+        assert json.loads(body)["limit"] == "string_bytes"
+        assert read == 3
+
+    def test_content_length_rejected_before_reading(self):
+        app = BodyBudgetMiddleware(echo_app, max_bytes=1000)
+        status, _, read = call(app, [b"x" * 2000], headers=[(b"content-length", b"2000")])
+        assert status == 413
+        assert read == 0
@@ -0,0 +1,96 @@
+#!/usr/bin/env python3
+"""
+Unit tests for the Redis MCP change feed
+Run without a server: the hub and SSE stream are driven directly on an event loop
+"""
+
+import asyncio
+import json
+
+import pytest
+
+from change_feed import ChangeHub, SubscriberLimit, sse_stream
+
+
+def change(key, event="sadd"):
+    return {"event": event, "key": key, "type": "set", "members": ["m"]}
+
+
+class TestChangeHub:
+    """Test routing events to subscriptions by key pattern"""
+
+    def test_exact_and_glob_patterns(self):
+        async def scenario():
+            hub = ChangeHub()
+            exact = hub.subscribe(["agent:1:inbox"])
+            glob = hub.subscribe(["agent:*", "agent:1:*"])
+            other = hub.subscribe(["timeline:?"])
+
+            hub.publish(change("agent:1:inbox"))
+            hub.publish(change("agent:2:inbox"))
+            hub.publish(change("timeline:ab"))
+
+            assert [e["key"] for e in await exact.next_batch(0.1)] == ["agent:1:inbox"]
+            # Matching two patterns still delivers an event once
+            assert [e["seq"] for e in await glob.next_batch(0.1)] == [1, 2]
+            assert await other.next_batch(0.01) == []
+            assert hub.stats() == {"subscribers": 3, "patterns": 4, "published": 3,
+                                   "delivered": 3}
+
+            hub.unsubscribe(glob)
+            hub.unsubscribe(glob)
+            assert hub.stats()["patterns"] == 2
+
+        asyncio.run(scenario())
+
+    def test_subscriber_limit(self):
+        async def scenario():
+            hub = ChangeHub(max_subscribers=1)
+            subscription = hub.subscribe(["k"])
+            with pytest.raises(SubscriberLimit):
+                hub.subscribe(["k"])
+            hub.unsubscribe(subscription)
+            hub.subscribe(["k"])
+
+        asyncio.run(scenario())
+
+
+class TestSseStream:
+    """Test the Server-Sent Events framing"""
+
+    def test_events_keepalive_and_close(self):
+        async def scenario():
+            hub = ChangeHub()
+            subscription = hub.subscribe(["k"])
+            stream = sse_stream(hub, subscription, keepalive=0.01)
+            assert await stream.__anext__() == b'event: subscribed\ndata: {"patterns":["k"]}\n\n'
+            assert await stream.__anext__() == b": keepalive\n\n"
+
+            hub.publish(change("k"))
+            hub.publish(change("k", "srem"))
+            chunk = await stream.__anext__()
+            frames = chunk.split(b"\n\n")[:-1]
+            assert [frame.split(b"\n")[0] for frame in frames] == [b"id: 1", b"id: 2"]
+            assert json.loads(frames[1].split(b"\n")[1][6:])["event"] == "srem"
+
+            hub.close()
+            with pytest.raises(StopAsyncIteration):
+                await stream.__anext__()
+            assert hub.subscribers == 0
+
+        asyncio.run(scenario())
+
+    def test_slow_subscriber_overflows(self):
+        async def scenario():
+            hub = ChangeHub(max_pending=4)
+            subscription = hub.subscribe(["k"])
+            stream = sse_stream(hub, subscription, keepalive=1)
+            await stream.__anext__()
+            for _ in range(10):
+                hub.publish(change("k"))
+            assert await stream.__anext__() == b"event: overflow\ndata: {}\n\n"
+            with pytest.raises(StopAsyncIteration):
+                await stream.__anext__()
+            assert hub.subscribers == 0
+
+        asyncio.run(scenario())
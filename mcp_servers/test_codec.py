@@ -0,0 +1,56 @@
+#!/usr/bin/env python3
+"""
+Unit tests for the wire codecs
+Run without a server: negotiation and encoding are exercised directly
+"""
+
+import json
+from datetime import datetime
+
+import pytest
+
+from codec import DECODERS, ENCODERS, JSON, MSGPACK, media_type_of, negotiate
+
+
+class TestNegotiation:
+    """Test Accept and Content-Type handling"""
+
+    @pytest.mark.parametrize("accept, expected", [
+        ("", JSON),
+        ("*/*", JSON),
+        ("application/json", JSON),
+        ("application/msgpack", MSGPACK),
+        ("application/x-msgpack, application/json;q=0.5", MSGPACK),
+        ("application/msgpack;q=0.5, application/json", JSON),
+        ("application/msgpack, */*", JSON),
+        ("application/msgpack;q=bogus, */*;q=0.1", JSON),
+    ])
+    def test_negotiate(self, accept, expected):
+        if expected == MSGPACK:
+            pytest.importorskip("msgpack")
+        assert negotiate(accept) == expected
+
+    def test_media_type_of(self):
+        assert media_type_of("application/json; charset=utf-8") == JSON
+        assert media_type_of("Application/X-MsgPack") == MSGPACK
+
+
+class TestEncoding:
+    """Test encoder output and fallbacks"""
+
+    def test_json_matches_stdlib(self):
+        value = {"nodes": [{"name": "é", "observations": ["a", "b"], "score": 1.5}], "count": 1}
+        assert json.loads(ENCODERS[JSON](value)) == value
+        assert DECODERS[JSON](json.dumps(value).encode()) == value
+
+    def test_fallback_types(self):
+        value = {"members": ("a", 1.0), "when": datetime(2024, 1, 2, 3, 4, 5), 3: "int key"}
+        decoded = json.loads(ENCODERS[JSON](value))
+        assert decoded["members"] == ["a", 1.0]
+        assert decoded["when"].startswith("2024-01-02T03:04:05")
+        assert decoded["3"] == "int key"
+
+    def test_msgpack_round_trip(self):
+        pytest.importorskip("msgpack")
+        value = {"query": "x", "nodes": [{"observations": ["hello"]}], "count": 1}
+        assert DECODERS[MSGPACK](ENCODERS[MSGPACK](value)) == value
@@ -0,0 +1,103 @@
+#!/usr/bin/env python3
+"""
+Unit tests for the synthetic dataset generator
+Run without a server: datasets are generated in memory and loaded into a temp directory
+"""
+
+import random
+from collections import Counter
+
+import pytest
+
+from dataset_generator import Dataset, DatasetSpec, Zipf, populate_storage, scaled
+from memory_store import MemoryStore
+from redis_aof import AppendOnlyLog
+from redis_store import RedisStore
+from relation_store import RelationStore
+
+SMALL = DatasetSpec(entities=2000, vocabulary=3000, hash_keys=50, set_keys=40, zset_keys=10,
+                    member_universe=2000)
+
+
+class TestGeneration:
+    """Test that datasets are reproducible and shaped as specified"""
+
+    def test_same_seed_same_data(self):
+        first, second = Dataset(SMALL), Dataset(SMALL)
+        assert list(first.entities()) == list(second.entities())
+        assert list(first.relations()) == list(second.relations())
+        assert list(first.redis_commands()) == list(second.redis_commands())
+        assert first.queries(20) == second.queries(20)
+
+        other = Dataset(SMALL._replace(seed=7))
+        assert list(other.entities())[:10] != list(first.entities())[:10]
+
+    def test_entity_types_follow_zipf(self):
+        dataset = Dataset(SMALL._replace(entities=20000))
+        counts = Counter(entity["entityType"] for entity in dataset.entities())
+        for rank in (0, 1, 5):
+            expected = dataset.type_zipf.probability(rank) * 20000
+            assert counts[dataset.types[rank]] == pytest.approx(expected, rel=0.15)
+
+    def test_redis_cardinalities_are_exact(self):
+        dataset = Dataset(SMALL)
+        fields = Counter()
+        sets, zsets = {}, {}
+        for command in dataset.redis_commands():
+            if command["op"] == "hset":
+                fields[command["key"]] += 1
+            elif command["op"] == "sadd":
+                sets[command["key"]] = command["members"]
+            else:
+                zsets[command["key"]] = command["members"]
+        assert len(fields) == SMALL.hash_keys
+        assert set(fields.values()) == {SMALL.hash_fields}
+        assert len(sets) == SMALL.set_keys
+        assert all(len(set(members)) == SMALL.set_members for members in sets.values())
+        assert len(zsets) == SMALL.zset_keys
+        assert all(len(members) == SMALL.zset_members for members in zsets.values())
+
+    def test_zipf_sampling_matches_probabilities(self):
+        zipf = Zipf(100, 1.1)
+        rng = random.Random(1)
+        counts = Counter(zipf.samples(rng, 50000))
+        assert counts[0] / 50000 == pytest.approx(zipf.probability(0), rel=0.05)
+        assert sum(zipf.probability(rank) for rank in range(100)) == pytest.approx(1)
+
+    def test_scaled_spec_grows_key_spaces(self):
+        assert scaled(100000).hash_keys == 10 * scaled(10000).hash_keys
+
+
+class TestPopulateStorage:
+    """Test loading a dataset straight into a storage directory"""
+
+    def test_storage_holds_dataset_with_stable_ids(self, tmp_path):
+        spec = SMALL._replace(entities=500)
+        loaded = populate_storage(tmp_path, spec, fsync=False)
+        assert loaded["entities"] == 500
+
+        dataset = Dataset(spec)
+        store = MemoryStore(tmp_path)
+        assert store.loaded_from_snapshot
+        assert store.count == 500
+        first = next(dataset.entities())
+        assert store.get_entity(dataset.entity_id(0))["name"] == first["name"]
+        store.close()
+
+        relations = RelationStore(tmp_path / "knowledge_graph")
+        assert relations.edge_count == loaded["relations"]
+        assert relations.edge_count == len(set(dataset.relations()))
+        relations.close()
+
+        redis = RedisStore()
+        AppendOnlyLog(tmp_path / "redis_aof").replay(redis)
+        expected = dataset.expected_counts()
+        assert redis.key_counts() == {"hash": expected["hash_keys"], "set": expected["set_keys"],
+                                      "zset": expected["sorted_set_keys"]}
+        assert len(redis) == loaded["redis_keys"]
+
+        # Loading again replaces the same IDs instead of duplicating them
+        populate_storage(tmp_path, spec, fsync=False)
+        store = MemoryStore(tmp_path)
+        assert store.count == 500
+        store.close()
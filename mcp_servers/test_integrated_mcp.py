@@ -10,6 +10,8 @@ This test suite implements:
 - Edge case testing and boundary conditions
 """
 
+import os
+import pytest
 import requests
 import json
 import time
@@ -18,15 +20,16 @@ from datetime import datetime
 from typing import List, Dict, Any, Optional
 from contextlib import contextmanager
 
+from mcp_client import worker_namespace
+
 # Configuration
-MCP_URL = "http://localhost:8000"
+MCP_URL = os.environ.get("MCP_SERVER_URL", "http://localhost:8000")
 REQUEST_TIMEOUT = 10
 MAX_RETRIES = 3
 RETRY_DELAY = 1
 
-# Test data tracking for cleanup
-test_entities_created = []
-test_redis_keys_created = []
+# Every entity name and Redis key starts with this, so cleanup is one prefix delete per store
+NAMESPACE = worker_namespace()
 
 class TestFailure(Exception):
     """Custom exception for test failures"""
@@ -127,9 +130,9 @@ def test_memory_operations():
     
     try:
         # Test entity creation
-        unique_id = datetime.now().strftime('%Y%m%d_%H%M%S_%f')
+        unique_id = f"{NAMESPACE}:{datetime.now().strftime('%Y%m%d_%H%M%S_%f')}"
         entity = {
-            "name": f"test-entity-{unique_id}",
+            "name": f"{unique_id}:test-entity",
             "entityType": "test",
             "observations": [
                 f"Test observation 1 - {unique_id}",
@@ -161,7 +164,6 @@ def test_memory_operations():
             raise TestFailure("Created entity missing 'entity_id' field")
         
         entity_id = entity_data["entity_id"]
-        test_entities_created.append(entity_id)  # Track for cleanup
         
         # Validate entity ID format
         if not entity_id or not isinstance(entity_id, str):
@@ -239,11 +241,10 @@ def test_redis_operations():
     print("\n🔴 Testing Redis MCP operations...")
     
     try:
-        unique_id = datetime.now().strftime('%Y%m%d_%H%M%S_%f')
+        unique_id = f"{NAMESPACE}:{datetime.now().strftime('%Y%m%d_%H%M%S_%f')}"
         
         # Test hash operations
-        hash_key = f"test:hash:{unique_id}"
-        test_redis_keys_created.append(hash_key)
+        hash_key = f"{unique_id}:test:hash"
         
         hash_req = {
             "key": hash_key,
@@ -275,8 +276,7 @@ def test_redis_operations():
                 raise TestFailure(f"Hash get returned wrong value: {get_result.get('value')}")
         
         # Test set operations
-        set_key = f"test:set:{unique_id}"
-        test_redis_keys_created.append(set_key)
+        set_key = f"{unique_id}:test:set"
         
         set_req = {
             "key": set_key,
@@ -310,8 +310,7 @@ def test_redis_operations():
                 raise TestFailure(f"Set members mismatch. Expected: {expected_members}, Got: {actual_members}")
         
         # Test sorted set operations
-        zset_key = f"test:zset:{unique_id}"
-        test_redis_keys_created.append(zset_key)
+        zset_key = f"{unique_id}:test:zset"
         
         zset_req = {
             "key": zset_key,
@@ -368,41 +367,22 @@ def cleanup_test_data():
     print("\n🧹 Cleaning up test data...")
     
     cleanup_success = True
-    
-    # Clean up memory entities
-    for entity_id in test_entities_created:
+    cleanups = [
+        ("memory entities", "/mcp/memory/delete_entities", {"namePrefix": f"{NAMESPACE}:"}),
+        ("Redis keys", "/mcp/redis/delete_prefix", {"prefix": f"{NAMESPACE}:"}),
+    ]
+    for label, path, delete_req in cleanups:
         try:
-            delete_req = {"entity_id": entity_id}
-            response = make_request('POST', f"{MCP_URL}/mcp/memory/delete_entity", delete_req)
-            
-            if response.status_code in [200, 404]:  # 404 is ok if already deleted
-                print(f"✅ Cleaned up memory entity: {entity_id}")
+            response = make_request('POST', f"{MCP_URL}{path}", delete_req)
+            if response.status_code == 200:
+                print(f"✅ Cleaned up {response.json()['deleted']} {label}")
             else:
-                print(f"⚠️ Failed to clean up memory entity {entity_id}: status {response.status_code}")
+                print(f"⚠️ Failed to clean up {label}: status {response.status_code}")
                 cleanup_success = False
         except Exception as e:
-            print(f"⚠️ Error cleaning up memory entity {entity_id}: {e}")
+            print(f"⚠️ Error cleaning up {label}: {e}")
             cleanup_success = False
     
-    # Clean up Redis keys
-    for key in test_redis_keys_created:
-        try:
-            delete_req = {"key": key}
-            response = make_request('POST', f"{MCP_URL}/mcp/redis/delete", delete_req)
-            
-            if response.status_code in [200, 404]:  # 404 is ok if already deleted
-                print(f"✅ Cleaned up Redis key: {key}")
-            else:
-                print(f"⚠️ Failed to clean up Redis key {key}: status {response.status_code}")
-                cleanup_success = False
-        except Exception as e:
-            print(f"⚠️ Error cleaning up Redis key {key}: {e}")
-            cleanup_success = False
-    
-    # Clear tracking lists
-    test_entities_created.clear()
-    test_redis_keys_created.clear()
-    
     if cleanup_success:
         print("✅ All test data cleaned up successfully")
     else:
@@ -491,7 +471,7 @@ def test_negative_cases():
         
         # Test missing required fields
         try:
-            incomplete_entity = {"name": "incomplete"}
+            incomplete_entity = {"name": f"{NAMESPACE}:incomplete"}
             response = make_request('POST', f"{MCP_URL}/mcp/memory/create_entities", [incomplete_entity])
             if response.status_code in [400, 422]:
                 print("✅ Incomplete entity data properly rejected")
@@ -568,6 +548,16 @@ def run_performance_tests():
         print(f"❌ Performance tests FAILED: {e}")
         return False
 
+@pytest.fixture(autouse=True, scope="module")
+def mcp_url(server_url):
+    """Under pytest, run the suite against the server_url fixture's server"""
+    global MCP_URL
+    MCP_URL = server_url
+
+def teardown_module():
+    """Under pytest, clean up once after every test in this file has run"""
+    cleanup_test_data()
+
 def main():
     print("🧪 Comprehensive MCP Server Test Suite")
     print("=" * 60)
@@ -0,0 +1,123 @@
+#!/usr/bin/env python3
+"""
+Unit tests for the multi-process load driver
+Histogram and report merging only; no server or worker processes needed
+"""
+
+import random
+
+import pytest
+
+from load_driver import (LABEL_PAIR, METRIC_LINE, LatencyHistogram, _split, merge_reports,
+                         server_breakdown)
+from request_timing import RequestTimer
+from server_metrics import ServerMetrics
+
+
+class TestLatencyHistogram:
+    """Test the mergeable latency histogram"""
+
+    def test_percentiles_within_bucket_precision(self):
+        rng = random.Random(3)
+        samples = [rng.uniform(0.001, 0.2) for _ in range(10000)]
+        histogram = LatencyHistogram()
+        for sample in samples:
+            histogram.record(sample)
+
+        ordered = sorted(samples)
+        for q in (50, 90, 99):
+            exact = ordered[int(len(ordered) * q / 100) - 1]
+            assert histogram.percentile(q) == pytest.approx(exact, rel=0.06)
+        assert histogram.percentile(100) == max(samples)
+
+    def test_merge_matches_single_histogram(self):
+        rng = random.Random(5)
+        combined = LatencyHistogram()
+        parts = [LatencyHistogram() for _ in range(4)]
+        for i in range(4000):
+            sample = rng.expovariate(100)
+            combined.record(sample)
+            parts[i % 4].record(sample)
+
+        merged = LatencyHistogram()
+        for part in parts:
+            merged.merge(LatencyHistogram.from_dict(part.to_dict()))
+        assert merged.counts == combined.counts
+        assert merged.summary() == pytest.approx(combined.summary())
+
+
+class TestReports:
+    """Test splitting work and merging worker reports"""
+
+    def test_split_covers_total(self):
+        assert _split(10, 3) == [4, 3, 3]
+        assert _split(None, 2) == [None, None]
+
+    def test_merge_reports(self):
+        histogram = LatencyHistogram()
+        histogram.record(0.01)
+        worker = {"worker_id": 0, "pid": 1, "started": 100.0, "finished": 102.0,
+                  "statuses": {"200": 1}, "errors": {"ClientError": 1},
+                  "histogram": histogram.to_dict()}
+        report = merge_reports([worker, {"worker_id": 1, "failed": "boom"}], {"processes": 2})
+        assert report["total_requests"] == 2
+        assert report["successful_requests"] == 1
+        assert report["requests_per_second"] == 1.0
+        assert len(report["failed_workers"]) == 1
+
+    def test_merge_windows_by_index(self):
+        workers = []
+        for worker_id, windows in enumerate([[0.001, 0.002, 0.003], [0.004]]):
+            histograms = []
+            for seconds in windows:
+                histogram = LatencyHistogram()
+                histogram.record(seconds)
+                histograms.append(histogram.to_dict())
+            workers.append({"worker_id": worker_id, "pid": worker_id, "started": 0.0,
+                            "finished": 3.0, "statuses": {"200": len(windows)}, "errors": {},
+                            "histogram": LatencyHistogram().to_dict(), "windows": histograms})
+        report = merge_reports(workers, {})
+        assert [w["count"] for w in report["windows"]] == [2, 1, 1]
+        assert report["windows"][0]["max_ms"] == pytest.approx(4)
+
+
+class TestServerBreakdown:
+    """Test correlating scraped server metrics"""
+
+    @staticmethod
+    def parse(text):
+        samples = {}
+        for line in text.splitlines():
+            match = METRIC_LINE.match(line)
+            if match:
+                name, labels, value = match.groups()
+                samples[(name, tuple(sorted(LABEL_PAIR.findall(labels or ""))))] = float(value)
+        return samples
+
+    @staticmethod
+    def timer(queue, handler, storage, serialization):
+        timer = RequestTimer()
+        timer.arrival = 0.0
+        timer.handler_start = queue
+        timer.storage = storage
+        timer.handler_end = queue + handler + storage
+        timer.response_start = timer.handler_end + serialization
+        return timer
+
+    def test_breakdown_uses_only_new_requests(self):
+        metrics = ServerMetrics()
+        metrics.observe("/mcp/memory/search_nodes", "POST", 200, self.timer(0.5, 0.5, 0.5, 0.5))
+        before = self.parse(metrics.render())
+        for _ in range(10):
+            metrics.observe("/mcp/memory/search_nodes", "POST", 200,
+                            self.timer(0.001, 0.002, 0.003, 0.004))
+        metrics.observe("/metrics", "GET", 200, self.timer(0.001, 0.001, 0, 0.001))
+
+        breakdown = server_breakdown(before, self.parse(metrics.render()))
+        assert list(breakdown) == ["/mcp/memory/search_nodes"]
+        search = breakdown["/mcp/memory/search_nodes"]
+        assert search["requests"] == 10
+        assert search["mean_ms"] == pytest.approx(10.0)
+        assert search["p99_upper_bound_ms"] == pytest.approx(10.0)
+        assert search["phase_mean_ms"] == pytest.approx(
+            {"queue": 1.0, "handler": 2.0, "storage": 3.0, "serialization": 4.0})
@@ -13,56 +13,41 @@ from datetime import datetime
 from typing import Dict, List, Any, Generator
 from unittest.mock import patch, MagicMock
 
-# Configuration
-SERVER_URL = "http://localhost:8000"
+from mcp_client import MCPClient, worker_namespace
+
+# Configuration (the server itself comes from the server_url fixture in conftest.py)
 REQUEST_TIMEOUT = 10
 
-# Test data tracking for cleanup
+# Every entity name and redis key a worker creates starts with "<namespace>:",
+# so workers never see each other's data and cleanup is one bulk delete per store
 @pytest.fixture(scope="session")
-def test_data_tracker():
-    """Track test data for cleanup"""
-    tracker = {
-        "entities": [],
-        "redis_keys": []
-    }
-    yield tracker
-    
-    # Cleanup after all tests
-    cleanup_test_data(tracker)
-
-def cleanup_test_data(tracker: Dict[str, List[str]]):
-    """Clean up test data"""
-    print("\n🧹 Cleaning up test data...")
-    
-    # Clean memory entities
-    for entity_id in tracker["entities"]:
-        try:
-            requests.post(f"{SERVER_URL}/mcp/memory/delete_entity", 
-                         json={"entity_id": entity_id}, timeout=5)
-        except:
-            pass
+def namespace(server_url):
+    """Per-worker namespace, bulk-deleted after the session"""
+    ns = worker_namespace()
+    yield ns
     
-    # Clean Redis keys
-    for key in tracker["redis_keys"]:
-        try:
-            requests.post(f"{SERVER_URL}/mcp/redis/delete", 
-                         json={"key": key}, timeout=5)
-        except:
-            pass
+    print("\n🧹 Cleaning up test data...")
+    client = MCPClient(server_url, timeout=60)
+    try:
+        client.delete_namespace(ns)
+    except Exception as e:
+        print(f"⚠️ Cleanup of namespace {ns} failed: {e}")
+    finally:
+        client.close()
 
 @pytest.fixture(scope="session")
-def server_health():
+def server_health(server_url):
     """Ensure server is healthy before running tests"""
-    response = requests.get(f"{SERVER_URL}/health", timeout=10)
+    response = requests.get(f"{server_url}/health", timeout=10)
     assert response.status_code == 200, "Server is not healthy"
     return response.json()
 
 class TestServerHealth:
     """Test server health and basic connectivity"""
     
-    def test_health_endpoint_accessibility(self):
+    def test_health_endpoint_accessibility(self, server_url):
         """Test that health endpoint is accessible"""
-        response = requests.get(f"{SERVER_URL}/health", timeout=REQUEST_TIMEOUT)
+        response = requests.get(f"{server_url}/health", timeout=REQUEST_TIMEOUT)
         assert response.status_code == 200
     
     def test_health_response_structure(self, server_health):
@@ -77,10 +62,10 @@ class TestServerHealth:
         assert server_health["memory_entities"] >= 0
         assert server_health["redis_keys"] >= 0
     
-    def test_health_endpoint_response_time(self):
+    def test_health_endpoint_response_time(self, server_url):
         """Test health endpoint responds quickly"""
         start_time = time.time()
-        response = requests.get(f"{SERVER_URL}/health", timeout=REQUEST_TIMEOUT)
+        response = requests.get(f"{server_url}/health", timeout=REQUEST_TIMEOUT)
         response_time = time.time() - start_time
         
         assert response.status_code == 200
@@ -90,15 +75,15 @@ class TestMemoryOperations:
     """Test Memory MCP operations"""
     
     @pytest.fixture
-    def unique_id(self):
-        """Generate unique ID for test data"""
-        return datetime.now().strftime('%Y%m%d_%H%M%S_%f')
+    def unique_id(self, namespace):
+        """Generate unique ID for test data, inside the worker's namespace"""
+        return f"{namespace}:{datetime.now().strftime('%Y%m%d_%H%M%S_%f')}"
     
     @pytest.fixture
     def test_entity(self, unique_id):
         """Create test entity data"""
         return {
-            "name": f"test-entity-{unique_id}",
+            "name": f"{unique_id}-test-entity",
             "entityType": "test",
             "observations": [
                 f"Test observation 1 - {unique_id}",
@@ -107,9 +92,9 @@ class TestMemoryOperations:
             ]
         }
     
-    def test_entity_creation_success(self, test_entity, test_data_tracker):
+    def test_entity_creation_success(self, server_url, test_entity):
         """Test successful entity creation"""
-        response = requests.post(f"{SERVER_URL}/mcp/memory/create_entities", 
+        response = requests.post(f"{server_url}/mcp/memory/create_entities", 
                                json=[test_entity], timeout=REQUEST_TIMEOUT)
         
         assert response.status_code == 200
@@ -120,27 +105,62 @@ class TestMemoryOperations:
         assert "entity_id" in result["entities"][0]
         
         entity_id = result["entities"][0]["entity_id"]
-        test_data_tracker["entities"].append(entity_id)
         
         assert isinstance(entity_id, str)
         assert len(entity_id) > 0
     
-    def test_entity_search_functionality(self, test_entity, test_data_tracker, unique_id):
+    @pytest.mark.parametrize("codec", ["json", "msgpack"])
+    def test_codec_round_trip(self, server_url, codec, test_entity, unique_id):
+        """Test create and search through the shared client with each wire codec"""
+        if codec == "msgpack":
+            pytest.importorskip("msgpack")
+        client = MCPClient(server_url, codec=codec, timeout=REQUEST_TIMEOUT)
+        try:
+            response = client.post("/mcp/memory/create_entities", [test_entity])
+            assert response.status_code == 200
+            assert response.headers["content-type"].startswith(client.media_type)
+    
+            response = client.post("/mcp/memory/search_nodes", {"query": unique_id, "limit": 5})
+            assert response.status_code == 200
+            assert response.data["nodes"][0]["observations"] == test_entity["observations"]
+        finally:
+            client.close()
+    
+    def test_open_nodes(self, server_url, test_entity):
+        """Test opening entities by ID, twice so the second read comes from the cache"""
+        created = requests.post(f"{server_url}/mcp/memory/create_entities", json=[test_entity],
+                                timeout=REQUEST_TIMEOUT).json()["entities"]
+        entity_id = created[0]["entity_id"]
+        for _ in range(2):
+            response = requests.post(f"{server_url}/mcp/memory/open_nodes",
+                                     json={"entity_ids": [entity_id, "missing-id"]},
+                                     timeout=REQUEST_TIMEOUT)
+            assert response.status_code == 200
+            result = response.json()
+            assert result["count"] == 1
+            assert result["nodes"][0]["observations"] == test_entity["observations"]
+            assert result["missing"] == ["missing-id"]
+
+        cache = requests.get(f"{server_url}/status",
+                             timeout=REQUEST_TIMEOUT).json()["memory_mcp"]["cache"]
+        assert cache["entities"]["hits"] >= 1
+        assert 0 < cache["entities"]["hit_ratio"] <= 1
+
+    def test_entity_search_functionality(self, server_url, test_entity, unique_id):
         """Test entity search finds created entities"""
         # Create entity
-        response = requests.post(f"{SERVER_URL}/mcp/memory/create_entities", 
+        response = requests.post(f"{server_url}/mcp/memory/create_entities", 
                                json=[test_entity], timeout=REQUEST_TIMEOUT)
         assert response.status_code == 200
         
         result = response.json()
         entity_id = result["entities"][0]["entity_id"]
-        test_data_tracker["entities"].append(entity_id)
         
         # Search for entity
         search_query = f"Test observation 1 - {unique_id}"
         search = {"query": search_query, "limit": 5}
         
-        response = requests.post(f"{SERVER_URL}/mcp/memory/search_nodes", 
+        response = requests.post(f"{server_url}/mcp/memory/search_nodes", 
                                json=search, timeout=REQUEST_TIMEOUT)
         
         assert response.status_code == 200
@@ -156,15 +176,98 @@ class TestMemoryOperations:
         found = any(node.get("entity_id") == entity_id for node in results["nodes"])
         assert found, "Created entity not found in search results"
     
+    def test_substring_search(self, server_url, test_entity, unique_id):
+        """Test substring search on a fragment that cuts across tokens"""
+        requests.post(f"{server_url}/mcp/memory/create_entities", json=[test_entity],
+                      timeout=REQUEST_TIMEOUT)
+        fragment = f"ion 1 - {unique_id}"[:-1]
+        response = requests.post(f"{server_url}/mcp/memory/search_nodes",
+                                 json={"query": fragment, "match": "substring", "limit": 5},
+                                 timeout=REQUEST_TIMEOUT)
+        assert response.status_code == 200
+        assert response.json()["nodes"][0]["name"] == test_entity["name"]
+
+        response = requests.post(f"{server_url}/mcp/memory/search_nodes",
+                                 json={"query": fragment, "match": "regex"},
+                                 timeout=REQUEST_TIMEOUT)
+        assert response.status_code == 422
+
+    def test_search_pagination_and_stream(self, server_url, unique_id):
+        """Test cursor pages and the NDJSON stream return the same nodes"""
+        entities = [{"name": f"{unique_id}-page-{i}", "entityType": f"paged-{unique_id}",
+                     "observations": [f"paged observation {unique_id}"]} for i in range(7)]
+        response = requests.post(f"{server_url}/mcp/memory/create_entities",
+                               json=entities, timeout=REQUEST_TIMEOUT)
+        assert response.status_code == 200
+        
+        search = {"query": "", "entityType": f"paged-{unique_id}", "limit": 3}
+        paged = []
+        while True:
+            page = requests.post(f"{server_url}/mcp/memory/search_nodes",
+                                 json=search, timeout=REQUEST_TIMEOUT).json()
+            paged += [node["name"] for node in page["nodes"]]
+            if page["next_cursor"] is None:
+                break
+            search["cursor"] = page["next_cursor"]
+        assert paged == [e["name"] for e in entities]
+        
+        response = requests.post(f"{server_url}/mcp/memory/search_nodes",
+                               json={"query": "", "entityType": f"paged-{unique_id}", "limit": 100},
+                               headers={"Accept": "application/x-ndjson"},
+                               stream=True, timeout=REQUEST_TIMEOUT)
+        assert response.headers["content-type"].startswith("application/x-ndjson")
+        lines = [json.loads(line) for line in response.iter_lines() if line]
+        assert [node["name"] for node in lines[:-1]] == paged
+        assert lines[-1] == {"query": "", "count": 7, "next_cursor": None}
+
+    def test_relations_and_traversal(self, server_url, unique_id):
+        """Test relations between entities, neighbourhood and path queries"""
+        entities = [{"name": f"{unique_id}-graph-{i}", "entityType": "graph_node"}
+                    for i in range(4)]
+        response = requests.post(f"{server_url}/mcp/memory/create_entities",
+                               json=entities, timeout=REQUEST_TIMEOUT)
+        assert response.status_code == 200
+        ids = [e["entity_id"] for e in response.json()["entities"]]
+
+        chain = [{"from": a, "to": b, "relationType": "precedes"} for a, b in zip(ids, ids[1:])]
+        response = requests.post(f"{server_url}/mcp/memory/create_relations",
+                               json={"relations": chain}, timeout=REQUEST_TIMEOUT)
+        assert response.json() == {"created": 3, "count": 3}
+
+        response = requests.post(f"{server_url}/mcp/memory/create_relations",
+                               json={"relations": [{"from": ids[0], "to": "missing",
+                                                    "relationType": "precedes"}]},
+                               timeout=REQUEST_TIMEOUT)
+        assert response.status_code == 404
+
+        data = requests.post(f"{server_url}/mcp/memory/neighbors",
+                           json={"entity_id": ids[0], "depth": 2},
+                           timeout=REQUEST_TIMEOUT).json()
+        assert [(n["id"], n["depth"]) for n in data["nodes"]] == [(ids[1], 1), (ids[2], 2)]
+
+        data = requests.post(f"{server_url}/mcp/memory/find_path",
+                           json={"source": ids[3], "target": ids[0], "direction": "in"},
+                           timeout=REQUEST_TIMEOUT).json()
+        assert data["found"]
+        assert [edge["from"] for edge in data["path"]] == ids[2::-1]
+
+        # Deleting an entity drops its relations
+        requests.post(f"{server_url}/mcp/memory/delete_entity",
+                     json={"entity_id": ids[1]}, timeout=REQUEST_TIMEOUT)
+        data = requests.post(f"{server_url}/mcp/memory/find_path",
+                           json={"source": ids[0], "target": ids[3]},
+                           timeout=REQUEST_TIMEOUT).json()
+        assert not data["found"]
+
     @pytest.mark.parametrize("invalid_entity", [
         {},  # Empty entity
         {"name": "test"},  # Missing required fields
         {"entityType": "test"},  # Missing name
         {"observations": ["test"]},  # Missing name and type
     ])
-    def test_entity_creation_validation(self, invalid_entity):
+    def test_entity_creation_validation(self, server_url, invalid_entity):
         """Test entity creation rejects invalid data"""
-        response = requests.post(f"{SERVER_URL}/mcp/memory/create_entities", 
+        response = requests.post(f"{server_url}/mcp/memory/create_entities", 
                                json=[invalid_entity], timeout=REQUEST_TIMEOUT)
         
         # Should reject with 400 or 422
@@ -176,9 +279,9 @@ class TestMemoryOperations:
         {"query": "test", "limit": -1},  # Negative limit
         {"query": "test", "limit": 10000},  # Very large limit
     ])
-    def test_search_edge_cases(self, search_params):
+    def test_search_edge_cases(self, server_url, search_params):
         """Test search handles edge cases gracefully"""
-        response = requests.post(f"{SERVER_URL}/mcp/memory/search_nodes", 
+        response = requests.post(f"{server_url}/mcp/memory/search_nodes", 
                                json=search_params, timeout=REQUEST_TIMEOUT)
         
         # Should either succeed or reject appropriately
@@ -193,14 +296,13 @@ class TestRedisOperations:
     """Test Redis MCP operations"""
     
     @pytest.fixture
-    def unique_id(self):
-        """Generate unique ID for test data"""
-        return datetime.now().strftime('%Y%m%d_%H%M%S_%f')
+    def unique_id(self, namespace):
+        """Generate unique ID for test data, inside the worker's namespace"""
+        return f"{namespace}:{datetime.now().strftime('%Y%m%d_%H%M%S_%f')}"
     
-    def test_hash_operations(self, unique_id, test_data_tracker):
+    def test_hash_operations(self, server_url, unique_id):
         """Test Redis hash operations"""
-        key = f"test:hash:{unique_id}"
-        test_data_tracker["redis_keys"].append(key)
+        key = f"{unique_id}:test:hash"
         
         # Test HSET
         hash_req = {
@@ -209,35 +311,34 @@ class TestRedisOperations:
             "value": f"value1_{unique_id}"
         }
         
-        response = requests.post(f"{SERVER_URL}/mcp/redis/hset", 
+        response = requests.post(f"{server_url}/mcp/redis/hset", 
                                json=hash_req, timeout=REQUEST_TIMEOUT)
         assert response.status_code == 200
         
         # Test HGET
         get_req = {"key": key, "field": "field1"}
-        response = requests.post(f"{SERVER_URL}/mcp/redis/hget", 
+        response = requests.post(f"{server_url}/mcp/redis/hget", 
                                json=get_req, timeout=REQUEST_TIMEOUT)
         
         if response.status_code == 200:
             result = response.json()
             assert result.get("value") == f"value1_{unique_id}"
     
-    def test_set_operations(self, unique_id, test_data_tracker):
+    def test_set_operations(self, server_url, unique_id):
         """Test Redis set operations"""
-        key = f"test:set:{unique_id}"
-        test_data_tracker["redis_keys"].append(key)
+        key = f"{unique_id}:test:set"
         
         members = [f"member1_{unique_id}", f"member2_{unique_id}", f"member3_{unique_id}"]
         
         # Test SADD
         set_req = {"key": key, "members": members}
-        response = requests.post(f"{SERVER_URL}/mcp/redis/sadd", 
+        response = requests.post(f"{server_url}/mcp/redis/sadd", 
                                json=set_req, timeout=REQUEST_TIMEOUT)
         assert response.status_code == 200
         
         # Test SMEMBERS
         members_req = {"key": key}
-        response = requests.post(f"{SERVER_URL}/mcp/redis/smembers", 
+        response = requests.post(f"{server_url}/mcp/redis/smembers", 
                                json=members_req, timeout=REQUEST_TIMEOUT)
         
         if response.status_code == 200:
@@ -246,10 +347,9 @@ class TestRedisOperations:
             expected_members = set(members)
             assert expected_members.issubset(returned_members)
     
-    def test_sorted_set_operations(self, unique_id, test_data_tracker):
+    def test_sorted_set_operations(self, server_url, unique_id):
         """Test Redis sorted set operations"""
-        key = f"test:zset:{unique_id}"
-        test_data_tracker["redis_keys"].append(key)
+        key = f"{unique_id}:test:zset"
         
         # Test ZADD
         zset_req = {
@@ -261,31 +361,105 @@ class TestRedisOperations:
             }
         }
         
-        response = requests.post(f"{SERVER_URL}/mcp/redis/zadd", 
+        response = requests.post(f"{server_url}/mcp/redis/zadd", 
                                json=zset_req, timeout=REQUEST_TIMEOUT)
         assert response.status_code == 200
         
         # Test ZRANGE
         range_req = {"key": key, "start": 0, "stop": -1}
-        response = requests.post(f"{SERVER_URL}/mcp/redis/zrange", 
+        response = requests.post(f"{server_url}/mcp/redis/zrange", 
                                json=range_req, timeout=REQUEST_TIMEOUT)
         
         if response.status_code == 200:
             result = response.json()
             members = result.get("members", [])
             assert len(members) >= 3
+    
+    def test_zadd_rejects_non_finite_scores(self, server_url, unique_id):
+        """Test NaN and infinite scores get 400 and leave the sorted set intact"""
+        key = f"{unique_id}:test:zset:nan"
+        for members in ({"a": "nan", "b": 2}, {"a": 1}, {"a": "inf"}, {"a": "-inf"}):
+            response = requests.post(f"{server_url}/mcp/redis/zadd",
+                                   json={"key": key, "members": members},
+                                   timeout=REQUEST_TIMEOUT)
+            assert response.status_code == (200 if members == {"a": 1} else 400)
+        assert "not a valid float" in response.json()["detail"]
+        
+        response = requests.post(f"{server_url}/mcp/redis/zrange",
+                               json={"key": key, "withscores": True}, timeout=REQUEST_TIMEOUT)
+        assert response.json()["members"] == [["a", 1.0]]
+    
+    def test_pipeline_operations(self, server_url, unique_id):
+        """Test a mixed pipeline returns per-command results in order"""
+        hash_key = f"{unique_id}:test:pipe:hash"
+        zset_key = f"{unique_id}:test:pipe:zset"
+        
+        commands = [
+            {"op": "hset", "key": hash_key, "field": "f1", "value": "v1"},
+            {"op": "zadd", "key": zset_key, "members": {"b": 2.0, "a": 1.0}},
+            {"op": "hget", "key": hash_key, "field": "f1"},
+            {"op": "zrange", "key": zset_key, "start": 0, "stop": -1},
+            {"op": "sadd", "key": hash_key, "members": ["wrong type"]},
+        ]
+        response = requests.post(f"{server_url}/mcp/redis/pipeline",
+                               json={"commands": commands}, timeout=REQUEST_TIMEOUT)
+        assert response.status_code == 200
+        
+        results = response.json()["results"]
+        assert [r["ok"] for r in results] == [True, True, True, True, False]
+        assert results[2]["result"]["value"] == "v1"
+        assert results[3]["result"]["members"] == ["a", "b"]
+        assert results[4]["status"] == 400
+    
+    def test_atomic_pipeline_rejects_invalid_command(self, server_url, unique_id):
+        """Test an atomic pipeline runs nothing when one command is invalid"""
+        key = f"{unique_id}:test:pipe:atomic"
+        commands = [
+            {"op": "hset", "key": key, "field": "f1", "value": "v1"},
+            {"op": "hset", "key": key},
+        ]
+        response = requests.post(f"{server_url}/mcp/redis/pipeline",
+                               json={"commands": commands, "atomic": True}, timeout=REQUEST_TIMEOUT)
+        assert response.status_code == 400
+        assert response.json()["detail"]["index"] == 1
+        
+        response = requests.post(f"{server_url}/mcp/redis/hget",
+                               json={"key": key, "field": "f1"}, timeout=REQUEST_TIMEOUT)
+        assert response.json()["value"] is None
+
+    def test_subscribe_streams_changes(self, server_url, unique_id):
+        """Test a subscriber is pushed changes to keys matching its pattern"""
+        key = f"{unique_id}:test:inbox"
+        response = requests.get(f"{server_url}/mcp/redis/subscribe",
+                                params={"pattern": f"{unique_id}:test:*"},
+                                stream=True, timeout=REQUEST_TIMEOUT)
+        assert response.status_code == 200
+        assert response.headers["content-type"].startswith("text/event-stream")
+        lines = response.iter_lines()
+        assert next(lines) == b"event: subscribed"
+        
+        requests.post(f"{server_url}/mcp/redis/sadd",
+                      json={"key": f"{unique_id}:other", "members": ["ignored"]}, timeout=REQUEST_TIMEOUT)
+        requests.post(f"{server_url}/mcp/redis/sadd",
+                      json={"key": key, "members": ["task-1"]}, timeout=REQUEST_TIMEOUT)
+        data = next(line for line in lines if line.startswith(b"data: {\"event\""))
+        event = json.loads(data[6:])
+        response.close()
+        assert event["event"] == "sadd"
+        assert event["key"] == key
+        assert event["members"] == ["task-1"]
 
 class TestStatusEndpoint:
     """Test status endpoint functionality"""
     
-    def test_status_endpoint_accessibility(self):
+    def test_status_endpoint_accessibility(self, server_url):
         """Test status endpoint is accessible"""
-        response = requests.get(f"{SERVER_URL}/status", timeout=REQUEST_TIMEOUT)
+        response = requests.get(f"{server_url}/status", timeout=REQUEST_TIMEOUT)
         assert response.status_code == 200
     
-    def test_status_response_structure(self):
+    def test_status_response_structure(self, server_url):
         """Test status response has required structure"""
-        response = requests.get(f"{SERVER_URL}/status", timeout=REQUEST_TIMEOUT)
+        response = requests.get(f"{server_url}/status", timeout=REQUEST_TIMEOUT)
         assert response.status_code == 200
         
         status = response.json()
@@ -304,46 +478,76 @@ class TestStatusEndpoint:
         for field in redis_fields:
             assert field in status["redis_mcp"]
             assert isinstance(status["redis_mcp"][field], int)
+    
+    def test_server_timing_header(self, server_url):
+        """Test responses carry a Server-Timing phase breakdown"""
+        response = requests.post(f"{server_url}/mcp/memory/search_nodes",
+                               json={"query": "timing"}, timeout=REQUEST_TIMEOUT)
+        assert response.status_code == 200
+        
+        timing = response.headers.get("Server-Timing", "")
+        phases = {part.split(";")[0].strip() for part in timing.split(",")}
+        assert {"queue", "handler", "storage", "serialization", "total"} <= phases
+    
+    def test_metrics_endpoint(self, server_url):
+        """Test /metrics exposes Prometheus counters and phase histograms"""
+        requests.get(f"{server_url}/health", timeout=REQUEST_TIMEOUT)
+        response = requests.get(f"{server_url}/metrics", timeout=REQUEST_TIMEOUT)
+        assert response.status_code == 200
+        assert response.headers["content-type"].startswith("text/plain")
+        
+        body = response.text
+        assert "# TYPE mcp_requests_total counter" in body
+        assert 'mcp_request_phase_seconds_count{phase="queue",route="/health"}' in body
+        assert "mcp_memory_entities " in body
 
 class TestErrorHandling:
     """Test error handling and edge cases"""
     
-    def test_nonexistent_endpoint(self):
+    def test_nonexistent_endpoint(self, server_url):
         """Test accessing non-existent endpoint"""
-        response = requests.get(f"{SERVER_URL}/nonexistent", timeout=REQUEST_TIMEOUT)
+        response = requests.get(f"{server_url}/nonexistent", timeout=REQUEST_TIMEOUT)
         assert response.status_code == 404
     
-    def test_malformed_json(self):
+    def test_malformed_json(self, server_url):
         """Test sending malformed JSON"""
         headers = {'Content-Type': 'application/json'}
         
-        with pytest.raises(Exception):  # Should fail to send invalid JSON
-            requests.post(f"{SERVER_URL}/mcp/memory/create_entities", 
-                         data="invalid json", headers=headers, timeout=REQUEST_TIMEOUT)
+        response = requests.post(f"{server_url}/mcp/memory/create_entities", 
+                               data="invalid json", headers=headers, timeout=REQUEST_TIMEOUT)
+        assert response.status_code in [400, 422]
     
-    def test_missing_content_type(self):
+    def test_missing_content_type(self, server_url):
         """Test sending JSON without proper content type"""
-        response = requests.post(f"{SERVER_URL}/mcp/memory/create_entities", 
+        response = requests.post(f"{server_url}/mcp/memory/create_entities", 
                                data='{"test": "data"}', timeout=REQUEST_TIMEOUT)
         
         # Server should handle this gracefully
         assert response.status_code in [200, 400, 415, 422]
     
+    def test_oversized_observation_rejected(self, server_url):
+        """Test that an oversized observation is refused with 413 before parsing"""
+        huge_entity = {"name": "huge", "entityType": "test", "observations": ["a" * 1000000]}
+        response = requests.post(f"{server_url}/mcp/memory/create_entities",
+                               json=[huge_entity], timeout=REQUEST_TIMEOUT)
+        assert response.status_code == 413
+        assert response.json()["limit"] == "string_bytes"
+    
     @pytest.mark.parametrize("method", ["PUT", "DELETE", "PATCH"])
-    def test_unsupported_methods(self, method):
+    def test_unsupported_methods(self, server_url, method):
         """Test unsupported HTTP methods"""
-        response = requests.request(method, f"{SERVER_URL}/health", timeout=REQUEST_TIMEOUT)
+        response = requests.request(method, f"{server_url}/health", timeout=REQUEST_TIMEOUT)
         assert response.status_code in [405, 501]  # Method not allowed or not implemented
 
 class TestPerformance:
     """Test performance characteristics"""
     
-    def test_response_time_health(self):
+    def test_response_time_health(self, server_url):
         """Test health endpoint response time"""
         times = []
         for _ in range(5):
             start = time.time()
-            response = requests.get(f"{SERVER_URL}/health", timeout=REQUEST_TIMEOUT)
+            response = requests.get(f"{server_url}/health", timeout=REQUEST_TIMEOUT)
             end = time.time()
             
             assert response.status_code == 200
@@ -352,10 +556,53 @@ class TestPerformance:
         avg_time = sum(times) / len(times)
         assert avg_time < 0.5, f"Average response time too slow: {avg_time:.3f}s"
     
-    def test_concurrent_requests(self):
+    @pytest.mark.performance
+    def test_health_latency_constant_as_store_grows(self, server_url, namespace):
+        """Test health and status stay O(1) while entities and redis keys are added"""
+        session = requests.Session()
+        
+        def median_latency(path: str, samples: int = 30) -> float:
+            times = []
+            for _ in range(samples):
+                start = time.perf_counter()
+                response = session.get(f"{server_url}{path}", timeout=REQUEST_TIMEOUT)
+                times.append(time.perf_counter() - start)
+                assert response.status_code == 200
+            return sorted(times)[len(times) // 2]
+        
+        baseline_health = median_latency("/health")
+        baseline_status = median_latency("/status")
+        
+        # Grow both stores by a few thousand items
+        run_id = f"{namespace}:perf-{datetime.now().strftime('%Y%m%d_%H%M%S_%f')}"
+        for batch in range(4):
+            entities = [{"name": f"{run_id}-{batch}-{i}", "entityType": run_id,
+                         "observations": ["health latency growth"]} for i in range(500)]
+            response = session.post(f"{server_url}/mcp/memory/create_entities",
+                                    json=entities, timeout=60)
+            assert response.status_code == 200
+        keys = [f"{run_id}:{i}" for i in range(2000)]
+        response = session.post(f"{server_url}/mcp/redis/pipeline", json={"commands": [
+            {"op": "sadd", "key": key, "members": ["x"]} for key in keys]}, timeout=60)
+        assert response.status_code == 200
+        
+        # Other workers add and delete data concurrently, so check only this test's own
+        response = session.post(f"{server_url}/mcp/memory/search_nodes",
+                                json={"entityType": run_id, "limit": 5000}, timeout=60)
+        assert response.json()["count"] == 2000
+        
+        # Allow for noise, but a scan over thousands of items would blow well past this
+        grown_health = median_latency("/health")
+        grown_status = median_latency("/status")
+        assert grown_health < baseline_health * 3 + 0.005, \
+            f"Health latency grew from {baseline_health * 1000:.2f}ms to {grown_health * 1000:.2f}ms"
+        assert grown_status < baseline_status * 3 + 0.005, \
+            f"Status latency grew from {baseline_status * 1000:.2f}ms to {grown_status * 1000:.2f}ms"
+    
+    def test_concurrent_requests(self, server_url):
         """Test handling concurrent requests"""
         def make_request():
-            return requests.get(f"{SERVER_URL}/health", timeout=REQUEST_TIMEOUT)
+            return requests.get(f"{server_url}/health", timeout=REQUEST_TIMEOUT)
         
         # Start 5 concurrent requests
         threads = []
@@ -378,35 +625,65 @@ class TestPerformance:
         assert len(results) == 5
         for result in results:
             assert result.status_code == 200
-    
+
+    def test_concurrent_mixed_writes(self, server_url, namespace):
+        """Test parallel entity creates, deletes and redis writes stay consistent"""
+        from concurrent.futures import ThreadPoolExecutor
+
+        run_id = f"{namespace}:concurrent-{int(time.time() * 1000)}"
+
+        def writer(worker: int) -> List[str]:
+            session = requests.Session()
+            kept = []
+            for i in range(10):
+                response = session.post(f"{server_url}/mcp/memory/create_entities",
+                                      json=[{"name": f"{run_id}-{worker}-{i}",
+                                             "entityType": run_id}],
+                                      timeout=REQUEST_TIMEOUT)
+                assert response.status_code == 200
+                entity_id = response.json()["entities"][0]["entity_id"]
+                if i % 2:
+                    response = session.post(f"{server_url}/mcp/memory/delete_entity",
+                                          json={"entity_id": entity_id},
+                                          timeout=REQUEST_TIMEOUT)
+                    assert response.status_code == 200
+                else:
+                    kept.append(entity_id)
+                response = session.post(f"{server_url}/mcp/redis/sadd",
+                                      json={"key": f"{run_id}:set", "members": [f"{worker}-{i}"]},
+                                      timeout=REQUEST_TIMEOUT)
+                assert response.status_code == 200
+            return kept
+
+        start = time.time()
+        with ThreadPoolExecutor(16) as pool:
+            kept = [entity_id for ids in pool.map(writer, range(16)) for entity_id in ids]
+        elapsed = time.time() - start
+
+        response = requests.post(f"{server_url}/mcp/memory/search_nodes",
+                               json={"query": "", "entityType": run_id, "limit": 1000},
+                               timeout=REQUEST_TIMEOUT)
+        assert sorted(node["entity_id"] for node in response.json()["nodes"]) == sorted(kept)
+
+        response = requests.post(f"{server_url}/mcp/redis/smembers",
+                               json={"key": f"{run_id}:set"}, timeout=REQUEST_TIMEOUT)
+        assert len(response.json()["members"]) == 160
+
+        writes = 16 * 25
+        assert writes / elapsed > 50, f"Only {writes / elapsed:.0f} writes/s under concurrency"
+
     @pytest.mark.slow
-    def test_load_handling(self):
-        """Test server under moderate load"""
-        success_count = 0
-        total_requests = 20
-        
-        def make_requests():
-            nonlocal success_count
-            for _ in range(5):
-                try:
-                    response = requests.get(f"{SERVER_URL}/health", timeout=REQUEST_TIMEOUT)
-                    if response.status_code == 200:
-                        success_count += 1
-                except:
-                    pass
-        
-        # Start 4 threads, each making 5 requests
-        threads = []
-        for _ in range(4):
-            thread = threading.Thread(target=make_requests)
-            threads.append(thread)
-            thread.start()
+    def test_load_handling(self, server_url):
+        """Test server under moderate load from two worker processes"""
+        from load_driver import run_load
         
-        for thread in threads:
-            thread.join()
+        report = run_load(server_url, "health", processes=2, concurrency=2, requests=20)
+        
+        assert report["workers_reported"] == 2, f"Load workers failed: {report['failed_workers']}"
+        assert report["total_requests"] == 20
         
         # At least 80% should succeed
-        success_rate = (success_count / total_requests) * 100
+        success_rate = report["success_rate"]
         assert success_rate >= 80, f"Success rate too low: {success_rate:.1f}%"
 
 # Custom markers for different test types
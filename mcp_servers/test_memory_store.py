@@ -0,0 +1,532 @@
+#!/usr/bin/env python3
+"""
+Unit tests for the Memory MCP entity store
+Run without a server: the store is exercised in-process against a temp directory
+"""
+
+import json
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from memory_store import MemoryStore
+
+
+@pytest.fixture
+def store(tmp_path):
+    store = MemoryStore(tmp_path)
+    yield store
+    store.close()
+
+
+def make_entities(count: int):
+    return [
+        {"name": f"entity-{i}", "entityType": "test",
+         "observations": [f"Observation {i}", "shared text"]}
+        for i in range(count)
+    ]
+
+
+class TestBatchedWrites:
+    """Test the batched journal write path"""
+
+    def test_batch_uses_single_fsync(self, store, monkeypatch):
+        calls = []
+        real_fsync = os.fsync
+        monkeypatch.setattr(os, "fsync", lambda fd: (calls.append(fd), real_fsync(fd)))
+
+        created = store.create_entities(make_entities(500))
+
+        assert len(created) == 500
+        assert len(calls) == 1
+        assert store.count == 500
+
+    def test_entities_survive_reopen(self, tmp_path):
+        store = MemoryStore(tmp_path)
+        created = store.create_entities(make_entities(10))
+        store.delete_entity(created[0]["entity_id"])
+        store.close()
+
+        reopened = MemoryStore(tmp_path)
+        assert reopened.count == 9
+        assert reopened.get_entity(created[0]["entity_id"]) is None
+        assert reopened.get_entity(created[1]["entity_id"])["name"] == "entity-1"
+        reopened.close()
+
+    def test_torn_log_tail_is_discarded(self, tmp_path):
+        store = MemoryStore(tmp_path)
+        store.create_entities(make_entities(3))
+        store.close()
+
+        with open(tmp_path / "entity_log" / "segment-000001.log", "ab") as f:
+            f.write(b'0badc0de {"op":"put","id":"trunc')
+
+        reopened = MemoryStore(tmp_path)
+        assert reopened.count == 3
+        reopened.create_entities(make_entities(1))
+        reopened.close()
+
+        assert MemoryStore(tmp_path).count == 4
+
+
+class TestGroupCommit:
+    """Test concurrent writers sharing appends and fsyncs"""
+
+    def test_concurrent_mixed_writes_are_durable(self, tmp_path, monkeypatch):
+        calls = []
+        real_fsync = os.fsync
+
+        def slow_fsync(fd):
+            calls.append(fd)
+            time.sleep(0.002)
+            real_fsync(fd)
+        monkeypatch.setattr(os, "fsync", slow_fsync)
+
+        store = MemoryStore(tmp_path)
+        barrier = threading.Barrier(16)
+
+        def writer(worker: int):
+            barrier.wait()
+            kept, deleted = [], []
+            for i in range(20):
+                created = store.create_entities([{"name": f"w{worker}-{i}", "entityType": "c"}])
+                entity_id = created[0]["entity_id"]
+                if i % 2:
+                    assert store.delete_entity(entity_id)
+                    assert not store.delete_entity(entity_id)
+                    deleted.append(entity_id)
+                else:
+                    kept.append(entity_id)
+            return kept, deleted
+
+        with ThreadPoolExecutor(16) as pool:
+            results = list(pool.map(writer, range(16)))
+        writes = 16 * 30
+        # Writers that arrive while a batch is being fsynced share the next one
+        assert len(calls) < writes / 2
+        store.close()
+
+        reopened = MemoryStore(tmp_path)
+        assert reopened.count == 16 * 10
+        for kept, deleted in results:
+            assert all(reopened.get_entity(entity_id) for entity_id in kept)
+            assert not any(reopened.get_entity(entity_id) for entity_id in deleted)
+        reopened.close()
+
+    def test_readers_do_not_wait_for_fsync(self, store, monkeypatch):
+        entity_id = store.create_entities(make_entities(1))[0]["entity_id"]
+        syncing, release = threading.Event(), threading.Event()
+        real_fsync = os.fsync
+
+        def stalled_fsync(fd):
+            syncing.set()
+            release.wait(5)
+            real_fsync(fd)
+        monkeypatch.setattr(os, "fsync", stalled_fsync)
+
+        future = store.submit_create(make_entities(1))
+        assert syncing.wait(5)
+        try:
+            # The store lock is free while the batch is on its way to disk
+            assert store.get_entity(entity_id)["name"] == "entity-0"
+            assert len(store.search("shared text")) == 1
+            assert not future.done()
+        finally:
+            release.set()
+        assert future.result()[0]["name"] == "entity-0"
+        assert store.count == 2
+
+    def test_failed_write_is_truncated(self, tmp_path, monkeypatch):
+        store = MemoryStore(tmp_path)
+        store.create_entities(make_entities(2))
+        segment = tmp_path / "entity_log" / "segment-000001.log"
+        size = segment.stat().st_size
+        real_fsync = os.fsync
+
+        def failing_fsync(fd):
+            raise OSError("disk full")
+        monkeypatch.setattr(os, "fsync", failing_fsync)
+        with pytest.raises(OSError):
+            store.create_entities(make_entities(3))
+        assert segment.stat().st_size == size
+
+        monkeypatch.setattr(os, "fsync", real_fsync)
+        created = store.create_entities([{"name": "after", "entityType": "test"}])
+        assert store.get_entity(created[0]["entity_id"])["name"] == "after"
+        store.close()
+
+        reopened = MemoryStore(tmp_path)
+        assert reopened.count == 3
+        assert reopened.get_entity(created[0]["entity_id"])["name"] == "after"
+        reopened.close()
+
+    def test_deletes_of_one_entity_in_one_batch(self, store):
+        entity_id = store.create_entities(make_entities(1))[0]["entity_id"]
+        futures = [store.submit_delete_many([entity_id]) for _ in range(5)]
+        assert sorted(len(f.result()) for f in futures) == [0] * 4 + [1]
+        assert store.count == 0
+
+    def test_delete_by_name_prefix(self, store):
+        store.create_entities([{"name": f"{ns}:entity-{i}", "entityType": "test",
+                                "observations": [f"mentions {ns}"]}
+                               for ns in ("run1", "run2") for i in range(3)])
+        store.create_entities([{"name": "unrelated", "entityType": "test",
+                                "observations": ["mentions run1:"]}])
+        for prefix in ("run1:", "run1:ent", "ru"):
+            found = store.find_by_name_prefix(prefix)
+            names = sorted(store.get_entity(entity_id)["name"] for entity_id in found)
+            expected = [f"{ns}:entity-{i}" for ns in ("run1", "run2") for i in range(3)
+                        if f"{ns}:entity-{i}".startswith(prefix)]
+            assert names == expected
+
+        deleted = store.delete_entities(store.find_by_name_prefix("run1:") + ["missing"])
+        assert len(deleted) == 3
+        assert store.count == 4
+
+
+class TestMigration:
+    """Test the one-shot migration from the legacy layouts"""
+
+    def test_legacy_entity_files_are_migrated(self, tmp_path):
+        entities_dir = tmp_path / "entities"
+        entities_dir.mkdir()
+        with open(entities_dir / "29fe48f9713c.json", "w") as f:
+            json.dump({"name": "legacy", "entityType": "test", "observations": ["old"],
+                       "metadata": {}}, f, indent=2)
+
+        store = MemoryStore(tmp_path)
+        assert store.get_entity("29fe48f9713c")["name"] == "legacy"
+        assert list(entities_dir.glob("*.json")) == []
+        store.close()
+
+        reopened = MemoryStore(tmp_path)
+        assert reopened.search("old")[0]["entity_id"] == "29fe48f9713c"
+        assert reopened.delete_entity("29fe48f9713c")
+        reopened.close()
+
+    def test_legacy_journal_is_migrated(self, tmp_path):
+        with open(tmp_path / "entity_journal.jsonl", "w") as f:
+            f.write(json.dumps({"op": "put", "id": "aaa", "entity": {
+                "name": "kept", "entityType": "test", "observations": []}}) + "\n")
+            f.write(json.dumps({"op": "put", "id": "bbb", "entity": {
+                "name": "gone", "entityType": "test", "observations": []}}) + "\n")
+            f.write(json.dumps({"op": "del", "id": "bbb"}) + "\n")
+
+        store = MemoryStore(tmp_path)
+        assert store.count == 1
+        assert store.get_entity("aaa")["name"] == "kept"
+        assert not (tmp_path / "entity_journal.jsonl").exists()
+        store.close()
+
+
+class TestCompaction:
+    """Test segment rotation and compaction"""
+
+    def test_compaction_reclaims_deleted_entities(self, tmp_path):
+        store = MemoryStore(tmp_path, max_segment_bytes=4096)
+        created = store.create_entities(make_entities(200))
+        for entity in created[:150]:
+            store.delete_entity(entity["entity_id"])
+        store.create_entities(make_entities(1))
+
+        segments_before = store.stats()["segments"]
+        assert store.maybe_compact(min_bytes=0)
+        assert store.stats()["segments"] < segments_before
+        assert store.stats()["garbage_bytes"] < 4096
+
+        survivors = [e["entity_id"] for e in created[150:]]
+        assert all(store.get_entity(entity_id) for entity_id in survivors)
+        store.close()
+
+        reopened = MemoryStore(tmp_path, max_segment_bytes=4096)
+        assert reopened.count == 51
+        assert reopened.get_entity(survivors[0])["name"] == "entity-150"
+        assert len(reopened.search("shared", limit=100)) == 51
+        reopened.close()
+
+    def test_garbage_counters_match_segments(self, tmp_path):
+        def scanned(store):
+            log = store._log
+            sealed = [s for s in log._sizes if s != log.active]
+            total = sum(log._sizes[s] for s in sealed)
+            return total - sum(log._live_bytes.get(s, 0) for s in sealed), total
+
+        store = MemoryStore(tmp_path, max_segment_bytes=4096)
+        created = store.create_entities(make_entities(200))
+        for entity in created[::3]:
+            store.delete_entity(entity["entity_id"])
+        assert store._log.garbage() == scanned(store)
+        store.compact()
+        assert store._log.garbage() == scanned(store)
+        store.write_snapshot()
+        store.close()
+
+        reopened = MemoryStore(tmp_path, max_segment_bytes=4096)
+        assert reopened.loaded_from_snapshot
+        assert reopened._log.garbage() == scanned(reopened)
+        reopened.close()
+
+    def test_interrupted_compaction_recovers(self, tmp_path):
+        store = MemoryStore(tmp_path, max_segment_bytes=4096)
+        created = store.create_entities(make_entities(100))
+        store.create_entities(make_entities(1))
+        for entity in created[:50]:
+            store.delete_entity(entity["entity_id"])
+
+        # Simulate a crash after the compacted segment was written but not installed
+        with store._lock:
+            sealed = store._log.sealed_segments()
+            live = {s: [(k, loc) for k, loc in store._locations.items() if loc.segment == s]
+                    for s in sealed}
+        store._log.compact_copy(sealed, live)
+        store.close()
+
+        reopened = MemoryStore(tmp_path, max_segment_bytes=4096)
+        assert reopened.count == 51
+        assert not list((tmp_path / "entity_log").glob("*.compact"))
+        reopened.close()
+
+
+class TestSnapshot:
+    """Test startup from a persisted index snapshot"""
+
+    def test_snapshot_load_matches_replay(self, tmp_path):
+        store = MemoryStore(tmp_path)
+        created = store.create_entities(make_entities(50))
+        store.delete_entity(created[0]["entity_id"])
+        assert store.write_snapshot()
+        assert not store.write_snapshot()
+        store.close()
+
+        reopened = MemoryStore(tmp_path)
+        assert reopened.loaded_from_snapshot
+        assert reopened.count == 49
+        assert reopened.get_entity(created[0]["entity_id"]) is None
+        assert [r["name"] for r in reopened.search("Observation 7")] == ["entity-7"]
+        assert len(reopened.search("", entity_type="test", limit=100)) == 49
+        reopened.close()
+
+    def test_changes_after_snapshot_are_replayed(self, tmp_path):
+        store = MemoryStore(tmp_path)
+        created = store.create_entities(make_entities(10))
+        store.write_snapshot()
+        store.delete_entity(created[3]["entity_id"])
+        store.ingest([(created[4]["entity_id"],
+                       {"name": "renamed", "entityType": "decision", "observations": []})])
+        store.create_entities([{"name": "late", "entityType": "test",
+                                "observations": ["shared text"]}])
+        store.close()
+
+        reopened = MemoryStore(tmp_path)
+        assert reopened.loaded_from_snapshot
+        assert reopened.count == 10
+        assert reopened.search("Observation 3") == []
+        assert reopened.get_entity(created[4]["entity_id"])["name"] == "renamed"
+        assert [r["name"] for r in reopened.search("", entity_type="decision")] == ["renamed"]
+        assert reopened.search("shared", limit=100)[-1]["name"] == "late"
+
+        # Deleting a snapshot entity and re-snapshotting drops it from the base layer
+        reopened.delete_entity(created[5]["entity_id"])
+        reopened.write_snapshot()
+        reopened.close()
+        again = MemoryStore(tmp_path)
+        assert again.count == 9
+        assert len(again.search("shared", limit=100)) == 8
+        again.close()
+
+    def test_stale_snapshot_falls_back_to_replay(self, tmp_path):
+        store = MemoryStore(tmp_path, max_segment_bytes=4096)
+        created = store.create_entities(make_entities(100))
+        store.create_entities(make_entities(1))
+        store.write_snapshot()
+        for entity in created[:80]:
+            store.delete_entity(entity["entity_id"])
+        assert store.compact()
+        store.close()
+
+        reopened = MemoryStore(tmp_path, max_segment_bytes=4096)
+        assert not reopened.loaded_from_snapshot
+        assert reopened.count == 21
+        reopened.close()
+
+    def test_corrupt_snapshot_is_ignored(self, tmp_path):
+        store = MemoryStore(tmp_path)
+        store.create_entities(make_entities(5))
+        store.close()
+        (tmp_path / "entity_index.snap").write_bytes(b"not a snapshot")
+
+        reopened = MemoryStore(tmp_path)
+        assert not reopened.loaded_from_snapshot
+        assert reopened.count == 5
+        reopened.close()
+
+
+class TestSearch:
+    """Test entity search"""
+
+    def test_search_respects_limit(self, store):
+        store.create_entities(make_entities(20))
+        assert len(store.search("shared", limit=5)) == 5
+
+    def test_search_matches_observation_phrase(self, store):
+        store.create_entities(make_entities(20))
+        results = store.search("Observation 7")
+        assert [r["name"] for r in results] == ["entity-7"]
+
+    def test_delete_missing_entity(self, store):
+        assert store.delete_entity("doesnotexist") is False
+
+    def test_search_requires_contiguous_phrase(self, store):
+        store.create_entities([
+            {"name": "a", "entityType": "test", "observations": ["alpha beta gamma"]},
+            {"name": "b", "entityType": "test", "observations": ["beta alpha gamma"]},
+        ])
+        assert [r["name"] for r in store.search("alpha beta")] == ["a"]
+        assert [r["name"] for r in store.search("ALPHA, beta!")] == ["a"]
+
+    def test_search_filters_by_entity_type(self, store):
+        store.create_entities(make_entities(5))
+        store.create_entities([{"name": "note", "entityType": "decision",
+                                "observations": ["shared text"]}])
+        assert [r["name"] for r in store.search("shared", entity_type="decision")] == ["note"]
+        assert [r["name"] for r in store.search("", entity_type="decision")] == ["note"]
+
+    def test_index_updated_on_delete(self, store):
+        created = store.create_entities(make_entities(3))
+        store.delete_entity(created[1]["entity_id"])
+        assert store.search("Observation 1") == []
+        assert len(store.search("shared")) == 2
+
+
+class TestEntityCache:
+    """Test the parsed-entity and search-result caches"""
+
+    def test_repeated_reads_hit_cache(self, store):
+        created = store.create_entities(make_entities(3))
+        ids = [entity["entity_id"] for entity in created]
+        assert [e["name"] for e in store.get_entities(ids + ["nope"])] == \
+            ["entity-0", "entity-1", "entity-2"]
+        store.get_entities(ids)
+        stats = store.cache_stats()["entities"]
+        assert (stats["hits"], stats["misses"], stats["entries"]) == (3, 3, 3)
+
+        store.search("shared")
+        assert store.search("shared") == store.search("shared")
+        assert store.cache_stats()["searches"]["hits"] == 2
+
+    def test_writes_invalidate(self, store):
+        created = store.create_entities(make_entities(2))
+        ids = [entity["entity_id"] for entity in created]
+        store.get_entities(ids)
+        assert len(store.search("shared")) == 2
+
+        store.ingest([(ids[0], {"name": "renamed", "entityType": "test",
+                                "observations": ["shared text"]})])
+        assert store.get_entities(ids[:1])[0]["name"] == "renamed"
+        store.create_entities(make_entities(1))
+        assert len(store.search("shared")) == 3
+        store.delete_entity(ids[1])
+        assert store.get_entities(ids[1:]) == []
+        assert len(store.search("shared")) == 2
+
+    def test_scans_do_not_fill_cache(self, tmp_path):
+        store = MemoryStore(tmp_path, entity_cache_size=2)
+        try:
+            created = store.create_entities(make_entities(10))
+            store.get_entities([created[0]["entity_id"]])
+            assert len(store.find_by_name_prefix("entity-")) == 10
+            # Non-matching phrase candidates are read around the cache too
+            store.search("Observation 9")
+            stats = store.cache_stats()["entities"]
+            # entity-0 and the one search match; the other eight were only scanned
+            assert stats["entries"] == 2 and stats["evictions"] == 0
+            store.get_entities([created[0]["entity_id"]])
+            assert store.cache_stats()["entities"]["hits"] == stats["hits"] + 1
+        finally:
+            store.close()
+
+
+class TestSubstringSearch:
+    """Test trigram-narrowed substring search"""
+
+    @pytest.fixture
+    def runs(self, store):
+        return store.create_entities([
+            {"name": f"run_{stamp}", "entityType": "run",
+             "observations": [f"Test observation 1 - {stamp}"]}
+            for stamp in ("20250820_162709_409303", "20250820_170001_000001", "20250821_090000_5")
+        ])
+
+    def test_matches_across_tokens_and_punctuation(self, store, runs):
+        assert store.search("0820_1627", match="substring")[0]["name"] == \
+            "run_20250820_162709_409303"
+        assert store.search("0820_1627") == []
+        names = [r["name"] for r in store.search("ION 1 - 202508", match="substring")]
+        assert len(names) == 3
+        assert [r["name"] for r in store.search("_5", match="substring")] == \
+            ["run_20250821_090000_5"]
+        assert store.search("0820_1627", entity_type="other", match="substring") == []
+
+    def test_index_follows_writes_and_snapshots(self, tmp_path):
+        store = MemoryStore(tmp_path)
+        created = store.create_entities(make_entities(30))
+        store.write_snapshot()
+        store.delete_entity(created[12]["entity_id"])
+        store.create_entities([{"name": "late", "entityType": "test",
+                                "observations": ["xyz-12-late"]}])
+        store.close()
+
+        reopened = MemoryStore(tmp_path)
+        assert reopened.loaded_from_snapshot
+        assert [r["name"] for r in reopened.search("ion 12", match="substring")] == []
+        assert [r["name"] for r in reopened.search("-12-", match="substring")] == ["late"]
+        assert [r["name"] for r in reopened.search("ity-2", match="substring", limit=20)] == \
+            ["entity-2"] + [f"entity-{i}" for i in range(20, 30)]
+        reopened.close()
+
+    def test_prefix_without_complete_token_uses_trigrams(self, store, runs):
+        assert len(store.find_by_name_prefix("run")) == 3
+        assert store.find_by_name_prefix("ru") == [e["entity_id"] for e in runs]
+        assert store.find_by_name_prefix("un_") == []
+
+
+class TestSearchPages:
+    """Test cursor pagination over search results"""
+
+    @pytest.fixture
+    def layered(self, tmp_path):
+        """Store with a snapshot base layer, deletions in it and a newer overlay"""
+        store = MemoryStore(tmp_path)
+        created = store.create_entities(make_entities(30))
+        store.write_snapshot()
+        store.close()
+        store = MemoryStore(tmp_path)
+        for entity in created[::4]:
+            store.delete_entity(entity["entity_id"])
+        store.create_entities(make_entities(15))
+        yield store
+        store.close()
+
+    @pytest.mark.parametrize("query, entity_type", [("shared", None), ("shared text", "test"),
+                                                    ("", None), ("", "test")])
+    def test_pages_match_single_search(self, layered, query, entity_type):
+        expected = [r["entity_id"] for r in layered.search(query, entity_type, limit=1000)]
+        paged = []
+        after = -1
+        while True:
+            nodes, last_seq = layered.search_page(query, entity_type, 7, after)
+            paged += [r["entity_id"] for r in nodes]
+            if len(nodes) < 7:
+                break
+            after = last_seq
+        assert paged == expected
+        assert len(expected) == 37
+
+    def test_search_pages_stop_at_limit(self, layered):
+        pages = list(layered.search_pages("shared", limit=20, page_size=8))
+        assert [len(nodes) for nodes, _ in pages] == [8, 8, 4]
+        rest = [r for nodes, _ in layered.search_pages("shared", after=pages[-1][1]) for r in nodes]
+        assert len(rest) == 17
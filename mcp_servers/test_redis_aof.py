@@ -0,0 +1,187 @@
+#!/usr/bin/env python3
+"""
+Tests for Redis MCP persistence
+Append-only file replay, torn tails, rewrites, and a server restart with appendonly on
+"""
+
+import asyncio
+import os
+
+import pytest
+import requests
+
+from integrated_mcp_server import background_server
+from redis_aof import ALWAYS, FSYNC_POLICIES, NO, AppendOnlyLog, encode_frame
+from redis_store import RedisStore
+
+REQUEST_TIMEOUT = 30
+
+
+def open_logged(directory, fsync=ALWAYS):
+    """A store rebuilt from ``directory`` that logs its changes there"""
+    store = RedisStore()
+    aof = AppendOnlyLog(directory, fsync)
+    aof.replay(store)
+    aof.start()
+    store.on_change = aof.record
+    return store, aof
+
+
+def contents(store: RedisStore):
+    """Every key's type and value, ignoring TTLs"""
+    return {key: store.dump(key)[:2] for key in sorted(store.keys())}
+
+
+class TestAppendOnlyLog:
+    """Test logging and replaying keyspace changes"""
+
+    @pytest.mark.parametrize("policy", FSYNC_POLICIES)
+    def test_replay_rebuilds_the_keyspace(self, tmp_path, policy):
+        store, aof = open_logged(tmp_path, policy)
+        store.hset("h", "a", "1")
+        store.hset("h", "b", "2", ttl=300)
+        store.hdel("h", "a")
+        store.sadd("s", ["x", "y", "z"])
+        store.srem("s", ["y"])
+        store.zadd("z", {"m": 1, "n": 2})
+        store.zadd("z", {"m": 5})
+        store.zrem("z", ["n"])
+        store.sadd("gone", ["x"])
+        store.delete("gone")
+        store.sadd("kept", ["x"], ttl=300)
+        store.persist("kept")
+        aof.close()
+
+        replayed, aof = open_logged(tmp_path, policy)
+        assert contents(replayed) == contents(store)
+        assert 299 < replayed.ttl("h") <= 300
+        assert replayed.ttl("kept") == -1
+        # Writes with a TTL log an expire record after their data
+        assert aof.replayed == 14
+        aof.close()
+
+    def test_torn_tail_is_truncated(self, tmp_path):
+        store, aof = open_logged(tmp_path)
+        store.hset("h", "f", "v")
+        aof.close()
+        path = tmp_path / "incr-000001.aof"
+        intact = path.stat().st_size
+        with open(path, "ab") as f:
+            f.write(encode_frame([["hset", "h", "g", "w"]])[:-4])
+
+        replayed, aof = open_logged(tmp_path)
+        assert contents(replayed) == {"h": ("hash", {"f": "v"})}
+        assert path.stat().st_size == intact
+        replayed.hset("h", "g", "w")
+        aof.close()
+        assert open_logged(tmp_path)[0].hget("h", "g") == "w"
+
+    def test_keys_that_expired_while_down_are_not_restored(self, tmp_path):
+        store, aof = open_logged(tmp_path)
+        store.sadd("short", ["x"])
+        store.sadd("long", ["x"])
+        aof.close()
+        with open(tmp_path / "incr-000001.aof", "ab") as f:
+            f.write(encode_frame([["expireat", "short", 1.0], ["expireat", "long", 4e9]]))
+
+        replayed, aof = open_logged(tmp_path)
+        assert replayed.keys() == ["long"]
+        assert replayed.ttl("long") > 0
+        aof.close()
+
+    def test_non_finite_scores_are_not_replayed(self, tmp_path):
+        store, aof = open_logged(tmp_path)
+        store.zadd("z", {"a": 1, "b": 2})
+        aof.close()
+        # Scores logged as null by a server that accepted NaN or infinity
+        with open(tmp_path / "incr-000001.aof", "ab") as f:
+            f.write(encode_frame([["zadd", "z", {"a": None}], ["zadd", "nan", {"x": None}]]))
+
+        replayed, aof = open_logged(tmp_path)
+        assert contents(replayed) == {"z": ("zset", {"a": 1, "b": 2})}
+        aof.close()
+
+    def test_rewrite_keeps_changes_made_while_it_runs(self, tmp_path):
+        store, aof = open_logged(tmp_path, NO)
+        for i in range(200):
+            store.hset(f"h{i}", "v", "0")
+            store.sadd(f"s{i}", ["a", "b"])
+        for i in range(200):
+            store.hset(f"h{i}", "v", "1")
+
+        async def churn():
+            for i in range(200):
+                store.hset(f"h{i}", "v", "2")
+                store.delete(f"s{i}")
+                if i % 2:
+                    # Same key, new type, possibly after the rewrite copied the set
+                    store.zadd(f"s{i}", {"m": i})
+                await asyncio.sleep(0)
+
+        async def rewrite_during_churn():
+            return await asyncio.gather(aof.rewrite(store, chunk=7), churn())
+
+        aof.barrier().result()
+        before = aof.incr_bytes()
+        assert asyncio.run(rewrite_during_churn())[0]
+        aof.barrier().result()
+        assert aof.rewrites == 1
+        assert sorted(os.listdir(tmp_path)) == ["base-000003.aof", "incr-000002.aof",
+                                                "manifest.json"]
+        assert aof.base_bytes() < before
+        aof.close()
+
+        replayed, aof = open_logged(tmp_path)
+        assert contents(replayed) == contents(store)
+        aof.close()
+
+    def test_needs_rewrite_once_incremental_files_outgrow_the_base(self, tmp_path):
+        store, aof = open_logged(tmp_path)
+        store.hset("h", "f", "x" * 1000)
+        aof.barrier().result()
+        assert not aof.needs_rewrite(min_bytes=10_000)
+        assert aof.needs_rewrite(min_bytes=100)
+        asyncio.run(aof.rewrite(store))
+        assert not aof.needs_rewrite(min_bytes=100)
+        aof.close()
+
+    def test_stray_files_are_removed_and_bad_policies_rejected(self, tmp_path):
+        _, aof = open_logged(tmp_path)
+        aof.close()
+        (tmp_path / "base-000009.aof").write_bytes(b"half a rewrite")
+        AppendOnlyLog(tmp_path)
+        assert not (tmp_path / "base-000009.aof").exists()
+        with pytest.raises(ValueError):
+            AppendOnlyLog(tmp_path, "sometimes")
+
+
+class TestPersistentServer:
+    """Test that redis state survives a server restart with appendonly on"""
+
+    def test_restart_restores_redis_keys(self, tmp_path):
+        with background_server(tmp_path, appendonly=True, appendfsync=ALWAYS) as url:
+            requests.post(f"{url}/mcp/redis/hset",
+                          json={"key": "agent:1", "field": "phase", "value": "review"},
+                          timeout=REQUEST_TIMEOUT)
+            requests.post(f"{url}/mcp/redis/pipeline", json={"commands": [
+                {"op": "sadd", "key": "queue", "members": ["t1", "t2"]},
+                {"op": "zadd", "key": "scores", "members": {"t1": 0.5}, "ttl": 600},
+            ]}, timeout=REQUEST_TIMEOUT)
+
+        with background_server(tmp_path, appendonly=True) as url:
+            response = requests.post(f"{url}/mcp/redis/hget",
+                                     json={"key": "agent:1", "field": "phase"},
+                                     timeout=REQUEST_TIMEOUT)
+            assert response.json()["value"] == "review"
+            response = requests.post(f"{url}/mcp/redis/smembers", json={"key": "queue"},
+                                     timeout=REQUEST_TIMEOUT)
+            assert response.json()["members"] == ["t1", "t2"]
+            response = requests.post(f"{url}/mcp/redis/ttl", json={"key": "scores"},
+                                     timeout=REQUEST_TIMEOUT)
+            assert 0 < response.json()["ttl"] <= 600
+
+            status = requests.get(f"{url}/status", timeout=REQUEST_TIMEOUT).json()
+            persistence = status["redis_mcp"]["persistence"]
+            assert persistence["appendonly"]
+            assert persistence["replayed"] == 4
+            assert persistence["fsync"] == "everysec"
@@ -0,0 +1,241 @@
+#!/usr/bin/env python3
+"""
+Unit tests for the Redis MCP in-process store
+Data structures are exercised directly; only active expiry runs against an in-process server
+"""
+
+import random
+import time
+
+import pytest
+import requests
+
+import integrated_mcp_server
+from integrated_mcp_server import background_server
+from redis_store import RedisStore, SkipList, SortedSet, WrongTypeError
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+@pytest.fixture
+def clock():
+    return FakeClock()
+
+
+@pytest.fixture
+def store(clock):
+    return RedisStore(clock=clock)
+
+
+class TestSortedSet:
+    """Test the skip-list backed sorted set"""
+
+    def test_range_matches_sorted_reference(self):
+        rng = random.Random(7)
+        zset = SortedSet()
+        reference = {}
+        for _ in range(3000):
+            member = f"m{rng.randint(0, 500)}"
+            if rng.random() < 0.2:
+                zset.remove(member)
+                reference.pop(member, None)
+            else:
+                score = float(rng.randint(0, 100))
+                zset.add(member, score)
+                reference[member] = score
+
+        ordered = sorted(reference.items(), key=lambda item: (item[1], item[0]))
+        assert zset.range(0, -1) == ordered
+        for start, stop in [(0, 9), (10, 20), (-5, -1), (-1000, 3), (50, 10), (len(ordered) - 1, 10**6)]:
+            size = len(ordered)
+            lo = max(size + start, 0) if start < 0 else start
+            hi = size + stop if stop < 0 else stop
+            assert zset.range(start, stop) == ordered[lo:hi + 1]
+
+    def test_rescore_moves_member(self):
+        zset = SortedSet()
+        assert zset.add("a", 1)
+        assert zset.add("b", 2)
+        assert not zset.add("a", 3)
+        assert zset.range(0, -1) == [("b", 2), ("a", 3)]
+        assert len(zset.order) == 2
+
+    def test_non_finite_scores_are_rejected(self, store):
+        zset = SortedSet()
+        for score in (float("nan"), float("inf"), float("-inf")):
+            with pytest.raises(ValueError):
+                zset.add("a", score)
+        assert len(zset) == 0 and len(zset.order) == 0
+
+        store.zadd("z", {"b": 2})
+        with pytest.raises(ValueError):
+            store.zadd("z", {"a": 1, "b": float("nan")})
+        with pytest.raises(ValueError):
+            store.zadd("fresh", {"a": float("inf")})
+        assert store.zrange("z") == [("b", 2)]
+        assert store.keys() == ["z"]
+
+    def test_skiplist_delete_missing(self):
+        skiplist = SkipList()
+        skiplist.insert(1.0, "a")
+        assert not skiplist.delete(1.0, "b")
+        assert skiplist.delete(1.0, "a")
+        assert len(skiplist) == 0
+
+
+class TestKeyspace:
+    """Test Redis keyspace semantics"""
+
+    def test_wrong_type_is_rejected(self, store):
+        store.hset("k", "f", "v")
+        with pytest.raises(WrongTypeError):
+            store.sadd("k", ["x"])
+        with pytest.raises(WrongTypeError):
+            store.zrange("k")
+
+    def test_key_counts_and_delete(self, store):
+        store.hset("h", "f", "v")
+        store.sadd("s", ["a", "b"])
+        store.zadd("z", {"a": 1})
+        assert store.key_counts() == {"hash": 1, "set": 1, "zset": 1}
+        assert store.delete("s")
+        assert not store.delete("s")
+        assert store.key_counts() == {"hash": 1, "set": 0, "zset": 1}
+        assert len(store) == 2
+
+    def test_delete_prefix(self, store):
+        for ns in ("gw0", "gw1"):
+            store.hset(f"{ns}:h", "f", "v")
+            store.sadd(f"{ns}:s", ["a"])
+        assert store.delete_prefix("gw0:") == 2
+        assert store.key_counts() == {"hash": 1, "set": 1, "zset": 0}
+        assert store.delete_prefix("gw0:") == 0
+        assert store.used_bytes > 0
+        assert store.delete_prefix("gw") == 2
+        assert store.used_bytes == 0
+
+    def test_ttl_expires_key(self, store, clock):
+        store.zadd("timeline", {"event": 1}, ttl=10)
+        store.hset("config", "mode", "fast")
+        assert store.ttl("timeline") == pytest.approx(10)
+        assert store.ttl("config") == -1
+        assert store.ttl("missing") == -2
+
+        clock.now += 11
+        assert store.zrange("timeline") == []
+        assert store.ttl("timeline") == -2
+        assert len(store) == 1
+
+    def test_expire_due_drops_keys_actively(self, store, clock):
+        for i in range(5):
+            store.sadd(f"s{i}", ["x"], ttl=i + 1)
+        store.persist("s4")
+        clock.now += 3.5
+        assert store.expire_due() == 3
+        assert len(store) == 2
+        clock.now += 100
+        assert store.expire_due() == 1
+        assert store.smembers("s4") == ["x"]
+
+
+class TestChangeEvents:
+    """Test the change events handed to ``on_change``"""
+
+    def test_writes_emit_only_real_changes(self, clock):
+        events = []
+        store = RedisStore(clock=clock, on_change=events.append)
+        store.hset("h", "f", "v")
+        store.hset("h", "f", "v")
+        store.sadd("s", ["a", "b"])
+        store.sadd("s", ["a"])
+        store.zadd("z", {"a": 1, "b": 2})
+        store.zadd("z", {"a": 1, "b": 3})
+        store.srem("s", ["a", "missing"])
+        store.delete("h")
+        store.delete("h")
+        assert [(e["event"], e["key"], e["type"]) for e in events] == [
+            ("hset", "h", "hash"), ("sadd", "s", "set"), ("zadd", "z", "zset"),
+            ("zadd", "z", "zset"), ("srem", "s", "set"), ("del", "h", "hash")]
+        assert events[1]["members"] == ["a", "b"]
+        assert events[3]["members"] == {"b": 3}
+        assert events[4]["members"] == ["a"]
+
+    def test_expiry_emits_expired(self, clock):
+        events = []
+        store = RedisStore(clock=clock, on_change=events.append)
+        store.sadd("s", ["x"], ttl=1)
+        clock.now += 2
+        assert store.expire_due() == 1
+        assert events[-1] == {"event": "expired", "key": "s", "type": "set"}
+
+    def test_ttl_changes_follow_their_write(self, clock):
+        events = []
+        store = RedisStore(clock=clock, on_change=events.append)
+        store.hset("h", "f", "v", ttl=5)
+        store.persist("h")
+        store.persist("h")
+        assert [e["event"] for e in events] == ["hset", "expire", "persist"]
+        assert events[1]["ttl"] == 5
+
+    def test_dump_and_restore(self, clock):
+        store = RedisStore(clock=clock)
+        store.zadd("z", {"a": 1, "b": 2}, ttl=10)
+        clock.now += 4
+        kind, value, ttl = store.dump("z")
+        assert (kind, value, ttl) == ("zset", {"a": 1, "b": 2}, 6)
+
+        events = []
+        copy = RedisStore(clock=clock, on_change=events.append)
+        copy.sadd("z", ["replaced"])
+        copy.restore("z", kind, value, ttl)
+        assert copy.zrange("z") == [("a", 1), ("b", 2)]
+        assert copy.ttl("z") == 6
+        assert copy.memory() == store.memory()
+        assert len(events) == 1
+        assert store.dump("missing") is None
+
+
+class TestMemoryAccounting:
+    """Test incremental memory accounting"""
+
+    def test_usage_returns_to_zero(self, store):
+        store.hset("h", "field", "value")
+        store.hset("h", "field", "a much longer value")
+        store.sadd("s", ["a", "b", "c"])
+        store.zadd("z", {"a": 1, "b": 2})
+        assert store.memory()["used_bytes"] > 0
+
+        store.hdel("h", "field")
+        store.srem("s", ["a", "b", "c"])
+        store.zrem("z", ["a"])
+        store.delete("z")
+        assert store.memory() == {"used_bytes": 0, "keys": 0, "expiring_keys": 0}
+
+
+class TestActiveExpiry:
+    """Test that the server's expiry loop keeps up with keys that are never read again"""
+
+    def test_ten_thousand_keys_expire_within_two_ticks(self, tmp_path, monkeypatch):
+        interval = 0.25
+        monkeypatch.setattr(integrated_mcp_server, "EXPIRE_INTERVAL", interval)
+        with background_server(tmp_path) as url:
+            commands = [{"op": "hset", "key": f"lease:{i}", "field": "owner", "value": "a",
+                         "ttl": 1} for i in range(10000)]
+            response = requests.post(f"{url}/mcp/redis/pipeline", json={"commands": commands},
+                                     timeout=30)
+            assert response.json()["failed"] == 0
+            written = time.monotonic()
+
+            def keys():
+                return requests.get(f"{url}/health", timeout=30).json()["redis_keys"]
+            assert keys() == 10000
+            # Deadline, two ticks, and some slack for a busy machine
+            while keys() and time.monotonic() < written + 1 + 2 * interval + 0.5:
+                time.sleep(0.05)
+            assert keys() == 0
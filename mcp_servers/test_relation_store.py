@@ -0,0 +1,287 @@
+#!/usr/bin/env python3
+"""
+Unit tests for the knowledge graph relation store
+Run without a server: the store is exercised in-process against a temp directory
+"""
+
+import random
+from collections import deque
+
+import pytest
+
+from integrated_mcp_server import create_app
+from memory_store import MemoryStore
+from relation_store import BOTH, IN, OUT, TYPE_BITS, TYPE_MASK, MissingNodeError, RelationStore
+
+
+@pytest.fixture
+def graph(tmp_path):
+    store = RelationStore(tmp_path, fsync=False)
+    yield store
+    store.close()
+
+
+def edge_set(store):
+    """Every edge in the store as (source, target, relation type)"""
+    names, types = store._node_names, store._type_names
+    return {(names[node], names[packed >> TYPE_BITS], types[packed & TYPE_MASK])
+            for node, out in store._out.items() for packed in out}
+
+
+def churn(store, rng, rounds):
+    """Add and remove random edges, keeping a reference set of what should remain"""
+    expected = set()
+    for _ in range(rounds):
+        batch = [(f"n{rng.randrange(500)}", f"n{rng.randrange(500)}", rng.choice("xyz"))
+                 for _ in range(50)]
+        store.add(batch)
+        expected.update(batch)
+        gone = rng.sample(sorted(expected), len(expected) // 3)
+        store.remove(gone)
+        expected.difference_update(gone)
+    return expected
+
+
+def shortest_length(edges, source, target, direction):
+    """Reference breadth-first search over an edge list"""
+    adjacency = {}
+    for s, t, _ in edges:
+        if direction in (OUT, BOTH):
+            adjacency.setdefault(s, set()).add(t)
+        if direction in (IN, BOTH):
+            adjacency.setdefault(t, set()).add(s)
+    depth = {source: 0}
+    queue = deque([source])
+    while queue:
+        node = queue.popleft()
+        for neighbour in adjacency.get(node, ()):
+            if neighbour not in depth:
+                depth[neighbour] = depth[node] + 1
+                queue.append(neighbour)
+    return depth.get(target)
+
+
+class TestMutation:
+    """Test adding and removing relations"""
+
+    def test_duplicates_and_counts(self, graph):
+        assert graph.add([("a", "b", "knows"), ("a", "b", "knows"), ("a", "b", "cites")]) == 2
+        assert graph.add([("b", "c", "knows")]) == 1
+        assert graph.stats() == {"relations": 3, "nodes": 3, "relation_types": 2,
+                                 "garbage_bytes": 0}
+        assert graph.degree("b") == {"out": 1, "in": 2}
+
+        assert graph.remove([("a", "b", "knows"), ("x", "y", "knows")]) == 1
+        assert graph.remove_node("b") == 2
+        assert graph.stats()["relations"] == 0
+        assert graph.stats()["nodes"] == 0
+
+    def test_self_loop_counts_one_node(self, graph):
+        graph.add([("a", "a", "self")])
+        assert graph.stats()["nodes"] == 1
+        graph.remove([("a", "a", "self")])
+        assert graph.stats()["nodes"] == 0
+
+    def test_relations_survive_reopen(self, tmp_path):
+        store = RelationStore(tmp_path)
+        store.add([("a", "b", "knows"), ("b", "c", "knows"), ("c", "d", "knows")])
+        store.remove([("c", "d", "knows")])
+        store.add([("d", "a", "cites")])
+        store.remove_node("b")
+        store.close()
+
+        reopened = RelationStore(tmp_path)
+        assert reopened.stats() == {"relations": 1, "nodes": 2, "relation_types": 2,
+                                    "garbage_bytes": 0}
+        assert reopened.find_path("d", "a")["path"] == [
+            {"from": "d", "to": "a", "relationType": "cites"}]
+        reopened.close()
+
+
+class TestPersistence:
+    """Test snapshots, compaction and node ID reuse"""
+
+    def test_snapshot_then_tail_replay(self, tmp_path):
+        store = RelationStore(tmp_path, fsync=False)
+        expected = churn(store, random.Random(3), 20)
+        assert store.write_snapshot()
+        assert not store.write_snapshot()
+        store.add([("after", "snapshot", "x")])
+        store.remove_node("n1")
+        store.close()
+
+        reopened = RelationStore(tmp_path, fsync=False)
+        assert reopened.loaded_from_snapshot
+        expected = {e for e in expected if "n1" not in e[:2]} | {("after", "snapshot", "x")}
+        assert edge_set(reopened) == expected
+        snapshot_stats = reopened.stats()
+        reopened.close()
+
+        (tmp_path / "graph.snap").unlink()
+        replayed = RelationStore(tmp_path, fsync=False)
+        assert not replayed.loaded_from_snapshot
+        assert edge_set(replayed) == expected
+        assert replayed.stats() == snapshot_stats
+        replayed.close()
+
+    def test_compaction_shrinks_log_and_keeps_graph(self, tmp_path):
+        store = RelationStore(tmp_path, fsync=False, max_segment_bytes=4096)
+        expected = churn(store, random.Random(5), 60)
+        store.write_snapshot()
+        before = sum(p.stat().st_size for p in tmp_path.glob("segment-*.log"))
+        assert store.stats()["garbage_bytes"] > 0
+        assert not store.maybe_compact(min_bytes=1 << 30)
+        assert store.maybe_compact(min_bytes=0, min_ratio=0)
+        store.add([("after", "compaction", "x")])
+        expected.add(("after", "compaction", "x"))
+        assert edge_set(store) == expected
+        store.close()
+        assert sum(p.stat().st_size for p in tmp_path.glob("segment-*.log")) < before / 2
+
+        # The snapshot predates the compaction, so the whole log is replayed
+        reopened = RelationStore(tmp_path, fsync=False)
+        assert not reopened.loaded_from_snapshot
+        assert edge_set(reopened) == expected
+        reopened.close()
+
+    def test_node_ids_are_reused(self, graph):
+        for i in range(1000):
+            graph.add([(f"a{i}", f"b{i}", "x")])
+            graph.remove([(f"a{i}", f"b{i}", "x")])
+        graph.add([("c", "d", "x")])
+        assert len(graph._node_names) == 2
+        assert graph.nodes() == ["c", "d"]
+        assert graph.neighbors("c")["nodes"][0]["id"] == "d"
+
+
+class TestEntityConsistency:
+    """Test that edges only connect entities that exist"""
+
+    def test_missing_endpoints_are_rejected_and_orphans_pruned(self, graph):
+        existing = {"a", "b", "c"}
+
+        def missing(names):
+            return [name for name in names if name not in existing]
+
+        assert graph.add([("a", "b", "knows"), ("b", "c", "knows")], missing) == 2
+        with pytest.raises(MissingNodeError) as error:
+            graph.add([("a", "x", "knows")], missing)
+        assert error.value.names == ["x"]
+        assert graph.stats()["relations"] == 2
+
+        existing.discard("b")
+        assert graph.prune(missing) == 2
+        assert graph.nodes() == []
+        assert graph.prune(missing) == 0
+
+    def test_server_prunes_edges_left_by_a_crash(self, tmp_path):
+        memory = MemoryStore(tmp_path)
+        kept, deleted = (e["entity_id"] for e in memory.create_entities(
+            [{"name": "kept", "entityType": "t"}, {"name": "deleted", "entityType": "t"}]))
+        relations = RelationStore(tmp_path / "knowledge_graph")
+        relations.add([(kept, deleted, "knows"), (kept, kept, "self")])
+        # The crash came after the entity delete and before its edge removal
+        memory.delete_entity(deleted)
+        memory.close()
+        relations.close()
+        (tmp_path / "knowledge_graph" / "clean_shutdown").unlink()
+
+        app = create_app(tmp_path, appendonly=False)
+        try:
+            assert not app.state.relations.closed_cleanly
+            assert app.state.pruned_relations == 1
+            assert app.state.relations.nodes() == [kept]
+        finally:
+            app.state.memory.close()
+            app.state.relations.close()
+
+    def test_clean_shutdown_skips_the_prune(self, tmp_path):
+        directory = tmp_path / "knowledge_graph"
+        relations = RelationStore(directory, fsync=False)
+        assert not relations.closed_cleanly
+        relations.add([("a", "b", "knows")])
+        relations.close()
+
+        reopened = RelationStore(directory, fsync=False)
+        assert reopened.closed_cleanly
+        assert not (directory / "clean_shutdown").exists()
+        reopened.close()
+
+        memory = MemoryStore(tmp_path)
+        memory.close()
+        app = create_app(tmp_path, appendonly=False)
+        try:
+            assert app.state.relations.closed_cleanly
+            assert app.state.pruned_relations == 0
+        finally:
+            app.state.memory.close()
+            app.state.relations.close()
+
+
+class TestTraversal:
+    """Test neighbourhood and path queries"""
+
+    def test_neighbors_by_depth_and_direction(self, graph):
+        graph.add([("a", "b", "knows"), ("b", "c", "knows"), ("c", "d", "knows"),
+                   ("e", "a", "cites")])
+        result = graph.neighbors("a", depth=2)
+        assert [(n["id"], n["depth"]) for n in result["nodes"]] == [("b", 1), ("c", 2)]
+        assert result["nodes"][1]["via"] == {"from": "b", "to": "c", "relationType": "knows"}
+
+        incoming = graph.neighbors("a", depth=3, direction=IN)
+        assert [n["id"] for n in incoming["nodes"]] == ["e"]
+        assert incoming["nodes"][0]["via"] == {"from": "e", "to": "a", "relationType": "cites"}
+
+        both = graph.neighbors("a", depth=1, direction=BOTH)
+        assert sorted(n["id"] for n in both["nodes"]) == ["b", "e"]
+        assert graph.neighbors("a", depth=3, relation_type="cites")["nodes"] == []
+        assert graph.neighbors("missing")["nodes"] == []
+
+    def test_neighbors_limit_stops_early(self, graph):
+        graph.add([("hub", f"leaf-{i}", "has") for i in range(10000)])
+        result = graph.neighbors("hub", limit=10)
+        assert len(result["nodes"]) == 10
+        assert result["truncated"]
+        assert result["edges_visited"] == 10
+
+    def test_leaf_walk_does_not_scan_graph(self, graph):
+        graph.add([("hub", f"leaf-{i}", "has") for i in range(10000)])
+        graph.add([("start", "next", "to")])
+        result = graph.neighbors("start", depth=5)
+        assert [n["id"] for n in result["nodes"]] == ["next"]
+        assert result["edges_visited"] == 1
+
+    @pytest.mark.parametrize("direction", [OUT, IN, BOTH])
+    def test_find_path_is_shortest(self, graph, direction):
+        rng = random.Random(11)
+        edges = [(f"n{rng.randrange(300)}", f"n{rng.randrange(300)}", rng.choice("xyz"))
+                 for _ in range(700)]
+        graph.add(edges)
+        for _ in range(50):
+            source, target = f"n{rng.randrange(300)}", f"n{rng.randrange(300)}"
+            expected = shortest_length(edges, source, target, direction)
+            result = graph.find_path(source, target, max_depth=20, direction=direction)
+            if expected is None:
+                assert not result["found"]
+                continue
+            assert result["found"]
+            path = result["path"]
+            assert len(path) == expected
+            # The path must be a walk from source to target over real edges
+            node = source
+            for edge in path:
+                assert (edge["from"], edge["to"], edge["relationType"]) in edges
+                if direction == OUT or (direction == BOTH and edge["from"] == node):
+                    node = edge["to"]
+                else:
+                    node = edge["from"]
+            assert node == target
+
+    def test_find_path_respects_max_depth_and_type(self, graph):
+        graph.add([(f"c{i}", f"c{i + 1}", "next") for i in range(10)])
+        graph.add([("c0", "c10", "jump")])
+        assert len(graph.find_path("c0", "c10")["path"]) == 1
+        assert not graph.find_path("c0", "c10", max_depth=9, relation_type="next")["found"]
+        assert len(graph.find_path("c0", "c10", max_depth=10,
+                                   relation_type="next")["path"]) == 10
+        assert not graph.find_path("c10", "c0")["found"]
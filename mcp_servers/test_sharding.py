@@ -0,0 +1,255 @@
+#!/usr/bin/env python3
+"""
+Tests for the sharded MCP server
+Hash ring placement, cursor merging, and the router in front of in-process shards
+"""
+
+import time
+from contextlib import ExitStack
+
+import pytest
+import requests
+from fastapi import FastAPI, HTTPException
+
+import shard_router
+
+from integrated_mcp_server import background_server, serve_in_background
+from shard_router import create_router_app, decode_cursors, encode_cursors, sum_numbers
+from sharding import HashRing, hash_tag
+
+REQUEST_TIMEOUT = 30
+
+
+class TestHashRing:
+    """Test consistent-hash placement"""
+
+    def test_keys_spread_evenly(self):
+        ring = HashRing(4)
+        counts = [0] * 4
+        for i in range(20000):
+            counts[ring.shard_for(f"key:{i}")] += 1
+        assert min(counts) > 20000 / 4 * 0.8
+        assert max(counts) < 20000 / 4 * 1.2
+
+    def test_adding_a_shard_moves_few_keys(self):
+        before, after = HashRing(4), HashRing(5)
+        keys = [f"entity-{i}" for i in range(20000)]
+        moved = [key for key in keys if before.shard_for(key) != after.shard_for(key)]
+        # Ideally 1/5 of the keys move, all of them onto the new shard
+        assert len(moved) < len(keys) * 0.3
+        assert {after.shard_for(key) for key in moved} == {4}
+
+    def test_hash_tags_colocate_keys(self):
+        assert hash_tag("{job42}:inbox") == "job42"
+        assert hash_tag("plain:key") == "plain:key"
+        assert hash_tag("{}:empty") == "{}:empty"
+        ring = HashRing(8)
+        owners = {ring.shard_for_redis_key(f"{{job42}}:part{i}") for i in range(50)}
+        assert len(owners) == 1
+
+
+class TestRouterHelpers:
+    """Test the router's cursor and stats merging"""
+
+    def test_cursor_round_trip_and_validation(self):
+        assert decode_cursors(None, 3) == [-1, -1, -1]
+        cursor = encode_cursors([-1, 0, 41])
+        assert decode_cursors(cursor, 3) == [-1, 0, 41]
+        for bad in ("1.2", "x.y.z", "01.1.1", "1.-2.1"):
+            with pytest.raises(HTTPException):
+                decode_cursors(bad, 3)
+
+    def test_sum_numbers(self):
+        merged = sum_numbers([{"keys": 2, "dir": "/a", "memory": {"used_bytes": 10}},
+                              {"keys": 3, "dir": "/b", "memory": {"used_bytes": 5}}])
+        assert merged == {"keys": 5, "memory": {"used_bytes": 15}}
+
+
+@pytest.fixture(scope="module")
+def shard_urls(tmp_path_factory):
+    """Three in-process shards"""
+    with ExitStack() as stack:
+        yield [stack.enter_context(background_server(
+            tmp_path_factory.mktemp(f"shard{shard}"), shard=True)) for shard in range(3)]
+
+
+@pytest.fixture(scope="module")
+def router_url(shard_urls):
+    """A router over the three shards"""
+    with serve_in_background(create_router_app(shard_urls)) as url:
+        yield url
+
+
+class TestRouterHealth:
+    """Test that health probes are answered without asking the shards"""
+
+    def test_probe_sends_no_shard_requests(self, monkeypatch):
+        probes = []
+        shard = FastAPI()
+
+        @shard.get("/health")
+        def shard_health():
+            probes.append(time.monotonic())
+            return {"status": "healthy", "memory_entities": 3, "redis_keys": 2}
+
+        monkeypatch.setattr(shard_router, "HEALTH_INTERVAL", 3600)
+        with serve_in_background(shard) as shard_url, \
+                serve_in_background(create_router_app([shard_url, shard_url])) as url:
+            deadline = time.monotonic() + REQUEST_TIMEOUT
+            while len(probes) < 2 and time.monotonic() < deadline:
+                time.sleep(0.01)
+            assert len(probes) == 2
+            for _ in range(20):
+                response = requests.get(f"{url}/health", timeout=REQUEST_TIMEOUT)
+                assert response.status_code == 200
+            assert len(probes) == 2
+            body = response.json()
+            assert body["healthy_shards"] == 2 and body["memory_entities"] == 6
+            assert 0 <= body["age_seconds"] < REQUEST_TIMEOUT
+
+
+class TestRouter:
+    """Test that the sharded server answers like a single server"""
+
+    def test_entities_spread_and_page_in_creation_order(self, router_url):
+        entities = [{"name": f"router item {i}", "entityType": "routed",
+                     "observations": ["routed observation"]} for i in range(30)]
+        response = requests.post(f"{router_url}/mcp/memory/create_entities", json=entities,
+                                 timeout=REQUEST_TIMEOUT)
+        assert response.status_code == 200
+        assert response.json()["count"] == 30
+
+        status = requests.get(f"{router_url}/status", timeout=REQUEST_TIMEOUT).json()
+        assert status["memory_mcp"]["entities"] == 30
+        assert all(shard["memory_mcp"]["entities"] > 0 for shard in status["shards"])
+
+        names, cursor = [], None
+        while True:
+            page = requests.post(f"{router_url}/mcp/memory/search_nodes",
+                                 json={"query": "routed", "limit": 8, "cursor": cursor},
+                                 timeout=REQUEST_TIMEOUT).json()
+            names += [node["name"] for node in page["nodes"]]
+            cursor = page["next_cursor"]
+            if cursor is None:
+                break
+        assert names == [e["name"] for e in entities]
+
+        page = requests.post(f"{router_url}/mcp/memory/search_nodes",
+                             json={"query": "ter item 1", "match": "substring", "limit": 30},
+                             timeout=REQUEST_TIMEOUT).json()
+        assert [node["name"] for node in page["nodes"]] == \
+            [e["name"] for e in entities if e["name"].startswith("router item 1")]
+
+        ids = [node["entity_id"] for node in requests.post(
+            f"{router_url}/mcp/memory/search_nodes", json={"query": "routed", "limit": 30},
+            timeout=REQUEST_TIMEOUT).json()["nodes"]]
+        opened = requests.post(f"{router_url}/mcp/memory/open_nodes",
+                               json={"entity_ids": ids[::-1] + ["nope"]},
+                               timeout=REQUEST_TIMEOUT).json()
+        assert [node["entity_id"] for node in opened["nodes"]] == ids[::-1]
+        assert opened["missing"] == ["nope"]
+
+        response = requests.post(f"{router_url}/mcp/memory/delete_entities",
+                                 json={"namePrefix": "router item"}, timeout=REQUEST_TIMEOUT)
+        assert response.json()["deleted"] == 30
+
+    def test_relations_across_shards(self, router_url):
+        created = requests.post(f"{router_url}/mcp/memory/create_entities",
+                                json=[{"name": f"hop {i}", "entityType": "hop"} for i in range(6)],
+                                timeout=REQUEST_TIMEOUT).json()["entities"]
+        ids = [entity["entity_id"] for entity in created]
+        relations = [{"from": ids[i], "to": ids[i + 1], "relationType": "next"}
+                     for i in range(5)]
+        response = requests.post(f"{router_url}/mcp/memory/create_relations",
+                                 json={"relations": relations}, timeout=REQUEST_TIMEOUT)
+        assert response.json()["created"] == 5
+
+        path = requests.post(f"{router_url}/mcp/memory/find_path",
+                             json={"source": ids[0], "target": ids[5]},
+                             timeout=REQUEST_TIMEOUT).json()
+        assert len(path["path"]) == 5
+
+        missing = requests.post(f"{router_url}/mcp/memory/create_relations",
+                                json={"relations": [{"from": ids[0], "to": "nope",
+                                                     "relationType": "next"}]},
+                                timeout=REQUEST_TIMEOUT)
+        assert missing.status_code == 404
+
+        # Deleting an entity on any shard drops its edges from the graph
+        requests.post(f"{router_url}/mcp/memory/delete_entities", json={"entity_ids": ids[2:4]},
+                      timeout=REQUEST_TIMEOUT)
+        path = requests.post(f"{router_url}/mcp/memory/find_path",
+                             json={"source": ids[0], "target": ids[5]},
+                             timeout=REQUEST_TIMEOUT).json()
+        assert not path["found"]
+
+    def test_router_start_prunes_orphaned_edges(self, router_url, shard_urls):
+        created = requests.post(f"{router_url}/mcp/memory/create_entities",
+                                json=[{"name": f"orphan {i}", "entityType": "orphan"}
+                                      for i in range(12)],
+                                timeout=REQUEST_TIMEOUT).json()["entities"]
+        ids = [entity["entity_id"] for entity in created]
+        hub = ids[0]
+        ring = HashRing(len(shard_urls))
+        remote = next(entity_id for entity_id in ids[1:]
+                      if ring.shard_for(entity_id) != shard_router.GRAPH_SHARD)
+        requests.post(f"{router_url}/mcp/memory/create_relations",
+                      json={"relations": [{"from": hub, "to": remote, "relationType": "r"}]},
+                      timeout=REQUEST_TIMEOUT)
+        # Deleted behind the router's back, as when it fails before removing the edges
+        response = requests.post(f"{shard_urls[ring.shard_for(remote)]}/mcp/memory/delete_entity",
+                                 json={"entity_id": remote}, timeout=REQUEST_TIMEOUT)
+        assert response.status_code == 200
+
+        def neighbors(url):
+            return requests.post(f"{url}/mcp/memory/neighbors", json={"entity_id": hub},
+                                 timeout=REQUEST_TIMEOUT).json()["nodes"]
+        assert len(neighbors(router_url)) == 1
+
+        with serve_in_background(create_router_app(shard_urls)) as url:
+            deadline = time.monotonic() + REQUEST_TIMEOUT
+            while neighbors(url) and time.monotonic() < deadline:
+                time.sleep(0.05)
+            assert neighbors(url) == []
+
+    def test_redis_keys_and_pipeline(self, router_url):
+        commands = [{"op": "sadd", "key": f"routed:{i}", "members": [str(i)]} for i in range(20)]
+        commands += [{"op": "smembers", "key": "routed:7"},
+                     {"op": "delete_prefix", "prefix": "routed:"},
+                     {"op": "smembers", "key": "routed:7"}]
+        results = requests.post(f"{router_url}/mcp/redis/pipeline", json={"commands": commands},
+                                timeout=REQUEST_TIMEOUT).json()["results"]
+        assert results[20]["result"]["members"] == ["7"]
+        assert results[21]["result"]["deleted"] == 20
+        assert results[22]["result"]["members"] == []
+
+        requests.post(f"{router_url}/mcp/redis/hset",
+                      json={"key": "{agent}:state", "field": "phase", "value": "3"},
+                      timeout=REQUEST_TIMEOUT)
+        response = requests.post(f"{router_url}/mcp/redis/hget",
+                                 json={"key": "{agent}:state", "field": "phase"},
+                                 timeout=REQUEST_TIMEOUT)
+        assert response.json()["value"] == "3"
+
+        atomic = requests.post(f"{router_url}/mcp/redis/pipeline",
+                               json={"commands": [{"op": "hset", "key": "a", "field": "f",
+                                                   "value": "v"}, {"op": "hset", "key": "b"}],
+                                     "atomic": True}, timeout=REQUEST_TIMEOUT)
+        assert atomic.status_code == 400
+        assert atomic.json()["detail"]["index"] == 1
+        response = requests.post(f"{router_url}/mcp/redis/hget", json={"key": "a", "field": "f"},
+                                 timeout=REQUEST_TIMEOUT)
+        assert response.json()["value"] is None
+
+    def test_sequential_thinking_on_one_shard(self, router_url):
+        for number in (1, 2):
+            requests.post(f"{router_url}/mcp/thinking/thought",
+                          json={"thought": f"step {number}", "thoughtNumber": number,
+                                "totalThoughts": 2, "nextThoughtNeeded": number < 2},
+                          timeout=REQUEST_TIMEOUT)
+        summary = requests.get(f"{router_url}/mcp/thinking/summary",
+                               timeout=REQUEST_TIMEOUT).json()
+        assert summary["thoughts"] == 2
+        assert not summary["nextThoughtNeeded"]
+        status = requests.get(f"{router_url}/status", timeout=REQUEST_TIMEOUT).json()
+        assert status["sequential_thinking"]["thoughts"] == 2
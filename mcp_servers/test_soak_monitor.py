@@ -0,0 +1,64 @@
+#!/usr/bin/env python3
+"""
+Unit tests for soak-test trend detection
+Run without a server: series are synthesized and the test process samples itself
+"""
+
+import os
+import random
+import sys
+
+import pytest
+
+from soak_monitor import analyze_soak, detect_growth, kendall_tau, sample_process
+
+MiB = 1024 * 1024
+
+
+class TestGrowthDetection:
+    """Test that steady growth is flagged and noise or warm-up is not"""
+
+    def test_slow_leak_is_flagged(self):
+        rng = random.Random(1)
+        rss = [200 * MiB + i * 0.5 * MiB + rng.uniform(-2, 2) * MiB for i in range(120)]
+        trend = detect_growth(rss, 0.05, 8 * MiB)
+        assert trend["growing"]
+        assert trend["tau"] > 0.8
+
+    def test_noisy_plateau_is_not_flagged(self):
+        rng = random.Random(2)
+        rss = [200 * MiB + rng.uniform(-20, 20) * MiB for _ in range(120)]
+        assert not detect_growth(rss, 0.05, 8 * MiB)["growing"]
+
+    def test_warmup_and_single_step_are_not_flagged(self):
+        # Grows during warm-up, then one step (a cache filling) and flat again
+        threads = list(range(4, 40)) + [40] * 60 + [46] * 60
+        trend = detect_growth(threads, 0.10, 4)
+        assert trend["growth"] == 6
+        assert not trend["growing"]
+
+    def test_small_absolute_growth_is_not_flagged(self):
+        fds = [10 + i // 40 for i in range(120)]
+        assert not detect_growth(fds, 0.10, 8)["growing"]
+
+    def test_kendall_tau(self):
+        assert kendall_tau([1, 2, 3, 4]) == 1
+        assert kendall_tau([4, 3, 2, 1]) == -1
+        assert kendall_tau([1, 1, 1]) == 0
+
+    def test_analyze_flags_latency_drift(self):
+        samples = [{"rss_bytes": 100 * MiB, "open_fds": 20, "threads": 10} for _ in range(40)]
+        windows = [{"count": 100, "p50_ms": 1.0, "p99_ms": 5.0 + i * 0.5} for i in range(40)]
+        windows.append({"count": 0})
+        trends = analyze_soak(samples, windows)
+        assert trends["p99_ms"]["growing"]
+        assert not trends["p50_ms"]["growing"]
+        assert not trends["rss_bytes"]["growing"]
+
+
+@pytest.mark.skipif(not sys.platform.startswith("linux"), reason="reads /proc")
+def test_sample_process_reads_own_process():
+    sample = sample_process(os.getpid())
+    assert sample["rss_bytes"] > MiB
+    assert sample["threads"] >= 1
+    assert sample["open_fds"] >= 3
@@ -0,0 +1,117 @@
+#!/usr/bin/env python3
+"""
+Tests for the sequential thinking thought store
+Branch indexes, revision chains, the running summary, and the /mcp/thinking routes
+"""
+
+import pytest
+import requests
+
+from integrated_mcp_server import background_server
+from thought_store import ThoughtStore
+
+REQUEST_TIMEOUT = 30
+
+
+def thought(number, total=5, **fields):
+    return {"thought": f"step {number}", "thoughtNumber": number, "totalThoughts": total,
+            "nextThoughtNeeded": True, **fields}
+
+
+@pytest.fixture
+def session():
+    """Main line 1-4, a revision of 2 and of that revision, and two branches"""
+    store = ThoughtStore()
+    for number in range(1, 4):
+        store.add(thought(number))
+    store.add(thought(4, isRevision=True, revisesThought=2))
+    store.add(thought(5, branchId="alt", branchFromThought=3))
+    store.add(thought(6, branchId="alt"))
+    store.add(thought(7, isRevision=True, revisesThought=4))
+    store.add(thought(4, branchId="other", branchFromThought=2))
+    store.add(thought(8, total=3, branchId="alt"))
+    return store
+
+
+class TestThoughtStore:
+    """Test the indexes against what a scan of the history would return"""
+
+    def test_add_returns_the_tool_response(self):
+        store = ThoughtStore()
+        response = store.add(thought(3, total=2, branchId="b", branchFromThought=1))
+        assert response == {"thoughtNumber": 3, "totalThoughts": 3, "nextThoughtNeeded": True,
+                            "branches": ("b",), "thoughtHistoryLength": 1}
+
+    def test_history_and_branch_pages(self, session):
+        page, last = session.history(limit=4)
+        assert [t["thoughtNumber"] for t in page] == [1, 2, 3, 4]
+        page, last = session.history(after=last, limit=100)
+        assert len(page) == 5
+        assert session.history(after=last) == ([], None)
+
+        history = session.history(limit=100)[0]
+        expected = [t for t in history if t.get("branchId") == "alt"]
+        page, last = session.branch("alt", limit=2)
+        assert page == expected[:2]
+        assert session.branch("alt", after=last, limit=2)[0] == expected[2:]
+        assert session.branch("missing") is None
+
+    def test_revision_chain_follows_revisions_of_revisions(self, session):
+        assert [t["thoughtNumber"] for t in session.revisions(2)] == [4, 7]
+        assert [t["thoughtNumber"] for t in session.revisions(4)] == [7]
+        assert session.revisions(1) == []
+
+    def test_summary_is_maintained_on_append(self, session):
+        summary = session.summary()
+        assert summary["thoughts"] == 9
+        assert summary["totalThoughts"] == 8
+        assert summary["revisions"] == 2
+        assert summary["revisedThoughts"] == 2
+        assert summary["branches"] == {
+            "alt": {"thoughts": 3, "branchFromThought": 3, "lastThoughtNumber": 8},
+            "other": {"thoughts": 1, "branchFromThought": 2, "lastThoughtNumber": 4},
+        }
+        assert summary["lastThought"]["thoughtNumber"] == 8
+
+        assert session.clear() == 9
+        assert session.summary()["thoughts"] == 0
+        assert session.summary()["branches"] == {}
+
+
+class TestThinkingRoutes:
+    """Test the sequential thinking API of the integrated server"""
+
+    def test_thoughts_round_trip(self, tmp_path):
+        with background_server(tmp_path) as url:
+            for number in range(1, 6):
+                response = requests.post(f"{url}/mcp/thinking/thought",
+                                         json=thought(number, branchId="b" if number > 3 else None,
+                                                      branchFromThought=3 if number == 4 else None),
+                                         timeout=REQUEST_TIMEOUT)
+                assert response.status_code == 200
+            assert response.json()["branches"] == ["b"]
+            bad = requests.post(f"{url}/mcp/thinking/thought", json=thought(0),
+                                timeout=REQUEST_TIMEOUT)
+            assert bad.status_code == 422
+
+            numbers, cursor = [], None
+            while True:
+                page = requests.post(f"{url}/mcp/thinking/history",
+                                     json={"limit": 2, "cursor": cursor},
+                                     timeout=REQUEST_TIMEOUT).json()
+                numbers += [t["thoughtNumber"] for t in page["thoughts"]]
+                cursor = page["next_cursor"]
+                if cursor is None:
+                    break
+            assert numbers == [1, 2, 3, 4, 5]
+
+            branch = requests.post(f"{url}/mcp/thinking/branch", json={"branchId": "b"},
+                                   timeout=REQUEST_TIMEOUT).json()
+            assert [t["thoughtNumber"] for t in branch["thoughts"]] == [4, 5]
+            missing = requests.post(f"{url}/mcp/thinking/branch", json={"branchId": "nope"},
+                                    timeout=REQUEST_TIMEOUT)
+            assert missing.status_code == 404
+
+            summary = requests.get(f"{url}/mcp/thinking/summary", timeout=REQUEST_TIMEOUT).json()
+            assert summary["thoughts"] == 5
+            assert summary["branches"]["b"]["branchFromThought"] == 3
@@ -0,0 +1,137 @@
+#!/usr/bin/env python3
+"""
+Sequential thinking thought history
+Thought log with per-branch indexes, revision chains and a summary kept up to date on every append
+"""
+
+from bisect import bisect_right
+from typing import Any, Dict, List, Optional, Tuple
+
+# A thought as the sequential_thinking tool sends it: thought, thoughtNumber, totalThoughts,
+# nextThoughtNeeded, and optionally isRevision, revisesThought, branchFromThought, branchId
+Thought = Dict[str, Any]
+
+
+class ThoughtStore:
+    """Thought history of one sequential thinking session, indexed for its resources.
+
+    Thoughts are kept in arrival order, and a thought's position is its
+    sequence number. Next to the log the store keeps each branch's sequence
+    numbers, the sequence numbers of the thoughts revising each thought
+    number, and the counters ``summary`` reports, all updated on append. A
+    history or branch page, a revision chain and the summary therefore cost
+    the size of their result however long the session runs.
+
+    As in the reference server, thought numbers are not unique (branches
+    and revisions reuse them) and a thought claiming too small a
+    ``totalThoughts`` has it raised to its ``thoughtNumber``. Every thought
+    carrying a ``branchId`` belongs to that branch; the first one to give a
+    ``branchFromThought`` sets where the branch starts.
+    """
+
+    def __init__(self):
+        self._thoughts: List[Thought] = []
+        self._branches: Dict[str, List[int]] = {}
+        # Each branch's summary entry, kept current on append
+        self._branch_summary: Dict[str, Dict[str, Any]] = {}
+        # Branch IDs in creation order, rebuilt only when a branch is added
+        self._branch_ids: Tuple[str, ...] = ()
+        self._revised_by: Dict[int, List[int]] = {}
+        self._revisions = 0
+
+    def __len__(self) -> int:
+        return len(self._thoughts)
+
+    def add(self, thought: Thought) -> Dict[str, Any]:
+        """Record a thought; returns the sequential_thinking tool's response"""
+        thought = dict(thought)
+        if thought["thoughtNumber"] > thought["totalThoughts"]:
+            thought["totalThoughts"] = thought["thoughtNumber"]
+        seq = len(self._thoughts)
+        self._thoughts.append(thought)
+
+        branch_id = thought.get("branchId")
+        if branch_id is not None:
+            if branch_id not in self._branches:
+                self._branches[branch_id] = []
+                self._branch_ids += (branch_id,)
+                self._branch_summary[branch_id] = {"thoughts": 0, "branchFromThought": None}
+            self._branches[branch_id].append(seq)
+            entry = self._branch_summary[branch_id]
+            entry["thoughts"] += 1
+            entry["lastThoughtNumber"] = thought["thoughtNumber"]
+            if entry["branchFromThought"] is None:
+                entry["branchFromThought"] = thought.get("branchFromThought")
+        revises = thought.get("revisesThought")
+        if thought.get("isRevision") and revises is not None:
+            self._revised_by.setdefault(revises, []).append(seq)
+            self._revisions += 1
+
+        return {
+            "thoughtNumber": thought["thoughtNumber"],
+            "totalThoughts": thought["totalThoughts"],
+            "nextThoughtNeeded": thought["nextThoughtNeeded"],
+            "branches": self._branch_ids,
+            "thoughtHistoryLength": len(self._thoughts),
+        }
+
+    def history(self, after: int = -1, limit: int = 100) -> Tuple[List[Thought], Optional[int]]:
+        """Up to ``limit`` thoughts after sequence number ``after``, and the last one's"""
+        start = after + 1
+        page = self._thoughts[start:start + limit]
+        return page, start + len(page) - 1 if page else None
+
+    def branch(self, branch_id: str, after: int = -1, limit: int = 100
+               ) -> Optional[Tuple[List[Thought], Optional[int]]]:
+        """A page of one branch's thoughts like ``history``, or None for an unknown branch"""
+        seqs = self._branches.get(branch_id)
+        if seqs is None:
+            return None
+        start = bisect_right(seqs, after)
+        page = seqs[start:start + limit]
+        return [self._thoughts[seq] for seq in page], page[-1] if page else None
+
+    def revisions(self, thought_number: int) -> List[Thought]:
+        """Every thought revising ``thought_number``, or revising one of those, in arrival order"""
+        chain: List[int] = []
+        pending = [thought_number]
+        seen = {thought_number}
+        while pending:
+            for seq in self._revised_by.get(pending.pop(), ()):
+                chain.append(seq)
+                number = self._thoughts[seq]["thoughtNumber"]
+                if number not in seen:
+                    seen.add(number)
+                    pending.append(number)
+        return [self._thoughts[seq] for seq in sorted(chain)]
+
+    def summary(self) -> Dict[str, Any]:
+        last = self._thoughts[-1] if self._thoughts else None
+        return {
+            "thoughts": len(self._thoughts),
+            "totalThoughts": last["totalThoughts"] if last else 0,
+            "nextThoughtNeeded": last["nextThoughtNeeded"] if last else True,
+            "revisions": self._revisions,
+            "revisedThoughts": len(self._revised_by),
+            "branches": {branch_id: dict(entry)
+                         for branch_id, entry in self._branch_summary.items()},
+            "lastThought": last,
+        }
+
+    def clear(self) -> int:
+        """Forget the session; returns how many thoughts it had"""
+        count = len(self._thoughts)
+        self._thoughts = []
+        self._branches = {}
+        self._branch_summary = {}
+        self._branch_ids = ()
+        self._revised_by = {}
+        self._revisions = 0
+        return count
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "thoughts": len(self._thoughts),
+            "branches": len(self._branches),
+            "revisions": self._revisions,
+        }